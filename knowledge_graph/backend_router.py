@@ -0,0 +1,488 @@
+"""Health-probed routing across graph transports with per-backend circuit breakers.
+
+`build_graph_backend` used to try Bolt, then the Query API, then the in-memory
+graph exactly once at startup. `BackendRouter` keeps every transport as a
+candidate instead: a background prober measures each one, a circuit breaker
+takes a backend out of rotation after repeated errors, and every `run_cypher`
+goes to the fastest backend whose breaker is closed. While no backend is
+healthy, writes are appended to a journal (and mirrored into the in-memory
+fallback so reads keep working) and replayed in order once Neo4j answers again.
+
+Errors where Neo4j answered but rejected the statement (syntax errors,
+constraint violations; see `is_query_error`) are not outages: they go straight
+back to the caller without tripping a breaker or being journaled. A journaled
+write that Neo4j keeps rejecting on replay is moved to a dead-letter journal
+so the writes behind it can proceed.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Sequence, Tuple
+
+try:
+    from journal import AppendOnlyJournal
+    from prototype import Article, KnowledgeGraphBase, is_query_error, is_write_statement
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .journal import AppendOnlyJournal
+    from .prototype import Article, KnowledgeGraphBase, is_query_error, is_write_statement
+
+HEALTH_PROBE_CYPHER = "RETURN 1 AS ok"
+
+
+class NoHealthyBackendError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` consecutive errors.
+
+    An open breaker stays open for at least `reset_timeout` seconds and only
+    the background prober may close it again, so request threads never pay a
+    timeout against a backend that is known to be down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.CLOSED
+
+    def ready_for_probe(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        return self._clock() - (self.opened_at or 0.0) >= self.reset_timeout
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = self._clock()
+
+
+class RoutedBackend:
+    """A transport candidate: lazily constructed backend + health statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        breaker: CircuitBreaker,
+        latency_alpha: float = 0.2,
+        error_window: int = 50,
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.breaker = breaker
+        self.backend: Any = None
+        self.latency_alpha = latency_alpha
+        self.latency_ewma: float | None = None
+        self._outcomes: Deque[bool] = deque(maxlen=error_window)
+        self.last_error: Exception | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def connect(self) -> Any:
+        with self._lock:
+            if self.backend is None:
+                self.backend = self.factory()
+            return self.backend
+
+    def record(self, ok: bool, latency: float | None = None, error: Exception | None = None) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                if latency is not None:
+                    if self.latency_ewma is None:
+                        self.latency_ewma = latency
+                    else:
+                        self.latency_ewma += self.latency_alpha * (latency - self.latency_ewma)
+                self.breaker.record_success()
+            else:
+                self.last_error = error
+                self.breaker.record_failure()
+
+    def close(self) -> None:
+        if self.backend is not None:
+            try:
+                self.backend.close()
+            finally:
+                self.backend = None
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "connected": self.backend is not None,
+            "latency_ms": None if self.latency_ewma is None else self.latency_ewma * 1000,
+            "error_rate": self.error_rate,
+            "last_error": None if self.last_error is None else str(self.last_error),
+        }
+
+
+class BackendRouter(KnowledgeGraphBase):
+    """KnowledgeGraphBase whose `run_cypher` is routed across several transports.
+
+    `candidates` are `(name, factory)` pairs; factories are called lazily so a
+    transport that is down at startup can still join later. All Cypher-level
+    methods inherited from `KnowledgeGraphBase` are routed automatically.
+    """
+
+    def __init__(
+        self,
+        candidates: Sequence[Tuple[str, Callable[[], Any]]],
+        embedding_dim: int,
+        fallback: Any = None,
+        journal: AppendOnlyJournal | None = None,
+        dead_letter: AppendOnlyJournal | None = None,
+        max_replay_rejections: int = 3,
+        probe_interval: float = 15.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        start_prober: bool = True,
+        prefix_dim: int | None = None,
+        split_storage: bool = False,
+        compress_bodies: bool = False,
+    ) -> None:
+        # Each backend applies its own schema when constructed, so the base
+        # initializer (which would route DDL through run_cypher) is skipped.
+        self.embedding_dim = embedding_dim
+        self.startup_cache = None
+        if prefix_dim is not None and prefix_dim < embedding_dim:
+            self.prefix_dim = prefix_dim
+        if split_storage:
+            self.use_split_storage(compress_bodies)
+        self.fallback = fallback
+        self.journal = journal if journal is not None else AppendOnlyJournal(None)
+        if dead_letter is None:
+            path = self.journal.path
+            dead_letter = AppendOnlyJournal(
+                path.with_name(path.name + ".rejected") if path is not None else None
+            )
+        self.dead_letter = dead_letter
+        self.max_replay_rejections = max_replay_rejections
+        self._rejections: Dict[int, int] = {}  # journal seq -> times Neo4j rejected it
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self.backends = [
+            RoutedBackend(name, factory, CircuitBreaker(failure_threshold, reset_timeout, clock))
+            for name, factory in candidates
+        ]
+        self._replay_lock = threading.Lock()
+        self._local = threading.local()
+        self._degraded = False
+        self._stop = threading.Event()
+        self._prober: threading.Thread | None = None
+        # At startup only construct transports until one answers: a healthy
+        # Bolt driver means the Query API client is not loaded until needed.
+        self.probe_once(stop_at_healthy=True)
+        self._degraded = self.degraded  # build_graph_backend already reported it
+        if start_prober:
+            self.start()
+
+    # Health ----------------------------------------------------------------
+    def start(self) -> None:
+        if self._prober is not None:
+            return
+        self._stop.clear()
+        self._prober = threading.Thread(
+            target=self._probe_loop, name="kg-backend-prober", daemon=True
+        )
+        self._prober.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._prober is not None:
+            self._prober.join(timeout=self.probe_interval + 1)
+            self._prober = None
+
+    def probe_once(self, stop_at_healthy: bool = False) -> None:
+        for candidate in self.backends:
+            if stop_at_healthy and any(
+                c.latency_ewma is not None and c.breaker.is_closed for c in self.backends
+            ):
+                break
+            if not candidate.breaker.ready_for_probe():
+                continue
+            started = self._clock()
+            try:
+                candidate.connect().run_cypher(HEALTH_PROBE_CYPHER)
+            except Exception as exc:  # noqa: BLE001 - any transport error marks it down
+                was_closed = candidate.breaker.is_closed
+                candidate.record(False, error=exc)
+                candidate.breaker.trip()
+                if was_closed:
+                    print(f"[WARN] Graph backend {candidate.name} unavailable due to {exc}.")
+                continue
+            candidate.record(True, self._clock() - started)
+        self._replay_pending()
+
+    def health(self) -> List[Dict[str, object]]:
+        return [candidate.snapshot() for candidate in self.backends]
+
+    @property
+    def degraded(self) -> bool:
+        return not any(candidate.breaker.is_closed for candidate in self.backends)
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.probe_interval):
+            self.probe_once()
+
+    # Routing ---------------------------------------------------------------
+    def run_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        return self._route(
+            lambda backend: backend.run_cypher(statement, parameters),
+            [(statement, parameters)],
+            [],
+        )
+
+    def iter_read_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        # Drained per backend so a failure mid-stream still fails over.
+        yield from self._route(
+            lambda backend: list(backend.iter_read_cypher(statement, parameters)),
+            [(statement, parameters)],
+            [],
+        )
+
+    def run_cypher_batch(
+        self, statements: Sequence[Tuple[str, Dict[str, Any] | None]]
+    ) -> List[List[Dict[str, Any]]]:
+        return self._route(
+            lambda backend: backend.run_cypher_batch(statements),
+            statements,
+            [[] for _ in statements],
+        )
+
+    def _route(
+        self,
+        call: Callable[[Any], Any],
+        statements: Sequence[Tuple[str, Dict[str, Any] | None]],
+        journaled_result: Any,
+    ) -> Any:
+        write = any(is_write_statement(statement) for statement, _ in statements)
+        self._local.journaled = False
+        if self.journal.pending_count():
+            # Anything buffered during the outage goes upstream first: a write
+            # must not overtake it and a read must not miss it.
+            self._replay_pending()
+            if self.journal.pending_count():
+                if write:
+                    self._journal(statements)
+                    return journaled_result
+                if self.fallback is not None:
+                    raise NoHealthyBackendError("Buffered graph writes not replayed yet")
+        last_error: Exception | None = None
+        for candidate in self._ranked():
+            started = self._clock()
+            try:
+                result = call(candidate.connect())
+            except Exception as exc:  # noqa: BLE001 - fail over to the next transport
+                if is_query_error(exc):
+                    # Neo4j answered: the statement is bad, the backend is fine.
+                    candidate.record(True)
+                    raise
+                candidate.record(False, error=exc)
+                last_error = exc
+                continue
+            candidate.record(True, self._clock() - started)
+            self._set_degraded(False)
+            return result
+        self._set_degraded(True)
+        if write:
+            self._journal(statements)
+            return journaled_result
+        raise NoHealthyBackendError(f"No healthy graph backend (last error: {last_error})")
+
+    def _journal(self, statements: Sequence[Tuple[str, Dict[str, Any] | None]]) -> None:
+        self.journal.append_many(
+            {"statement": statement, "parameters": parameters or {}}
+            for statement, parameters in statements
+            if is_write_statement(statement)
+        )
+        self._local.journaled = True
+
+    def _ranked(self) -> List[RoutedBackend]:
+        healthy = [c for c in self.backends if c.breaker.is_closed]
+        order = {id(c): index for index, c in enumerate(self.backends)}
+        return sorted(
+            healthy,
+            key=lambda c: (
+                c.latency_ewma if c.latency_ewma is not None else float("inf"),
+                order[id(c)],
+            ),
+        )
+
+    def _replay_pending(self) -> None:
+        if not self.journal.pending_count() or self.degraded:
+            return
+        # Blocking: a caller that finds entries pending waits for the replay
+        # in progress instead of racing ahead of it.
+        with self._replay_lock:
+            replayed = 0
+            # Writes journaled while this runs (they found entries pending)
+            # are picked up by the next pass, behind the ones before them.
+            entries = self.journal.pending()
+            while entries:
+                entry = entries.pop(0)
+                rejected: Exception | None = None
+                for candidate in self._ranked():
+                    try:
+                        candidate.connect().run_cypher(entry["statement"], entry["parameters"])
+                    except Exception as exc:  # noqa: BLE001 - retry on next probe
+                        if is_query_error(exc):
+                            candidate.record(True)
+                            rejected = exc
+                            break
+                        candidate.record(False, error=exc)
+                        continue
+                    candidate.record(True)
+                    break
+                else:
+                    break
+                if rejected is not None and not self._quarantine(entry, rejected):
+                    break
+                self._rejections.pop(entry["seq"], None)
+                self.journal.mark_flushed(entry["seq"])
+                if rejected is None:
+                    replayed += 1
+                if not entries:
+                    entries = self.journal.pending()
+            if replayed:
+                print(f"[INFO] Replayed {replayed} buffered graph writes.")
+
+    def _quarantine(self, entry: Dict[str, Any], error: Exception) -> bool:
+        """Count a rejection of `entry`; dead-letter it once it reaches the limit."""
+        seq = entry["seq"]
+        self._rejections[seq] = self._rejections.get(seq, 0) + 1
+        if self._rejections[seq] < self.max_replay_rejections:
+            return False
+        self.dead_letter.append(
+            {
+                "statement": entry["statement"],
+                "parameters": entry["parameters"],
+                "journal_seq": seq,
+                "error": str(error),
+            }
+        )
+        print(f"[WARN] Neo4j rejected buffered write #{seq} ({error}); moved to dead letters.")
+        return True
+
+    def _set_degraded(self, degraded: bool) -> None:
+        if degraded and not self._degraded:
+            target = "in-memory fallback" if self.fallback is not None else "journal"
+            print(f"[WARN] No healthy Neo4j backend; serving from {target} until it recovers.")
+        self._degraded = degraded
+
+    # High-level API --------------------------------------------------------
+    def _write(self, name: str, *args: Any) -> None:
+        self._local.journaled = False
+        getattr(KnowledgeGraphBase, name)(self, *args)
+        if getattr(self._local, "journaled", False) and self.fallback is not None:
+            try:
+                getattr(self.fallback, name)(*args)
+            except KeyError:
+                # The article was written before the outage and only lives upstream.
+                pass
+
+    def _read(self, name: str, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        try:
+            return getattr(KnowledgeGraphBase, name)(self, *args, **kwargs)
+        except NoHealthyBackendError:
+            if self.fallback is None:
+                raise
+            return getattr(self.fallback, name)(*args, **kwargs)
+
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        self._write("upsert_article", article, embedding)
+
+    def attach_topics(self, article: Article) -> None:
+        self._write("attach_topics", article)
+
+    def attach_entities(self, article: Article) -> None:
+        self._write("attach_entities", article)
+
+    def attach_projects(self, article: Article) -> None:
+        self._write("attach_projects", article)
+
+    def create_similarity_links(
+        self, source_id: str, matches: List[Dict[str, object]]
+    ) -> None:
+        self._write("create_similarity_links", source_id, matches)
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        self._write("write_batch", operations)
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        self._write("merge_entities", groups)
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        return self._read("list_entities")
+
+    def filter_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("filter_articles", *args, **kwargs)
+
+    def read_page(self, *args: Any, **kwargs: Any) -> Tuple[List[Dict[str, object]], str | None]:
+        return self._read("read_page", *args, **kwargs)
+
+    def find_similar_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("find_similar_articles", *args, **kwargs)
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        return self._read("article_body", telegram_message_id)
+
+    def weekly_digest(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("weekly_digest", *args, **kwargs)
+
+    def article_list_by_entity(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("article_list_by_entity", *args, **kwargs)
+
+    def articles_by_domain(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("articles_by_domain", *args, **kwargs)
+
+    def vlm_projects(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("vlm_projects", *args, **kwargs)
+
+    def image_edit_news(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("image_edit_news", *args, **kwargs)
+
+    def close(self) -> None:
+        self.stop()
+        for candidate in self.backends:
+            candidate.close()
+        if self.fallback is not None:
+            self.fallback.close()
+        self.journal.close()
+        self.dead_letter.close()
@@ -0,0 +1,82 @@
+"""Throughput of HashEmbeddingService vs ParallelHashEmbedder by batch size.
+
+Every embedder is warmed on separate texts first (worker processes started,
+token caches filled from the same vocabulary), so the timings compare steady
+state rather than pool start-up. For each batch size it reports the serial
+rate and, per worker count, the forced-pool rate (`pool`) and the default
+policy (`auto`, which embeds batches below `min_parallel_batch` in-process).
+Worker counts are capped at the CPUs available to this process.
+
+Usage: python benchmarks/bench_embedding_pool.py [--batches 600,5000,20000] [--dim 256]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from embedding_pool import ParallelHashEmbedder, available_cpus  # noqa: E402
+from prototype import HashEmbeddingService  # noqa: E402
+
+
+def synthetic_texts(
+    count: int, seed: int = 7, words_per_text: int = 120, vocabulary: int = 20000
+) -> list[str]:
+    rng = random.Random(seed)
+    vocab = [f"tok{i}" for i in range(vocabulary)]
+    return [" ".join(rng.choices(vocab, k=words_per_text)) for _ in range(count)]
+
+
+def rate(embed_many, texts: list[str]) -> float:
+    started = time.perf_counter()
+    embed_many(texts)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", default="600,5000,20000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--warmup", type=int, default=2000)
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.batches.split(",")]
+    texts = synthetic_texts(max(sizes))
+    warmup = synthetic_texts(args.warmup, seed=11)
+    cpus = available_cpus()
+    print(f"{cpus} CPU(s) available, dim {args.dim}")
+
+    service = HashEmbeddingService(args.dim)
+    for text in warmup:
+        service.embed(text)
+    serial = {
+        size: rate(lambda batch: [service.embed(text) for text in batch], texts[:size])
+        for size in sizes
+    }
+    baseline = service.embed(texts[0])
+
+    for workers in sorted({2, 4, cpus}):
+        pool = ParallelHashEmbedder(args.dim, workers=workers, min_parallel_batch=0)
+        auto = ParallelHashEmbedder(args.dim, workers=workers)
+        with pool, auto:
+            for embedder in (pool, auto):
+                embedder.embed_many(warmup)
+            for size in sizes:
+                batch = texts[:size]
+                pooled, default = rate(pool.embed_many, batch), rate(auto.embed_many, batch)
+                drift = max(abs(a - b) for a, b in zip(pool.embed_many(batch[:1])[0], baseline))
+                print(
+                    f"workers={workers} (effective {pool.workers})  batch={size:<6} "
+                    f"serial {serial[size]:7,.0f}/s  pool {pooled:7,.0f}/s "
+                    f"({pooled / serial[size]:.2f}x)  auto {default:7,.0f}/s "
+                    f"({default / serial[size]:.2f}x, threshold {auto.min_parallel_batch})  "
+                    f"float32_drift={drift:.1e}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Memory footprint and query latency of InMemoryKnowledgeGraph on a synthetic corpus.
+
+Also builds the previous dict-per-article layout (Article object + embedding
+list + name lists + string-keyed set postings) from the same data for a
+memory comparison.
+
+Usage: python benchmarks/bench_inmemory_store.py [--articles 100000] [--dim 64] [--body-path FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prototype import Article, EntityRef, InMemoryKnowledgeGraph, ProjectRef  # noqa: E402
+
+TOPICS = [f"Topic {i}" for i in range(60)] + ["Image Editing Models", "Vision-Language Models"]
+ENTITIES = [f"Company {i}" for i in range(5000)]
+PROJECTS = [f"Project {i}" for i in range(2000)]
+
+
+def synthetic_corpus(count: int, dim: int) -> tuple[List[Article], List[List[float]]]:
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    articles, embeddings = [], []
+    for i in range(count):
+        articles.append(
+            Article(
+                telegram_message_id=str(100000 + i),
+                title=f"Synthetic article {i}",
+                body=" ".join(rng.choices(ENTITIES, k=40)),
+                telegram_url=f"https://t.me/bench/{100000 + i}",
+                published_at=now - timedelta(minutes=rng.randrange(60 * 24 * 90)),
+                source_channel="bench",
+                topics=rng.sample(TOPICS, 3),
+                entities=[EntityRef(name, "company") for name in rng.sample(ENTITIES, 4)],
+                projects=[ProjectRef(rng.choice(PROJECTS), rng.sample(TOPICS, 2))],
+            )
+        )
+        embeddings.append([rng.uniform(-1, 1) for _ in range(dim)])
+    return articles, embeddings
+
+
+def legacy_layout(articles: List[Article], embeddings: List[List[float]]) -> dict:
+    store: dict = {"articles": {}, "topics": defaultdict(set), "entities": defaultdict(set)}
+    for article, embedding in zip(articles, embeddings):
+        store["articles"][article.telegram_message_id] = {
+            "article": article,
+            "embedding": list(embedding),
+            "topics": list(article.topics),
+            "entities": [e.name for e in article.entities],
+            "projects": [p.name for p in article.projects],
+        }
+        for topic in article.topics:
+            store["topics"][topic].add(article.telegram_message_id)
+        for entity in article.entities:
+            store["entities"][entity.name].add(article.telegram_message_id)
+    return store
+
+
+def measure(build: Callable[[], object]) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(label: str, call: Callable[[], object], repeat: int = 5) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    print(f"  {label:<28} {(time.perf_counter() - started) / repeat * 1000:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--body-path", help="spill bodies to this file instead of RAM")
+    args = parser.parse_args()
+
+    articles, embeddings = synthetic_corpus(args.articles, args.dim)
+
+    # Fresh Article objects and float objects, as they would be after decoding a
+    # payload; strings are shared with the columnar run, so neither pays for them.
+    def build_legacy() -> dict:
+        return legacy_layout(
+            [Article.from_dict(a.to_dict()) for a in articles],
+            [[value * 1.0 for value in e] for e in embeddings],
+        )
+
+    def build_columnar() -> InMemoryKnowledgeGraph:
+        graph = InMemoryKnowledgeGraph(args.dim, body_path=args.body_path)
+        for article, embedding in zip(articles, embeddings):
+            graph.upsert_article(article, embedding)
+            graph.attach_topics(article)
+            graph.attach_entities(article)
+            graph.attach_projects(article)
+        return graph
+
+    legacy, legacy_bytes = measure(build_legacy)
+    del legacy
+    graph, columnar_bytes = measure(build_columnar)
+    print(f"{args.articles:,} articles, {args.dim}-dim embeddings")
+    print(f"  dict-per-article layout  {legacy_bytes / args.articles:8.0f} B/article")
+    print(f"  columnar store           {columnar_bytes / args.articles:8.0f} B/article")
+    print(f"  reduction                {legacy_bytes / columnar_bytes:8.1f}x")
+
+    query = embeddings[0]
+    timed("weekly_digest(7)", lambda: graph.weekly_digest(7))
+    timed("article_list_by_entity", lambda: graph.article_list_by_entity("Company 42", 30))
+    timed("vlm_projects", lambda: graph.vlm_projects())
+    timed("image_edit_news", lambda: graph.image_edit_news())
+    timed(
+        "filter_articles (3 facets)",
+        lambda: graph.filter_articles(
+            topics=["Topic 1"], exclude_topics=["Topic 2"], entities=["Company 7"], days=30
+        ),
+    )
+    timed("find_similar_articles", lambda: graph.find_similar_articles(query, "", 5, 0.5), 1)
+    graph.close()
+
+
+if __name__ == "__main__":
+    main()
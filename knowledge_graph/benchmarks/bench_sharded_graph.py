@@ -0,0 +1,106 @@
+"""Single-graph vs per-channel sharded in-memory graph on a multi-channel corpus.
+
+Times mixed-channel batch ingest, single-channel dedupe (`channels=[...]`),
+the cross-channel fan-out top-k and the merged facet/domain reads, and checks
+that the sharded reads return what the single graph returns. Both graphs
+compact their cold vector weeks before the reads are timed, so no background
+compactor competes with the measurement.
+
+Usage: python benchmarks/bench_sharded_graph.py [--articles 20000] [--channels 8] [--dim 64]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prototype import Article, InMemoryKnowledgeGraph  # noqa: E402
+from sharded_graph import ShardedKnowledgeGraph  # noqa: E402
+
+
+def synthetic_batches(count: int, channels: int, dim: int, batch: int) -> List[list]:
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    operations: list = []
+    for i in range(count):
+        article = Article(
+            telegram_message_id=str(i),
+            title=f"Synthetic article {i}",
+            body="",
+            telegram_url=f"https://t.me/bench/{i}",
+            published_at=now - timedelta(minutes=rng.randrange(60 * 24 * 60)),
+            source_channel=f"channel_{rng.randrange(channels)}",
+            topics=[f"Topic {rng.randrange(20)}"],
+            cta_link=f"https://site{rng.randrange(50)}.example.com/{i}",
+        )
+        embedding = [rng.uniform(-1, 1) for _ in range(dim)]
+        operations.append(("upsert_article", {"article": article, "embedding": embedding}))
+        operations.append(("attach_topics", {"article": article}))
+    return [operations[i : i + 2 * batch] for i in range(0, len(operations), 2 * batch)]
+
+
+def timed(label: str, call: Callable[[], Any], repeat: int = 5) -> Any:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    print(f"  {label:<34} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    batches = synthetic_batches(args.articles, args.channels, args.dim, args.batch)
+    single = InMemoryKnowledgeGraph(args.dim)
+    sharded = ShardedKnowledgeGraph(args.dim)
+    print(f"{args.articles:,} articles across {args.channels} channels, {args.dim}-dim")
+    for label, graph in (("single graph", single), ("sharded graph", sharded)):
+        started = time.perf_counter()
+        for batch in batches:
+            graph.write_batch(batch)
+        print(f"  ingest, {label:<26} {(time.perf_counter() - started) * 1000:9.2f} ms")
+        graph.compact_vectors()
+
+    query = batches[0][0][1]["embedding"]
+    article = batches[0][0][1]["article"]
+    channel = [article.source_channel]
+    timed("dedupe, single graph (global)", lambda: single.find_similar_articles(query, "", 5, 0.1))
+    timed(
+        "dedupe, single graph (channel)",
+        lambda: single.find_similar_articles(query, "", 5, 0.1, channels=channel),
+    )
+    timed(
+        "dedupe, sharded (channel)",
+        lambda: sharded.find_similar_articles(query, "", 5, 0.1, channels=channel),
+    )
+    expected = timed(
+        "top-10, single graph", lambda: single.find_similar_articles(query, "", 10, 0.1)
+    )
+    merged = timed("fan-out top-10, sharded", lambda: sharded.find_similar_articles(query, "", 10, 0.1))
+    same = [r["telegram_message_id"] for r in expected] == [r["telegram_message_id"] for r in merged]
+    print(f"  fan-out matches single graph       {same}")
+    topics = ["Topic 3"]
+    expected = timed("filter_articles, single graph", lambda: single.filter_articles(topics=topics))
+    merged = timed("filter_articles, sharded", lambda: sharded.filter_articles(topics=topics))
+    print(f"  filter matches single graph        {expected == merged}")
+    domain = "site7.example.com"
+    expected = timed("articles_by_domain, single graph", lambda: single.articles_by_domain(domain))
+    merged = timed("articles_by_domain, sharded", lambda: sharded.articles_by_domain(domain))
+    print(f"  domain matches single graph        {expected == merged}")
+    single.close()
+    sharded.close()
+
+
+if __name__ == "__main__":
+    main()
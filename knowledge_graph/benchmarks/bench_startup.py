@@ -0,0 +1,96 @@
+"""Import-time and cold/warm startup cost of the prototype entry points.
+
+Measures (1) how long `import prototype` takes in a fresh interpreter and which
+backend SDKs it drags in, next to the cost of importing those SDKs eagerly, and
+(2) graph construction with an empty vs. populated startup cache, using a fake
+backend that charges a simulated Aura round trip per statement.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--rtt-ms 80]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PACKAGE_DIR))
+
+from prototype import KnowledgeGraphBase, StartupCache  # noqa: E402
+
+SDK_MODULES = ("google.generativeai", "neo4j", "requests", "dotenv")
+
+
+def _time_python(code: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=PACKAGE_DIR, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _loaded_sdks() -> List[str]:
+    probe = (
+        "import sys, prototype; "
+        f"print(','.join(m for m in {SDK_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=PACKAGE_DIR, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    return [name for name in output.split(",") if name]
+
+
+class _SimulatedAura(KnowledgeGraphBase):
+    def __init__(self, embedding_dim: int, startup_cache: StartupCache, rtt: float) -> None:
+        self.rtt = rtt
+        self.statements = 0
+        super().__init__(embedding_dim, startup_cache)
+
+    @property
+    def schema_target(self) -> str | None:
+        return "bench://aura/neo4j"
+
+    def run_cypher(self, statement: str, parameters: Dict[str, Any] | None = None):
+        self.statements += 1
+        time.sleep(self.rtt)
+        return []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    baseline = _time_python("pass", args.runs)
+    lazy = _time_python("import prototype", args.runs)
+    print(f"interpreter startup:        {baseline * 1000:7.1f} ms")
+    print(f"import prototype:           {(lazy - baseline) * 1000:7.1f} ms")
+    print(f"SDKs loaded by import:      {', '.join(_loaded_sdks()) or 'none'}")
+    eager_imports = "\n".join(
+        f"try:\n    import {name}\nexcept ImportError:\n    pass" for name in SDK_MODULES
+    )
+    eager = _time_python(eager_imports, args.runs)
+    print(f"eager SDK imports (before): {(eager - baseline) * 1000:7.1f} ms (installed ones only)")
+
+    rtt = args.rtt_ms / 1000
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_path = Path(cache_dir) / StartupCache.FILENAME
+        for label in ("cold", "warm"):
+            started = time.perf_counter()
+            graph = _SimulatedAura(3072, StartupCache(cache_path), rtt)
+            elapsed = time.perf_counter() - started
+            print(
+                f"{label} graph construction:    {elapsed * 1000:7.1f} ms "
+                f"({graph.statements} DDL statements)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Full-vector scan vs two-stage prefix search in the in-memory graph.
+
+Matryoshka-style embeddings put most of the signal in the leading
+dimensions, so a renormalized prefix is enough to shortlist candidates and
+the full vector only has to rerank `limit * oversample` of them. The corpus
+here mimics that with a decaying per-dimension spectrum and topical clusters;
+queries are perturbed corpus vectors. For each (prefix_dim, oversample) the
+script reports query latency, recall@k against the exact full-vector top-k,
+and the size of the first-stage matrix relative to the full one.
+
+Usage: python benchmarks/bench_two_stage.py [--articles 5000] [--dim 768] [--prefixes 64,128,256]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prototype import Article, InMemoryKnowledgeGraph  # noqa: E402
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, rng: random.Random) -> List[List[float]]:
+    spectrum = [(index + 1) ** -0.35 for index in range(dim)]
+    centers = [[rng.gauss(0, 1) * scale for scale in spectrum] for _ in range(clusters)]
+    return [
+        [c + rng.gauss(0, 1.0) * scale for c, scale in zip(rng.choice(centers), spectrum)]
+        for _ in range(count)
+    ]
+
+
+def build(
+    vectors: Sequence[List[float]], dim: int, prefix_dim: int | None, oversample: int
+) -> InMemoryKnowledgeGraph:
+    graph = InMemoryKnowledgeGraph(dim, prefix_dim=prefix_dim, oversample=oversample)
+    now = datetime.utcnow()
+    operations = [
+        (
+            "upsert_article",
+            {
+                "article": Article(
+                    telegram_message_id=str(i),
+                    title=f"Synthetic article {i}",
+                    body="",
+                    telegram_url=f"https://t.me/bench/{i}",
+                    published_at=now - timedelta(minutes=i),
+                    source_channel="bench",
+                ),
+                "embedding": vector,
+            },
+        )
+        for i, vector in enumerate(vectors)
+    ]
+    graph.write_batch(operations)
+    return graph
+
+
+def run_queries(graph: InMemoryKnowledgeGraph, queries: Sequence[List[float]], limit: int) -> tuple:
+    started = time.perf_counter()
+    results = [
+        [record["telegram_message_id"] for record in graph.find_similar_articles(query, "", limit, -1.0)]
+        for query in queries
+    ]
+    return results, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--prefixes", default="64,128,256")
+    parser.add_argument("--oversample", default="2,5,10")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vectors = synthetic_vectors(args.articles, args.dim, max(1, args.articles // 50), rng)
+    queries = [
+        [value + rng.gauss(0, 0.5) * abs(value) for value in rng.choice(vectors)]
+        for _ in range(args.queries)
+    ]
+
+    exact_graph = build(vectors, args.dim, None, 1)
+    exact, exact_ms = run_queries(exact_graph, queries, args.limit)
+    exact_graph.close()
+    print(f"{args.articles:,} articles, dim {args.dim}, top-{args.limit}, {args.queries} queries")
+    print(f"  full scan                      {exact_ms:8.2f} ms/query   recall 1.000")
+
+    for prefix_dim in (int(value) for value in args.prefixes.split(",")):
+        for oversample in (int(value) for value in args.oversample.split(",")):
+            graph = build(vectors, args.dim, prefix_dim, oversample)
+            results, elapsed = run_queries(graph, queries, args.limit)
+            graph.close()
+            hits = sum(len(set(got) & set(want)) for got, want in zip(results, exact))
+            recall = hits / sum(len(want) for want in exact)
+            print(
+                f"  prefix {prefix_dim:4d} x oversample {oversample:3d}  {elapsed:8.2f} ms/query   "
+                f"recall {recall:.3f}   speedup {exact_ms / elapsed:5.1f}x   "
+                f"first stage {args.dim / prefix_dim:4.1f}x smaller"
+            )
+
+
+if __name__ == "__main__":
+    main()
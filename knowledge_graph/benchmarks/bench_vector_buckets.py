@@ -0,0 +1,126 @@
+"""Dedupe latency as the archive grows: flat scan vs weekly vector buckets.
+
+Builds archives of increasing age at a fixed weekly volume, then times
+duplicate checks for fresh posts (a perturbed copy of an article from the
+last few days). The flat scan is the single-channel path, which still scores
+every article; the bucketed path searches recent weeks first and prunes old
+ones by codebook bounds. Both must return the same matches. Besides the
+steady state it reports the first search on a fresh graph (cold weeks not
+compacted yet, so they are scanned flat while a background thread compacts
+them) and the first search after an edit lands in a compacted cold week.
+
+Usage: python benchmarks/bench_vector_buckets.py [--weeks 13,52,104,208] [--per-week 150] [--dim 128]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prototype import Article, InMemoryKnowledgeGraph  # noqa: E402
+
+
+def build(weeks: int, per_week: int, dim: int, rng: random.Random) -> tuple:
+    graph = InMemoryKnowledgeGraph(dim)
+    now = datetime(2026, 10, 1)
+    topics = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(60)]
+    vectors: List[List[float]] = []
+    operations = []
+    for i in range(weeks * per_week):
+        vector = [value + rng.gauss(0, 0.6) for value in rng.choice(topics)]
+        vectors.append(vector)
+        article = Article(
+            telegram_message_id=str(i),
+            title=f"Synthetic article {i}",
+            body="",
+            telegram_url=f"https://t.me/bench/{i}",
+            published_at=now - timedelta(minutes=i * 7 * 24 * 60 / per_week),
+            source_channel="bench",
+        )
+        operations.append(("upsert_article", {"article": article, "embedding": vector}))
+    graph.write_batch(operations)
+    return graph, vectors
+
+
+def ids(results: List[dict]) -> List[str]:
+    return [row["telegram_message_id"] for row in results]
+
+
+def timed(search, queries: list) -> tuple:
+    started = time.perf_counter()
+    results = [search(query) for query in queries]
+    return results, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--weeks", default="13,52,104,208")
+    parser.add_argument("--per-week", type=int, default=150)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--min-score", type=float, default=0.88)
+    args = parser.parse_args()
+
+    print(f"{args.per_week} articles/week, dim {args.dim}, min_score {args.min_score}")
+    for weeks in (int(value) for value in args.weeks.split(",")):
+        rng = random.Random(weeks)
+        graph, vectors = build(weeks, args.per_week, args.dim, rng)
+        buckets = graph.vector_buckets
+        recent = args.per_week // 2  # duplicates of posts from the last ~3 days
+        queries = [
+            [value + rng.gauss(0, 0.15) for value in vectors[rng.randrange(recent)]]
+            for _ in range(args.queries)
+        ]
+
+        def flat_search(query: List[float]) -> List[dict]:
+            return graph.find_similar_articles(query, "", 5, args.min_score, channels=["bench"])
+
+        def bucket_search(query: List[float]) -> List[dict]:
+            return graph.find_similar_articles(query, "", 5, args.min_score)
+
+        flat, flat_ms = timed(flat_search, queries)
+        # First search on the fresh graph: nothing compacted yet.
+        (first,), first_ms = timed(bucket_search, queries[:1])
+        started = time.perf_counter()
+        buckets.wait_for_compaction()
+        compact_s = time.perf_counter() - started
+
+        scored = 0
+        started = time.perf_counter()
+        bucketed = []
+        for query in queries:
+            bucketed.append(bucket_search(query))
+            scored += buckets.last_scored
+        bucket_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        mode = buckets.last_mode
+
+        # An edit to an article in a compacted (cold) week, then the next search.
+        old = len(vectors) - 1
+        graph.upsert_article(graph.get_article(str(old)), vectors[old])
+        (edited,), edit_ms = timed(bucket_search, queries[:1])
+
+        same = (
+            ids(first) == ids(flat[0])
+            and ids(edited) == ids(flat[0])
+            and all(ids(a) == ids(b) for a, b in zip(flat, bucketed))
+        )
+        stats = buckets.stats()
+        float_bytes = 4 * args.dim * len(vectors)
+        print(
+            f"  {weeks:4d} weeks {len(vectors):7,} articles   flat {flat_ms:8.2f} ms   "
+            f"buckets {bucket_ms:7.2f} ms ({mode}, {scored / len(queries):6.0f} scored)   "
+            f"first call {first_ms:7.2f} ms   after edit {edit_ms:7.2f} ms   same={same}   "
+            f"{stats['compacted']} weeks compacted in {compact_s:.1f}s (background), "
+            f"int8 {stats['int8_bytes'] / float_bytes:.0%} of float32"
+        )
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Telegram burst load against a Neo4j Query API endpoint (local stand-in or Aura).
+
+Channels publish in bursts (albums, cross-posts, a morning queue flushing),
+so ingest sees dozens of posts within a second and then silence. Each burst
+here is one channel posting `--burst-size` messages with ~`--spacing-ms`
+between them; every post runs the ingest round trip on one of `--workers`
+concurrent executions: a duplicate check, then the article upsert. About
+`--duplicate-rate` of the posts repeat a recent text, so dedupe has hits.
+
+Modes:
+  raw        the n8n node statements (read from the workflow JSON) over
+             keep-alive `http.client` connections, one per worker
+  transport  `Neo4jQueryAPIKnowledgeGraph` (needs `requests`):
+             `find_similar_articles` plus a `write_batch` transaction
+
+Reports throughput, p50/p95/p99 per step and end to end (arrival to done,
+so queueing behind a burst counts), errors by status, and the server's
+`/stats` when it is the local stand-in.
+
+Usage:
+    python query_api_server.py --latency-ms 10 --jitter-ms 10 --concurrency 4 &
+    python benchmarks/load_query_api.py [--mode raw|transport] [--bursts 20] [--burst-size 30]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import http.client
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prototype import (  # noqa: E402
+    Article,
+    EntityRef,
+    HashEmbeddingService,
+    Neo4jQueryAPIKnowledgeGraph,
+)
+
+N8N_DIR = Path(__file__).resolve().parents[1] / "n8n"
+TOPICS = ["OpenAI", "Generative Video", "Vision-Language Models", "Developer Tools", "Policy"]
+
+
+def n8n_statements() -> Tuple[str, str]:
+    """(duplicate query, upsert) exactly as the n8n Code nodes build them."""
+    nodes = {}
+    for workflow in ("content_posting_flow.json", "channel_knowledge_graph_ingestion.json"):
+        for node in json.loads((N8N_DIR / workflow).read_text())["nodes"]:
+            nodes[node["name"]] = node["parameters"].get("jsCode", "")
+    lines = re.search(r"const STATEMENT = \[(.*?)\]\.join", nodes["Query Builder"], re.S)
+    upsert = re.search(r"const statement = `(.*?)`", nodes["Query Builder1"], re.S)
+    return "\n".join(json.loads(f"[{lines.group(1)}]")), upsert.group(1).strip()
+
+
+class QueryAPIError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RawClient:
+    """One keep-alive connection per worker thread, like an n8n HTTP Request node."""
+
+    def __init__(self, url: str, auth: Tuple[str, str] | None) -> None:
+        self.url = urlparse(url)
+        self.headers = {"Content-Type": "application/json"}
+        if auth:
+            token = base64.b64encode(":".join(auth).encode()).decode()
+            self.headers["Authorization"] = f"Basic {token}"
+        self.duplicate_query, self.upsert = n8n_statements()
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            factory = (
+                http.client.HTTPSConnection
+                if self.url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = self._local.connection = factory(self.url.netloc, timeout=60)
+        return connection
+
+    def post(self, statement: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps({"statement": statement, "parameters": parameters})
+        connection = self._connection()
+        try:
+            connection.request("POST", self.url.path, body, self.headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status >= 400:
+            raise QueryAPIError(response.status, payload.decode(errors="replace")[:200])
+        return json.loads(payload)
+
+    def steps(self, post: Dict[str, Any]) -> List[Tuple[str, Callable[[], Any]]]:
+        dedupe = {
+            "limit": 5,
+            "min_score": 0.9,
+            "embedding": post["embedding"],
+            "telegram_message_id": post["id"],
+        }
+        upsert = {
+            "telegram_message_id": post["id"],
+            "channel_id": post["channel"],
+            "channel_title": post["channel"],
+            "channel_username": post["channel"],
+            "telegram_url": f"https://t.me/{post['channel']}/{post['id']}",
+            "raw_text": post["text"],
+            "media_type": None,
+            "media_file_id": None,
+            "embedding": post["embedding"],
+            "title": post["text"][:60],
+            "summary": post["text"],
+            "topics": post["topics"],
+            "tags": [],
+            "entity_names": ["OpenAI"],
+            "entity_types": ["Org"],
+            "cta_text": None,
+            "cta_link": None,
+            "topic_decision_required": False,
+            "suggested_topic": None,
+        }
+        return [
+            ("dedupe", lambda: self.post(self.duplicate_query, dedupe)),
+            ("upsert", lambda: self.post(self.upsert, upsert)),
+        ]
+
+
+class TransportClient:
+    """`Neo4jQueryAPIKnowledgeGraph` per worker thread (requests.Session is not shared)."""
+
+    def __init__(self, url: str, auth: Tuple[str, str] | None, dim: int) -> None:
+        user, password = auth or ("neo4j", "")
+        self.config = SimpleNamespace(
+            neo4j_user=user, neo4j_password=password, neo4j_query_url=url
+        )
+        self.dim = dim
+        self._local = threading.local()
+
+    def _graph(self) -> Neo4jQueryAPIKnowledgeGraph:
+        graph = getattr(self._local, "graph", None)
+        if graph is None:
+            graph = self._local.graph = Neo4jQueryAPIKnowledgeGraph(self.config, self.dim)
+        return graph
+
+    def steps(self, post: Dict[str, Any]) -> List[Tuple[str, Callable[[], Any]]]:
+        article = Article(
+            telegram_message_id=post["id"],
+            title=post["text"][:60],
+            body=post["text"],
+            telegram_url=f"https://t.me/{post['channel']}/{post['id']}",
+            published_at=datetime.utcnow(),
+            source_channel=post["channel"],
+            topics=post["topics"],
+            entities=[EntityRef("OpenAI", "Org")],
+        )
+        found: List[Dict[str, object]] = []
+
+        def dedupe() -> None:
+            found[:] = self._graph().find_similar_articles(post["embedding"], post["id"], 5, 0.9)
+
+        def write() -> None:
+            operations = [
+                ("upsert_article", {"article": article, "embedding": post["embedding"]}),
+                ("attach_topics", {"article": article}),
+                ("attach_entities", {"article": article}),
+            ]
+            if found:
+                matches = [
+                    {"telegram_message_id": m["telegram_message_id"], "score": m["score"]}
+                    for m in found
+                ]
+                operations.append(
+                    ("create_similarity_links", {"source_id": post["id"], "matches": matches})
+                )
+            self._graph().write_batch(operations)
+
+        return [("dedupe", dedupe), ("upsert", write)]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_posts(args: argparse.Namespace, rng: random.Random) -> List[List[Dict[str, Any]]]:
+    embedder = HashEmbeddingService(args.dim)
+    channels = [f"channel_{index}" for index in range(args.channels)]
+    recent: List[str] = []
+    bursts = []
+    serial = 0
+    for _ in range(args.bursts):
+        channel = rng.choice(channels)
+        burst = []
+        for _ in range(args.burst_size):
+            serial += 1
+            if recent and rng.random() < args.duplicate_rate:
+                text = rng.choice(recent[-200:])
+            else:
+                words = rng.sample(TOPICS, 2) + [f"release{rng.randrange(10_000)}"]
+                text = f"{' '.join(words)} announcement number {serial} with details"
+                recent.append(text)
+            burst.append(
+                {
+                    "id": f"load-{serial}",
+                    "channel": channel,
+                    "text": text,
+                    "topics": rng.sample(TOPICS, 2),
+                    "embedding": embedder.embed(text),
+                }
+            )
+        bursts.append(burst)
+    return bursts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:7475/db/neo4j/query/v2")
+    parser.add_argument("--mode", choices=("raw", "transport"), default="raw")
+    parser.add_argument("--auth", help="user:password for HTTP basic auth")
+    parser.add_argument("--dim", type=int, default=HashEmbeddingService().dimensions)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=30)
+    parser.add_argument("--spacing-ms", type=float, default=20.0, help="mean gap inside a burst")
+    parser.add_argument("--burst-gap", type=float, default=1.0, help="seconds between bursts")
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bursts = make_posts(args, rng)
+    auth = tuple(args.auth.split(":", 1)) if args.auth else None
+    if args.mode == "raw":
+        client: Any = RawClient(args.url, auth)
+    else:
+        client = TransportClient(args.url, auth, args.dim)
+
+    arrivals: "queue.Queue[Tuple[float, Dict[str, Any]] | None]" = queue.Queue()
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    lock = threading.Lock()
+
+    def worker() -> None:
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            arrived, post = item
+            failed = False
+            for step, call in client.steps(post):
+                started = time.perf_counter()
+                try:
+                    call()
+                except QueryAPIError as exc:
+                    failed = True
+                    with lock:
+                        errors[f"HTTP {exc.status}"] += 1
+                except RuntimeError as exc:  # the transport's "Neo4j Query API error <status>"
+                    failed = True
+                    status = re.search(r"Query API error (\d{3})", str(exc))
+                    with lock:
+                        errors[f"HTTP {status.group(1)}" if status else "RuntimeError"] += 1
+                except Exception as exc:  # noqa: BLE001 - counted and reported
+                    failed = True
+                    with lock:
+                        errors[type(exc).__name__] += 1
+                with lock:
+                    timings[step].append((time.perf_counter() - started) * 1000)
+                if failed:
+                    break
+            if not failed:
+                with lock:
+                    timings["post"].append((time.perf_counter() - arrived) * 1000)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    total = sum(len(burst) for burst in bursts)
+    print(
+        f"{args.mode}: {args.bursts} bursts x {args.burst_size} posts, {args.workers} workers, "
+        f"{args.url}"
+    )
+    started = time.perf_counter()
+    for index, burst in enumerate(bursts):
+        if index:
+            time.sleep(args.burst_gap)
+        for post in burst:
+            arrivals.put((time.perf_counter(), post))
+            time.sleep(rng.expovariate(1000 / args.spacing_ms) if args.spacing_ms else 0)
+    for _ in threads:
+        arrivals.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    done = len(timings["post"])
+    statements = len(timings["dedupe"]) + len(timings["upsert"])
+    print(
+        f"  {done}/{total} posts in {elapsed:.1f}s: {done / elapsed:.1f} posts/s, "
+        f"{statements / elapsed:.1f} requests/s"
+    )
+    for step in ("dedupe", "upsert", "post"):
+        values = timings[step]
+        print(
+            f"  {step:7s} p50 {percentile(values, 0.5):8.1f} ms   "
+            f"p95 {percentile(values, 0.95):8.1f} ms   p99 {percentile(values, 0.99):8.1f} ms   "
+            f"max {max(values, default=0):8.1f} ms"
+        )
+    if errors:
+        print("  errors: " + ", ".join(f"{name} x{count}" for name, count in errors.most_common()))
+    stats_url = urlparse(args.url)
+    if stats_url.scheme != "http":
+        return
+    try:
+        connection = http.client.HTTPConnection(stats_url.netloc, timeout=5)
+        connection.request("GET", "/stats")
+        response = connection.getresponse()
+        if response.status == 200:
+            print(f"  server: {json.loads(response.read())}")
+    except (OSError, http.client.HTTPException, ValueError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Mixed read/write stress test for ConcurrentKnowledgeGraph.
+
+Writer threads publish batches of synthetic articles while reader threads
+run dedupe, digest and faceted reads. Every read pins a snapshot and checks
+it is consistent: the article count is a whole number of batches, and
+`weekly_digest` over the full window sees exactly that many articles. The
+same load is repeated on a plain InMemoryKnowledgeGraph behind one lock
+(readers wait for ingest) for comparison.
+
+Usage: python benchmarks/stress_concurrent_graph.py [--seconds 5] [--readers 4] [--writers 2]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from concurrent_graph import ConcurrentKnowledgeGraph  # noqa: E402
+from prototype import Article, EntityRef, InMemoryKnowledgeGraph  # noqa: E402
+
+TOPICS = [f"Topic {i}" for i in range(20)]
+ENTITIES = [f"Company {i}" for i in range(200)]
+
+
+class LockedKnowledgeGraph:
+    """Baseline: one lock around every call."""
+
+    def __init__(self, embedding_dim: int) -> None:
+        self.graph = InMemoryKnowledgeGraph(embedding_dim)
+        self.lock = threading.RLock()
+        self.publishes = 0
+
+    @contextmanager
+    def snapshot(self) -> Iterator[InMemoryKnowledgeGraph]:
+        with self.lock:
+            yield self.graph
+
+    def write_batch(self, operations: List[Any]) -> None:
+        with self.lock:
+            self.graph.write_batch(operations)
+            self.publishes += 1
+
+    def close(self) -> None:
+        self.graph.close()
+
+
+def make_batch(writer: int, number: int, size: int, dim: int, rng: random.Random) -> List[Any]:
+    now = datetime.utcnow()
+    operations: List[Any] = []
+    for i in range(size):
+        article = Article(
+            telegram_message_id=f"{writer}-{number}-{i}",
+            title=f"Stress article {writer}/{number}/{i}",
+            body="",
+            telegram_url=f"https://t.me/stress/{writer}{number}{i}",
+            published_at=now - timedelta(minutes=rng.randrange(60 * 24)),
+            source_channel="stress",
+            topics=rng.sample(TOPICS, 2),
+            entities=[EntityRef(rng.choice(ENTITIES), "company")],
+        )
+        embedding = [rng.uniform(-1, 1) for _ in range(dim)]
+        operations.append(("upsert_article", {"article": article, "embedding": embedding}))
+        operations.append(("attach_topics", {"article": article}))
+        operations.append(("attach_entities", {"article": article}))
+    return operations
+
+
+def run(graph: Any, args: argparse.Namespace) -> Dict[str, Any]:
+    stop = threading.Event()
+    stats: Dict[str, Any] = {"reads": 0, "writes": 0, "violations": 0, "read_ms": [], "write_ms": []}
+    stats_lock = threading.Lock()
+
+    def writer(index: int) -> None:
+        rng = random.Random(index)
+        number = 0
+        while not stop.is_set():
+            batch = make_batch(index, number, args.batch, args.dim, rng)
+            started = time.perf_counter()
+            graph.write_batch(batch)
+            elapsed = (time.perf_counter() - started) * 1000
+            number += 1
+            with stats_lock:
+                stats["writes"] += args.batch
+                stats["write_ms"].append(elapsed)
+
+    def reader(index: int) -> None:
+        rng = random.Random(1000 + index)
+        while not stop.is_set():
+            query = [rng.uniform(-1, 1) for _ in range(args.dim)]
+            started = time.perf_counter()
+            with graph.snapshot() as view:
+                count = len(view)
+                digest = view.weekly_digest(days=2)
+                view.find_similar_articles(query, "", 5, 0.5)
+                view.filter_articles(topics=[rng.choice(TOPICS)], limit=10)
+            elapsed = (time.perf_counter() - started) * 1000
+            with stats_lock:
+                stats["reads"] += 1
+                stats["read_ms"].append(elapsed)
+                if count % args.batch or len(digest) != count:
+                    stats["violations"] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=32)
+    args = parser.parse_args()
+
+    print(
+        f"{args.readers} readers, {args.writers} writers, batches of {args.batch}, "
+        f"{args.seconds:.0f}s per run"
+    )
+    for label, graph in (
+        ("single lock", LockedKnowledgeGraph(args.dim)),
+        ("left-right snapshots", ConcurrentKnowledgeGraph(args.dim)),
+    ):
+        stats = run(graph, args)
+        print(f"  {label}")
+        print(
+            f"    reads   {stats['reads'] / args.seconds:9.1f}/s   "
+            f"p50 {percentile(stats['read_ms'], 0.5):7.2f} ms  p99 {percentile(stats['read_ms'], 0.99):7.2f} ms"
+        )
+        print(
+            f"    writes  {stats['writes'] / args.seconds:9.1f} articles/s   "
+            f"publish p50 {percentile(stats['write_ms'], 0.5):7.2f} ms  "
+            f"p99 {percentile(stats['write_ms'], 0.99):7.2f} ms"
+        )
+        print(f"    inconsistent snapshots  {stats['violations']}")
+        with graph.snapshot() as view:
+            print(f"    final corpus            {len(view):,} articles")
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""Record/replay of Gemini embeddings and Neo4j Query API traffic.
+
+Offline runs use `HashEmbeddingService` and `InMemoryKnowledgeGraph`, which
+return different vectors, smaller payloads and no network latency, so batching,
+pooling and caching work cannot be measured without production credentials.
+A `Cassette` captures real calls once and plays them back deterministically:
+
+* `CassetteEmbeddingService` wraps an embedder. Each vector is stored as
+  base64 float32 under `(model, sha256(text))` together with its latency.
+* `CassetteSession` stands in for the `requests.Session` of
+  `Neo4jQueryAPIKnowledgeGraph`. It stores the status, headers and raw JSON
+  body of every `/query/v2` POST, so replay exercises the real streaming
+  parser on real payload sizes. Requests match on statement plus parameters.
+  Otherwise they fall back to the n-th recording of the same statement,
+  which keeps runs with fresh timestamps in their parameters replayable.
+
+With an inner service or session, hits replay and misses go upstream and are
+recorded; without one, a miss raises `CassetteMiss`. Replay latency can be
+"off", each call's "recorded" latency, or "sampled" (seeded draws from the
+recorded distribution of that kind of call), scaled by `latency_scale`.
+The file is gzip JSON lines.
+
+Usage:
+  python cassette.py record cassettes/scenario.jsonl.gz   # live Gemini + Query API
+  python cassette.py replay cassettes/scenario.jsonl.gz --latency sampled
+  python cassette.py stats cassettes/scenario.jsonl.gz
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from array import array
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlparse
+
+try:
+    from prototype import (
+        EnvConfig,
+        GeminiEmbeddingService,
+        Neo4jQueryAPIKnowledgeGraph,
+        ScenarioRunner,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import (
+        EnvConfig,
+        GeminiEmbeddingService,
+        Neo4jQueryAPIKnowledgeGraph,
+        ScenarioRunner,
+    )
+
+EMBED = "embed"
+QUERY_API = "query_api"
+LATENCY_MODES = ("off", "recorded", "sampled")
+TX_PATH_RE = re.compile(r"/tx/[^/]+")
+
+
+class CassetteMiss(LookupError):
+    """A replay-only cassette has no recording for this request."""
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def encode_vector(vector: Sequence[float]) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(data))
+    return values.tolist()
+
+
+class Cassette:
+    """Recorded calls keyed by (kind, request key), replayed in recording order."""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        latency: str = "off",
+        latency_scale: float = 1.0,
+        seed: int = 0,
+    ) -> None:
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"latency must be one of {LATENCY_MODES}, got {latency!r}")
+        self.path = Path(path) if path is not None else None
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.meta: Dict[str, Any] = {}
+        self.entries: List[Dict[str, Any]] = []
+        self._exact: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._fallback: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._cursors: Dict[Tuple[str, str, str], int] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            self.load(self.path)
+
+    # Persistence -----------------------------------------------------------
+    def load(self, path: Path | str) -> None:
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                record = json.loads(line)
+                if "meta" in record:
+                    self.meta.update(record["meta"])
+                else:
+                    self._index(record)
+
+    def save(self, path: Path | str | None = None) -> Path:
+        target = Path(path) if path is not None else self.path
+        if target is None:
+            raise ValueError("Cassette has no path to save to.")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, gzip.open(target, "wt", encoding="utf-8") as handle:
+            handle.write(json.dumps({"meta": self.meta}) + "\n")
+            for entry in self.entries:
+                handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return target
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self.entries.append(entry)
+        self._exact.setdefault((entry["kind"], entry["key"]), []).append(entry)
+        if entry.get("fallback"):
+            self._fallback.setdefault((entry["kind"], entry["fallback"]), []).append(entry)
+        self._latencies.setdefault(entry["kind"], []).append(entry["latency"])
+
+    # Recording and lookup --------------------------------------------------
+    def record(
+        self,
+        kind: str,
+        key: str,
+        payload: Dict[str, Any],
+        latency: float,
+        fallback: str | None = None,
+    ) -> None:
+        entry = {"kind": kind, "key": key, "latency": round(latency, 6), **payload}
+        if fallback:
+            entry["fallback"] = fallback
+        with self._lock:
+            self._index(entry)
+
+    def lookup(self, kind: str, key: str, fallback: str | None = None) -> Dict[str, Any] | None:
+        """Next recording for `key` (else for `fallback`); the last one repeats once exhausted."""
+        with self._lock:
+            entry = self._next(self._exact, kind, key)
+            # Advance the statement's sequence on exact hits too, so a later
+            # fallback lookup picks the recording made at the same point.
+            fallback_entry = self._next(self._fallback, kind, fallback) if fallback else None
+            entry = entry or fallback_entry
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def _next(
+        self, index: Dict[Tuple[str, str], List[Dict[str, Any]]], kind: str, key: str
+    ) -> Dict[str, Any] | None:
+        recorded = index.get((kind, key))
+        if not recorded:
+            return None
+        cursor_key = (kind, "exact" if index is self._exact else "fallback", key)
+        cursor = self._cursors.get(cursor_key, 0)
+        self._cursors[cursor_key] = cursor + 1
+        return recorded[min(cursor, len(recorded) - 1)]
+
+    def rewind(self) -> None:
+        with self._lock:
+            self._cursors.clear()
+
+    def delay(self, kind: str, entry: Dict[str, Any]) -> float:
+        if self.latency == "off":
+            return 0.0
+        if self.latency == "recorded":
+            seconds = entry["latency"]
+        else:
+            with self._lock:
+                seconds = self._rng.choice(self._latencies[kind])
+        return seconds * self.latency_scale
+
+    def replay_wait(self, kind: str, entry: Dict[str, Any]) -> None:
+        seconds = self.delay(kind, entry)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        summary: Dict[str, Dict[str, float]] = {}
+        for kind, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            entries = [entry for entry in self.entries if entry["kind"] == kind]
+            payload = sum(len(entry.get("body") or entry.get("vector") or "") for entry in entries)
+            summary[kind] = {
+                "calls": len(ordered),
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p99_ms": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000,
+                "payload_bytes": payload,
+            }
+        return summary
+
+
+class CassetteEmbeddingService:
+    """Embedding service that replays recorded vectors and records misses through `service`."""
+
+    def __init__(
+        self, cassette: Cassette, service: Any | None = None, model: str | None = None
+    ) -> None:
+        self.cassette = cassette
+        self.service = service
+        self.model = (
+            model or getattr(service, "model", None) or cassette.meta.get("embedding_model")
+        )
+        if self.model is None:
+            raise ValueError("Pass a service or model, or use a cassette recorded with one.")
+        if service is not None:
+            cassette.meta.setdefault("embedding_model", self.model)
+
+    def embed(self, text: str) -> List[float]:
+        key = _digest(self.model, text)
+        entry = self.cassette.lookup(EMBED, key)
+        if entry is not None:
+            self.cassette.replay_wait(EMBED, entry)
+            return decode_vector(entry["vector"])
+        if self.service is None:
+            raise CassetteMiss(f"No recorded embedding for {text[:40]!r} ({self.model}).")
+        started = time.perf_counter()
+        vector = self.service.embed(text)
+        self.cassette.record(
+            EMBED, key, {"vector": encode_vector(vector)}, time.perf_counter() - started
+        )
+        self.cassette.meta["embedding_dimensions"] = len(vector)
+        return vector
+
+    def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
+
+    @property
+    def dimensions(self) -> int:
+        recorded = self.cassette.meta.get("embedding_dimensions")
+        if recorded:
+            return int(recorded)
+        if self.service is None:
+            raise CassetteMiss("Cassette has no recorded embedding dimensions.")
+        dimensions = self.service.dimensions
+        self.cassette.meta["embedding_dimensions"] = dimensions
+        return dimensions
+
+
+class CassetteResponse:
+    """The parts of `requests.Response` that `Neo4jQueryAPIKnowledgeGraph` uses."""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+class CassetteSession:
+    """`requests.Session` stand-in recording or replaying Query API calls."""
+
+    KEPT_HEADERS = ("content-type", "neo4j-cluster-affinity")
+
+    def __init__(self, cassette: Cassette, session: Any | None = None) -> None:
+        self.cassette = cassette
+        self.session = session
+
+    @property
+    def auth(self) -> Any:
+        return getattr(self.session, "auth", None)
+
+    @auth.setter
+    def auth(self, value: Any) -> None:
+        if self.session is not None:
+            self.session.auth = value
+
+    @staticmethod
+    def request_keys(method: str, url: str, payload: Dict[str, Any] | None) -> Tuple[str, str]:
+        # Transaction ids differ between runs; the path shape and statement do not.
+        path = TX_PATH_RE.sub("/tx/*", urlparse(url).path)
+        payload = payload or {}
+        statement = payload.get("statement") or ""
+        parameters = json.dumps(payload.get("parameters") or {}, sort_keys=True, default=str)
+        return _digest(method, path, statement, parameters), _digest(method, path, statement)
+
+    def post(self, url: str, json: Dict[str, Any] | None = None, **kwargs: Any) -> CassetteResponse:
+        return self._call("POST", url, json, kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> CassetteResponse:
+        return self._call("DELETE", url, None, kwargs)
+
+    def _call(
+        self, method: str, url: str, payload: Dict[str, Any] | None, kwargs: Dict[str, Any]
+    ) -> CassetteResponse:
+        key, fallback = self.request_keys(method, url, payload)
+        entry = self.cassette.lookup(QUERY_API, key, fallback)
+        if entry is not None:
+            self.cassette.replay_wait(QUERY_API, entry)
+            return CassetteResponse(
+                entry["status"], dict(entry["headers"]), entry["body"].encode("utf-8")
+            )
+        if self.session is None:
+            statement = (payload or {}).get("statement") or method
+            raise CassetteMiss(f"No recorded Query API call for {statement.strip()[:60]!r}.")
+        kwargs.pop("stream", None)
+        started = time.perf_counter()
+        response = getattr(self.session, method.lower())(url, json=payload, **kwargs)
+        content = response.content  # read fully so the latency covers the whole body
+        elapsed = time.perf_counter() - started
+        headers = {
+            name: response.headers[name] for name in self.KEPT_HEADERS if name in response.headers
+        }
+        body = content.decode("utf-8", errors="replace")
+        self.cassette.record(
+            QUERY_API,
+            key,
+            {"status": response.status_code, "headers": headers, "body": body},
+            elapsed,
+            fallback,
+        )
+        self.cassette.meta.setdefault("query_url", url.split("/tx")[0])
+        return CassetteResponse(response.status_code, headers, content)
+
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
+
+
+def replay_services(
+    cassette: Cassette, embedding_dim: int | None = None
+) -> Tuple[CassetteEmbeddingService, Neo4jQueryAPIKnowledgeGraph]:
+    """Embedding service and Query API graph served entirely from `cassette`."""
+    embedder = CassetteEmbeddingService(cassette)
+    config = SimpleNamespace(
+        neo4j_user="", neo4j_password="", neo4j_query_url=cassette.meta["query_url"]
+    )
+    graph = Neo4jQueryAPIKnowledgeGraph(
+        config, embedding_dim or embedder.dimensions, session=CassetteSession(cassette)
+    )
+    return embedder, graph
+
+
+def record_services(
+    cassette: Cassette, config: EnvConfig
+) -> Tuple[CassetteEmbeddingService, Neo4jQueryAPIKnowledgeGraph]:
+    """Live Gemini and Query API services whose calls are recorded into `cassette`."""
+    import requests
+
+    embedder = CassetteEmbeddingService(
+        cassette,
+        GeminiEmbeddingService(
+            api_key=config.gemini_api_key,
+            model=config.embedding_model,
+            dimensions=config.embedding_dimensions,
+        ),
+    )
+    graph = Neo4jQueryAPIKnowledgeGraph(
+        config, embedder.dimensions, session=CassetteSession(cassette, requests.Session())
+    )
+    return embedder, graph
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay Gemini/Query API cassettes.")
+    parser.add_argument("command", choices=("record", "replay", "stats"))
+    parser.add_argument("path")
+    parser.add_argument("--latency", choices=LATENCY_MODES, default="sampled")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path, args.latency, args.latency_scale, args.seed)
+    if args.command == "stats":
+        for kind, summary in cassette.stats().items():
+            print(
+                f"{kind:10s} {summary['calls']:6.0f} calls  p50 {summary['p50_ms']:8.1f} ms  "
+                f"p99 {summary['p99_ms']:8.1f} ms  {summary['payload_bytes'] / 1024:9.1f} KiB"
+            )
+        return
+
+    if args.command == "record":
+        embedder, graph = record_services(cassette, EnvConfig())
+    else:
+        embedder, graph = replay_services(cassette)
+    started = time.perf_counter()
+    ScenarioRunner(graph, embedder).run()
+    elapsed = time.perf_counter() - started
+    graph.close()
+    if args.command == "record":
+        print(f"[INFO] Recorded {len(cassette.entries)} calls to {cassette.save()}.")
+    print(
+        f"[INFO] Scenario took {elapsed:.2f}s ({cassette.hits} replayed, "
+        f"{cassette.misses} recorded calls)."
+    )
+
+
+if __name__ == "__main__":
+    main()
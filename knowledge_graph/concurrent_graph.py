@@ -0,0 +1,184 @@
+"""Readers-writer wrapper that lets one in-memory graph serve concurrent threads.
+
+`InMemoryKnowledgeGraph` mutates its columns and postings in place, so a
+query running while a batch is ingested can see half an article. The
+`ConcurrentKnowledgeGraph` wrapper keeps two identical replicas and
+versions them by epoch (the "left-right" scheme):
+
+* readers pin whichever replica is active, run the whole read on it and
+  unpin. They never wait for ingest; they only touch a tiny counter lock.
+* a writer applies its batch to the standby replica (no reader can see it),
+  publishes it by flipping `active` and bumping `version`, waits for readers
+  still pinned to the old replica to leave, then replays the same batch there
+  so both replicas are identical again.
+
+Every read call therefore sees a consistent snapshot of whole published
+batches, and `snapshot()` pins one version across several calls. The cost is
+twice the memory of one graph and applying each batch twice, in exchange for
+no per-publish copy of the store.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+try:
+    from prototype import Article, InMemoryKnowledgeGraph, PagedReadsMixin, PageKey
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import Article, InMemoryKnowledgeGraph, PagedReadsMixin, PageKey
+
+
+class ConcurrentKnowledgeGraph(PagedReadsMixin):
+    """Wait-free snapshot reads and batch-published writes over two graph replicas."""
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        factory: Callable[[], Any] | None = None,
+    ) -> None:
+        self.embedding_dim = embedding_dim
+        factory = factory or (lambda: InMemoryKnowledgeGraph(embedding_dim))
+        self._replicas = (factory(), factory())
+        self._active = 0
+        self._readers = [0, 0]
+        self._readers_changed = threading.Condition()
+        self._write_lock = threading.Lock()
+        self.version = 0
+        self.publishes = 0
+
+    def close(self) -> None:
+        for replica in self._replicas:
+            replica.close()
+
+    def compact_vectors(self) -> None:
+        """Compact both replicas' vector buckets; call before publishing the graph."""
+        for replica in self._replicas:
+            if hasattr(replica, "compact_vectors"):
+                replica.compact_vectors()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[Any]:
+        """Pin the current version; the yielded graph must only be read."""
+        with self._readers_changed:
+            index = self._active
+            self._readers[index] += 1
+        try:
+            yield self._replicas[index]
+        finally:
+            with self._readers_changed:
+                self._readers[index] -= 1
+                if not self._readers[index]:
+                    self._readers_changed.notify_all()
+
+    def _publish(self, apply: Callable[[Any], None]) -> None:
+        with self._write_lock:
+            standby = 1 - self._active
+            error: Exception | None = None
+            try:
+                apply(self._replicas[standby])
+            except Exception as exc:  # noqa: BLE001 - replayed below so replicas stay identical
+                error = exc
+            with self._readers_changed:
+                retired = self._active
+                self._active = standby
+                self.version += 1
+                while self._readers[retired]:
+                    self._readers_changed.wait()
+            # The batch fails at the same point on both replicas, so replaying
+            # a failed batch leaves them identical as well.
+            try:
+                apply(self._replicas[retired])
+            except Exception:  # noqa: BLE001 - already captured from the first replica
+                if error is None:
+                    raise
+            self.publishes += 1
+        if error is not None:
+            raise error
+
+    # Writes ----------------------------------------------------------------
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Apply `operations` and publish them to readers as one new version."""
+        operations = list(operations)
+        self._publish(lambda graph: graph.write_batch(operations))
+
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        self.write_batch([("upsert_article", {"article": article, "embedding": embedding})])
+
+    def attach_topics(self, article: Article) -> None:
+        self.write_batch([("attach_topics", {"article": article})])
+
+    def attach_entities(self, article: Article) -> None:
+        self.write_batch([("attach_entities", {"article": article})])
+
+    def attach_projects(self, article: Article) -> None:
+        self.write_batch([("attach_projects", {"article": article})])
+
+    def create_similarity_links(self, source_id: str, matches: List[Dict[str, object]]) -> None:
+        self.write_batch(
+            [("create_similarity_links", {"source_id": source_id, "matches": list(matches)})]
+        )
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        groups = list(groups)
+        self._publish(lambda graph: graph.merge_entities(groups))
+
+    # Reads -----------------------------------------------------------------
+    def _read(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self.snapshot() as graph:
+            return getattr(graph, name)(*args, **kwargs)
+
+    def __len__(self) -> int:
+        with self.snapshot() as graph:
+            return len(graph)
+
+    @property
+    def similarity_edges(self) -> List[Dict[str, object]]:
+        with self.snapshot() as graph:
+            return graph.similarity_edges
+
+    def get_article(self, telegram_message_id: str) -> Article | None:
+        return self._read("get_article", telegram_message_id)
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        return self._read("article_body", telegram_message_id)
+
+    def get_embedding(self, telegram_message_id: str) -> List[float] | None:
+        return self._read("get_embedding", telegram_message_id)
+
+    def find_similar_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("find_similar_articles", *args, **kwargs)
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        return self._read("list_entities")
+
+    def filter_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("filter_articles", *args, **kwargs)
+
+    def weekly_digest(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("weekly_digest", *args, **kwargs)
+
+    def article_list_by_entity(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("article_list_by_entity", *args, **kwargs)
+
+    def articles_by_domain(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("articles_by_domain", *args, **kwargs)
+
+    def vlm_projects(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("vlm_projects", *args, **kwargs)
+
+    def image_edit_news(self) -> List[Dict[str, object]]:
+        return self._read("image_edit_news")
+
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        # Each page reads one version; keyset cursors stay valid across publishes.
+        return self._read("read_page", name, params, cursor, limit)
+
+    def keyed_page(self, *args: Any, **kwargs: Any) -> List[Tuple[PageKey, Dict[str, object]]]:
+        return self._read("keyed_page", *args, **kwargs)
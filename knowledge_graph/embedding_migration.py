@@ -0,0 +1,515 @@
+"""Zero-downtime migration of article embeddings to a new model or dimension.
+
+`ensure_schema` creates `article_embedding_idx` with `IF NOT EXISTS`, so
+pointing `GOOGLE_EMBEDDING_MODEL` at another model (or changing
+`GOOGLE_EMBEDDING_DIMENSIONS`) silently leaves an index of the wrong size
+behind. Instead, every model gets its own versioned property and vector index
+(`embedding_<model>_<dims>` / `article_embedding_<model>_<dims>_idx`), and
+`EmbeddingMigration` moves the corpus over in four steps:
+
+1. `start()` creates the target index and records the migration in an
+   `(:EmbeddingMigration)` node, so a restarted process resumes it.
+2. New ingests go through `MigratingKnowledgeGraph`, which shadow-writes the
+   target embedding next to the active one.
+3. `backfill()` re-embeds history in keyset order on `telegram_message_id`.
+   It is throttled to `max_rate` articles per second and commits its cursor
+   with each batch, so it can stop and resume anywhere.
+4. `cutover()` runs once every article has a target vector and the target
+   index is ONLINE. One write flips the active version, and the graph and
+   the embedding service switch together. Queries never hit a half-built
+   index.
+
+`EmbeddingMigration` doubles as the embedding service during the migration.
+Its vectors are `VersionedVector`s that name their property and index. A
+vector embedded just before the cutover is therefore still written and
+searched under the version that produced it.
+
+    python embedding_migration.py --target-model gemini-embedding-002 --target-dimensions 1536
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+try:
+    from prototype import (
+        EMBEDDING_PROPERTY,
+        VECTOR_INDEX_NAME,
+        EnvConfig,
+        GeminiEmbeddingService,
+        StartupCache,
+        build_graph_backend,
+        cypher_identifier,
+        prefix_target,
+        prefix_vector,
+        vector_index_cypher,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import (
+        EMBEDDING_PROPERTY,
+        VECTOR_INDEX_NAME,
+        EnvConfig,
+        GeminiEmbeddingService,
+        StartupCache,
+        build_graph_backend,
+        cypher_identifier,
+        prefix_target,
+        prefix_vector,
+        vector_index_cypher,
+    )
+
+MIGRATION_ID = "article_embedding"
+STATE_CYPHER = """
+MATCH (m:EmbeddingMigration {id: $id})
+RETURN properties(m) AS state
+"""
+SAVE_STATE_CYPHER = """
+MERGE (m:EmbeddingMigration {id: $id})
+SET m += $state, m.updated_at = datetime()
+"""
+
+
+@dataclass(frozen=True)
+class EmbeddingVersion:
+    """One embedding model/dimension and the property + index holding its vectors."""
+
+    model: str
+    dimensions: int
+    embedding_property: str
+    index_name: str
+
+    @classmethod
+    def for_model(cls, model: str, dimensions: int) -> "EmbeddingVersion":
+        slug = re.sub(r"[^a-z0-9]+", "_", model.lower()).strip("_")
+        return cls(
+            model,
+            dimensions,
+            cypher_identifier(f"embedding_{slug}_{dimensions}"),
+            cypher_identifier(f"article_embedding_{slug}_{dimensions}_idx"),
+        )
+
+    @classmethod
+    def legacy(cls, model: str, dimensions: int) -> "EmbeddingVersion":
+        """The unversioned `embedding` property and `article_embedding_idx`."""
+        return cls(model, dimensions, EMBEDDING_PROPERTY, VECTOR_INDEX_NAME)
+
+    def to_state(self, prefix: str) -> Dict[str, Any]:
+        return {
+            f"{prefix}_model": self.model,
+            f"{prefix}_dimensions": self.dimensions,
+            f"{prefix}_property": self.embedding_property,
+            f"{prefix}_index": self.index_name,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], prefix: str) -> "EmbeddingVersion | None":
+        if not state.get(f"{prefix}_property"):
+            return None
+        return cls(
+            state[f"{prefix}_model"],
+            int(state[f"{prefix}_dimensions"]),
+            state[f"{prefix}_property"],
+            state[f"{prefix}_index"],
+        )
+
+
+class VersionedVector(list):
+    """A plain list of floats that also names the property/index it belongs to."""
+
+    __slots__ = ("embedding_property", "index_name")
+
+    def __init__(self, values: Sequence[float], version: EmbeddingVersion) -> None:
+        super().__init__(values)
+        self.embedding_property = version.embedding_property
+        self.index_name = version.index_name
+
+
+def load_state(graph: Any) -> Dict[str, Any]:
+    records = graph.run_cypher(STATE_CYPHER, {"id": MIGRATION_ID})
+    return dict(records[0]["state"]) if records else {}
+
+
+def active_version(graph: Any) -> EmbeddingVersion | None:
+    """The version queries should use, as recorded by the last cutover (None before any)."""
+    return EmbeddingVersion.from_state(load_state(graph), "active")
+
+
+class EmbeddingMigration:
+    """Shadow writes, throttled resumable backfill and atomic cutover between two versions."""
+
+    def __init__(
+        self,
+        graph: Any,
+        source_service: Any,
+        target_service: Any,
+        source: EmbeddingVersion,
+        target: EmbeddingVersion,
+        batch_size: int = 64,
+        max_rate: float | None = 50.0,
+        text_of: Callable[[Dict[str, Any]], str] | None = None,
+    ) -> None:
+        if source.embedding_property == target.embedding_property:
+            raise ValueError("Source and target embedding versions must use different properties.")
+        if getattr(graph, "split_storage", False):
+            raise ValueError(
+                "Embedding migrations read and write vectors on (:Article); run them before "
+                "storage_migration.py moves the vectors to (:ArticleEmbedding)."
+            )
+        self.graph = graph
+        self.source_service = source_service
+        self.target_service = target_service
+        self.source = source
+        self.target = target
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        # Ingest embeds the post body, so the backfill does too.
+        self.text_of = text_of or (lambda record: record.get("body") or record.get("title") or "")
+        # Keep the two-stage prefix index (KG_PREFIX_DIM) in step with the target.
+        prefix_dim = getattr(graph, "prefix_dim", None)
+        self.prefix_dim = prefix_dim if prefix_dim and prefix_dim < target.dimensions else None
+        self._active = source
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+        self.cursor = ""
+        self.status = "idle"
+        self.backfilled = 0
+
+    # Embedding service interface -------------------------------------------
+    @property
+    def active(self) -> EmbeddingVersion:
+        return self._active
+
+    @property
+    def dimensions(self) -> int:
+        return self._active.dimensions
+
+    def _service(self, version: EmbeddingVersion) -> Any:
+        return self.target_service if version == self.target else self.source_service
+
+    def embed(self, text: str) -> VersionedVector:
+        version = self._active
+        return VersionedVector(self._service(version).embed(text), version)
+
+    def embed_many(self, texts: Sequence[str]) -> List[VersionedVector]:
+        version = self._active
+        return [VersionedVector(row, version) for row in _embed_all(self._service(version), texts)]
+
+    # Lifecycle -------------------------------------------------------------
+    def start(self) -> None:
+        """Create the target index and record (or resume) the migration."""
+        state = load_state(self.graph)
+        if EmbeddingVersion.from_state(state, "target") == self.target:
+            self.cursor = state.get("cursor") or ""
+            self.status = state.get("status") or "backfilling"
+            self.backfilled = int(state.get("backfilled") or 0)
+            if EmbeddingVersion.from_state(state, "active") == self.target:
+                self._switch(self.target)
+            print(f"[INFO] Resuming embedding migration to {self.target.model} at {self.cursor!r}.")
+        else:
+            self.status = "backfilling"
+            self._save({**self.source.to_state("active"), "cursor": "", "backfilled": 0})
+        self.graph.run_cypher(
+            vector_index_cypher(
+                self.target.index_name, self.target.embedding_property, self.target.dimensions
+            )
+        )
+        if self.prefix_dim:
+            prefix_property, prefix_index = prefix_target(
+                self.target.embedding_property, self.target.index_name, self.prefix_dim
+            )
+            self.graph.run_cypher(vector_index_cypher(prefix_index, prefix_property, self.prefix_dim))
+
+    def _save(self, extra: Dict[str, Any] | None = None) -> None:
+        self.graph.run_cypher(SAVE_STATE_CYPHER, {"id": MIGRATION_ID, "state": self._state(extra)})
+
+    def _state(self, extra: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        return {
+            **self.target.to_state("target"),
+            "status": self.status,
+            "cursor": self.cursor,
+            "backfilled": self.backfilled,
+            **(extra or {}),
+        }
+
+    # Shadow writes ---------------------------------------------------------
+    def shadow_rows(self, items: Sequence[Tuple[str, str, Sequence[float]]]) -> List[Dict[str, Any]]:
+        """Target vectors for `(telegram_message_id, text, embedding)` not already in the target version."""
+        missing = [
+            (message_id, text)
+            for message_id, text, embedding in items
+            if getattr(embedding, "embedding_property", self._active.embedding_property)
+            != self.target.embedding_property
+        ]
+        if not missing:
+            return []
+        vectors = _embed_all(self.target_service, [text for _, text in missing])
+        return [self._row(message_id, vector) for (message_id, _), vector in zip(missing, vectors)]
+
+    def _row(self, telegram_message_id: str, vector: Sequence[float]) -> Dict[str, Any]:
+        row = {"telegram_message_id": telegram_message_id, "embedding": list(vector)}
+        if self.prefix_dim:
+            row["prefix"] = prefix_vector(vector, self.prefix_dim)
+        return row
+
+    def write_shadow(self, rows: Sequence[Dict[str, Any]]) -> None:
+        if rows:
+            self.graph.run_cypher(self._set_vectors_cypher(), {"rows": list(rows)})
+
+    def _set_vectors_cypher(self) -> str:
+        assignment = f"a.{self.target.embedding_property} = row.embedding"
+        if self.prefix_dim:
+            prefix_property, _ = prefix_target(
+                self.target.embedding_property, self.target.index_name, self.prefix_dim
+            )
+            assignment += f", a.{prefix_property} = row.prefix"
+        return f"""
+        UNWIND $rows AS row
+        MATCH (a:Article {{telegram_message_id: row.telegram_message_id}})
+        SET {assignment}
+        """
+
+    # Backfill --------------------------------------------------------------
+    def coverage(self) -> Tuple[int, int]:
+        """(articles with a target vector, all articles)."""
+        records = self.graph.run_cypher(
+            f"MATCH (a:Article) RETURN count(a.{self.target.embedding_property}) AS covered, "
+            "count(a) AS total"
+        )
+        record = records[0] if records else {"covered": 0, "total": 0}
+        return int(record["covered"]), int(record["total"])
+
+    def index_state(self) -> str | None:
+        records = self.graph.run_cypher(
+            "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state",
+            {"name": self.target.index_name},
+        )
+        return records[0]["state"] if records else None
+
+    def backfill_step(self) -> int:
+        """Re-embed one batch after the cursor; returns how many articles it covered."""
+        records = self.graph.run_cypher(
+            f"""
+            MATCH (a:Article)
+            WHERE a.telegram_message_id > $after AND a.{self.target.embedding_property} IS NULL
+            RETURN a.telegram_message_id AS telegram_message_id, a.title AS title, a.body AS body
+            ORDER BY a.telegram_message_id
+            LIMIT $limit
+            """,
+            {"after": self.cursor, "limit": self.batch_size},
+        )
+        if not records:
+            return 0
+        vectors = _embed_all(self.target_service, [self.text_of(record) for record in records])
+        rows = [
+            self._row(record["telegram_message_id"], vector)
+            for record, vector in zip(records, vectors)
+        ]
+        with self._lock:
+            self.cursor = records[-1]["telegram_message_id"]
+            self.backfilled += len(rows)
+            # Vectors and cursor commit together, so a crash never skips a batch.
+            self.graph.run_cypher_batch(
+                [
+                    (self._set_vectors_cypher(), {"rows": rows}),
+                    (SAVE_STATE_CYPHER, {"id": MIGRATION_ID, "state": self._state()}),
+                ]
+            )
+        return len(rows)
+
+    def backfill(self, stop: threading.Event | None = None, cutover: bool = True) -> bool:
+        """Backfill until every article is covered; returns True once cut over (or ready)."""
+        stop = stop or self._stop
+        started = time.monotonic()
+        done = 0
+        swept = False
+        while not stop.is_set():
+            count = self.backfill_step()
+            if not count:
+                covered, total = self.coverage()
+                if covered < total and not swept:
+                    # Articles ingested before shadow writes began can sit behind the cursor.
+                    with self._lock:
+                        self.cursor = ""
+                    swept = True
+                    continue
+                if covered < total:
+                    print(f"[WARN] Backfill stalled at {covered}/{total} articles.")
+                    return False
+                with self._lock:
+                    self.status = "ready"
+                    self._save()
+                return self.cutover() if cutover else True
+            done += count
+            if self.max_rate:
+                # Throttle to max_rate articles/s so the backfill never crowds out live queries.
+                delay = done / self.max_rate - (time.monotonic() - started)
+                if delay > 0 and stop.wait(delay):
+                    break
+        return False
+
+    def run_in_background(self, poll_seconds: float = 30.0) -> threading.Thread:
+        """Backfill on a daemon thread, retrying until the cutover succeeds or `stop()`."""
+
+        def loop() -> None:
+            while not self._stop.is_set():
+                try:
+                    if self.backfill(self._stop):
+                        return
+                except Exception as exc:  # noqa: BLE001 - keep retrying; progress is in the cursor
+                    print(f"[WARN] Embedding backfill failed: {exc}")
+                self._stop.wait(poll_seconds)
+
+        self._stop.clear()
+        self._worker = threading.Thread(target=loop, name="kg-embedding-backfill", daemon=True)
+        self._worker.start()
+        return self._worker
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    # Cutover ---------------------------------------------------------------
+    def cutover(self) -> bool:
+        """Switch queries and writes to the target version once it is complete and ONLINE."""
+        with self._lock:
+            if self._active == self.target:
+                return True
+            covered, total = self.coverage()
+            state = self.index_state()
+            if covered < total or state != "ONLINE":
+                print(
+                    f"[INFO] Not cutting over yet: {covered}/{total} articles embedded, "
+                    f"index {self.target.index_name} is {state}."
+                )
+                return False
+            self.status = "complete"
+            self._save(self.target.to_state("active"))
+            self._switch(self.target)
+        print(f"[INFO] Vector search now uses {self.target.index_name} ({self.target.model}).")
+        return True
+
+    def _switch(self, version: EmbeddingVersion) -> None:
+        self.graph.use_embedding(version.embedding_property, version.index_name, version.dimensions)
+        self._active = version
+
+    def finalize(self, batch_size: int = 1000) -> None:
+        """After cutover: drop the source index and strip source vectors in batches."""
+        if self._active != self.target:
+            raise RuntimeError("finalize() before cutover() would remove the live index.")
+        self.graph.run_cypher(f"DROP INDEX {self.source.index_name} IF EXISTS")
+        removed = f"a.{self.source.embedding_property}"
+        if self.prefix_dim and self.prefix_dim < self.source.dimensions:
+            prefix_property, prefix_index = prefix_target(
+                self.source.embedding_property, self.source.index_name, self.prefix_dim
+            )
+            self.graph.run_cypher(f"DROP INDEX {prefix_index} IF EXISTS")
+            removed += f", a.{prefix_property}"
+        while True:
+            records = self.graph.run_cypher(
+                f"""
+                MATCH (a:Article) WHERE a.{self.source.embedding_property} IS NOT NULL
+                WITH a LIMIT $limit
+                REMOVE {removed}
+                RETURN count(a) AS removed
+                """,
+                {"limit": batch_size},
+            )
+            if not records or not records[0]["removed"]:
+                break
+
+
+class MigratingKnowledgeGraph:
+    """Graph wrapper that shadow-writes target embeddings while a migration runs."""
+
+    def __init__(self, graph: Any, migration: EmbeddingMigration) -> None:
+        self.graph = graph
+        self.migration = migration
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    def upsert_article(self, article: Any, embedding: Sequence[float]) -> None:
+        self.graph.upsert_article(article, embedding)
+        self.migration.write_shadow(
+            self.migration.shadow_rows([(article.telegram_message_id, article.body, embedding)])
+        )
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        self.graph.write_batch(operations)
+        self.migration.write_shadow(
+            self.migration.shadow_rows(
+                [
+                    (payload["article"].telegram_message_id, payload["article"].body, payload["embedding"])
+                    for op, payload in operations
+                    if op == "upsert_article"
+                ]
+            )
+        )
+
+
+def _embed_all(service: Any, texts: Sequence[str]) -> List[Sequence[float]]:
+    if hasattr(service, "embed_many"):
+        return list(service.embed_many(list(texts)))
+    return [service.embed(text) for text in texts]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate article embeddings to another model")
+    parser.add_argument("--target-model", required=True)
+    parser.add_argument("--target-dimensions", type=int, required=True)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-rate", type=float, default=50.0, help="articles per second")
+    parser.add_argument("--no-cutover", action="store_true", help="stop once the backfill is done")
+    parser.add_argument(
+        "--finalize", action="store_true", help="after cutover, drop the old index and vectors"
+    )
+    args = parser.parse_args()
+
+    config = EnvConfig()
+    startup_cache = StartupCache.from_env()
+    source_service = GeminiEmbeddingService(
+        config.gemini_api_key,
+        config.embedding_model,
+        dimensions=config.embedding_dimensions,
+        startup_cache=startup_cache,
+    )
+    target_service = GeminiEmbeddingService(
+        config.gemini_api_key,
+        args.target_model,
+        dimensions=args.target_dimensions,
+        startup_cache=startup_cache,
+    )
+    graph = build_graph_backend(config, source_service.dimensions, startup_cache)
+    try:
+        source = active_version(graph) or EmbeddingVersion.legacy(
+            config.embedding_model, source_service.dimensions
+        )
+        migration = EmbeddingMigration(
+            graph,
+            source_service,
+            target_service,
+            source,
+            EmbeddingVersion.for_model(args.target_model, args.target_dimensions),
+            batch_size=args.batch_size,
+            max_rate=args.max_rate,
+        )
+        migration.start()
+        done = migration.backfill(cutover=not args.no_cutover)
+        covered, total = migration.coverage()
+        print(f"Backfilled {migration.backfilled} articles; coverage {covered}/{total}.")
+        if done and args.finalize and not args.no_cutover:
+            migration.finalize()
+            print(f"Dropped {source.index_name} and the {source.embedding_property} vectors.")
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Multi-process executor for the deterministic hash embedding fallback.
+
+When Gemini is unavailable `build_embedding_service` returns
+`HashEmbeddingService`, which embeds one text at a time in the main process.
+`ParallelHashEmbedder` shards a batch across worker processes; every worker
+keeps its own `HashEmbeddingService` (and therefore its own token-vector cache)
+for the lifetime of the pool and writes float32 rows straight into a shared
+memory block, so only the input texts are pickled.
+
+Dispatching a batch costs a round trip per shard and every worker starts with
+a cold token cache, so small batches (an ingest micro-batch, a few hundred
+posts) are embedded in-process; the pool only takes batches large enough to
+give every worker at least one full shard, and never runs more workers than
+there are CPUs to run them on.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List, Sequence, Tuple
+
+try:
+    from prototype import HashEmbeddingService
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import HashEmbeddingService
+
+FLOAT32_BYTES = 4
+
+_worker_service: HashEmbeddingService | None = None
+
+
+def _init_worker(dim: int) -> None:
+    global _worker_service
+    _worker_service = HashEmbeddingService(dim)
+
+
+def _embed_shard(task: Tuple[str, int, int, List[str]]) -> int:
+    shm_name, dim, start, texts = task
+    assert _worker_service is not None
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        rows = shm.buf.cast("f")
+        try:
+            offset = start * dim
+            for text in texts:
+                rows[offset : offset + dim] = array("f", _worker_service.embed(text))
+                offset += dim
+        finally:
+            rows.release()
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class EmbeddingMatrix:
+    """Row-major float32 matrix of embeddings in input order."""
+
+    __slots__ = ("data", "dim")
+
+    def __init__(self, data: array, dim: int) -> None:
+        self.data = data
+        self.dim = dim
+
+    def __len__(self) -> int:
+        return len(self.data) // self.dim if self.dim else 0
+
+    def __getitem__(self, index: int) -> List[float]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = index * self.dim
+        return self.data[start : start + self.dim].tolist()
+
+    def __iter__(self) -> Iterator[List[float]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def row_view(self, index: int) -> memoryview:
+        start = index * self.dim
+        return memoryview(self.data)[start : start + self.dim]
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+class ParallelHashEmbedder:
+    """Drop-in for `HashEmbeddingService` that embeds batches on a process pool.
+
+    `workers` is capped at the CPUs this process may run on. Batches smaller
+    than `min_parallel_batch` (default: one `shard_size` shard per worker) are
+    embedded in-process.
+    """
+
+    def __init__(
+        self,
+        dim: int = 256,
+        workers: int | None = None,
+        shard_size: int = 256,
+        min_parallel_batch: int | None = None,
+        start_method: str | None = None,
+    ) -> None:
+        self._dimensions = dim
+        self.workers = min(workers or available_cpus(), available_cpus())
+        self.shard_size = shard_size
+        self.min_parallel_batch = (
+            min_parallel_batch if min_parallel_batch is not None else self.workers * shard_size
+        )
+        self._context = multiprocessing.get_context(start_method)
+        self._local = HashEmbeddingService(dim)
+        self._pool = None
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    def embed(self, text: str) -> List[float]:
+        return self._local.embed(text)
+
+    def embed_many(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        count = len(texts)
+        dim = self._dimensions
+        if count == 0:
+            return EmbeddingMatrix(array("f"), dim)
+        if self.workers == 1 or count < self.min_parallel_batch:
+            data = array("f")
+            for text in texts:
+                data.extend(self._local.embed(text))
+            return EmbeddingMatrix(data, dim)
+
+        pool = self._ensure_pool()
+        shm = shared_memory.SharedMemory(create=True, size=count * dim * FLOAT32_BYTES)
+        try:
+            tasks = [
+                (shm.name, dim, start, list(texts[start : start + self.shard_size]))
+                for start in range(0, count, self.shard_size)
+            ]
+            written = sum(pool.imap_unordered(_embed_shard, tasks))
+            if written != count:
+                raise RuntimeError(f"Embedding pool wrote {written} of {count} rows")
+            data = array("f")
+            data.frombytes(shm.buf[: count * dim * FLOAT32_BYTES])
+            return EmbeddingMatrix(data, dim)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self) -> "ParallelHashEmbedder":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            # Start the tracker before forking so workers share it instead of
+            # spawning their own, which would report the parent's blocks as leaked.
+            resource_tracker.ensure_running()
+            self._pool = self._context.Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self._dimensions,),
+            )
+        return self._pool
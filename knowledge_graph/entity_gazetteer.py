@@ -0,0 +1,186 @@
+"""Gazetteer pre-tagging of known entities in post bodies.
+
+Entity extraction is entirely the LLM's job today, so an entity the prompt
+misses (or names differently) never reaches `article_list_by_entity`. Most
+mentions, though, are of entities the graph already knows. `EntityGazetteer`
+compiles every known name and alias into an Aho-Corasick automaton and finds
+all of them in one linear pass over the post, however many entities there are.
+
+Text and patterns are normalized the same way: NFKC + casefold (Latin and
+Cyrillic alike), words joined by single spaces, with a space at both ends.
+Patterns therefore carry their own word boundaries, so "Meta" does not fire
+inside "metadata". Overlapping hits resolve leftmost-longest ("Google
+DeepMind" wins over "Google").
+
+New entities are added to a small delta automaton that is rebuilt on its
+own. It is folded into the main automaton once it reaches an eighth of the
+main one's size, so adding an entity costs about as much as the delta,
+not the whole gazetteer. A scan runs both automata.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import replace
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    from entity_resolution import EntityResolver
+    from prototype import Article, EntityRef, canonical_entity_id
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .entity_resolution import EntityResolver
+    from .prototype import Article, EntityRef, canonical_entity_id
+
+# Words, keeping Ukrainian apostrophes (e.g. "п'ять", "пʼять") inside the word.
+_WORD_RE = re.compile(r"\w+(?:['ʼ’]\w+)*")
+MIN_DELTA_MERGE = 64
+
+
+def normalize_text(text: str) -> str:
+    """Casefolded words joined by single spaces, padded with a space at both ends."""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return " " + " ".join(_WORD_RE.findall(folded)) + " "
+
+
+class _Automaton:
+    """Immutable Aho-Corasick automaton over normalized patterns."""
+
+    def __init__(self, patterns: Sequence[Tuple[str, str]]) -> None:
+        # patterns: (normalized pattern, entity id)
+        self.size = len(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[int, str], ...]] = [()]
+        for pattern, entity_id in patterns:
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            if (len(pattern), entity_id) not in self._out[node]:
+                self._out[node] += ((len(pattern), entity_id),)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def scan(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, entity id) of every pattern occurrence in normalized `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: List[Tuple[int, int, str]] = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, entity_id in out[node]:
+                hits.append((end - length, end, entity_id))
+        return hits
+
+
+class EntityGazetteer:
+    """Known entity names and aliases, matched against post text in one pass."""
+
+    def __init__(self, min_length: int = 3) -> None:
+        self.min_length = min_length
+        self.entities: Dict[str, EntityRef] = {}
+        self._patterns: Dict[str, str] = {}  # normalized pattern -> entity id
+        self._delta_patterns: List[Tuple[str, str]] = []
+        # (main, delta), swapped as one so a scan never sees half a merge.
+        self._automata = (_Automaton(()), _Automaton(()))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_resolver(cls, resolver: EntityResolver, min_length: int = 3) -> "EntityGazetteer":
+        """Every canonical name plus every alias key the resolver knows."""
+        gazetteer = cls(min_length)
+        gazetteer.add_many((entity.name, entity) for entity in resolver.canonical.values())
+        gazetteer.add_many(
+            (alias, resolver.canonical[entity_id])
+            for alias, entity_id in resolver.aliases.items()
+        )
+        return gazetteer
+
+    # Maintenance -----------------------------------------------------------
+    def add(self, name: str, entity: EntityRef) -> bool:
+        """Make `name` tag `entity`; returns False if it was already known or too short."""
+        return bool(self.add_many([(name, entity)]))
+
+    def add_many(self, names: Iterable[Tuple[str, EntityRef]]) -> int:
+        with self._lock:
+            added = 0
+            for name, entity in names:
+                pattern = normalize_text(name)
+                if len(pattern.strip()) < self.min_length or pattern in self._patterns:
+                    continue
+                entity_id = canonical_entity_id(entity.name)
+                self.entities.setdefault(entity_id, entity)
+                self._patterns[pattern] = entity_id
+                self._delta_patterns.append((pattern, entity_id))
+                added += 1
+            if not added:
+                return 0
+            main = self._automata[0]
+            if len(self._delta_patterns) >= max(MIN_DELTA_MERGE, main.size // 8):
+                main = _Automaton(list(self._patterns.items()))
+                self._delta_patterns = []
+            self._automata = (main, _Automaton(self._delta_patterns))
+            return added
+
+    def learn_articles(self, articles: Sequence[Article]) -> int:
+        """Add the (resolved) entities of `articles`, so the next post can be pre-tagged."""
+        return self.add_many(
+            (entity.name, entity) for article in articles for entity in article.entities
+        )
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    # Tagging ---------------------------------------------------------------
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest non-overlapping (start, end, entity id) in `normalize_text(text)`."""
+        normalized = normalize_text(text)
+        main, delta = self._automata
+        hits = main.scan(normalized) + delta.scan(normalized)
+        hits.sort(key=lambda hit: (hit[0], -hit[1]))
+        chosen: List[Tuple[int, int, str]] = []
+        last_end = 0
+        for start, end, entity_id in hits:
+            # Adjacent matches share the space between them.
+            if start + 1 >= last_end:
+                chosen.append((start, end, entity_id))
+                last_end = end
+        return chosen
+
+    def tag(self, text: str) -> List[EntityRef]:
+        """Known entities mentioned in `text`, in order of first mention."""
+        seen: Dict[str, EntityRef] = {}
+        for _, _, entity_id in self.find(text):
+            seen.setdefault(entity_id, self.entities[entity_id])
+        return list(seen.values())
+
+    def tag_articles(self, articles: Sequence[Article]) -> List[Article]:
+        """Articles with gazetteer hits appended after their existing entities."""
+        tagged = []
+        for article in articles:
+            known = {canonical_entity_id(entity.name) for entity in article.entities}
+            extra = [
+                entity
+                for entity in self.tag(f"{article.title}\n{article.body}")
+                if canonical_entity_id(entity.name) not in known
+            ]
+            tagged.append(replace(article, entities=article.entities + extra) if extra else article)
+        return tagged
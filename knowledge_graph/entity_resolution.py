@@ -0,0 +1,232 @@
+"""Entity resolution: map raw entity mentions onto canonical Entity nodes.
+
+`canonical_entity_id` already folds case, spacing and punctuation ("Open AI",
+"openai" -> "openai"). `EntityResolver` adds what a key function cannot: an
+alias table for names that share no spelling ("Facebook" -> "Meta") and a
+SymSpell-style deletion index that catches typos ("OpenAl", "Antropic") with a
+few dictionary lookups instead of a scan over every known entity. Names whose
+numbers or `+`/`#` differ are never typos of each other ("Llama 4" is not
+"Llama 3", "Wan 2.5" is not "Wan 2.2"), so fuzzy matching skips them.
+
+Resolution runs per ingest batch (`resolve_articles`), and `plan_merges` /
+`apply_merges` fold existing duplicate nodes in the graph with one bulk write.
+Merging deletes the duplicate nodes, so `apply_merges` only reports the plan
+unless called with `confirm=True`.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import replace
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    from prototype import Article, EntityRef, canonical_entity_id
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import Article, EntityRef, canonical_entity_id
+
+MERGE_CHUNK_SIZE = 500
+_VERSION_TOKEN_RE = re.compile(r"\d+|[+#]+")
+
+
+def _max_distance(key: str) -> int:
+    # Short names are too close to each other for fuzzy matching to be safe.
+    if len(key) < 5:
+        return 0
+    return 1 if len(key) < 10 else 2
+
+
+def _version_tokens(key: str) -> List[str]:
+    """Digit runs and `+`/`#` of a key: "gemini25pro" -> ["25"], "c++" -> ["++"]."""
+    return _VERSION_TOKEN_RE.findall(key)
+
+
+def _deletes(key: str, distance: int) -> set[str]:
+    variants = {key}
+    for removed in range(1, min(distance, len(key) - 1) + 1):
+        for positions in combinations(range(len(key)), removed):
+            variants.add("".join(ch for i, ch in enumerate(key) if i not in positions))
+    return variants
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class EntityResolver:
+    """Alias table plus deletion index over canonical entity keys."""
+
+    def __init__(self, max_distance: int = 2) -> None:
+        self.max_distance = max_distance
+        self.canonical: Dict[str, EntityRef] = {}
+        # Normalized alias key -> canonical id.
+        self.aliases: Dict[str, str] = {}
+        # Deletion variant -> alias keys that produce it.
+        self._deletion_index: Dict[str, set[str]] = {}
+        self._cache: Dict[str, str | None] = {}
+
+    @classmethod
+    def from_graph(cls, graph: Any, max_distance: int = 2) -> "EntityResolver":
+        """Seed from the Entity nodes (and their `aliases`) already in the graph.
+
+        Records arrive most-mentioned first, so when two existing nodes are
+        near-duplicates the better-established one becomes canonical.
+        """
+        resolver = cls(max_distance)
+        for record in graph.list_entities():
+            canonical = resolver.resolve(
+                EntityRef(str(record["name"]), str(record.get("type") or "other"))
+            )
+            for alias in record.get("aliases") or ():
+                resolver.add_alias(str(alias), canonical)
+        return resolver
+
+    # Table maintenance -----------------------------------------------------
+    def add(self, entity: EntityRef) -> str:
+        """Register a canonical entity; returns its id."""
+        entity_id = canonical_entity_id(entity.name)
+        self.canonical.setdefault(entity_id, entity)
+        self._index_alias(entity_id, entity_id)
+        return entity_id
+
+    def add_alias(self, alias: str, entity: EntityRef) -> None:
+        """Make `alias` resolve to `entity` (registered as canonical if new)."""
+        entity_id = self.add(entity)
+        self._index_alias(canonical_entity_id(alias), entity_id)
+
+    def _index_alias(self, key: str, entity_id: str) -> None:
+        if not key or self.aliases.get(key) == entity_id:
+            return
+        self.aliases[key] = entity_id
+        self._cache.clear()
+        for variant in _deletes(key, min(self.max_distance, _max_distance(key))):
+            self._deletion_index.setdefault(variant, set()).add(key)
+
+    # Lookup ----------------------------------------------------------------
+    def lookup(self, name: str) -> str | None:
+        """Canonical id for `name`, or None when nothing is close enough."""
+        key = canonical_entity_id(name)
+        if key in self.aliases:
+            return self.aliases[key]
+        if key in self._cache:
+            return self._cache[key]
+        distance = min(self.max_distance, _max_distance(key))
+        best: Tuple[int, int, str] | None = None
+        if distance:
+            candidates: set[str] = set()
+            for variant in _deletes(key, distance):
+                candidates.update(self._deletion_index.get(variant, ()))
+            versions = _version_tokens(key)
+            for candidate in candidates:
+                if _version_tokens(candidate) != versions:
+                    continue
+                limit = min(distance, _max_distance(candidate))
+                found = _edit_distance(key, candidate, limit)
+                if found <= limit:
+                    rank = (found, -len(candidate), candidate)
+                    if best is None or rank < best:
+                        best = rank
+        resolved = self.aliases[best[2]] if best is not None else None
+        self._cache[key] = resolved
+        return resolved
+
+    def resolve(self, entity: EntityRef, learn: bool = True) -> EntityRef:
+        """Canonical form of `entity`; unknown names become new canonical entries."""
+        entity_id = self.lookup(entity.name)
+        if entity_id is None:
+            if not learn:
+                return entity
+            entity_id = self.add(entity)
+        elif canonical_entity_id(entity.name) not in self.aliases:
+            self._index_alias(canonical_entity_id(entity.name), entity_id)
+        return self.canonical[entity_id]
+
+    def resolve_articles(self, articles: Sequence[Article]) -> List[Article]:
+        """Rewrite each article's entities to canonical refs, deduped per article."""
+        resolved_articles = []
+        for article in articles:
+            entities: List[EntityRef] = []
+            seen = set()
+            for entity in article.entities:
+                canonical = self.resolve(entity)
+                entity_id = canonical_entity_id(canonical.name)
+                if entity_id not in seen:
+                    seen.add(entity_id)
+                    entities.append(canonical)
+            resolved_articles.append(replace(article, entities=entities))
+        return resolved_articles
+
+    # Merges ----------------------------------------------------------------
+    def plan_merges(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group existing Entity records (`list_entities()` rows) by canonical id.
+
+        Returns `merge_entities` groups for every canonical entity that more
+        than one node (or a node without the canonical id) currently maps to.
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            name = str(record["name"])
+            entity_id = self.lookup(name) or self.add(
+                EntityRef(name, str(record.get("type") or "other"))
+            )
+            canonical = self.canonical[entity_id]
+            group = groups.setdefault(
+                entity_id,
+                {
+                    "id": entity_id,
+                    "name": canonical.name,
+                    "type": canonical.type,
+                    "aliases": [],
+                    "duplicates": [],
+                    "_needs_merge": False,
+                },
+            )
+            for alias in [name, *(record.get("aliases") or ())]:
+                if alias not in group["aliases"]:
+                    group["aliases"].append(alias)
+            group["duplicates"].append(name)
+            if record.get("id") != entity_id:
+                group["_needs_merge"] = True
+            if len(group["duplicates"]) > 1:
+                group["_needs_merge"] = True
+        return [
+            {k: v for k, v in group.items() if k != "_needs_merge"}
+            for group in groups.values()
+            if group["_needs_merge"]
+        ]
+
+    def apply_merges(
+        self,
+        graph: Any,
+        records: Iterable[Dict[str, Any]] | None = None,
+        confirm: bool = False,
+    ) -> int:
+        """Plan merges and, with `confirm=True`, write them back in chunks.
+
+        Returns the number of groups merged (or, as a dry run, that would be).
+        """
+        groups = self.plan_merges(graph.list_entities() if records is None else records)
+        if not confirm:
+            for group in groups:
+                print(f"[INFO] Would merge {group['duplicates']} into {group['name']!r}.")
+            if groups:
+                print(f"[INFO] Dry run: {len(groups)} entity merges planned; pass confirm=True.")
+            return len(groups)
+        for start in range(0, len(groups), MERGE_CHUNK_SIZE):
+            graph.merge_entities(groups[start : start + MERGE_CHUNK_SIZE])
+        return len(groups)
@@ -0,0 +1,694 @@
+"""Local ingestion HTTP service for Telegram channel posts.
+
+Replaces the per-post n8n chain (Normalize → Embedding Builder1 → AI Agent1 →
+Query Builder1 → Neo4j Upsert Article) with one endpoint. `POST /ingest`
+accepts a raw Telegram update (or a list of them, optionally with the LLM
+metadata under `metadata`); concurrent requests are micro-batched over a short
+window and run through normalization, embedding, duplicate detection (against
+the corpus and earlier posts of the batch) and a single group-committed upsert
+inside the process; a post that fails comes back with its own error. With a topic classifier,
+posts without LLM topics are labelled from their embedding, and only the ones
+it is unsure about come back with `topic_decision_required`. With a
+gazetteer, known entities named in the post are tagged without the LLM.
+
+Run locally against the offline backends:
+    python ingest_service.py --in-memory --port 8080
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+try:
+    from prototype import (
+        Article,
+        EnvConfig,
+        InMemoryKnowledgeGraph,
+        StartupCache,
+        build_embedding_service,
+        build_graph_backend,
+        hash_embedding_service_from_env,
+    )
+    from entity_gazetteer import EntityGazetteer
+    from entity_resolution import EntityResolver
+    from metadata_validator import MetadataValidator
+    from read_replica import ReadReplica
+    from topic_classifier import CentroidTopicClassifier
+    from write_behind import write_behind_from_env
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .entity_gazetteer import EntityGazetteer
+    from .entity_resolution import EntityResolver
+    from .metadata_validator import MetadataValidator
+    from .read_replica import ReadReplica
+    from .topic_classifier import CentroidTopicClassifier
+    from .write_behind import write_behind_from_env
+    from .prototype import (
+        Article,
+        EnvConfig,
+        InMemoryKnowledgeGraph,
+        StartupCache,
+        build_embedding_service,
+        build_graph_backend,
+        hash_embedding_service_from_env,
+    )
+
+MAX_TITLE_CHARS = 120
+MAX_BODY_BYTES = 8 * 1024 * 1024
+_VALIDATOR = MetadataValidator()
+
+
+@dataclass
+class IngestItem:
+    article: Article
+    metadata: Dict[str, Any]
+
+
+def normalize_update(
+    update: Dict[str, Any], validator: MetadataValidator | None = None
+) -> IngestItem | None:
+    """Python port of the "Code in JavaScript Normalize" n8n node.
+
+    LLM metadata, when present, goes through the METADATA_CONTRACT checks.
+    Returns None for updates without a message id or any text to embed, and
+    raises ValueError for fields of the wrong type or an unparseable `date`.
+    """
+    source = _object(update.get("channel_post") or update.get("message"), "channel_post/message")
+    chat = _object(source.get("chat"), "chat")
+    sender_chat = _object(source.get("sender_chat"), "sender_chat")
+    message_id = source.get("message_id") or source.get("messageId")
+    raw_text = source.get("text") or source.get("caption") or ""
+    if not isinstance(raw_text, str):
+        raise ValueError(f"text must be a string, not {type(raw_text).__name__}")
+    raw_text = raw_text.strip()
+    if message_id is None or not raw_text:
+        return None
+
+    username = chat.get("username") or sender_chat.get("username") or ""
+    channel = username or str(chat.get("id") or "")
+    metadata = update.get("metadata") or {}
+    if not isinstance(metadata, (dict, str)):
+        raise ValueError(f"metadata must be an object or string, not {type(metadata).__name__}")
+    validated = (validator or _VALIDATOR).validate(metadata, raw_text) if metadata else None
+    if "date" in source:
+        try:
+            published_at = datetime.fromtimestamp(int(source["date"]), tz=timezone.utc)
+        except (TypeError, ValueError, OverflowError, OSError):
+            raise ValueError(f"invalid date: {source['date']!r}") from None
+    else:
+        published_at = datetime.now(timezone.utc)
+
+    article = Article(
+        telegram_message_id=str(message_id),
+        title=_fallback_title(raw_text),
+        body=raw_text,
+        telegram_url=f"https://t.me/{username}/{message_id}" if username else "",
+        # The prototype compares against naive UTC (`datetime.utcnow()`).
+        published_at=published_at.replace(tzinfo=None),
+        source_channel=channel,
+    )
+    if validated is not None:
+        article = validated.apply_to(article)
+    return IngestItem(article=article, metadata=metadata)
+
+
+def _object(value: Any, name: str) -> Dict[str, Any]:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be an object, not {type(value).__name__}")
+    return value
+
+
+def _fallback_title(text: str) -> str:
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), text)
+    return first_line[:MAX_TITLE_CHARS]
+
+
+class IngestPipeline:
+    """Embeds, upserts and dedupes a batch of normalized posts in one pass.
+
+    `dedupe_scope="channel"` only compares a post against its own channel's
+    articles instead of the whole corpus. A `topic_classifier` learns from
+    posts whose metadata carries topics and labels the rest when confident.
+    A `gazetteer` adds the known entities each post mentions before entity
+    resolution, and learns the resolved entities for later posts.
+    """
+
+    def __init__(
+        self,
+        graph: Any,
+        embedding_service: Any,
+        duplicate_threshold: float = 0.88,
+        duplicate_limit: int = 5,
+        enricher: Callable[[Article, Sequence[float]], Article] | None = None,
+        entity_resolver: EntityResolver | None = None,
+        dedupe_scope: str = "global",
+        topic_classifier: CentroidTopicClassifier | None = None,
+        gazetteer: EntityGazetteer | None = None,
+    ) -> None:
+        if dedupe_scope not in ("global", "channel"):
+            raise ValueError(f"dedupe_scope must be 'global' or 'channel', got {dedupe_scope!r}")
+        self.graph = graph
+        self.embedding_service = embedding_service
+        self.duplicate_threshold = duplicate_threshold
+        self.duplicate_limit = duplicate_limit
+        self.enricher = enricher
+        self.entity_resolver = entity_resolver
+        self.dedupe_scope = dedupe_scope
+        self.topic_classifier = topic_classifier
+        self.gazetteer = gazetteer
+        self._lock = threading.Lock()
+
+    def process_batch(self, items: Sequence[IngestItem]) -> List[Dict[str, Any]]:
+        """One result per item, in order; an item that fails gets `status="error"`.
+
+        Each post is deduped against the stored corpus and the posts before it
+        in the batch, never against later ones, so a burst of near-identical
+        posts links each repeat to the first instead of to each other.
+        """
+        failures: Dict[int, Exception] = {}
+        embeddings = self._embed(items, failures)
+
+        articles: Dict[int, Article] = {}
+        topic_states: Dict[int, Dict[str, Any]] = {}
+        # Resolver, gazetteer and classifier are shared by every channel's batcher.
+        with self._lock:
+            for index, item in enumerate(items):
+                if index in failures:
+                    continue
+                try:
+                    articles[index] = self._enrich(item, embeddings[index], topic_states, index)
+                except Exception as exc:  # noqa: BLE001 - fails this item only
+                    failures[index] = exc
+            order = sorted(articles)
+            tagged = [articles[index] for index in order]
+            if self.gazetteer is not None:
+                tagged = self.gazetteer.tag_articles(tagged)
+            if self.entity_resolver is not None:
+                tagged = self.entity_resolver.resolve_articles(tagged)
+            if self.gazetteer is not None:
+                self.gazetteer.learn_articles(tagged)
+            articles = dict(zip(order, tagged))
+
+        matches: Dict[int, List[Dict[str, Any]]] = {}
+        for index in order:
+            earlier = [(i, articles[i]) for i in matches]
+            try:
+                matches[index] = self._find_duplicates(
+                    articles[index], embeddings[index], earlier, embeddings
+                )
+            except Exception as exc:  # noqa: BLE001 - fails this item only
+                failures[index] = exc
+
+        upserts: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+        for index in matches:
+            article = articles[index]
+            upserts[index] = [
+                ("upsert_article", {"article": article, "embedding": embeddings[index]})
+            ]
+            upserts[index].extend(
+                (op, {"article": article})
+                for op in ("attach_topics", "attach_entities", "attach_projects")
+            )
+        self._write_each(upserts, failures)
+        written = {articles[i].telegram_message_id for i in matches if i not in failures}
+        links: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+        for index, found in matches.items():
+            # Earlier posts of this batch whose write failed do not exist upstream.
+            found = [
+                match
+                for match in found
+                if not match.pop("_in_batch", False) or match["telegram_message_id"] in written
+            ]
+            matches[index] = found
+            if found and index not in failures:
+                links[index] = [
+                    (
+                        "create_similarity_links",
+                        {"source_id": articles[index].telegram_message_id, "matches": found},
+                    )
+                ]
+        if links:
+            self._write_each(links, failures)
+
+        results: List[Dict[str, Any]] = []
+        for index, item in enumerate(items):
+            if index in failures:
+                results.append(
+                    {
+                        "status": "error",
+                        "telegram_message_id": item.article.telegram_message_id,
+                        "error": str(failures[index]),
+                    }
+                )
+                continue
+            article = articles[index]
+            results.append(
+                {
+                    "status": "ingested",
+                    "telegram_message_id": article.telegram_message_id,
+                    "telegram_url": article.telegram_url,
+                    "title": article.title,
+                    "topics": list(article.topics),
+                    **topic_states.get(index, {}),
+                    "duplicates": matches[index],
+                }
+            )
+        return results
+
+    def _embed(
+        self, items: Sequence[IngestItem], failures: Dict[int, Exception]
+    ) -> List[List[float] | None]:
+        texts = [item.article.body for item in items]
+        if hasattr(self.embedding_service, "embed_many"):
+            try:
+                return [list(row) for row in self.embedding_service.embed_many(texts)]
+            except Exception:  # noqa: BLE001 - retried one by one to isolate the bad post
+                pass
+        embeddings: List[List[float] | None] = []
+        for index, text in enumerate(texts):
+            try:
+                embeddings.append(self.embedding_service.embed(text))
+            except Exception as exc:  # noqa: BLE001 - fails this item only
+                failures[index] = exc
+                embeddings.append(None)
+        return embeddings
+
+    def _enrich(
+        self,
+        item: IngestItem,
+        embedding: Sequence[float],
+        topic_states: Dict[int, Dict[str, Any]],
+        index: int,
+    ) -> Article:
+        article = item.article
+        if self.enricher is not None:
+            article = self.enricher(article, embedding)
+        if self.topic_classifier is not None:
+            article, topic_states[index] = self._classify_topics(item, article, embedding)
+        return article
+
+    def _find_duplicates(
+        self,
+        article: Article,
+        embedding: Sequence[float],
+        earlier: Sequence[Tuple[int, Article]],
+        embeddings: Sequence[Sequence[float] | None],
+    ) -> List[Dict[str, Any]]:
+        # Runs before this batch is written, so the graph holds only the corpus.
+        channels = [article.source_channel] if self.dedupe_scope == "channel" else None
+        found: Dict[str, Dict[str, Any]] = {
+            str(record["telegram_message_id"]): record
+            for record in self.graph.find_similar_articles(
+                embedding,
+                telegram_message_id=article.telegram_message_id,
+                limit=self.duplicate_limit,
+                min_score=self.duplicate_threshold,
+                channels=channels,
+            )
+        }
+        for index, other in earlier:
+            if other.telegram_message_id == article.telegram_message_id:
+                continue
+            if channels and other.source_channel not in channels:
+                continue
+            score = InMemoryKnowledgeGraph._cosine_similarity(embedding, embeddings[index])
+            if score >= self.duplicate_threshold:
+                found[other.telegram_message_id] = {
+                    "telegram_message_id": other.telegram_message_id,
+                    "title": other.title,
+                    "telegram_url": other.telegram_url,
+                    "score": score,
+                    "_in_batch": True,
+                }
+        ranked = sorted(found.values(), key=lambda record: record["score"], reverse=True)
+        return ranked[: self.duplicate_limit]
+
+    def _write_each(
+        self,
+        operations: Dict[int, List[Tuple[str, Dict[str, Any]]]],
+        failures: Dict[int, Exception],
+    ) -> None:
+        """Group-commit every item's operations; on error, retry per item to isolate it."""
+        operations = {index: ops for index, ops in operations.items() if index not in failures}
+        if not operations:
+            return
+        try:
+            self.graph.write_batch([op for ops in operations.values() for op in ops])
+            return
+        except Exception as exc:  # noqa: BLE001 - narrowed down below
+            if len(operations) == 1:
+                failures[next(iter(operations))] = exc
+                return
+        for index, ops in operations.items():
+            try:
+                self.graph.write_batch(ops)
+            except Exception as exc:  # noqa: BLE001 - fails this item only
+                failures[index] = exc
+
+    def _classify_topics(
+        self, item: IngestItem, article: Article, embedding: Sequence[float]
+    ) -> Tuple[Article, Dict[str, Any]]:
+        # Only metadata topics (LLM output) train the classifier.
+        if item.article.topics:
+            self.topic_classifier.learn(item.article.topics, embedding)
+            return article, {"topic_source": "metadata", "topic_decision_required": False}
+        if article.topics:
+            return article, {"topic_source": "enricher", "topic_decision_required": False}
+        prediction = self.topic_classifier.classify(embedding)
+        state = {
+            "topic_source": "classifier",
+            "topic_confidence": round(prediction.confidence, 4),
+            "topic_decision_required": prediction.decision_required,
+        }
+        if prediction.decision_required:
+            return article, state
+        return replace(article, topics=list(prediction.topics)), state
+
+
+class MicroBatcher:
+    """Collects submitted items for up to `window` seconds or `max_batch` items."""
+
+    def __init__(
+        self, pipeline: IngestPipeline, window: float = 0.05, max_batch: int = 64
+    ) -> None:
+        self.pipeline = pipeline
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue[Tuple[IngestItem, asyncio.Future]] | None = None
+        self._worker: asyncio.Task | None = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item: IngestItem) -> Dict[str, Any]:
+        assert self._queue is not None, "MicroBatcher.start() was not called"
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.pipeline.process_batch, items)
+            except Exception as exc:  # noqa: BLE001 - surfaced to every waiting request
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class ChannelBatchers:
+    """One `MicroBatcher` per source channel, so channels batch and ingest concurrently.
+
+    A burst on one channel fills only that channel's batches; the others keep
+    their own window and run their embedding + upsert round-trips in parallel.
+    The pipeline's resolver, gazetteer and classifier are shared, so it
+    serializes their (in-memory, fast) step behind its own lock.
+    """
+
+    def __init__(self, pipeline: IngestPipeline, window: float = 0.05, max_batch: int = 64) -> None:
+        self.pipeline = pipeline
+        self.window = window
+        self.max_batch = max_batch
+        self._batchers: Dict[str, MicroBatcher] = {}
+
+    @property
+    def batches(self) -> int:
+        return sum(batcher.batches for batcher in self._batchers.values())
+
+    @property
+    def items(self) -> int:
+        return sum(batcher.items for batcher in self._batchers.values())
+
+    def start(self) -> None:
+        for batcher in self._batchers.values():
+            batcher.start()
+
+    async def stop(self) -> None:
+        for batcher in self._batchers.values():
+            await batcher.stop()
+
+    async def submit(self, item: IngestItem) -> Dict[str, Any]:
+        channel = item.article.source_channel
+        batcher = self._batchers.get(channel)
+        if batcher is None:
+            batcher = self._batchers[channel] = MicroBatcher(
+                self.pipeline, window=self.window, max_batch=self.max_batch
+            )
+            batcher.start()
+        return await batcher.submit(item)
+
+
+class IngestServer:
+    """Minimal asyncio HTTP/1.1 server exposing `POST /ingest` and `GET /healthz`."""
+
+    def __init__(self, batcher: MicroBatcher | ChannelBatchers) -> None:
+        self.batcher = batcher
+
+    async def serve(self, host: str, port: int) -> None:
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"Ingestion service listening on http://{host}:{port}/ingest")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except BadRequest as exc:
+                    # The rest of the stream cannot be framed; answer and close.
+                    writer.write(_response(exc.status, {"error": str(exc)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if method == "GET" and path == "/healthz":
+            return 200, {
+                "status": "ok",
+                "batches": self.batcher.batches,
+                "items": self.batcher.items,
+            }
+        if method != "POST" or path != "/ingest":
+            return 404, {"error": f"{method} {path} not found"}
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as exc:
+            return 400, {"error": f"invalid JSON: {exc}"}
+        if isinstance(payload, dict) and "updates" in payload:
+            payload = payload["updates"]
+        updates = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(update, dict) for update in updates):
+            return 400, {"error": "expected a Telegram update object or a list of them"}
+
+        pending = []
+        results: List[Dict[str, Any] | None] = []
+        for update in updates:
+            try:
+                item = normalize_update(update)
+            except ValueError as exc:
+                if len(updates) == 1:
+                    return 400, {"error": f"invalid update: {exc}"}
+                results.append({"status": "error", "error": f"invalid update: {exc}"})
+                continue
+            if item is None:
+                results.append({"status": "skipped", "reason": "no message id or text"})
+                continue
+            results.append(None)
+            pending.append((len(results) - 1, self.batcher.submit(item)))
+        done = await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+        for (index, _), result in zip(pending, done):
+            if isinstance(result, Exception):
+                # The whole batch failed (e.g. entity resolution raised).
+                result = {"status": "error", "error": str(result)}
+            results[index] = result
+        if pending and all(results[index]["status"] == "error" for index, _ in pending):
+            return 502, {"results": results}
+        return 200, {"results": results}
+
+
+class BadRequest(Exception):
+    """A request that cannot be parsed; answered with `status` before closing."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Dict[str, str], bytes] | None:
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise BadRequest(f"malformed request line: {request_line[:100]!r}")
+    method, target, _ = parts
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise BadRequest(f"invalid Content-Length: {headers['content-length']!r}") from None
+    if length < 0:
+        raise BadRequest(f"invalid Content-Length: {length}")
+    if length > MAX_BODY_BYTES:
+        raise BadRequest(f"request body exceeds {MAX_BODY_BYTES} bytes", status=413)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    reasons = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        413: "Payload Too Large",
+        502: "Bad Gateway",
+    }
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Telegram → knowledge graph ingestion service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--window-ms", type=float, default=50.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--duplicate-threshold", type=float, default=0.88)
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="use HashEmbeddingService + InMemoryKnowledgeGraph (no credentials needed)",
+    )
+    parser.add_argument(
+        "--per-channel",
+        action="store_true",
+        help="batch each source channel separately and dedupe within the channel",
+    )
+    parser.add_argument(
+        "--pretag-entities",
+        action="store_true",
+        help="tag known entity names and aliases in each post (Aho-Corasick gazetteer)",
+    )
+    parser.add_argument(
+        "--topic-centroids",
+        type=Path,
+        help="label posts without LLM topics from embedding centroids kept in this JSON file",
+    )
+    parser.add_argument(
+        "--read-replica",
+        action="store_true",
+        help="serve dedupe and entity reads from an in-memory replica synced from Neo4j",
+    )
+    parser.add_argument("--replica-snapshot", type=Path, help="persist the replica here")
+    parser.add_argument("--max-staleness", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.in_memory:
+        embedding_service = hash_embedding_service_from_env()
+        # --per-channel dedupe is scoped by the graph's channel postings.
+        graph = InMemoryKnowledgeGraph(embedding_service.dimensions)
+    else:
+        config = EnvConfig()
+        startup_cache = StartupCache.from_env()
+        embedding_service = build_embedding_service(config, startup_cache)
+        graph = build_graph_backend(config, embedding_service.dimensions, startup_cache)
+        # KG_WRITE_BEHIND_PATH: acknowledge posts once journaled, group-commit upstream.
+        graph = write_behind_from_env(graph)
+        if args.read_replica:
+            graph = ReadReplica(
+                graph, max_staleness=args.max_staleness, snapshot_path=args.replica_snapshot
+            )
+
+    entity_resolver = EntityResolver.from_graph(graph)
+    pipeline = IngestPipeline(
+        graph,
+        embedding_service,
+        duplicate_threshold=args.duplicate_threshold,
+        entity_resolver=entity_resolver,
+        dedupe_scope="channel" if args.per_channel else "global",
+        topic_classifier=(
+            CentroidTopicClassifier.load(args.topic_centroids) if args.topic_centroids else None
+        ),
+        gazetteer=(
+            EntityGazetteer.from_resolver(entity_resolver) if args.pretag_entities else None
+        ),
+    )
+    batcher_class = ChannelBatchers if args.per_channel else MicroBatcher
+    batcher = batcher_class(pipeline, window=args.window_ms / 1000, max_batch=args.max_batch)
+    try:
+        asyncio.run(IngestServer(batcher).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pipeline.topic_classifier is not None:
+            pipeline.topic_classifier.save(args.topic_centroids)
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,14 +17,18 @@ try:
         EnvConfig,
         GeminiEmbeddingService,
         Neo4jQueryAPIKnowledgeGraph,
+        StartupCache,
     )
+    from write_behind import write_behind_from_env
 except ModuleNotFoundError:  # pragma: no cover - package import fallback
     from .prototype import (
         Article,
         EnvConfig,
         GeminiEmbeddingService,
         Neo4jQueryAPIKnowledgeGraph,
+        StartupCache,
     )
+    from .write_behind import write_behind_from_env
 
 
 def _build_articles() -> list[Article]:
@@ -114,8 +118,16 @@ def _build_articles() -> list[Article]:
 
 def main() -> None:
     config = EnvConfig()
-    embedder = GeminiEmbeddingService(config.gemini_api_key, config.embedding_model)
-    graph = Neo4jQueryAPIKnowledgeGraph(config, embedder.dimensions)
+    startup_cache = StartupCache.from_env()
+    embedder = GeminiEmbeddingService(
+        config.gemini_api_key,
+        config.embedding_model,
+        dimensions=config.embedding_dimensions,
+        startup_cache=startup_cache,
+    )
+    graph = write_behind_from_env(
+        Neo4jQueryAPIKnowledgeGraph(config, embedder.dimensions, startup_cache=startup_cache)
+    )
 
     try:
         for article in _build_articles():
@@ -0,0 +1,133 @@
+"""Append-only JSONL journal with a flushed-sequence checkpoint.
+
+Used to keep graph writes durable locally while Neo4j is unreachable (see
+`backend_router.py`) and for write-behind ingest. Entries are JSON objects
+tagged with a monotonically increasing `seq`; `mark_flushed(seq)` records the
+highest sequence already applied upstream, and `pending()` returns everything
+after it, which is what crash recovery replays.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+
+class AppendOnlyJournal:
+    """JSONL journal; pass `path=None` for a process-local (non-durable) journal."""
+
+    def __init__(self, path: Path | str | None, fsync: bool = True) -> None:
+        self.path = Path(path) if path is not None else None
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._flushed_seq = 0
+        self._next_seq = 1
+        self._handle = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._recover()
+            self._handle = self.path.open("a", encoding="utf-8")
+
+    @property
+    def checkpoint_path(self) -> Path | None:
+        if self.path is None:
+            return None
+        return self.path.with_name(self.path.name + ".checkpoint")
+
+    @property
+    def flushed_seq(self) -> int:
+        return self._flushed_seq
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        return self.append_many([entry])[-1]
+
+    def append_many(self, entries: Iterable[Dict[str, Any]]) -> List[int]:
+        with self._lock:
+            records = []
+            for entry in entries:
+                record = dict(entry, seq=self._next_seq)
+                self._next_seq += 1
+                records.append(record)
+            if not records:
+                return []
+            if self._handle is not None:
+                self._handle.write(
+                    "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                )
+                self._handle.flush()
+                if self.fsync:
+                    os.fsync(self._handle.fileno())
+            self._entries.extend(records)
+            return [record["seq"] for record in records]
+
+    def pending(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        # _entries only ever holds records past the checkpoint.
+        with self._lock:
+            return list(self._entries if limit is None else self._entries[:limit])
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def mark_flushed(self, seq: int) -> None:
+        with self._lock:
+            if seq <= self._flushed_seq:
+                return
+            self._flushed_seq = seq
+            self._entries = [e for e in self._entries if e["seq"] > seq]
+            checkpoint = self.checkpoint_path
+            if checkpoint is not None:
+                tmp_path = checkpoint.with_suffix(".tmp")
+                tmp_path.write_text(str(seq), encoding="utf-8")
+                os.replace(tmp_path, checkpoint)
+            if not self._entries:
+                self._truncate()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def _truncate(self) -> None:
+        # Everything is flushed: start a fresh file so replay stays cheap. The
+        # checkpoint keeps the sequence so numbering never goes backwards.
+        if self._handle is None:
+            return
+        self._handle.close()
+        self._handle = self.path.open("w", encoding="utf-8")
+
+    def _recover(self) -> None:
+        checkpoint = self.checkpoint_path
+        if checkpoint is not None and checkpoint.exists():
+            try:
+                self._flushed_seq = int(checkpoint.read_text(encoding="utf-8").strip() or 0)
+            except ValueError:
+                self._flushed_seq = 0
+        last_seq = self._flushed_seq
+        torn = False
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash; everything before it is intact.
+                        torn = True
+                        break
+                    last_seq = max(last_seq, record["seq"])
+                    if record["seq"] > self._flushed_seq:
+                        self._entries.append(record)
+        if torn:
+            # Drop the torn tail so new appends are not stranded behind it.
+            self.path.write_text(
+                "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self._entries),
+                encoding="utf-8",
+            )
+        self._next_seq = last_seq + 1
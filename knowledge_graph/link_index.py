@@ -0,0 +1,162 @@
+"""Link extraction and reversed-domain lookup for CTA / link attribution.
+
+"Which posts drove traffic to wan.video?" used to be
+`WHERE a.cta_link CONTAINS $domain`, a substring scan over every Article
+that also missed links written in the body. At upsert, links are now taken
+from the body and the CTA, normalized, and stored as
+`(:Article)-[:LINKS_TO {cta}]->(:Link {url})-[:ON_DOMAIN]->(:Domain {host,
+reversed_host})`.
+
+`reversed_host` lists the host labels backwards with a trailing dot
+(`cdn.wan.video` -> `video.wan.cdn.`). A domain and all of its subdomains
+therefore share the prefix `video.wan.`, and a `STARTS WITH` on the range
+index `domain_reversed_host_idx` is an index seek. The trailing dot keeps
+`wan.videos` out. `DomainTrie` is the in-memory equivalent: one trie node per
+reversed label, each holding the posting list of articles linking to exactly
+that host. Both answer in time proportional to the matching hosts and
+articles, not the corpus.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+try:
+    from posting_lists import posting_add, posting_remove, union
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .posting_lists import posting_add, posting_remove, union
+
+# http(s) URLs and bare www. hosts; trailing sentence punctuation is trimmed.
+_URL_RE = re.compile(r"(?:https?://|www\.)[^\s<>\"'«»]+", re.IGNORECASE)
+_TRAILING = ".,;:!?)]}'\"»…"
+_HOST_RE = re.compile(r"^[0-9a-z_-]+(?:\.[0-9a-z_-]+)*\.?$")
+# Tracking parameters that never change the target page.
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "yclid", "mc_cid", "mc_eid")
+
+
+def normalize_host(value: str) -> str | None:
+    """Lowercased IDNA host without `www.` or a port, from a URL or a bare domain."""
+    value = value.strip()
+    if not value:
+        return None
+    if "://" not in value:
+        value = f"https://{value}"
+    try:
+        host = urlsplit(value).hostname or ""
+        host = host.encode("idna").decode("ascii") if not host.isascii() else host
+    except (ValueError, UnicodeError):
+        return None
+    host = host.lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if "." not in host or not _HOST_RE.match(host):
+        return None
+    return host
+
+
+def normalize_url(value: str) -> Tuple[str, str] | None:
+    """(canonical url, host): https, no `www.`/port/fragment/tracking params/trailing slash."""
+    value = value.strip()
+    if not value:
+        return None
+    if "://" not in value:
+        value = f"https://{value}"
+    try:
+        parts = urlsplit(value)
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https"):
+        return None
+    host = normalize_host(value)
+    if host is None:
+        return None
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        [
+            (key, item)
+            for key, item in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(_TRACKING_PARAMS)
+        ]
+    )
+    return f"https://{host}{path}{'?' + query if query else ''}", host
+
+
+def reversed_host(host: str) -> str:
+    return ".".join(reversed(host.split("."))) + "."
+
+
+def domain_prefix(domain: str) -> str | None:
+    """`reversed_host` prefix matching `domain` and its subdomains (accepts a URL too)."""
+    host = normalize_host(domain)
+    return None if host is None else reversed_host(host)
+
+
+def article_links(body: str, cta_link: str = "") -> List[Tuple[str, str, bool]]:
+    """(url, host, is_cta) for each distinct link in the body and CTA, CTA first."""
+    links: Dict[str, Tuple[str, str, bool]] = {}
+    cta = normalize_url(cta_link) if cta_link else None
+    if cta is not None:
+        links[cta[0]] = (cta[0], cta[1], True)
+    for match in _URL_RE.finditer(body or ""):
+        normalized = normalize_url(match.group(0).rstrip(_TRAILING))
+        if normalized is not None and normalized[0] not in links:
+            links[normalized[0]] = (normalized[0], normalized[1], False)
+    return list(links.values())
+
+
+def link_rows(body: str, cta_link: str = "") -> List[Dict[str, object]]:
+    """`row.links` for the Cypher upsert."""
+    return [
+        {"url": url, "host": host, "reversed_host": reversed_host(host), "cta": cta}
+        for url, host, cta in article_links(body, cta_link)
+    ]
+
+
+class _DomainNode:
+    __slots__ = ("children", "posting")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _DomainNode] = {}
+        self.posting = array("I")
+
+
+class DomainTrie:
+    """Reversed-label trie of hosts to sorted article-id postings."""
+
+    def __init__(self) -> None:
+        self._root = _DomainNode()
+
+    def _node(self, host: str, create: bool) -> _DomainNode | None:
+        node = self._root
+        for label in reversed(host.split(".")):
+            child = node.children.get(label)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[label] = _DomainNode()
+            node = child
+        return node
+
+    def add(self, host: str, article_id: int) -> None:
+        posting_add(self._node(host, create=True).posting, article_id)
+
+    def remove(self, host: str, article_id: int) -> None:
+        node = self._node(host, create=False)
+        if node is not None:
+            posting_remove(node.posting, article_id)
+
+    def lookup(self, domain: str) -> array:
+        """Sorted ids of articles linking to `domain` or any of its subdomains."""
+        host = normalize_host(domain)
+        node = None if host is None else self._node(host, create=False)
+        if node is None:
+            return array("I")
+        postings, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            if current.posting:
+                postings.append(current.posting)
+            stack.extend(current.children.values())
+        return union(postings)
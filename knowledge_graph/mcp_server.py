@@ -0,0 +1,523 @@
+"""MCP-compatible read-only tool server over `KnowledgeGraphBase`.
+
+The digest and posting flows call `get_neo4j_schema` and `read_neo4j_cypher`
+on the Cloud Run MCP server, and the LLM keeps re-requesting the schema and
+re-sending near-identical Cypher. This server exposes the playbook queries as
+typed, parameterized tools instead, backed by one long-lived graph backend
+(warm Bolt/HTTP connection pool), a `CachedKnowledgeGraph` result cache and a
+TTL-cached schema introspection. Every tool result is capped by row count and
+serialized size and paginated with an opaque `cursor`: the playbook tools
+page on the keyset `read_page` queries, so a page costs one bounded query
+however deep the caller goes. `read_neo4j_cypher` runs in a read-access-mode
+transaction, so Neo4j itself refuses writes the statement check misses.
+
+With `--read-replica` the tools read a `ReadReplica` and the result cache is
+skipped: replica reads are already in-process, and a cache on top would stack
+its TTL onto the replica's `--max-staleness` (a digest could then be up to
+max_staleness + cache_ttl seconds behind Neo4j instead of max_staleness).
+
+Invalid arguments and backend failures during a tool call come back as an
+`isError` tool result the model can read; anything else that goes wrong
+while handling a request is a JSON-RPC -32603 error.
+
+Speaks JSON-RPC 2.0 (MCP `initialize`, `tools/list`, `tools/call`) over stdio
+(newline-delimited) or HTTP (`POST /mcp`):
+    python mcp_server.py --in-memory --seed --transport stdio
+    python mcp_server.py --transport http --port 8000
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+try:
+    from prototype import (
+        EnvConfig,
+        HashEmbeddingService,
+        InMemoryKnowledgeGraph,
+        ScenarioRunner,
+        StartupCache,
+        build_embedding_service,
+        build_graph_backend,
+        is_write_statement,
+    )
+    from query_cache import CachedKnowledgeGraph, QueryResultCache
+    from read_replica import ReadReplica
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import (
+        EnvConfig,
+        HashEmbeddingService,
+        InMemoryKnowledgeGraph,
+        ScenarioRunner,
+        StartupCache,
+        build_embedding_service,
+        build_graph_backend,
+        is_write_statement,
+    )
+    from .query_cache import CachedKnowledgeGraph, QueryResultCache
+    from .read_replica import ReadReplica
+
+PROTOCOL_VERSION = "2025-03-26"
+SERVER_INFO = {"name": "dubovyk-kg-read", "version": "0.1.0"}
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+MAX_RESULT_BYTES = 64 * 1024
+
+SCHEMA_CYPHER = {
+    "labels": "CALL db.labels() YIELD label RETURN collect(label) AS labels",
+    "relationship_types": (
+        "CALL db.relationshipTypes() YIELD relationshipType "
+        "RETURN collect(relationshipType) AS relationship_types"
+    ),
+    "indexes": (
+        "SHOW INDEXES YIELD name, type, labelsOrTypes, properties "
+        "RETURN collect({name: name, type: type, labels: labelsOrTypes, properties: properties}) AS indexes"
+    ),
+}
+
+
+class ToolError(Exception):
+    """Raised for invalid tool input; reported as an `isError` tool result."""
+
+
+class MethodNotFound(Exception):
+    """Raised for an unknown JSON-RPC method; reported as error -32601."""
+
+
+def _paging_properties() -> Dict[str, Any]:
+    return {
+        "limit": {"type": "integer", "minimum": 1, "maximum": MAX_PAGE_SIZE},
+        "cursor": {"type": "string", "description": "next_cursor from a previous page"},
+    }
+
+
+TOOLS: List[Dict[str, Any]] = [
+    {
+        "name": "get_neo4j_schema",
+        "description": "Labels, relationship types and indexes of the knowledge graph (cached).",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    {
+        "name": "weekly_digest",
+        "description": "Articles published in the last N days with their topics, newest day first.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"days": {"type": "integer", "minimum": 1, "default": 7}, **_paging_properties()},
+        },
+    },
+    {
+        "name": "article_list_by_entity",
+        "description": "Recent articles that mention an entity (company, person, product).",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "entity": {"type": "string"},
+                "days": {"type": "integer", "minimum": 1, "default": 14},
+                **_paging_properties(),
+            },
+            "required": ["entity"],
+        },
+    },
+    {
+        "name": "vlm_projects",
+        "description": "Projects about a topic (default Vision-Language Models) and the articles featuring them.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "topic": {"type": "string", "default": "Vision-Language Models"},
+                **_paging_properties(),
+            },
+        },
+    },
+    {
+        "name": "image_edit_news",
+        "description": "Articles about image-editing models.",
+        "inputSchema": {"type": "object", "properties": {**_paging_properties()}},
+    },
+    {
+        "name": "vector_search",
+        "description": "Semantic search: embeds the query and returns the closest articles.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": MAX_PAGE_SIZE, "default": 10},
+                "min_score": {"type": "number", "default": 0.0},
+            },
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "read_neo4j_cypher",
+        "description": "Escape hatch for read-only Cypher the typed tools do not cover.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "params": {"type": "object"},
+                **_paging_properties(),
+            },
+            "required": ["query"],
+        },
+    },
+]
+
+
+class SchemaCache:
+    """Caches schema introspection for `ttl_seconds`; the schema changes rarely."""
+
+    def __init__(self, graph: Any, ttl_seconds: float = 600.0) -> None:
+        self.graph = graph
+        self.ttl_seconds = ttl_seconds
+        self._value: Dict[str, Any] | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._value is None or time.monotonic() >= self._expires_at:
+                self._value = self._introspect()
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return self._value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+    def _introspect(self) -> Dict[str, Any]:
+        if isinstance(self.graph, InMemoryKnowledgeGraph) or not hasattr(self.graph, "run_cypher"):
+            return {
+                "labels": ["Article", "Topic", "Entity", "Project"],
+                "relationship_types": ["ABOUT", "MENTIONS", "FEATURES", "SIMILAR_TO"],
+                "indexes": [],
+                "backend": type(self.graph).__name__,
+            }
+        schema: Dict[str, Any] = {}
+        for key, statement in SCHEMA_CYPHER.items():
+            records = self.graph.run_cypher(statement)
+            schema[key] = records[0][key] if records else []
+        return schema
+
+
+class KnowledgeGraphToolServer:
+    """Transport-independent MCP request handler."""
+
+    def __init__(
+        self,
+        graph: Any,
+        embedding_service: Any = None,
+        cache: QueryResultCache | None = None,
+        max_result_bytes: int = MAX_RESULT_BYTES,
+        cache_results: bool = True,
+    ) -> None:
+        self.raw_graph = graph
+        if cache_results and not isinstance(graph, CachedKnowledgeGraph):
+            graph = CachedKnowledgeGraph(graph, cache)
+        self.graph = graph
+        self.embedding_service = embedding_service
+        self.schema = SchemaCache(self.raw_graph)
+        self.max_result_bytes = max_result_bytes
+        # Tool arguments -> `read_page` params of the paged read of the same name.
+        self._paged_tools: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "weekly_digest": lambda a: {"days": int(a.get("days", 7))},
+            "article_list_by_entity": lambda a: {
+                "entity": _required_str(a, "entity"),
+                "days": int(a.get("days", 14)),
+            },
+            "vlm_projects": lambda a: {"topic": str(a.get("topic") or "Vision-Language Models")},
+            "image_edit_news": lambda a: {},
+        }
+
+    # JSON-RPC --------------------------------------------------------------
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any] | None:
+        if not isinstance(message, dict):
+            return _error(None, -32600, "Invalid Request: expected an object")
+        request_id = message.get("id")
+        method = message.get("method")
+        if request_id is None:
+            return None  # notification (e.g. notifications/initialized)
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            return _error(request_id, -32602, "Invalid params: expected an object")
+        try:
+            result = self._dispatch(method, params)
+        except MethodNotFound as exc:
+            return _error(request_id, -32601, f"Method not found: {exc}")
+        except Exception as exc:  # noqa: BLE001 - answered, never kills the transport
+            print(f"[WARN] MCP {method} failed: {exc!r}", file=sys.stderr)
+            return _error(request_id, -32603, f"Internal error: {exc}")
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def handle_raw(self, payload: str | bytes) -> Any:
+        try:
+            message = json.loads(payload)
+        except ValueError as exc:
+            return _error(None, -32700, f"Parse error: {exc}")
+        if isinstance(message, list):
+            responses = [self.handle(item) for item in message]
+            return [response for response in responses if response is not None] or None
+        return self.handle(message)
+
+    def _dispatch(self, method: str | None, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == "initialize":
+            return {
+                "protocolVersion": params.get("protocolVersion") or PROTOCOL_VERSION,
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": SERVER_INFO,
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": TOOLS}
+        if method == "tools/call":
+            return self.call_tool(params.get("name"), params.get("arguments") or {})
+        raise MethodNotFound(method)
+
+    # Tools -----------------------------------------------------------------
+    def call_tool(self, name: str | None, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if not isinstance(arguments, dict):
+                raise ToolError("arguments must be an object")
+            if name == "get_neo4j_schema":
+                payload: Dict[str, Any] = self.schema.get()
+            elif name == "vector_search":
+                payload = {"rows": self._vector_search(arguments)}
+            elif name in self._paged_tools or name == "read_neo4j_cypher":
+                payload = self._paginated(name, arguments)
+            else:
+                raise ToolError(f"Unknown tool: {name}")
+        except ToolError as exc:
+            return _tool_error(str(exc))
+        except (TypeError, ValueError) as exc:
+            return _tool_error(f"invalid arguments for {name}: {exc}")
+        except Exception as exc:  # noqa: BLE001 - the model sees the failure, not the client
+            print(f"[WARN] MCP tool {name} failed: {exc!r}", file=sys.stderr)
+            return _tool_error(f"{name} failed: {exc}")
+        text = json.dumps(payload, ensure_ascii=False, default=str)
+        return {
+            "content": [{"type": "text", "text": text}],
+            "structuredContent": json.loads(text),
+            "isError": False,
+        }
+
+    def _paginated(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        query_args = {k: v for k, v in arguments.items() if k not in ("limit", "cursor")}
+        fingerprint = _fingerprint(name, query_args)
+        position: str | None = None
+        if arguments.get("cursor"):
+            cursor_fingerprint, position = _decode_cursor(arguments["cursor"])
+            if cursor_fingerprint != fingerprint:
+                raise ToolError("cursor does not belong to this tool call")
+        limit = max(1, min(int(arguments.get("limit") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        if name == "read_neo4j_cypher":
+            offset = int(position or 0)
+            rows = self._read_cypher(query_args, offset, limit + 1)
+            page = self._fit(rows[:limit])
+            next_position = str(offset + len(page)) if len(page) < len(rows) else None
+        else:
+            params = self._paged_tools[name](query_args)
+            rows, next_position = self.graph.read_page(name, params, position, limit)
+            page = self._fit(rows)
+            if len(page) < len(rows):
+                # Cut short by the size cap: the next page starts after the last row kept.
+                _, next_position = self.graph.read_page(name, params, position, len(page))
+        return {
+            "rows": page,
+            "next_cursor": (
+                _encode_cursor(fingerprint, next_position) if next_position is not None else None
+            ),
+        }
+
+    def _fit(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Leading rows that serialize within `max_result_bytes` (at least one)."""
+        page: List[Dict[str, Any]] = []
+        size = 2
+        for row in rows:
+            row_size = len(json.dumps(row, ensure_ascii=False, default=str)) + 1
+            if page and size + row_size > self.max_result_bytes:
+                break
+            page.append(row)
+            size += row_size
+        return page
+
+    def _vector_search(self, arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.embedding_service is None:
+            raise ToolError("vector_search needs an embedding service")
+        embedding = self.embedding_service.embed(_required_str(arguments, "query"))
+        limit = min(int(arguments.get("limit") or 10), MAX_PAGE_SIZE)
+        return self.graph.find_similar_articles(
+            embedding,
+            telegram_message_id="",
+            limit=limit,
+            min_score=float(arguments.get("min_score") or 0.0),
+        )
+
+    def _read_cypher(
+        self, arguments: Dict[str, Any], offset: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Rows `offset:offset + limit` of an arbitrary read query.
+
+        Free-form Cypher has no key to seek on, so pages skip through the
+        stream; only `offset + limit` rows are pulled and the rest is never read.
+        """
+        statement = _required_str(arguments, "query")
+        # Cheap early answer; the read-access-mode transaction is the real guard.
+        if is_write_statement(statement):
+            raise ToolError("read_neo4j_cypher only accepts read queries")
+        if not hasattr(self.raw_graph, "iter_read_cypher"):
+            raise ToolError("the in-memory backend does not execute Cypher; use the typed tools")
+        params = arguments.get("params") or {}
+        if not isinstance(params, dict):
+            raise ToolError("'params' must be an object")
+        records = self.raw_graph.iter_read_cypher(statement, params)
+        try:
+            return list(itertools.islice(records, offset, offset + limit))
+        finally:
+            records.close()
+
+
+def _required_str(arguments: Dict[str, Any], key: str) -> str:
+    value = arguments.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ToolError(f"'{key}' is required")
+    return value.strip()
+
+
+def _fingerprint(name: str, arguments: Dict[str, Any]) -> str:
+    canonical = json.dumps([name, arguments], sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_cursor(fingerprint: str, position: str) -> str:
+    """Tool cursor: the call's fingerprint plus a `read_page` cursor or a row offset."""
+    return base64.urlsafe_b64encode(f"{fingerprint}:{position}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        fingerprint, position = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        return fingerprint, position
+    except ValueError as exc:
+        raise ToolError("invalid cursor") from exc
+
+
+def _tool_error(message: str) -> Dict[str, Any]:
+    return {"content": [{"type": "text", "text": message}], "isError": True}
+
+
+def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def serve_stdio(server: KnowledgeGraphToolServer) -> None:
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = server.handle_raw(line)
+        if response is not None:
+            sys.stdout.write(json.dumps(response, ensure_ascii=False, default=str) + "\n")
+            sys.stdout.flush()
+
+
+def serve_http(server: KnowledgeGraphToolServer, host: str, port: int) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            if self.path.rstrip("/") not in ("/mcp", "/api/mcp"):
+                self._send(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            response = server.handle_raw(self.rfile.read(length))
+            if response is None:
+                self._send(202, None)
+            else:
+                self._send(200, response)
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = b"" if payload is None else json.dumps(payload, ensure_ascii=False, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return None
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"MCP server listening on http://{host}:{port}/mcp", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Read-only MCP tool server for the knowledge graph")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--in-memory", action="store_true", help="serve InMemoryKnowledgeGraph")
+    parser.add_argument("--seed", action="store_true", help="load the synthetic scenario articles")
+    # The result cache only sees this process's writes; ingest runs elsewhere.
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=15.0,
+        help="result cache TTL in seconds (not used with --read-replica)",
+    )
+    parser.add_argument(
+        "--read-replica",
+        action="store_true",
+        help="answer tools from an in-memory replica synced from Neo4j",
+    )
+    parser.add_argument("--replica-snapshot", help="persist the replica to this JSONL file")
+    parser.add_argument("--max-staleness", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.in_memory:
+        embedding_service = HashEmbeddingService()
+        graph = InMemoryKnowledgeGraph(embedding_service.dimensions)
+    else:
+        config = EnvConfig()
+        startup_cache = StartupCache.from_env()
+        embedding_service = build_embedding_service(config, startup_cache)
+        graph = build_graph_backend(config, embedding_service.dimensions, startup_cache)
+        if args.read_replica:
+            graph = ReadReplica(
+                graph, max_staleness=args.max_staleness, snapshot_path=args.replica_snapshot
+            )
+    if args.seed:
+        for article in ScenarioRunner.synthetic_articles():
+            graph.upsert_article(article, embedding_service.embed(article.body))
+            graph.attach_topics(article)
+            graph.attach_entities(article)
+            graph.attach_projects(article)
+
+    server = KnowledgeGraphToolServer(
+        graph,
+        embedding_service,
+        cache=QueryResultCache(ttl_seconds=args.cache_ttl),
+        # The replica already bounds staleness; see the module docstring.
+        cache_results=not args.read_replica,
+    )
+    try:
+        if args.transport == "stdio":
+            serve_stdio(server)
+        else:
+            serve_http(server, args.host, args.port)
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
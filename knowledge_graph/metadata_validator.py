@@ -0,0 +1,312 @@
+"""Batch validator for the LLM metadata described in `METADATA_CONTRACT.md`.
+
+The n8n Prompt Builder applies the validation checklist per item in
+JavaScript; backfills need the same rules in Python, millions of times. All
+lookup structures are built once per `MetadataValidator`: an exact-match table
+for canonical topics and their common spellings, a trigram index for fuzzy
+topic mapping, and a memo of every raw topic string already resolved (LLM
+output repeats the same few dozen labels). Dedupe is set-based on casefolded
+values. Results are `EntityRef` lists and topic lists ready to drop into an
+`Article` for `write_batch`.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from prototype import Article, EntityRef
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import Article, EntityRef
+
+CANONICAL_TOPICS: Tuple[str, ...] = (
+    "agentic_ai",
+    "model_context_protocol",
+    "frontier_models",
+    "multimodality",
+    "retrieval_augmented_generation",
+    "fine_tuning_and_customization",
+    "developer_tools_and_frameworks",
+    "ai_hardware_and_infrastructure",
+    "open_source_ecosystem",
+    "enterprise_ai_and_automation",
+    "responsible_ai_and_governance",
+)
+ENTITY_TYPES = frozenset({"person", "company", "project", "technology", "other"})
+
+# Spellings the LLM produces that exact/trigram matching would not catch.
+TOPIC_ALIASES: Dict[str, str] = {
+    "agents": "agentic_ai",
+    "ai_agents": "agentic_ai",
+    "agentic": "agentic_ai",
+    "mcp": "model_context_protocol",
+    "llm": "frontier_models",
+    "llms": "frontier_models",
+    "foundation_models": "frontier_models",
+    "multimodal": "multimodality",
+    "vision_language_models": "multimodality",
+    "vlm": "multimodality",
+    "rag": "retrieval_augmented_generation",
+    "fine_tuning": "fine_tuning_and_customization",
+    "finetuning": "fine_tuning_and_customization",
+    "dev_tools": "developer_tools_and_frameworks",
+    "developer_tools": "developer_tools_and_frameworks",
+    "gpu": "ai_hardware_and_infrastructure",
+    "hardware": "ai_hardware_and_infrastructure",
+    "open_source": "open_source_ecosystem",
+    "opensource": "open_source_ecosystem",
+    "enterprise_ai": "enterprise_ai_and_automation",
+    "automation": "enterprise_ai_and_automation",
+    "ai_safety": "responsible_ai_and_governance",
+    "ai_governance": "responsible_ai_and_governance",
+    "responsible_ai": "responsible_ai_and_governance",
+}
+
+MAX_TOPICS = 3
+MAX_TAGS = 6
+MAX_TITLE_CHARS = 120
+FUZZY_TOPIC_THRESHOLD = 0.55
+
+_SEPARATORS_RE = re.compile(r"[\s\-/.&#]+")
+_NON_WORD_RE = re.compile(r"[^0-9a-z_]+")
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_BARE_DOMAIN_RE = re.compile(r"^(?:www\.)?[0-9a-z-]+(?:\.[0-9a-z-]+)*\.[a-z]{2,}(?::\d+)?(?:[/?#].*)?$", re.I)
+_CLAUSE_RE = re.compile(r"[.!?\n]")
+
+
+def topic_key(value: str) -> str:
+    """Canonical comparison key: casefolded, separators collapsed to `_`."""
+    key = _SEPARATORS_RE.sub("_", value.strip().casefold())
+    return _NON_WORD_RE.sub("", key).strip("_")
+
+
+def _trigrams(key: str) -> frozenset:
+    padded = f"  {key} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Inverted trigram index over a fixed vocabulary, scored by Dice coefficient."""
+
+    def __init__(self, vocabulary: Iterable[str]) -> None:
+        self.terms: List[str] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for term in vocabulary:
+            grams = _trigrams(term)
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(term_id)
+
+    def best_match(self, key: str, threshold: float) -> Tuple[str | None, float]:
+        grams = _trigrams(key)
+        overlap: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                overlap[term_id] = overlap.get(term_id, 0) + 1
+        best, best_score = None, 0.0
+        for term_id, shared in overlap.items():
+            score = 2.0 * shared / (len(grams) + self._sizes[term_id])
+            if score > best_score:
+                best, best_score = self.terms[term_id], score
+        if best_score < threshold:
+            return None, best_score
+        return best, best_score
+
+
+@dataclass
+class ValidatedMetadata:
+    title: str
+    summary: str
+    topics: List[str] = field(default_factory=list)
+    topic_decision_required: bool = False
+    suggested_topic: str = ""
+    tags: List[str] = field(default_factory=list)
+    entities: List[EntityRef] = field(default_factory=list)
+    cta_text: str = ""
+    cta_link: str = ""
+    issues: List[str] = field(default_factory=list)
+
+    def apply_to(self, article: Article) -> Article:
+        """Copy of `article` carrying the validated title, topics, entities and CTA."""
+        return replace(
+            article,
+            title=self.title or article.title,
+            topics=list(self.topics),
+            entities=list(self.entities),
+            cta_text=self.cta_text or article.cta_text,
+            cta_link=self.cta_link or article.cta_link,
+        )
+
+
+class MetadataValidator:
+    """Applies the METADATA_CONTRACT checklist; reuse one instance per process."""
+
+    def __init__(
+        self,
+        canonical_topics: Sequence[str] = CANONICAL_TOPICS,
+        aliases: Dict[str, str] | None = None,
+        fuzzy_threshold: float = FUZZY_TOPIC_THRESHOLD,
+        memo_size: int = 65536,
+    ) -> None:
+        self.canonical_topics = tuple(canonical_topics)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.memo_size = memo_size
+        self._exact: Dict[str, str] = {topic_key(t): t for t in self.canonical_topics}
+        for alias, target in (TOPIC_ALIASES if aliases is None else aliases).items():
+            if target in self.canonical_topics:
+                self._exact.setdefault(topic_key(alias), target)
+        self._fuzzy = TrigramIndex(self._exact)
+        self._memo: Dict[str, str | None] = {}
+
+    # Topics ----------------------------------------------------------------
+    def resolve_topic(self, raw: str) -> str | None:
+        """Canonical topic for `raw`, or None when nothing is close enough."""
+        cached = self._memo.get(raw, False)
+        if cached is not False:
+            return cached
+        key = topic_key(raw)
+        resolved = self._exact.get(key)
+        if resolved is None and key:
+            match, _ = self._fuzzy.best_match(key, self.fuzzy_threshold)
+            resolved = self._exact[match] if match is not None else None
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[raw] = resolved
+        return resolved
+
+    # Validation ------------------------------------------------------------
+    def validate(self, raw: Dict[str, Any] | str, text: str = "") -> ValidatedMetadata:
+        """Validate one LLM response; `text` is the post body used for fallbacks."""
+        issues: List[str] = []
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(_CODE_FENCE_RE.sub("", raw.strip()))
+            except ValueError as exc:
+                raw = {}
+                issues.append(f"invalid JSON: {exc}")
+        if not isinstance(raw, dict):
+            issues.append("metadata is not an object")
+            raw = {}
+
+        title = _clean(raw.get("title"))
+        if not title:
+            title = _first_clause(text)
+            if title:
+                issues.append("title missing; used first clause")
+        title = title[:MAX_TITLE_CHARS]
+        summary = _clean(raw.get("summary"))
+        if not summary and text:
+            summary = text.strip()[:500]
+            issues.append("summary missing; used post text")
+
+        topics: List[str] = []
+        seen_topics = set()
+        unknown: List[str] = []
+        for value in _strings(raw.get("topics")):
+            topic = self.resolve_topic(value)
+            if topic is None:
+                unknown.append(value)
+            elif topic not in seen_topics:
+                seen_topics.add(topic)
+                topics.append(topic)
+        if unknown:
+            issues.append(f"dropped unknown topics: {', '.join(unknown)}")
+        if len(topics) > MAX_TOPICS:
+            issues.append(f"kept first {MAX_TOPICS} of {len(topics)} topics")
+            del topics[MAX_TOPICS:]
+        suggested = _clean(raw.get("suggestedTopic"))
+        if not topics and not suggested and unknown:
+            suggested = unknown[0]
+
+        tags = _dedupe_casefold(v.casefold() for v in _strings(raw.get("tags")))[:MAX_TAGS]
+
+        entities: List[EntityRef] = []
+        seen_entities = set()
+        for entity in raw.get("entities") or ():
+            if not isinstance(entity, dict):
+                continue
+            name = _clean(entity.get("name"))
+            folded = name.casefold()
+            if not name or folded in seen_entities:
+                continue
+            seen_entities.add(folded)
+            entity_type = _clean(entity.get("entityType") or entity.get("type")).lower()
+            entities.append(EntityRef(name, entity_type if entity_type in ENTITY_TYPES else "other"))
+
+        cta_link = normalize_cta_link(_clean(raw.get("ctaLink")))
+        if raw.get("ctaLink") and not cta_link:
+            issues.append(f"dropped invalid ctaLink: {raw.get('ctaLink')!r}")
+
+        return ValidatedMetadata(
+            title=title,
+            summary=summary,
+            topics=topics,
+            topic_decision_required=not topics,
+            suggested_topic="" if topics else suggested,
+            tags=tags,
+            entities=entities,
+            cta_text=_clean(raw.get("ctaText")),
+            cta_link=cta_link,
+            issues=issues,
+        )
+
+    def validate_batch(
+        self, items: Iterable[Dict[str, Any] | str], texts: Iterable[str] | None = None
+    ) -> List[ValidatedMetadata]:
+        if texts is None:
+            return [self.validate(item) for item in items]
+        return [self.validate(item, text) for item, text in zip(items, texts)]
+
+    def validate_articles(
+        self, pairs: Iterable[Tuple[Article, Dict[str, Any] | str]]
+    ) -> List[Article]:
+        """Validate `(article, llm_output)` pairs into articles ready for `write_batch`."""
+        return [self.validate(raw, article.body).apply_to(article) for article, raw in pairs]
+
+
+def normalize_cta_link(value: str) -> str:
+    """Return an absolute http(s) URL, prefixing bare domains with https://."""
+    if not value:
+        return ""
+    if "://" not in value:
+        if not _BARE_DOMAIN_RE.match(value):
+            return ""
+        value = f"https://{value}"
+    parts = urlsplit(value)
+    if parts.scheme.lower() not in ("http", "https") or not parts.netloc:
+        return ""
+    return value
+
+
+def _clean(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _strings(values: Any) -> List[str]:
+    if isinstance(values, str):
+        values = [values]
+    return [v.strip() for v in values or () if isinstance(v, str) and v.strip()]
+
+
+def _dedupe_casefold(values: Iterable[str]) -> List[str]:
+    seen = set()
+    result = []
+    for value in values:
+        folded = value.casefold()
+        if folded not in seen:
+            seen.add(folded)
+            result.append(value)
+    return result
+
+
+def _first_clause(text: str) -> str:
+    text = text.strip()
+    if not text:
+        return ""
+    return _CLAUSE_RE.split(text, maxsplit=1)[0].strip()
@@ -0,0 +1,236 @@
+"""Sorted integer posting lists and a small boolean query engine over them.
+
+`InMemoryKnowledgeGraph` keeps one sorted `array('I')` of article ids per
+topic, entity, project and channel, plus per-day time buckets. Faceted reads
+(topic AND entity AND last 30 days, NOT some topic, ...) are evaluated here as
+set algebra on those arrays: AND uses galloping (exponential) search so a
+short list intersected with a long one costs O(short * log(long)), OR is a
+C-level set union, and top-k by `published_at` is a heap over the survivors.
+"""
+from __future__ import annotations
+
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+SECONDS_PER_BUCKET = 86400
+
+
+def posting_add(posting: array, value: int) -> None:
+    # Article ids are allocated in increasing order, so this is almost always an append.
+    if not posting or value > posting[-1]:
+        posting.append(value)
+        return
+    index = bisect_left(posting, value)
+    if index == len(posting) or posting[index] != value:
+        posting.insert(index, value)
+
+
+def posting_remove(posting: array, value: int) -> None:
+    index = bisect_left(posting, value)
+    if index < len(posting) and posting[index] == value:
+        del posting[index]
+
+
+def _gallop(posting: Sequence[int], value: int, low: int) -> int:
+    """First index >= low whose element is >= value (exponential then binary search)."""
+    step = 1
+    high = low
+    size = len(posting)
+    while high < size and posting[high] < value:
+        low = high + 1
+        high += step
+        step <<= 1
+    return bisect_left(posting, value, low, min(high, size))
+
+
+def intersect(postings: Iterable[Sequence[int]]) -> array:
+    ordered = sorted(postings, key=len)
+    if not ordered:
+        return array("I")
+    result = array("I", ordered[0])
+    for posting in ordered[1:]:
+        if not result:
+            break
+        matched = array("I")
+        position = 0
+        for value in result:
+            position = _gallop(posting, value, position)
+            if position == len(posting):
+                break
+            if posting[position] == value:
+                matched.append(value)
+        result = matched
+    return result
+
+
+def union(postings: Iterable[Sequence[int]]) -> array:
+    postings = [posting for posting in postings if posting]
+    if len(postings) == 1:
+        return array("I", postings[0])
+    return array("I", sorted(set().union(*postings)))
+
+
+def difference(posting: Sequence[int], excluded: Sequence[int]) -> array:
+    result = array("I")
+    position = 0
+    for value in posting:
+        position = _gallop(excluded, value, position)
+        if position == len(excluded) or excluded[position] != value:
+            result.append(value)
+    return result
+
+
+# Query expressions ---------------------------------------------------------
+@dataclass(frozen=True)
+class Term:
+    """Articles carrying `value` in facet `field` (e.g. `Term("topic", "agentic_ai")`)."""
+
+    field: str
+    value: str
+
+
+@dataclass(frozen=True)
+class And:
+    children: Tuple["Expr", ...]
+
+    def __init__(self, *children: "Expr") -> None:
+        object.__setattr__(self, "children", children)
+
+
+@dataclass(frozen=True)
+class Or:
+    children: Tuple["Expr", ...]
+
+    def __init__(self, *children: "Expr") -> None:
+        object.__setattr__(self, "children", children)
+
+
+@dataclass(frozen=True)
+class Not:
+    child: "Expr"
+
+
+Expr = Term | And | Or | Not
+
+
+class TimeBuckets:
+    """Per-day postings so time windows touch only the days they cover."""
+
+    def __init__(self, seconds_per_bucket: int = SECONDS_PER_BUCKET) -> None:
+        self.seconds_per_bucket = seconds_per_bucket
+        self.buckets: Dict[int, array] = {}
+        self._keys: List[int] = []
+
+    def _key(self, timestamp: float) -> int:
+        return int(timestamp // self.seconds_per_bucket)
+
+    def add(self, article_id: int, timestamp: float) -> None:
+        key = self._key(timestamp)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = array("I")
+            insort(self._keys, key)
+        posting_add(bucket, article_id)
+
+    def remove(self, article_id: int, timestamp: float) -> None:
+        bucket = self.buckets.get(self._key(timestamp))
+        if bucket is not None:
+            posting_remove(bucket, article_id)
+
+    def window(
+        self, published: Sequence[float], since: float | None = None, until: float | None = None
+    ) -> array:
+        """Sorted ids with `since <= published < until`; edge buckets are checked per id."""
+        start = 0 if since is None else bisect_left(self._keys, self._key(since))
+        stop = len(self._keys) if until is None else bisect_left(self._keys, self._key(until) + 1)
+        selected: List[Sequence[int]] = []
+        for key in self._keys[start:stop]:
+            bucket = self.buckets[key]
+            lower = key * self.seconds_per_bucket
+            upper = lower + self.seconds_per_bucket
+            if (since is None or lower >= since) and (until is None or upper <= until):
+                selected.append(bucket)
+            else:
+                selected.append(
+                    [
+                        article_id
+                        for article_id in bucket
+                        if (since is None or published[article_id] >= since)
+                        and (until is None or published[article_id] < until)
+                    ]
+                )
+        return union(selected)
+
+
+class PostingQueryEngine:
+    """Evaluates `Expr` trees against a backend's posting lists.
+
+    `lookup(field, value)` returns the posting for one facet value (or None),
+    `universe()` the sorted ids of every article (needed only for a bare NOT),
+    and `published` maps article id -> epoch seconds.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[str, str], Sequence[int] | None],
+        universe: Callable[[], Sequence[int]],
+        published: Sequence[float],
+        time_buckets: TimeBuckets,
+    ) -> None:
+        self.lookup = lookup
+        self.universe = universe
+        self.published = published
+        self.time_buckets = time_buckets
+
+    def evaluate(self, expr: Expr) -> Sequence[int]:
+        if isinstance(expr, Term):
+            return self.lookup(expr.field, expr.value) or array("I")
+        if isinstance(expr, Or):
+            return union(self.evaluate(child) for child in expr.children)
+        if isinstance(expr, Not):
+            return difference(self.universe(), self.evaluate(expr.child))
+        if isinstance(expr, And):
+            positive = [c for c in expr.children if not isinstance(c, Not)]
+            negative = [c.child for c in expr.children if isinstance(c, Not)]
+            if not positive:
+                result: Sequence[int] = self.universe()
+            else:
+                result = intersect(self.evaluate(child) for child in positive)
+            for child in negative:
+                if not result:
+                    break
+                result = difference(result, self.evaluate(child))
+            return result
+        raise TypeError(f"Unsupported query expression: {expr!r}")
+
+    def select(
+        self,
+        expr: Expr | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> Sequence[int]:
+        """Sorted article ids matching `expr` within the time window."""
+        if expr is None:
+            if since is None and until is None:
+                return self.universe()
+            return self.time_buckets.window(self.published, since, until)
+        candidates = self.evaluate(expr)
+        if since is None and until is None:
+            return candidates
+        published = self.published
+        return [
+            article_id
+            for article_id in candidates
+            if (since is None or published[article_id] >= since)
+            and (until is None or published[article_id] < until)
+        ]
+
+    def top_k(self, article_ids: Iterable[int], limit: int | None) -> List[int]:
+        """Ids ordered newest first, truncated to `limit`."""
+        key = self.published.__getitem__
+        if limit is None:
+            return sorted(article_ids, key=key, reverse=True)
+        return heapq.nlargest(limit, article_ids, key=key)
@@ -7,27 +7,393 @@ pipeline before translating it to n8n agents.
 """
 from __future__ import annotations
 
+import base64
+import codecs
 import hashlib
+import heapq
+import json
 import math
 import os
 import random
 import re
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
 from collections import defaultdict
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from operator import mul
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
 from urllib.parse import urlparse
 
-import google.generativeai as genai
-import requests
-from dotenv import load_dotenv
-from neo4j import GraphDatabase
+try:
+    from posting_lists import (
+        And,
+        Expr,
+        Not,
+        Or,
+        PostingQueryEngine,
+        Term,
+        TimeBuckets,
+        posting_add,
+        posting_remove,
+        union,
+    )
+    from link_index import DomainTrie, article_links, domain_prefix, link_rows, reversed_host
+    from singleflight import SingleFlight, copy_rows, embedding_key, query_key
+    from vector_buckets import VectorBuckets
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .posting_lists import (
+        And,
+        Expr,
+        Not,
+        Or,
+        PostingQueryEngine,
+        Term,
+        TimeBuckets,
+        posting_add,
+        posting_remove,
+        union,
+    )
+    from .link_index import DomainTrie, article_links, domain_prefix, link_rows, reversed_host
+    from .singleflight import SingleFlight, copy_rows, embedding_key, query_key
+    from .vector_buckets import VectorBuckets
+
+# Backend SDKs (google.generativeai, neo4j, requests, dotenv) are imported inside
+# the classes that use them so short-lived CLI/Cloud Run invocations only pay
+# for the transport they actually select.
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_SKILLS_ENV = BASE_DIR / ".skills" / ".env"
 DEFAULT_LOCAL_ENV = BASE_DIR / ".env.local"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "dubovyk_kg"
 VECTOR_INDEX_NAME = "article_embedding_idx"
+EMBEDDING_PROPERTY = "embedding"
+CHANNEL_INDEX_NAME = "article_source_channel_idx"
+# Every write to an Article or its relationships stamps `a.updated_at`; the
+# range index lets read replicas pull changes past a watermark.
+UPDATED_AT_INDEX_NAME = "article_updated_at_idx"
+# Split storage layout (KG_STORAGE_LAYOUT=split, or after storage_migration.py):
+# vectors and bodies live on their own nodes one hop from the Article, so
+# metadata reads do not page huge properties through the cache.
+EMBEDDING_LABEL = "ArticleEmbedding"
+CONTENT_LABEL = "ArticleContent"
+SPLIT_VECTOR_INDEX_NAME = "article_embedding_node_idx"
+STORAGE_LAYOUT_ID = "article_storage"
+# Shorter bodies are stored as-is; zlib would only add its header.
+BODY_COMPRESS_MIN_BYTES = 512
+# Bump whenever ensure_schema() gains or changes DDL so cached setups re-run.
+SCHEMA_VERSION = 6
+_EPOCH = datetime(1970, 1, 1)
+WRITE_CLAUSE_RE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP)\b", re.IGNORECASE)
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def is_write_statement(statement: str) -> bool:
+    return WRITE_CLAUSE_RE.search(statement) is not None
+
+
+class GraphQueryError(RuntimeError):
+    """Neo4j rejected the statement itself (syntax, constraint, bad parameter).
+
+    Retrying it, or sending it over another transport, fails the same way, so
+    it must not count as an outage.
+    """
+
+    def __init__(self, message: str, code: str = "") -> None:
+        super().__init__(message)
+        self.code = code
+
+
+# Client errors that depend on the session or cluster rather than the statement.
+_TRANSIENT_CLIENT_CODES = (
+    "Neo.ClientError.Security.",
+    "Neo.ClientError.Cluster.",
+    "Neo.ClientError.Database.",
+    "Neo.ClientError.Transaction.",
+)
+
+
+def is_query_error(exc: BaseException) -> bool:
+    """True when Neo4j rejected the statement rather than failing to run it.
+
+    Matches `GraphQueryError` and, by status code, the Bolt driver's
+    `ClientError` family (`CypherSyntaxError`, `ConstraintError`, ...), so the
+    driver does not have to be imported to classify its errors.
+    """
+    if isinstance(exc, GraphQueryError):
+        return True
+    code = getattr(exc, "code", None)
+    return _is_statement_error_code(code)
+
+
+def _is_statement_error_code(code: Any) -> bool:
+    return (
+        isinstance(code, str)
+        and code.startswith("Neo.ClientError.")
+        and not code.startswith(_TRANSIENT_CLIENT_CODES)
+    )
+
+
+def query_api_error(message: str, errors: Any, status: int | None = None) -> RuntimeError:
+    """`GraphQueryError` for statement errors in a Query API response, else `RuntimeError`."""
+    codes = [error.get("code") for error in errors or () if isinstance(error, dict)]
+    if status in (401, 403, 404, 405):
+        rejected = False  # credentials or endpoint, not the statement
+    elif codes:
+        rejected = all(_is_statement_error_code(code) for code in codes)
+    else:
+        # No status code to go by: 400/409/422 are about the request itself.
+        rejected = status in (400, 409, 422)
+    if not rejected:
+        return RuntimeError(message)
+    return GraphQueryError(message, codes[0] if codes else "")
+
+
+_ENTITY_ID_STRIP_RE = re.compile(r"[^\w+#]+|_+", re.UNICODE)
+# `+`/`#` are part of a name after a letter ("C++", "C#", "F#") but not in
+# front of one ("#OpenAI", "+1").
+_ENTITY_ID_SYMBOL_RE = re.compile(r"(?<![\w+#])[+#]+", re.UNICODE)
+
+
+def cypher_identifier(name: str) -> str:
+    """Validate a property/index name before it is spliced into Cypher text."""
+    if not IDENTIFIER_RE.match(name):
+        raise ValueError(f"Not a valid Cypher identifier: {name!r}")
+    return name
+
+
+def vector_index_cypher(
+    index_name: str, embedding_property: str, dimensions: int, label: str = "Article"
+) -> str:
+    return f"""
+        CREATE VECTOR INDEX {cypher_identifier(index_name)} IF NOT EXISTS
+        FOR (a:{cypher_identifier(label)}) ON (a.{cypher_identifier(embedding_property)})
+        OPTIONS {{indexConfig: {{
+            `vector.dimensions`: {int(dimensions)},
+            `vector.similarity_function`: 'cosine'
+        }}}}
+        """
+
+
+def prefix_vector(embedding: Sequence[float], dimensions: int) -> List[float]:
+    """Leading `dimensions` components renormalized to unit length (Matryoshka truncation)."""
+    prefix = [float(value) for value in embedding[:dimensions]]
+    norm = math.sqrt(sum(value * value for value in prefix))
+    return [value / norm for value in prefix] if norm else prefix
+
+
+def prefix_target(embedding_property: str, index_name: str, dimensions: int) -> Tuple[str, str]:
+    """Property and vector index holding the `dimensions`-long prefixes of a version."""
+    return f"{embedding_property}_p{dimensions}", f"{index_name}_p{dimensions}"
+
+
+def vector_target(embedding: Sequence[float], default: Tuple[str, str]) -> Tuple[str, str]:
+    """(property, index) an embedding belongs to.
+
+    Vectors produced during a model migration (`embedding_migration.VersionedVector`)
+    name their own property and index, so one embedded before a cutover is
+    still written and searched under the version that produced it.
+    """
+    embedding_property = getattr(embedding, "embedding_property", None)
+    if embedding_property is None:
+        return default
+    return embedding_property, getattr(embedding, "index_name")
+
+
+def encode_body(body: str, compress: bool = False) -> Tuple[str, str]:
+    """(stored text, encoding) for an `ArticleContent` body; long ones may be zlib+base64."""
+    data = body.encode("utf-8")
+    if compress and len(data) >= BODY_COMPRESS_MIN_BYTES:
+        packed = base64.b64encode(zlib.compress(data, 6)).decode("ascii")
+        if len(packed) < len(data):
+            return packed, "zlib+base64"
+    return body, "utf-8"
+
+
+def decode_body(stored: str | None, encoding: str | None) -> str | None:
+    if stored is None or encoding != "zlib+base64":
+        return stored
+    return zlib.decompress(base64.b64decode(stored)).decode("utf-8")
+
+
+def canonical_entity_id(name: str) -> str:
+    """Spelling-insensitive Entity key: "OpenAI", "Open AI" and "openai" -> "openai".
+
+    Trailing `+`/`#` are kept, so "C++", "C#" and "C" stay three entities.
+    """
+    folded = unicodedata.normalize("NFKC", name).casefold()
+    key = _ENTITY_ID_STRIP_RE.sub("", _ENTITY_ID_SYMBOL_RE.sub("", folded))
+    return key or folded.strip()
+
+
+def _entity_rows(entities: Sequence[EntityRef]) -> List[Dict[str, str]]:
+    return [
+        {"id": canonical_entity_id(e.name), "name": e.name, "type": e.type} for e in entities
+    ]
+
+
+# The Entity nodes a name refers to: its own id, a spelling folded into it by
+# `merge_entities` (`alias_ids`), or a legacy node keyed by name only, which
+# stays readable until `EntityResolver.apply_merges` gives it an id.
+ENTITY_MATCH_CYPHER = (
+    "MATCH (e:Entity) WHERE e.id = $entity_id OR $entity_id IN coalesce(e.alias_ids, []) "
+    "OR (e.id IS NULL AND e.name = $entity)"
+)
+
+
+# UNWIND forms of the single-article writes, used by KnowledgeGraphBase.write_batch.
+BATCH_WRITE_CYPHER = {
+    "upsert_article": """
+    UNWIND $rows AS row
+    MERGE (a:Article {telegram_message_id: row.telegram_message_id})
+    SET a.title = row.title,
+        a.body = row.body,
+        a.telegram_url = row.telegram_url,
+        a.source_channel = row.source_channel,
+        a.published_at = datetime(row.published_at),
+        a.cta_text = row.cta_text,
+        a.cta_link = row.cta_link,
+        a.embedding = row.embedding,
+        a.status = 'ingested',
+        a.updated_at = datetime()
+    """,
+    "attach_topics": """
+    UNWIND $rows AS row
+    MATCH (a:Article {telegram_message_id: row.telegram_message_id})
+    SET a.updated_at = datetime()
+    FOREACH (topicName IN row.topics |
+        MERGE (t:Topic {name: topicName})
+        ON CREATE SET t.created_at = datetime()
+        MERGE (a)-[:ABOUT]->(t)
+    )
+    """,
+    "attach_entities": """
+    UNWIND $rows AS row
+    MATCH (a:Article {telegram_message_id: row.telegram_message_id})
+    SET a.updated_at = datetime()
+    FOREACH (entity IN row.entities |
+        MERGE (e:Entity {id: entity.id})
+        ON CREATE SET e.name = entity.name, e.aliases = [entity.name], e.created_at = datetime()
+        SET e.type = entity.type,
+            e.aliases = CASE WHEN entity.name IN coalesce(e.aliases, [])
+                             THEN e.aliases ELSE coalesce(e.aliases, []) + entity.name END
+        MERGE (a)-[:MENTIONS]->(e)
+    )
+    """,
+    "attach_projects": """
+    UNWIND $rows AS row
+    MATCH (a:Article {telegram_message_id: row.telegram_message_id})
+    SET a.updated_at = datetime()
+    FOREACH (project IN row.projects |
+        MERGE (p:Project {name: project.name})
+        ON CREATE SET p.description = project.description, p.created_at = datetime()
+        SET p.description = coalesce(project.description, p.description)
+        MERGE (a)-[:FEATURES]->(p)
+        FOREACH (topicName IN project.topics |
+            MERGE (t:Topic {name: topicName})
+            MERGE (p)-[:ABOUT]->(t)
+        )
+    )
+    """,
+    "create_similarity_links": """
+    UNWIND $rows AS row
+    MATCH (source:Article {telegram_message_id: row.source_id})
+    MATCH (target:Article {telegram_message_id: row.telegram_message_id})
+    MERGE (source)-[r:SIMILAR_TO]->(target)
+    SET r.score = row.score,
+        r.last_checked = datetime(),
+        source.updated_at = datetime()
+    """,
+}
+
+
+# Split-layout form of the upsert: metadata on the Article, the body on an
+# ArticleContent node and the vector on an ArticleEmbedding node.
+SPLIT_UPSERT_CYPHER = """
+    UNWIND $rows AS row
+    MERGE (a:Article {telegram_message_id: row.telegram_message_id})
+    SET a.title = row.title,
+        a.telegram_url = row.telegram_url,
+        a.source_channel = row.source_channel,
+        a.published_at = datetime(row.published_at),
+        a.cta_text = row.cta_text,
+        a.cta_link = row.cta_link,
+        a.status = 'ingested',
+        a.updated_at = datetime()
+    MERGE (c:ArticleContent {telegram_message_id: row.telegram_message_id})
+    SET c.body = row.body,
+        c.encoding = row.body_encoding
+    MERGE (a)-[:HAS_CONTENT]->(c)
+    MERGE (v:ArticleEmbedding {telegram_message_id: row.telegram_message_id})
+    SET v.embedding = row.embedding
+    MERGE (a)-[:HAS_EMBEDDING]->(v)
+    """
+
+
+# Appended to both upserts: replace the article's LINKS_TO edges with `row.links`
+# (see link_index.py), keyed on normalized Link urls and Domain hosts.
+LINKS_UPSERT_CYPHER = """
+    WITH a, row
+    OPTIONAL MATCH (a)-[old:LINKS_TO]->(:Link)
+    DELETE old
+    WITH DISTINCT a, row
+    FOREACH (link IN row.links |
+        MERGE (l:Link {url: link.url})
+        MERGE (d:Domain {host: link.host})
+        ON CREATE SET d.reversed_host = link.reversed_host
+        MERGE (l)-[:ON_DOMAIN]->(d)
+        MERGE (a)-[r:LINKS_TO]->(l)
+        SET r.cta = link.cta
+    )
+    """
+
+
+def upsert_cypher(
+    embedding_property: str = EMBEDDING_PROPERTY,
+    prefix_property: str | None = None,
+    split: bool = False,
+) -> str:
+    """The batched upsert writing vectors to `embedding_property` (and `row.prefix`)."""
+    holder = "v" if split else "a"
+    assignment = f"{holder}.{cypher_identifier(embedding_property)} = row.embedding"
+    if prefix_property is not None:
+        assignment += f",\n        {holder}.{cypher_identifier(prefix_property)} = row.prefix"
+    template = SPLIT_UPSERT_CYPHER if split else BATCH_WRITE_CYPHER["upsert_article"]
+    return (
+        template.replace(f"{holder}.embedding = row.embedding", assignment).rstrip()
+        + LINKS_UPSERT_CYPHER
+    )
+
+
+LINK_SCHEMA_CYPHER = (
+    "CREATE CONSTRAINT link_url_unique IF NOT EXISTS FOR (l:Link) REQUIRE l.url IS UNIQUE",
+    "CREATE CONSTRAINT domain_host_unique IF NOT EXISTS FOR (d:Domain) REQUIRE d.host IS UNIQUE",
+    # Range index: `reversed_host STARTS WITH $prefix` is a seek, not a scan.
+    "CREATE INDEX domain_reversed_host_idx IF NOT EXISTS FOR (d:Domain) ON (d.reversed_host)",
+)
+
+
+def split_storage_schema() -> List[str]:
+    """Uniqueness constraints for the split layout's ArticleEmbedding/ArticleContent nodes."""
+    return [
+        "CREATE CONSTRAINT article_embedding_node_unique IF NOT EXISTS "
+        f"FOR (v:{EMBEDDING_LABEL}) REQUIRE v.telegram_message_id IS UNIQUE",
+        "CREATE CONSTRAINT article_content_unique IF NOT EXISTS "
+        f"FOR (c:{CONTENT_LABEL}) REQUIRE c.telegram_message_id IS UNIQUE",
+    ]
+
+
+BATCH_WRITE_ORDER = (
+    "upsert_article",
+    "attach_topics",
+    "attach_entities",
+    "attach_projects",
+    "create_similarity_links",
+)
 
 
 def _load_env_file_if_kv(path: Path) -> None:
@@ -39,23 +405,84 @@ def _load_env_file_if_kv(path: Path) -> None:
         return
     if "=" not in sample:
         return
+    from dotenv import load_dotenv
+
     load_dotenv(path, override=False)
 
 
-@dataclass
+class StartupCache:
+    """Small JSON file remembering probe results between short-lived runs.
+
+    Stores the embedding dimension per model and which (database, schema
+    version, dimension) combinations already ran `ensure_schema`. Point
+    `KG_CACHE_DIR` elsewhere or set it to an empty string to disable.
+    """
+
+    FILENAME = "startup.json"
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self._data: Dict[str, Any] | None = None
+
+    @classmethod
+    def from_env(cls) -> "StartupCache":
+        cache_dir = os.getenv("KG_CACHE_DIR")
+        if cache_dir is None:
+            return cls(DEFAULT_CACHE_DIR / cls.FILENAME)
+        if not cache_dir:
+            return cls(None)
+        return cls(Path(cache_dir) / cls.FILENAME)
+
+    def get(self, key: str) -> Any:
+        return self._load().get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        data = self._load()
+        if data.get(key) == value:
+            return
+        data[key] = value
+        self._save()
+
+    def discard(self, key: str) -> None:
+        if self._load().pop(key, None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._load(), sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"[WARN] Could not persist startup cache to {self.path}: {exc}")
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = {}
+            if self.path is not None and self.path.exists():
+                try:
+                    self._data = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    self._data = {}
+        return self._data
+
+
+@dataclass(slots=True)
 class EntityRef:
     name: str
     type: str  # e.g., Org, Person, Product
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectRef:
     name: str
     topics: List[str]
     description: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Article:
     telegram_message_id: str
     title: str
@@ -66,6 +493,46 @@ class Article:
     topics: List[str] = field(default_factory=list)
     entities: List[EntityRef] = field(default_factory=list)
     projects: List[ProjectRef] = field(default_factory=list)
+    cta_text: str = ""
+    cta_link: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe representation used by journals and HTTP payloads."""
+        return {
+            "telegram_message_id": self.telegram_message_id,
+            "title": self.title,
+            "body": self.body,
+            "telegram_url": self.telegram_url,
+            "published_at": self.published_at.isoformat(),
+            "source_channel": self.source_channel,
+            "topics": list(self.topics),
+            "entities": [{"name": e.name, "type": e.type} for e in self.entities],
+            "projects": [
+                {"name": p.name, "topics": list(p.topics), "description": p.description}
+                for p in self.projects
+            ],
+            "cta_text": self.cta_text,
+            "cta_link": self.cta_link,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Article":
+        return cls(
+            telegram_message_id=str(data["telegram_message_id"]),
+            title=data["title"],
+            body=data["body"],
+            telegram_url=data["telegram_url"],
+            published_at=datetime.fromisoformat(data["published_at"]),
+            source_channel=data["source_channel"],
+            topics=list(data.get("topics") or []),
+            entities=[EntityRef(e["name"], e["type"]) for e in data.get("entities") or []],
+            projects=[
+                ProjectRef(p["name"], list(p.get("topics") or []), p.get("description"))
+                for p in data.get("projects") or []
+            ],
+            cta_text=data.get("cta_text") or "",
+            cta_link=data.get("cta_link") or "",
+        )
 
 
 class EnvConfig:
@@ -91,6 +558,8 @@ class EnvConfig:
         self.neo4j_user = os.environ["NEO4J_USERNAME"]
         self.neo4j_password = os.environ["NEO4J_PASSWORD"]
         self.neo4j_database = os.getenv("NEO4J_DATABASE", "neo4j")
+        dimensions = os.getenv("GOOGLE_EMBEDDING_DIMENSIONS")
+        self.embedding_dimensions = int(dimensions) if dimensions else None
         parsed = urlparse(self.neo4j_uri)
         if not parsed.hostname:
             raise RuntimeError("NEO4J_URI must include a hostname")
@@ -105,13 +574,35 @@ class EnvConfig:
 
 
 class GeminiEmbeddingService:
-    def __init__(self, api_key: str, model: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        dimensions: int | None = None,
+        startup_cache: StartupCache | None = None,
+        single_flight: SingleFlight | None = None,
+    ) -> None:
+        import google.generativeai as genai
+
         genai.configure(api_key=api_key)
+        self._genai = genai
         self.model = model
-        self._dimensions: int | None = None
+        self._startup_cache = startup_cache
+        # Concurrent embeds of the same text (cross-posted messages) share one request.
+        self.single_flight = single_flight
+        if dimensions is None and startup_cache is not None:
+            dimensions = startup_cache.get(self._dimensions_cache_key)
+        self._dimensions: int | None = dimensions
 
     def embed(self, text: str) -> List[float]:
-        response = genai.embed_content(model=self.model, content=text)
+        if self.single_flight is None:
+            return self._embed(text)
+        return self.single_flight.do(
+            embedding_key(self.model, text), lambda: self._embed(text), list
+        )
+
+    def _embed(self, text: str) -> List[float]:
+        response = self._genai.embed_content(model=self.model, content=text)
         embedding = response.get("embedding")
         if not embedding:
             raise RuntimeError("Gemini did not return an embedding")
@@ -120,11 +611,24 @@ class GeminiEmbeddingService:
     @property
     def dimensions(self) -> int:
         if self._dimensions is None:
-            probe = genai.embed_content(model=self.model, content="dimension probe")
-            embedding = probe.get("embedding") or []
-            self._dimensions = len(embedding)
+            self._dimensions = self.probe_dimensions()
         return self._dimensions
 
+    def probe_dimensions(self) -> int:
+        probe = self._genai.embed_content(model=self.model, content="dimension probe")
+        embedding = probe.get("embedding") or []
+        if self._startup_cache is not None and embedding:
+            self._startup_cache.set(self._dimensions_cache_key, len(embedding))
+        return len(embedding)
+
+    @property
+    def dimensions_known(self) -> bool:
+        return self._dimensions is not None
+
+    @property
+    def _dimensions_cache_key(self) -> str:
+        return f"embedding_dimensions:{self.model}"
+
 
 class HashEmbeddingService:
     """Deterministic fallback embedder built from token hashes."""
@@ -153,62 +657,531 @@ class HashEmbeddingService:
         return self._dimensions
 
 
-class KnowledgeGraphBase:
-    def __init__(self, embedding_dim: int) -> None:
+class FallbackEmbeddingService:
+    """`primary`, switching to the hash fallback only if it never produced an embedding.
+
+    Used when the dimension is known without a startup probe, so the first
+    embed makes the decision the probe used to make. Every call retries the
+    primary `attempts` times with exponential backoff. If the primary still
+    fails and has never answered, the process switches to hash embeddings,
+    as a failed startup probe would have. Once it has answered, the index
+    holds its vectors, and hash vectors of the same dimension would silently
+    corrupt dedupe, so later failures are raised after the retries instead.
+    """
+
+    def __init__(
+        self,
+        primary: Any,
+        fallback_factory: Callable[[], Any],
+        attempts: int = 3,
+        backoff: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.primary = primary
+        self._fallback_factory = fallback_factory
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self._sleep = sleep
+        self._active = primary
+        self._verified = False
+        self._lock = threading.Lock()
+
+    @property
+    def dimensions(self) -> int:
+        return self._active.dimensions
+
+    def embed(self, text: str) -> List[float]:
+        if self._active is not self.primary:
+            return self._active.embed(text)
+        delay = self.backoff
+        for _ in range(self.attempts - 1):
+            try:
+                return self._embed_primary(text)
+            except Exception:  # noqa: BLE001 - transient errors are retried
+                self._sleep(delay)
+                delay *= 2
+        try:
+            return self._embed_primary(text)
+        except Exception as exc:
+            if self._verified:
+                raise
+            with self._lock:
+                if self._active is self.primary and not self._verified:
+                    print(
+                        "[WARN] Gemini embeddings unavailable due to "
+                        f"{exc}. Falling back to deterministic hash embeddings."
+                    )
+                    self._active = self._fallback_factory()
+            if self._active is self.primary:
+                raise  # another thread got an embedding meanwhile
+            return self._active.embed(text)
+
+    def _embed_primary(self, text: str) -> List[float]:
+        embedding = self.primary.embed(text)
+        self._verified = True
+        return embedding
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._active, name)
+
+
+# Keyset pagination -----------------------------------------------------------
+# Paged reads order rows by (published_at, telegram_message_id, tie) descending,
+# where `tie` separates several rows of one article (the project name for
+# vlm_projects). A cursor is the key of the last row on a page.
+PageKey = Tuple[int, str, str]
+
+PAGED_READS: Dict[str, Dict[str, str]] = {
+    "weekly_digest": {
+        "match": "MATCH (a:Article) WHERE a.published_at >= datetime() - duration({days: $days})",
+        "tail": (
+            "OPTIONAL MATCH (a)-[:ABOUT]->(t:Topic) "
+            "WITH a, _ms, _id, _tie, collect(DISTINCT t.name) AS topics"
+        ),
+        "return": (
+            "date(a.published_at) AS day, a.title AS title, "
+            "a.telegram_url AS telegram_url, topics"
+        ),
+    },
+    "article_list_by_entity": {
+        "match": (
+            f"{ENTITY_MATCH_CYPHER} "
+            "MATCH (a:Article)-[:MENTIONS]->(e) "
+            "WHERE a.published_at >= datetime() - duration({days: $days}) "
+            "WITH DISTINCT a"
+        ),
+        "return": "a.title AS title, a.telegram_url AS telegram_url, date(a.published_at) AS day",
+    },
+    "vlm_projects": {
+        "match": "MATCH (a:Article)-[:FEATURES]->(p:Project)-[:ABOUT]->(:Topic {name: $topic})",
+        "carry": ", p",
+        "tie": "p.name",
+        "return": (
+            "p.name AS project, a.title AS title, a.telegram_url AS telegram_url, "
+            "date(a.published_at) AS day"
+        ),
+    },
+    "image_edit_news": {
+        "match": (
+            "MATCH (a:Article)-[:ABOUT]->(t:Topic) WHERE t.name CONTAINS 'Image Edit' "
+            "WITH a, collect(DISTINCT t.name) AS topics"
+        ),
+        "carry": ", topics",
+        "return": (
+            "a.title AS title, a.telegram_url AS telegram_url, "
+            "date(a.published_at) AS day, topics"
+        ),
+    },
+}
+
+
+def encode_cursor(key: PageKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> PageKey | None:
+    if not cursor:
+        return None
+    try:
+        millis, article_id, tie = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(millis), str(article_id), str(tie)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from exc
+
+
+def _paged_cypher(name: str) -> str:
+    spec = PAGED_READS[name]
+    return f"""
+    {spec["match"]}
+    WITH a{spec.get("carry", "")}, a.published_at.epochMillis AS _ms,
+         a.telegram_message_id AS _id, {spec.get("tie", "''")} AS _tie
+    WHERE $after IS NULL
+       OR _ms < $after.ms
+       OR (_ms = $after.ms AND (_id < $after.id OR (_id = $after.id AND _tie < $after.tie)))
+    ORDER BY _ms DESC, _id DESC, _tie DESC
+    LIMIT $limit
+    {spec.get("tail", "")}
+    RETURN {spec["return"]}, _ms AS _cursor_ms, _id AS _cursor_id, _tie AS _cursor_tie
+    ORDER BY _cursor_ms DESC, _cursor_id DESC, _cursor_tie DESC
+    """
+
+
+class PagedReadsMixin:
+    """Generator variants of the read methods on top of `read_page`.
+
+    Each page is one bounded query, so iterating a long window never holds
+    more than `page_size` rows. Rows come newest first.
+    """
+
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        raise NotImplementedError
+
+    def iter_rows(
+        self, name: str, params: Dict[str, Any] | None = None, page_size: int = 500
+    ) -> Iterator[Dict[str, object]]:
+        cursor = None
+        while True:
+            rows, cursor = self.read_page(name, params, cursor, page_size)
+            yield from rows
+            if cursor is None:
+                return
+
+    def iter_weekly_digest(self, days: int = 7, page_size: int = 500) -> Iterator[Dict[str, object]]:
+        return self.iter_rows("weekly_digest", {"days": days}, page_size)
+
+    def iter_article_list_by_entity(
+        self, entity_name: str, days: int = 14, page_size: int = 500
+    ) -> Iterator[Dict[str, object]]:
+        return self.iter_rows(
+            "article_list_by_entity", {"entity": entity_name, "days": days}, page_size
+        )
+
+    def iter_vlm_projects(
+        self, topic: str = "Vision-Language Models", page_size: int = 500
+    ) -> Iterator[Dict[str, object]]:
+        return self.iter_rows("vlm_projects", {"topic": topic}, page_size)
+
+    def iter_image_edit_news(self, page_size: int = 500) -> Iterator[Dict[str, object]]:
+        return self.iter_rows("image_edit_news", {}, page_size)
+
+
+class KnowledgeGraphBase(PagedReadsMixin):
+    # Where article vectors are written and searched; `use_embedding` repoints
+    # both when embedding_migration.py cuts over to a new model.
+    embedding_property = EMBEDDING_PROPERTY
+    vector_index_name = VECTOR_INDEX_NAME
+    # Two-stage retrieval: when set, a renormalized `prefix_dim` prefix of each
+    # vector gets its own index for candidate generation, and the
+    # `limit * oversample` candidates are reranked on the full vector.
+    prefix_dim: int | None = None
+    oversample = 10
+    # When set, concurrent identical read statements share one upstream call.
+    single_flight: SingleFlight | None = None
+    # Split layout: vectors on (:ArticleEmbedding), bodies on (:ArticleContent).
+    split_storage = False
+    compress_bodies = False
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        startup_cache: StartupCache | None = None,
+        embedding_property: str | None = None,
+        vector_index_name: str | None = None,
+        prefix_dim: int | None = None,
+        oversample: int | None = None,
+        single_flight: SingleFlight | None = None,
+        split_storage: bool = False,
+        compress_bodies: bool = False,
+    ) -> None:
         self.embedding_dim = embedding_dim
+        self.startup_cache = startup_cache
+        if single_flight is not None:
+            self.single_flight = single_flight
+        if embedding_property is not None:
+            self.embedding_property = cypher_identifier(embedding_property)
+        if vector_index_name is not None:
+            self.vector_index_name = cypher_identifier(vector_index_name)
+        if prefix_dim is not None and prefix_dim < embedding_dim:
+            self.prefix_dim = prefix_dim
+        if oversample is not None:
+            self.oversample = oversample
+        if split_storage:
+            self.use_split_storage(compress_bodies)
         self.ensure_schema()
 
+    def use_split_storage(self, compress_bodies: bool = False) -> None:
+        """Read and write the split layout (see `SPLIT_UPSERT_CYPHER`); no DDL."""
+        self.split_storage = True
+        self.compress_bodies = compress_bodies
+        if self.vector_index_name == VECTOR_INDEX_NAME:
+            self.vector_index_name = SPLIT_VECTOR_INDEX_NAME
+
+    @property
+    def vector_label(self) -> str:
+        """Label of the nodes holding article vectors."""
+        return EMBEDDING_LABEL if self.split_storage else "Article"
+
+    def use_embedding(
+        self, embedding_property: str, vector_index_name: str, embedding_dim: int
+    ) -> None:
+        """Point writes and vector search at another embedding version (no DDL)."""
+        self.embedding_property = cypher_identifier(embedding_property)
+        self.vector_index_name = cypher_identifier(vector_index_name)
+        self.embedding_dim = embedding_dim
+
     def close(self) -> None:
         return None
 
     def run_cypher(
         self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Run one statement; identical concurrent reads are coalesced via `single_flight`."""
+        if self.single_flight is None or is_write_statement(statement):
+            return self._run_cypher(statement, parameters)
+        return self.single_flight.do(
+            query_key(statement, parameters),
+            lambda: self._run_cypher(statement, parameters),
+            copy_rows,
+        )
+
+    def _run_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
     ) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
-    def ensure_schema(self) -> None:
+    def iter_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield records one by one; transports override this to stream."""
+        yield from self.run_cypher(statement, parameters)
+
+    def iter_read_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a statement in a read-access-mode transaction; the server refuses writes."""
+        raise NotImplementedError(f"{type(self).__name__} cannot run Cypher in read access mode")
+
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        """One keyset page of a `PAGED_READS` query plus the cursor for the next."""
+        parameters = dict(params or {})
+        if "entity" in parameters:
+            parameters["entity_id"] = canonical_entity_id(parameters["entity"])
+        after = decode_cursor(cursor)
+        parameters["after"] = (
+            None if after is None else {"ms": after[0], "id": after[1], "tie": after[2]}
+        )
+        parameters["limit"] = limit
+        rows = []
+        last: PageKey | None = None
+        for record in self.iter_cypher(_paged_cypher(name), parameters):
+            last = (record.pop("_cursor_ms"), record.pop("_cursor_id"), record.pop("_cursor_tie"))
+            rows.append(record)
+        return rows, encode_cursor(last) if last is not None and len(rows) == limit else None
+
+    def run_cypher_batch(
+        self, statements: Sequence[Tuple[str, Dict[str, Any] | None]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several statements; transports override this to use one transaction."""
+        return [self.run_cypher(statement, parameters) for statement, parameters in statements]
+
+    @property
+    def schema_target(self) -> str | None:
+        """Stable identifier of the database behind this backend, if any."""
+        return None
+
+    def verify_connectivity(self) -> None:
+        """Raise if the backend cannot be reached; transports with lazy connections override."""
+        return None
+
+    def ensure_schema(self, force: bool = False) -> None:
+        cache_key = None
+        if self.startup_cache is not None and self.schema_target:
+            cache_key = (
+                f"schema:{self.schema_target}:v{SCHEMA_VERSION}:"
+                f"{self.vector_index_name}:dim{self.embedding_dim}:p{self.prefix_dim or 0}:"
+                f"{'split' if self.split_storage else 'inline'}"
+            )
+            if not force and self.startup_cache.get(cache_key):
+                # No DDL round trips, but still fail here (not on first use) if
+                # the database is unreachable, so callers can fall back.
+                self.verify_connectivity()
+                return
+        self._apply_schema()
+        if cache_key is not None:
+            self.startup_cache.set(cache_key, time.time())
+
+    def _apply_schema(self) -> None:
         constraint_cypher = (
             "CREATE CONSTRAINT article_telegram_unique IF NOT EXISTS "
             "FOR (a:Article) REQUIRE a.telegram_message_id IS UNIQUE"
         )
-        vector_index_cypher = f"""
-        CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS
-        FOR (a:Article) ON (a.embedding)
-        OPTIONS {{indexConfig: {{
-            `vector.dimensions`: {self.embedding_dim},
-            `vector.similarity_function`: 'cosine'
-        }}}}
-        """
+        entity_constraint_cypher = (
+            "CREATE CONSTRAINT entity_id_unique IF NOT EXISTS "
+            "FOR (e:Entity) REQUIRE e.id IS UNIQUE"
+        )
+        channel_index_cypher = (
+            f"CREATE INDEX {CHANNEL_INDEX_NAME} IF NOT EXISTS "
+            "FOR (a:Article) ON (a.source_channel)"
+        )
         self.run_cypher(constraint_cypher)
-        self.run_cypher(vector_index_cypher)
+        self.run_cypher(entity_constraint_cypher)
+        self.run_cypher(channel_index_cypher)
+        self.run_cypher(
+            f"CREATE INDEX {UPDATED_AT_INDEX_NAME} IF NOT EXISTS FOR (a:Article) ON (a.updated_at)"
+        )
+        for statement in LINK_SCHEMA_CYPHER:
+            self.run_cypher(statement)
+        if self.split_storage:
+            for statement in split_storage_schema():
+                self.run_cypher(statement)
+        self.run_cypher(
+            vector_index_cypher(
+                self.vector_index_name,
+                self.embedding_property,
+                self.embedding_dim,
+                self.vector_label,
+            )
+        )
+        if self.prefix_dim:
+            prefix_property, prefix_index = prefix_target(
+                self.embedding_property, self.vector_index_name, self.prefix_dim
+            )
+            self.run_cypher(
+                vector_index_cypher(
+                    prefix_index, prefix_property, self.prefix_dim, self.vector_label
+                )
+            )
+        self._check_vector_index()
+
+    def _check_vector_index(self) -> None:
+        # `IF NOT EXISTS` keeps an index built for another model's dimension.
+        records = self.run_cypher(
+            "SHOW INDEXES YIELD name, options WHERE name = $name RETURN options",
+            {"name": self.vector_index_name},
+        )
+        options = (records[0].get("options") or {}) if records else {}
+        dimensions = (options.get("indexConfig") or {}).get("vector.dimensions")
+        if dimensions is not None and int(dimensions) != self.embedding_dim:
+            print(
+                f"[WARN] Vector index {self.vector_index_name} has {dimensions} dimensions but "
+                f"embeddings have {self.embedding_dim}. Migrate with embedding_migration.py "
+                "instead of reusing the index."
+            )
 
     def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
-        cypher = """
-        MERGE (a:Article {telegram_message_id: $telegram_message_id})
-        SET a.title = $title,
-            a.body = $body,
-            a.telegram_url = $telegram_url,
-            a.source_channel = $source_channel,
-            a.published_at = datetime($published_at),
-            a.embedding = $embedding,
-            a.status = 'ingested'
+        self.run_cypher(
+            self._upsert_cypher(embedding), {"rows": [self._upsert_row(article, embedding)]}
+        )
+
+    def _vector_target(self, embedding: Sequence[float]) -> Tuple[str, str]:
+        return vector_target(embedding, (self.embedding_property, self.vector_index_name))
+
+    def _upsert_cypher(self, embedding: Sequence[float]) -> str:
+        embedding_property, index_name = self._vector_target(embedding)
+        prefix_property = None
+        if self.prefix_dim:
+            prefix_property, _ = prefix_target(embedding_property, index_name, self.prefix_dim)
+        return upsert_cypher(embedding_property, prefix_property, self.split_storage)
+
+    def _upsert_row(self, article: Article, embedding: Sequence[float]) -> Dict[str, Any]:
+        row = self._article_row(article, embedding)
+        if self.split_storage:
+            row["body"], row["body_encoding"] = encode_body(article.body, self.compress_bodies)
+        if self.prefix_dim:
+            row["prefix"] = prefix_vector(embedding, self.prefix_dim)
+        return row
+
+    def backfill_prefixes(self, batch_size: int = 1000) -> int:
+        """Compute missing prefix vectors in-database after enabling `prefix_dim`."""
+        if not self.prefix_dim:
+            return 0
+        prefix_property, _ = prefix_target(
+            self.embedding_property, self.vector_index_name, self.prefix_dim
+        )
+        cypher = f"""
+        MATCH (a:{self.vector_label})
+        WHERE a.{self.embedding_property} IS NOT NULL AND a.{prefix_property} IS NULL
+        WITH a, a.{self.embedding_property}[0..$dimensions] AS prefix LIMIT $limit
+        WITH a, prefix, sqrt(reduce(total = 0.0, x IN prefix | total + x * x)) AS norm
+        SET a.{prefix_property} = CASE WHEN norm = 0 THEN prefix ELSE [x IN prefix | x / norm] END
+        RETURN count(a) AS updated
         """
-        params = {
+        updated = 0
+        while True:
+            records = self.run_cypher(cypher, {"dimensions": self.prefix_dim, "limit": batch_size})
+            count = int(records[0]["updated"]) if records else 0
+            updated += count
+            if count < batch_size:
+                return updated
+
+    def backfill_links(self, batch_size: int = 500) -> int:
+        """Extract LINKS_TO/Link/Domain for articles written before link indexing."""
+        read_cypher = """
+        MATCH (a:Article)
+        WHERE a.telegram_message_id > $after
+        OPTIONAL MATCH (a)-[:HAS_CONTENT]->(c:ArticleContent)
+        RETURN a.telegram_message_id AS telegram_message_id,
+               coalesce(c.body, a.body) AS body,
+               c.encoding AS encoding,
+               a.cta_link AS cta_link
+        ORDER BY a.telegram_message_id
+        LIMIT $limit
+        """
+        write_cypher = (
+            "UNWIND $rows AS row "
+            "MATCH (a:Article {telegram_message_id: row.telegram_message_id})"
+            + LINKS_UPSERT_CYPHER
+        )
+        linked, cursor = 0, ""
+        while True:
+            records = self.run_cypher(read_cypher, {"after": cursor, "limit": batch_size})
+            if not records:
+                return linked
+            rows = [
+                {
+                    "telegram_message_id": record["telegram_message_id"],
+                    "links": link_rows(
+                        decode_body(record.get("body"), record.get("encoding")) or "",
+                        record.get("cta_link") or "",
+                    ),
+                }
+                for record in records
+            ]
+            rows = [row for row in rows if row["links"]]
+            if rows:
+                self.run_cypher(write_cypher, {"rows": rows})
+            linked += len(rows)
+            cursor = records[-1]["telegram_message_id"]
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        """Full body of one article; one hop to its ArticleContent in the split layout."""
+        if self.split_storage:
+            cypher = """
+            MATCH (:Article {telegram_message_id: $telegram_message_id})
+                  -[:HAS_CONTENT]->(c:ArticleContent)
+            RETURN c.body AS body, c.encoding AS encoding
+            """
+        else:
+            cypher = """
+            MATCH (a:Article {telegram_message_id: $telegram_message_id})
+            RETURN a.body AS body, 'utf-8' AS encoding
+            """
+        records = self.run_cypher(cypher, {"telegram_message_id": telegram_message_id})
+        return decode_body(records[0]["body"], records[0]["encoding"]) if records else None
+
+    @staticmethod
+    def _article_row(article: Article, embedding: Sequence[float]) -> Dict[str, Any]:
+        return {
             "telegram_message_id": article.telegram_message_id,
             "title": article.title,
             "body": article.body,
             "telegram_url": article.telegram_url,
             "source_channel": article.source_channel,
             "published_at": article.published_at.isoformat(),
+            "cta_text": article.cta_text,
+            "cta_link": article.cta_link,
             "embedding": list(embedding),
+            "links": link_rows(article.body, article.cta_link),
         }
-        self.run_cypher(cypher, params)
 
     def attach_topics(self, article: Article) -> None:
         if not article.topics:
             return
         cypher = """
         MATCH (a:Article {telegram_message_id: $telegram_message_id})
+        SET a.updated_at = datetime()
         FOREACH (topicName IN $topics |
             MERGE (t:Topic {name: topicName})
             ON CREATE SET t.created_at = datetime()
@@ -225,10 +1198,13 @@ class KnowledgeGraphBase:
             return
         cypher = """
         MATCH (a:Article {telegram_message_id: $telegram_message_id})
+        SET a.updated_at = datetime()
         FOREACH (entity IN $entities |
-            MERGE (e:Entity {name: entity.name})
-            ON CREATE SET e.type = entity.type, e.created_at = datetime()
-            SET e.type = entity.type
+            MERGE (e:Entity {id: entity.id})
+            ON CREATE SET e.name = entity.name, e.aliases = [entity.name], e.created_at = datetime()
+            SET e.type = entity.type,
+                e.aliases = CASE WHEN entity.name IN coalesce(e.aliases, [])
+                                 THEN e.aliases ELSE coalesce(e.aliases, []) + entity.name END
             MERGE (a)-[:MENTIONS]->(e)
         )
         """
@@ -236,7 +1212,7 @@ class KnowledgeGraphBase:
             cypher,
             {
                 "telegram_message_id": article.telegram_message_id,
-                "entities": [e.__dict__ for e in article.entities],
+                "entities": _entity_rows(article.entities),
             },
         )
 
@@ -245,6 +1221,7 @@ class KnowledgeGraphBase:
             return
         cypher = """
         MATCH (a:Article {telegram_message_id: $telegram_message_id})
+        SET a.updated_at = datetime()
         FOREACH (project IN $projects |
             MERGE (p:Project {name: project.name})
             ON CREATE SET p.description = project.description, p.created_at = datetime()
@@ -260,7 +1237,7 @@ class KnowledgeGraphBase:
             cypher,
             {
                 "telegram_message_id": article.telegram_message_id,
-                "projects": [p.__dict__ for p in article.projects],
+                "projects": [asdict(p) for p in article.projects],
             },
         )
 
@@ -270,24 +1247,94 @@ class KnowledgeGraphBase:
         telegram_message_id: str,
         limit: int = 5,
         min_score: float = 0.88,
+        channels: Sequence[str] | None = None,
     ) -> List[Dict[str, object]]:
-        cypher = """
-        CALL db.index.vector.queryNodes($index_name, $limit, $embedding)
-        YIELD node, score
-        WHERE node.telegram_message_id <> $telegram_message_id AND score >= $min_score
-        RETURN node.telegram_message_id AS telegram_message_id,
-               node.title AS title,
-               node.telegram_url AS telegram_url,
-               score
-        ORDER BY score DESC
+        """Top `limit` articles by cosine score, optionally only from `channels`.
+
+        Channel-scoped searches scan just those channels' articles through the
+        `source_channel` index instead of post-filtering the global ANN result,
+        so single-channel dedupe is exact and does not pay for other channels.
+        With `prefix_dim` set, global searches query the prefix index for
+        `limit * oversample` candidates and rerank them on the full vector.
+        In the split layout the index yields ArticleEmbedding nodes and the
+        query hops back to their Article.
         """
-        params = {
-            "index_name": VECTOR_INDEX_NAME,
+        embedding_property, index_name = self._vector_target(embedding)
+        # Split layout: score `vector` (the ArticleEmbedding), return its Article.
+        holder = "vector" if self.split_storage else "node"
+        hop = (
+            "\n            MATCH (node:Article)-[:HAS_EMBEDDING]->(vector)"
+            if self.split_storage
+            else ""
+        )
+        params: Dict[str, Any] = {
+            "index_name": index_name,
             "limit": limit,
             "embedding": list(embedding),
             "telegram_message_id": telegram_message_id,
             "min_score": min_score,
+            "channels": list(channels or ()),
         }
+        if channels:
+            pattern = (
+                "(node:Article)-[:HAS_EMBEDDING]->(vector:ArticleEmbedding)"
+                if self.split_storage
+                else "(node:Article)"
+            )
+            cypher = f"""
+            MATCH {pattern}
+            WHERE node.source_channel IN $channels
+              AND node.telegram_message_id <> $telegram_message_id
+            WITH node, vector.similarity.cosine({holder}.{embedding_property}, $embedding) AS score
+            WHERE score >= $min_score
+            RETURN node.telegram_message_id AS telegram_message_id,
+                   node.title AS title,
+                   node.telegram_url AS telegram_url,
+                   score
+            ORDER BY score DESC
+            LIMIT $limit
+            """
+        elif self.prefix_dim:
+            _, prefix_index = prefix_target(embedding_property, index_name, self.prefix_dim)
+            cypher = f"""
+            CALL db.index.vector.queryNodes($prefix_index, $candidates, $prefix)
+            YIELD node{" AS vector" if self.split_storage else ""}{hop}
+            WHERE node.telegram_message_id <> $telegram_message_id
+            WITH node, vector.similarity.cosine({holder}.{embedding_property}, $embedding) AS score
+            WHERE score >= $min_score
+            RETURN node.telegram_message_id AS telegram_message_id,
+                   node.title AS title,
+                   node.telegram_url AS telegram_url,
+                   score
+            ORDER BY score DESC
+            LIMIT $limit
+            """
+            params["prefix_index"] = prefix_index
+            params["candidates"] = limit * self.oversample
+            params["prefix"] = prefix_vector(embedding, self.prefix_dim)
+        elif self.split_storage:
+            cypher = """
+            CALL db.index.vector.queryNodes($index_name, $limit, $embedding)
+            YIELD node AS vector, score
+            MATCH (node:Article)-[:HAS_EMBEDDING]->(vector)
+            WHERE node.telegram_message_id <> $telegram_message_id AND score >= $min_score
+            RETURN node.telegram_message_id AS telegram_message_id,
+                   node.title AS title,
+                   node.telegram_url AS telegram_url,
+                   score
+            ORDER BY score DESC
+            """
+        else:
+            cypher = """
+            CALL db.index.vector.queryNodes($index_name, $limit, $embedding)
+            YIELD node, score
+            WHERE node.telegram_message_id <> $telegram_message_id AND score >= $min_score
+            RETURN node.telegram_message_id AS telegram_message_id,
+                   node.title AS title,
+                   node.telegram_url AS telegram_url,
+                   score
+            ORDER BY score DESC
+            """
         return self.run_cypher(cypher, params)
 
     def create_similarity_links(
@@ -301,11 +1348,62 @@ class KnowledgeGraphBase:
         MATCH (target:Article {telegram_message_id: match.telegram_message_id})
         MERGE (source)-[r:SIMILAR_TO]->(target)
         SET r.score = match.score,
-            r.last_checked = datetime()
+            r.last_checked = datetime(),
+            source.updated_at = datetime()
         """
         self.run_cypher(cypher, {"source_id": source_id, "matches": matches})
 
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Group-commit buffered writes as one UNWIND statement per operation type.
+
+        `operations` are `(op, payload)` pairs as produced by write-behind
+        ingest: `upsert_article` ({article, embedding}), `attach_topics`,
+        `attach_entities`, `attach_projects` ({article}) and
+        `create_similarity_links` ({source_id, matches}). Statements run in
+        dependency order inside a single `run_cypher_batch` call.
+        """
+        rows: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        upserts: Dict[str, List[Dict[str, Any]]] = defaultdict(list)  # keyed by statement
+        for op, payload in operations:
+            if op == "create_similarity_links":
+                rows[op].extend(
+                    {"source_id": payload["source_id"], **match} for match in payload["matches"]
+                )
+                continue
+            article: Article = payload["article"]
+            if op == "upsert_article":
+                upserts[self._upsert_cypher(payload["embedding"])].append(
+                    self._upsert_row(article, payload["embedding"])
+                )
+            elif op == "attach_topics" and article.topics:
+                rows[op].append(
+                    {"telegram_message_id": article.telegram_message_id, "topics": article.topics}
+                )
+            elif op == "attach_entities" and article.entities:
+                rows[op].append(
+                    {
+                        "telegram_message_id": article.telegram_message_id,
+                        "entities": _entity_rows(article.entities),
+                    }
+                )
+            elif op == "attach_projects" and article.projects:
+                rows[op].append(
+                    {
+                        "telegram_message_id": article.telegram_message_id,
+                        "projects": [asdict(p) for p in article.projects],
+                    }
+                )
+        statements = [(cypher, {"rows": upsert_rows}) for cypher, upsert_rows in upserts.items()]
+        statements.extend(
+            (BATCH_WRITE_CYPHER[op], {"rows": rows[op]})
+            for op in BATCH_WRITE_ORDER
+            if rows.get(op)
+        )
+        if statements:
+            self.run_cypher_batch(statements)
+
     def weekly_digest(self, days: int = 7) -> List[Dict[str, object]]:
+        """Newest first, in the keyset order `read_page("weekly_digest")` pages through."""
         cypher = """
         MATCH (a:Article)
         WHERE a.published_at >= datetime() - duration({days: $days})
@@ -315,20 +1413,114 @@ class KnowledgeGraphBase:
                a.title AS title,
                a.telegram_url AS telegram_url,
                topics
-        ORDER BY day DESC, title ASC
+        ORDER BY a.published_at DESC, a.telegram_message_id DESC
         """
         return self.run_cypher(cypher, {"days": days})
 
-    def article_list_by_entity(self, entity_name: str, days: int = 14) -> List[Dict[str, object]]:
+    def articles_by_domain(
+        self,
+        domain: str,
+        days: int | None = None,
+        limit: int = 50,
+        cta_only: bool = False,
+    ) -> List[Dict[str, object]]:
+        """Articles linking to `domain` or a subdomain (body or CTA), newest first.
+
+        Seeks `domain_reversed_host_idx` with the reversed-host prefix instead
+        of scanning `cta_link` on every Article.
+        """
+        prefix = domain_prefix(domain)
+        if prefix is None:
+            return []
         cypher = """
-        MATCH (a:Article)-[:MENTIONS]->(e:Entity {name: $entity})
-        WHERE a.published_at >= datetime() - duration({days: $days})
+        MATCH (d:Domain)
+        WHERE d.reversed_host STARTS WITH $prefix
+        MATCH (d)<-[:ON_DOMAIN]-(l:Link)<-[r:LINKS_TO]-(a:Article)
+        WHERE ($days IS NULL OR a.published_at >= datetime() - duration({days: $days}))
+          AND (NOT $cta_only OR r.cta)
+        WITH a, collect(DISTINCT l.url) AS links, any(flag IN collect(r.cta) WHERE flag) AS cta
+        RETURN a.title AS title,
+               a.telegram_url AS telegram_url,
+               a.cta_text AS cta_text,
+               links,
+               cta,
+               date(a.published_at) AS day
+        ORDER BY a.published_at DESC, a.telegram_message_id
+        LIMIT $limit
+        """
+        return self.run_cypher(
+            cypher, {"prefix": prefix, "days": days, "limit": limit, "cta_only": cta_only}
+        )
+
+    def article_list_by_entity(self, entity_name: str, days: int = 14) -> List[Dict[str, object]]:
+        cypher = f"""
+        {ENTITY_MATCH_CYPHER}
+        MATCH (a:Article)-[:MENTIONS]->(e)
+        WHERE a.published_at >= datetime() - duration({{days: $days}})
+        WITH DISTINCT a
         RETURN a.title AS title,
                a.telegram_url AS telegram_url,
                date(a.published_at) AS day
         ORDER BY a.published_at DESC
         """
-        return self.run_cypher(cypher, {"entity": entity_name, "days": days})
+        return self.run_cypher(
+            cypher,
+            {"entity_id": canonical_entity_id(entity_name), "entity": entity_name, "days": days},
+        )
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        cypher = """
+        MATCH (e:Entity)
+        RETURN e.id AS id, e.name AS name, e.type AS type,
+               coalesce(e.aliases, [e.name]) AS aliases,
+               COUNT { (e)<-[:MENTIONS]-(:Article) } AS mentions
+        ORDER BY mentions DESC
+        """
+        return self.run_cypher(cypher)
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        """Fold duplicate Entity nodes into their canonical node in one statement.
+
+        Each group is `{id, name, type, aliases, duplicates}` where `duplicates`
+        lists the `name` of every node to fold in (legacy name-keyed nodes
+        included); their MENTIONS edges move to the canonical node and the
+        duplicates are deleted. Prefer `EntityResolver.apply_merges`, which
+        only writes with `confirm=True`.
+        """
+        if not groups:
+            return
+        cypher = """
+        UNWIND $groups AS g
+        MERGE (keep:Entity {id: g.id})
+        ON CREATE SET keep.name = g.name, keep.type = g.type, keep.created_at = datetime()
+        SET keep.aliases = reduce(acc = coalesce(keep.aliases, []), alias IN g.aliases |
+                CASE WHEN alias IN acc THEN acc ELSE acc + alias END),
+            keep.alias_ids = reduce(acc = coalesce(keep.alias_ids, []), id IN g.alias_ids |
+                CASE WHEN id IN acc OR id = g.id THEN acc ELSE acc + id END)
+        WITH keep, g
+        UNWIND g.duplicates AS duplicateName
+        MATCH (dup:Entity {name: duplicateName})
+        WHERE dup <> keep
+        OPTIONAL MATCH (a:Article)-[:MENTIONS]->(dup)
+        WITH keep, dup, collect(a) AS articles
+        FOREACH (a IN articles | MERGE (a)-[:MENTIONS]->(keep) SET a.updated_at = datetime())
+        DETACH DELETE dup
+        """
+        # Canonical ids of the folded spellings, so reads by alias find `keep`.
+        groups = [
+            dict(
+                group,
+                alias_ids=sorted(
+                    {
+                        canonical_entity_id(name)
+                        for key in ("aliases", "duplicates")
+                        for name in group.get(key) or ()
+                    }
+                ),
+            )
+            for group in groups
+        ]
+        self.run_cypher(cypher, {"groups": groups})
 
     def vlm_projects(self, topic: str = "Vision-Language Models") -> List[Dict[str, object]]:
         cypher = """
@@ -353,16 +1545,91 @@ class KnowledgeGraphBase:
         """
         return self.run_cypher(cypher)
 
+    def filter_articles(
+        self,
+        topics: Sequence[str] = (),
+        any_topics: Sequence[str] = (),
+        exclude_topics: Sequence[str] = (),
+        entities: Sequence[str] = (),
+        days: int | None = 30,
+        limit: int = 10,
+    ) -> List[Dict[str, object]]:
+        """Hybrid-RAG metadata prefilter: all `topics`, any of `any_topics`, none
+        of `exclude_topics`, mentioning every entity in `entities`."""
+        cypher = """
+        MATCH (a:Article)
+        WHERE ($days IS NULL OR a.published_at >= datetime() - duration({days: $days}))
+          AND all(name IN $topics WHERE EXISTS { (a)-[:ABOUT]->(:Topic {name: name}) })
+          AND (size($any_topics) = 0
+               OR EXISTS { (a)-[:ABOUT]->(t:Topic) WHERE t.name IN $any_topics })
+          AND NOT EXISTS { (a)-[:ABOUT]->(t:Topic) WHERE t.name IN $exclude_topics }
+          AND all(i IN range(0, size($entity_ids) - 1) WHERE EXISTS {
+                (a)-[:MENTIONS]->(e:Entity)
+                WHERE e.id = $entity_ids[i] OR $entity_ids[i] IN coalesce(e.alias_ids, [])
+                   OR (e.id IS NULL AND e.name = $entities[i]) })
+        RETURN a.telegram_message_id AS telegram_message_id,
+               a.title AS title,
+               a.telegram_url AS telegram_url,
+               date(a.published_at) AS day,
+               [(a)-[:ABOUT]->(t:Topic) | t.name] AS topics
+        ORDER BY a.published_at DESC
+        LIMIT $limit
+        """
+        params = {
+            "topics": list(topics),
+            "any_topics": list(any_topics),
+            "exclude_topics": list(exclude_topics),
+            "entity_ids": [canonical_entity_id(name) for name in entities],
+            "entities": list(entities),
+            "days": days,
+            "limit": limit,
+        }
+        return self.run_cypher(cypher, params)
+
 
 class Neo4jKnowledgeGraph(KnowledgeGraphBase):
-    def __init__(self, config: EnvConfig, embedding_dim: int) -> None:
+    def __init__(
+        self,
+        config: EnvConfig,
+        embedding_dim: int,
+        startup_cache: StartupCache | None = None,
+        embedding_property: str | None = None,
+        vector_index_name: str | None = None,
+        prefix_dim: int | None = None,
+        oversample: int | None = None,
+        single_flight: SingleFlight | None = None,
+        split_storage: bool = False,
+        compress_bodies: bool = False,
+    ) -> None:
+        from neo4j import GraphDatabase
+
         self._driver = GraphDatabase.driver(
             config.neo4j_uri, auth=(config.neo4j_user, config.neo4j_password)
         )
+        self.uri = config.neo4j_uri
         self.database = config.neo4j_database
-        super().__init__(embedding_dim)
+        self.fetch_size = 1000
+        super().__init__(
+            embedding_dim,
+            startup_cache,
+            embedding_property,
+            vector_index_name,
+            prefix_dim,
+            oversample,
+            single_flight,
+            split_storage,
+            compress_bodies,
+        )
 
-    def run_cypher(
+    @property
+    def schema_target(self) -> str | None:
+        return f"{self.uri}/{self.database}"
+
+    def verify_connectivity(self) -> None:
+        # The driver connects lazily; this is a handshake, not a query.
+        self._driver.verify_connectivity()
+
+    def _run_cypher(
         self, statement: str, parameters: Dict[str, Any] | None = None
     ) -> List[Dict[str, Any]]:
         with self._driver.session(database=self.database) as session:
@@ -370,29 +1637,264 @@ class Neo4jKnowledgeGraph(KnowledgeGraphBase):
             result = session.run(statement, params)
             return [record.data() for record in result]
 
+    def iter_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        # The driver pulls records in fetch_size batches while we iterate.
+        with self._driver.session(database=self.database, fetch_size=self.fetch_size) as session:
+            for record in session.run(statement, parameters or {}):
+                yield record.data()
+
+    def iter_read_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        from neo4j import READ_ACCESS
+
+        with self._driver.session(
+            database=self.database, fetch_size=self.fetch_size, default_access_mode=READ_ACCESS
+        ) as session:
+            for record in session.run(statement, parameters or {}):
+                yield record.data()
+
+    def run_cypher_batch(
+        self, statements: Sequence[Tuple[str, Dict[str, Any] | None]]
+    ) -> List[List[Dict[str, Any]]]:
+        with self._driver.session(database=self.database) as session:
+            with session.begin_transaction() as tx:
+                results = [
+                    [record.data() for record in tx.run(statement, parameters or {})]
+                    for statement, parameters in statements
+                ]
+                tx.commit()
+        return results
+
     def close(self) -> None:
         self._driver.close()
 
 
+class _JSONStream:
+    """Incremental reader over a chunked JSON document."""
+
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                if self.pos > 65536:
+                    # Drop consumed text so memory stays bounded by one chunk + one row.
+                    self.buffer = self.buffer[self.pos :]
+                    self.pos = 0
+                self.buffer += self._decoder.decode(chunk)
+                return True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of Query API response")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in Query API response at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_query_api_records(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Stream `{"data": {"fields": [...], "values": [[...], ...]}}` rows as dicts.
+
+    Parses the Query API body as it arrives instead of `response.json()`, so a
+    large result never exists as one string plus one list of lists.
+    """
+    stream = _JSONStream(chunks)
+    stream.expect("{")
+    fields: List[str] | None = None
+    pending: List[List[Any]] = []
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key != "data":
+            value = stream.value()
+            if key == "errors" and value:
+                raise query_api_error(f"Neo4j Query API error: {value}", value)
+        else:
+            stream.expect("{")
+            while stream.peek() != "}":
+                data_key = stream.value()
+                stream.expect(":")
+                if data_key == "fields":
+                    fields = stream.value()
+                    for row in pending:
+                        yield dict(zip(fields, row))
+                    pending = []
+                elif data_key == "values":
+                    stream.expect("[")
+                    while stream.peek() != "]":
+                        row = stream.value()
+                        if fields is None:
+                            pending.append(row)
+                        else:
+                            yield dict(zip(fields, row))
+                        if stream.peek() == ",":
+                            stream.pos += 1
+                    stream.pos += 1
+                else:
+                    stream.value()
+                if stream.peek() == ",":
+                    stream.pos += 1
+            stream.pos += 1
+        if stream.peek() == ",":
+            stream.pos += 1
+
+
 class Neo4jQueryAPIKnowledgeGraph(KnowledgeGraphBase):
-    def __init__(self, config: EnvConfig, embedding_dim: int) -> None:
-        self._session = requests.Session()
+    def __init__(
+        self,
+        config: EnvConfig,
+        embedding_dim: int,
+        startup_cache: StartupCache | None = None,
+        embedding_property: str | None = None,
+        vector_index_name: str | None = None,
+        prefix_dim: int | None = None,
+        oversample: int | None = None,
+        session: Any | None = None,
+        single_flight: SingleFlight | None = None,
+        split_storage: bool = False,
+        compress_bodies: bool = False,
+    ) -> None:
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        # Anything with requests.Session's post/delete/close, e.g. cassette.CassetteSession.
+        self._session = session
         self._session.auth = (config.neo4j_user, config.neo4j_password)
         self.base_url = config.neo4j_query_url
-        super().__init__(embedding_dim)
+        super().__init__(
+            embedding_dim,
+            startup_cache,
+            embedding_property,
+            vector_index_name,
+            prefix_dim,
+            oversample,
+            single_flight,
+            split_storage,
+            compress_bodies,
+        )
 
-    def run_cypher(
+    @property
+    def schema_target(self) -> str | None:
+        return self.base_url
+
+    def _run_cypher(
         self, statement: str, parameters: Dict[str, Any] | None = None
     ) -> List[Dict[str, Any]]:
-        payload: Dict[str, Any] = {"statement": statement}
+        return list(self.iter_cypher(statement, parameters))
+
+    def iter_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        response = self._post(self.base_url, statement, parameters, stream=True)
+        try:
+            yield from iter_query_api_records(response.iter_content(chunk_size=64 * 1024))
+        finally:
+            response.close()
+
+    def iter_read_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        response = self._post(
+            self.base_url, statement, parameters, stream=True, access_mode="READ"
+        )
+        try:
+            yield from iter_query_api_records(response.iter_content(chunk_size=64 * 1024))
+        finally:
+            response.close()
+
+    def run_cypher_batch(
+        self, statements: Sequence[Tuple[str, Dict[str, Any] | None]]
+    ) -> List[List[Dict[str, Any]]]:
+        if len(statements) <= 1:
+            return [self.run_cypher(statement, parameters) for statement, parameters in statements]
+        # Explicit transaction: open with the first statement, run the rest, commit.
+        headers: Dict[str, str] = {}
+        statement, parameters = statements[0]
+        response = self._post(f"{self.base_url}/tx", statement, parameters)
+        body = response.json()
+        tx_url = f"{self.base_url}/tx/{body['transaction']['id']}"
+        affinity = response.headers.get("neo4j-cluster-affinity")
+        if affinity:
+            headers["neo4j-cluster-affinity"] = affinity
+        results = [self._records(body)]
+        try:
+            for statement, parameters in statements[1:]:
+                response = self._post(tx_url, statement, parameters, headers)
+                results.append(self._records(response.json()))
+            self._post(f"{tx_url}/commit", None, None, headers)
+        except Exception:
+            self._session.delete(tx_url, headers=headers, timeout=60)
+            raise
+        return results
+
+    def _post(
+        self,
+        url: str,
+        statement: str | None,
+        parameters: Dict[str, Any] | None,
+        headers: Dict[str, str] | None = None,
+        stream: bool = False,
+        access_mode: str | None = None,
+    ):
+        payload: Dict[str, Any] = {}
+        if statement is not None:
+            payload["statement"] = statement
         if parameters:
             payload["parameters"] = parameters
-        response = self._session.post(self.base_url, json=payload, timeout=60)
+        if access_mode is not None:
+            payload["accessMode"] = access_mode
+        response = self._session.post(
+            url, json=payload, headers=headers, timeout=60, stream=stream
+        )
         if response.status_code >= 400:
-            raise RuntimeError(
-                f"Neo4j Query API error {response.status_code}: {response.text}"
+            try:
+                errors = response.json().get("errors")
+            except (ValueError, AttributeError):
+                errors = None
+            raise query_api_error(
+                f"Neo4j Query API error {response.status_code}: {response.text}",
+                errors,
+                response.status_code,
             )
-        data = response.json().get("data", {})
+        return response
+
+    @staticmethod
+    def _records(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        data = body.get("data", {})
         fields = data.get("fields") or []
         values = data.get("values") or []
         records: List[Dict[str, Any]] = []
@@ -404,48 +1906,454 @@ class Neo4jQueryAPIKnowledgeGraph(KnowledgeGraphBase):
         self._session.close()
 
 
-class InMemoryKnowledgeGraph:
-    """Fallback graph implementation when Neo4j is unavailable."""
+class _Interner:
+    """Bidirectional str <-> dense int id table."""
+
+    __slots__ = ("ids", "values")
+
+    def __init__(self) -> None:
+        self.ids: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def intern(self, value: Any) -> int:
+        interned = self.ids.get(value)
+        if interned is None:
+            interned = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return interned
+
+    def get(self, value: Any) -> int | None:
+        return self.ids.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class _BodyStore:
+    """Article bodies kept apart from the query columns.
+
+    With a `path`, bodies are appended to a UTF-8 file and only their
+    offsets/lengths stay in memory. With `compress`, bodies of at least
+    `BODY_COMPRESS_MIN_BYTES` are zlib-compressed when that makes them smaller.
+    """
+
+    def __init__(self, path: Path | str | None = None, compress: bool = False) -> None:
+        self.compress = compress
+        self._inline: List[str | bytes] = []  # bytes = zlib-compressed UTF-8
+        self._offsets: array = array("Q")
+        self._lengths: array = array("I")
+        self._compressed = bytearray()
+        self._handle = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(path, "w+b")
+
+    def _pack(self, body: str) -> Tuple[bytes, bool]:
+        data = body.encode("utf-8")
+        if self.compress and len(data) >= BODY_COMPRESS_MIN_BYTES:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                return packed, True
+        return data, False
+
+    def _write(self, body: str) -> Tuple[int, int, bool]:
+        data, compressed = self._pack(body)
+        self._handle.seek(0, os.SEEK_END)
+        offset = self._handle.tell()
+        self._handle.write(data)
+        return offset, len(data), compressed
+
+    def _inline_value(self, body: str) -> str | bytes:
+        data, compressed = self._pack(body)
+        return data if compressed else body
+
+    def append(self, body: str) -> None:
+        if self._handle is None:
+            self._inline.append(self._inline_value(body))
+            return
+        offset, length, compressed = self._write(body)
+        self._offsets.append(offset)
+        self._lengths.append(length)
+        self._compressed.append(compressed)
+
+    def __setitem__(self, index: int, body: str) -> None:
+        if self._handle is None:
+            self._inline[index] = self._inline_value(body)
+            return
+        self._offsets[index], self._lengths[index], self._compressed[index] = self._write(body)
+
+    def __getitem__(self, index: int) -> str:
+        if self._handle is None:
+            value = self._inline[index]
+            return zlib.decompress(value).decode("utf-8") if isinstance(value, bytes) else value
+        self._handle.seek(self._offsets[index])
+        data = self._handle.read(self._lengths[index])
+        return (zlib.decompress(data) if self._compressed[index] else data).decode("utf-8")
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+
 
-    def __init__(self, embedding_dim: int) -> None:
+def _epoch_seconds(moment: datetime) -> float:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH).total_seconds()
+
+
+class InMemoryKnowledgeGraph(PagedReadsMixin):
+    """Fallback graph implementation when Neo4j is unavailable.
+
+    Articles are stored column-wise under dense integer ids: scalar columns in
+    lists/arrays, embeddings in one flat float32 array, topic/entity/project
+    names interned, and postings as sorted `array('I')` of article ids. Bodies
+    live in their own store (optionally a file at `body_path`) and are only
+    touched by `get_article`/`article_body` (zlib-compressed when long, with
+    `compress_bodies`). With `prefix_dim`, a second matrix of
+    renormalized embedding prefixes drives the first stage of
+    `find_similar_articles` (see `KnowledgeGraphBase.prefix_dim`); otherwise
+    whole-archive searches go through the weekly `vector_buckets`.
+    """
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        body_path: Path | str | None = None,
+        prefix_dim: int | None = None,
+        oversample: int = 10,
+        compress_bodies: bool = False,
+    ) -> None:
         self.embedding_dim = embedding_dim
-        self.articles: Dict[str, Dict[str, Any]] = {}
-        self.topic_index: Dict[str, set[str]] = defaultdict(set)
-        self.entity_index: Dict[str, set[str]] = defaultdict(set)
-        self.project_topics: Dict[str, List[str]] = {}
-        self.project_articles: Dict[str, set[str]] = defaultdict(set)
-        self.similarity_edges: List[Dict[str, object]] = []
+        self.prefix_dim = prefix_dim if prefix_dim and prefix_dim < embedding_dim else None
+        self.oversample = oversample
+        self._prefixes: array = array("f")
+        self._article_ids: Dict[str, int] = {}
+        self._message_ids: List[str] = []
+        self._titles: List[str] = []
+        self._urls: List[str] = []
+        self._channels: List[int] = []
+        self._published: array = array("d")
+        self._embeddings: array = array("f")
+        self._norms: array = array("f")
+        self._topics: List[Tuple[int, ...]] = []
+        self._entity_refs: List[Tuple[int, ...]] = []
+        self._projects: List[Tuple[int, ...]] = []
+        self._cta_texts: List[str] = []
+        self._cta_links: List[str] = []
+        self._links: List[Tuple[Tuple[str, str, bool], ...]] = []  # (url, host, is_cta)
+        self._bodies = _BodyStore(body_path, compress_bodies)
+        # Posting keys each article is currently linked under, so re-attaching
+        # an edited article drops it from the postings it no longer belongs to.
+        self._topic_links: List[Tuple[int, ...]] = []
+        self._entity_links: List[Tuple[int, ...]] = []
+        self._project_links: List[Tuple[int, ...]] = []
+
+        self._strings = _Interner()  # channels, topics, project names
+        self._refs = _Interner()  # (name, type) pairs as written
+        self._entity_keys = _Interner()  # canonical_entity_id values
+        self._ref_entity: List[int] = []  # ref id -> entity key id
+        self._entity_names: Dict[int, int] = {}  # entity key id -> display ref id
+        self._entity_aliases: Dict[int, List[str]] = defaultdict(list)
+        # Entity key folded away by merge_entities -> the key it was merged into.
+        self._entity_redirects: Dict[int, int] = {}
+        self._project_topics: Dict[int, Tuple[int, ...]] = {}
+        self._project_descriptions: Dict[int, str | None] = {}
+
+        self.topic_index: Dict[int, array] = {}
+        self.entity_index: Dict[int, array] = {}
+        self.project_index: Dict[int, array] = {}
+        self.channel_index: Dict[int, array] = {}
+        # Hosts linked from bodies/CTAs (and from CTAs only), by reversed label.
+        self.domain_index = DomainTrie()
+        self.cta_domain_index = DomainTrie()
+        self.time_buckets = TimeBuckets()
+        self.vector_buckets = VectorBuckets(self._embeddings, self._norms, embedding_dim)
+        self.engine = PostingQueryEngine(
+            self._lookup_posting,
+            lambda: range(len(self._message_ids)),
+            self._published,
+            self.time_buckets,
+        )
+        self._topic_projects: Dict[int, set[int]] = defaultdict(set)
+
+        self._edge_sources: array = array("I")
+        self._edge_targets: array = array("I")
+        self._edge_scores: array = array("f")
+        self._edge_times: array = array("d")
 
     def close(self) -> None:
-        return None
+        self._bodies.close()
+
+    def __len__(self) -> int:
+        return len(self._message_ids)
+
+    def compact_vectors(self) -> int:
+        """Compact cold weeks of `vector_buckets` now instead of in the background."""
+        return self.vector_buckets.compact()
 
+    # Writes ----------------------------------------------------------------
     def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
-        self.articles[article.telegram_message_id] = {
-            "article": article,
-            "embedding": list(embedding),
-            "topics": list(article.topics),
-            "entities": [e.name for e in article.entities],
-            "projects": [p.name for p in article.projects],
-        }
+        if len(embedding) != self.embedding_dim:
+            raise ValueError(
+                f"Embedding has {len(embedding)} dimensions, expected {self.embedding_dim}."
+            )
+        vector = array("f", embedding)
+        norm = math.sqrt(sum(value * value for value in vector))
+        row = (
+            article.title,
+            article.telegram_url,
+            self._strings.intern(article.source_channel),
+            _epoch_seconds(article.published_at),
+            tuple(self._strings.intern(topic) for topic in article.topics),
+            tuple(self._intern_ref(entity) for entity in article.entities),
+            tuple(self._strings.intern(project.name) for project in article.projects),
+            article.cta_text,
+            article.cta_link,
+            tuple(article_links(article.body, article.cta_link)),
+            article.body,
+        )
+        aid = self._article_ids.get(article.telegram_message_id)
+        if aid is None:
+            aid = self._article_ids[article.telegram_message_id] = len(self._message_ids)
+            self._message_ids.append(article.telegram_message_id)
+            for column, value in zip(self._row_columns(), row):
+                column.append(value)
+            self._embeddings.extend(vector)
+            self._norms.append(norm)
+            if self.prefix_dim:
+                self._prefixes.extend(prefix_vector(vector, self.prefix_dim))
+            self._topic_links.append(())
+            self._entity_links.append(())
+            self._project_links.append(())
+        else:
+            self.time_buckets.remove(aid, self._published[aid])
+            self.vector_buckets.remove(aid, self._published[aid])
+            posting_remove(self.channel_index[self._channels[aid]], aid)
+            self._index_links(aid, remove=True)
+            for column, value in zip(self._row_columns(), row):
+                column[aid] = value
+            offset = aid * self.embedding_dim
+            self._embeddings[offset : offset + self.embedding_dim] = vector
+            self._norms[aid] = norm
+            if self.prefix_dim:
+                offset = aid * self.prefix_dim
+                self._prefixes[offset : offset + self.prefix_dim] = array(
+                    "f", prefix_vector(vector, self.prefix_dim)
+                )
+        self.time_buckets.add(aid, self._published[aid])
+        self.vector_buckets.add(aid, self._published[aid])
+        posting_add(self.channel_index.setdefault(self._channels[aid], array("I")), aid)
+        self._index_links(aid)
+
+    def _index_links(self, aid: int, remove: bool = False) -> None:
+        for _, host, cta in self._links[aid]:
+            indexes = (self.domain_index, self.cta_domain_index) if cta else (self.domain_index,)
+            for index in indexes:
+                if remove:
+                    index.remove(host, aid)
+                else:
+                    index.add(host, aid)
+
+    def _row_columns(self) -> Tuple[Any, ...]:
+        return (
+            self._titles,
+            self._urls,
+            self._channels,
+            self._published,
+            self._topics,
+            self._entity_refs,
+            self._projects,
+            self._cta_texts,
+            self._cta_links,
+            self._links,
+            self._bodies,
+        )
+
+    def _intern_ref(self, entity: EntityRef) -> int:
+        ref = self._refs.intern((entity.name, entity.type))
+        if ref == len(self._ref_entity):
+            self._ref_entity.append(self._entity_key(entity.name, create=True))
+        return ref
+
+    def _entity_key(self, name: str, create: bool = False) -> int | None:
+        entity_id = canonical_entity_id(name)
+        key = self._entity_keys.intern(entity_id) if create else self._entity_keys.get(entity_id)
+        while key in self._entity_redirects:
+            key = self._entity_redirects[key]
+        return key
+
+    def _intern_project(self, project: ProjectRef) -> int:
+        project_id = self._strings.intern(project.name)
+        topics = tuple(self._strings.intern(topic) for topic in project.topics)
+        for topic in self._project_topics.get(project_id, ()):
+            self._topic_projects[topic].discard(project_id)
+        self._project_topics[project_id] = topics
+        for topic in topics:
+            self._topic_projects[topic].add(project_id)
+        if project.description is not None or project_id not in self._project_descriptions:
+            self._project_descriptions[project_id] = project.description
+        return project_id
+
+    def _relink(
+        self, index: Dict[int, array], links: List[Tuple[int, ...]], aid: int, keys: Tuple[int, ...]
+    ) -> None:
+        unique = tuple(dict.fromkeys(keys))
+        if len(unique) != len(keys):
+            keys = unique
+        for key in set(links[aid]) - set(keys):
+            posting = index.get(key)
+            if posting is not None:
+                posting_remove(posting, aid)
+        for key in keys:
+            posting = index.get(key)
+            if posting is None:
+                posting = index[key] = array("I")
+            posting_add(posting, aid)
+        links[aid] = keys
 
     def attach_topics(self, article: Article) -> None:
-        stored = self.articles[article.telegram_message_id]
-        stored["topics"] = list(article.topics)
-        for topic in article.topics:
-            self.topic_index[topic].add(article.telegram_message_id)
+        aid = self._article_ids[article.telegram_message_id]
+        topics = tuple(self._strings.intern(topic) for topic in article.topics)
+        self._topics[aid] = topics
+        self._relink(self.topic_index, self._topic_links, aid, topics)
 
     def attach_entities(self, article: Article) -> None:
-        stored = self.articles[article.telegram_message_id]
-        stored["entities"] = [e.name for e in article.entities]
-        for entity in article.entities:
-            self.entity_index[entity.name].add(article.telegram_message_id)
+        aid = self._article_ids[article.telegram_message_id]
+        refs = tuple(self._intern_ref(entity) for entity in article.entities)
+        self._entity_refs[aid] = refs
+        keys = tuple(self._ref_entity[ref] for ref in refs)
+        for ref, key, entity in zip(refs, keys, article.entities):
+            self._entity_names.setdefault(key, ref)
+            if entity.name not in self._entity_aliases[key]:
+                self._entity_aliases[key].append(entity.name)
+        self._relink(self.entity_index, self._entity_links, aid, keys)
 
     def attach_projects(self, article: Article) -> None:
-        stored = self.articles[article.telegram_message_id]
-        stored["projects"] = [p.name for p in article.projects]
-        for project in article.projects:
-            self.project_topics[project.name] = list(project.topics)
-            self.project_articles[project.name].add(article.telegram_message_id)
+        aid = self._article_ids[article.telegram_message_id]
+        projects = tuple(self._intern_project(project) for project in article.projects)
+        self._projects[aid] = projects
+        self._relink(self.project_index, self._project_links, aid, projects)
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        records = []
+        for key, ref in self._entity_names.items():
+            name, entity_type = self._refs.values[ref]
+            records.append(
+                {
+                    "id": self._entity_keys.values[key],
+                    "name": name,
+                    "type": entity_type,
+                    "aliases": list(self._entity_aliases[key]),
+                    "mentions": len(self.entity_index.get(key, ())),
+                }
+            )
+        records.sort(key=lambda record: record["mentions"], reverse=True)
+        return records
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        for group in groups:
+            keep = self._entity_keys.intern(group["id"])
+            self._entity_redirects.pop(keep, None)
+            if keep not in self._entity_names:
+                self._entity_names[keep] = self._intern_ref(EntityRef(group["name"], group["type"]))
+            aliases = self._entity_aliases[keep]
+            for name in list(group.get("aliases") or []) + list(group.get("duplicates") or []):
+                if name not in aliases:
+                    aliases.append(name)
+                duplicate = self._entity_keys.intern(canonical_entity_id(name))
+                if duplicate == keep:
+                    continue
+                # Reads and writes by this spelling now land on `keep`.
+                self._entity_redirects[duplicate] = keep
+                for ref, key in enumerate(self._ref_entity):
+                    if key == duplicate:
+                        self._ref_entity[ref] = keep
+                for aid in self.entity_index.pop(duplicate, ()):
+                    links = tuple(keep if key == duplicate else key for key in self._entity_links[aid])
+                    self._relink(self.entity_index, self._entity_links, aid, links)
+                self._entity_names.pop(duplicate, None)
+                for alias in self._entity_aliases.pop(duplicate, []):
+                    if alias not in aliases:
+                        aliases.append(alias)
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        for op, payload in operations:
+            if op == "upsert_article":
+                self.upsert_article(payload["article"], payload["embedding"])
+            elif op == "create_similarity_links":
+                self.create_similarity_links(payload["source_id"], payload["matches"])
+            else:
+                getattr(self, op)(payload["article"])
+
+    def create_similarity_links(
+        self, source_id: str, matches: List[Dict[str, object]]
+    ) -> None:
+        timestamp = _epoch_seconds(datetime.utcnow())
+        source = self._article_ids[source_id]
+        for match in matches:
+            self._edge_sources.append(source)
+            self._edge_targets.append(self._article_ids[str(match["telegram_message_id"])])
+            self._edge_scores.append(float(match["score"]))
+            self._edge_times.append(timestamp)
+
+    @property
+    def similarity_edges(self) -> List[Dict[str, object]]:
+        return [
+            {
+                "source": self._message_ids[source],
+                "target": self._message_ids[target],
+                "score": score,
+                "timestamp": (_EPOCH + timedelta(seconds=moment)).isoformat(),
+            }
+            for source, target, score, moment in zip(
+                self._edge_sources, self._edge_targets, self._edge_scores, self._edge_times
+            )
+        ]
+
+    # Reads -----------------------------------------------------------------
+    def get_article(self, telegram_message_id: str) -> Article | None:
+        """Rebuild the full `Article` (including body) for one stored id."""
+        aid = self._article_ids.get(telegram_message_id)
+        if aid is None:
+            return None
+        names = self._strings.values
+        return Article(
+            telegram_message_id=telegram_message_id,
+            title=self._titles[aid],
+            body=self._bodies[aid],
+            telegram_url=self._urls[aid],
+            published_at=self._published_at(aid),
+            source_channel=names[self._channels[aid]],
+            topics=[names[topic] for topic in self._topics[aid]],
+            entities=[EntityRef(*self._refs.values[ref]) for ref in self._entity_refs[aid]],
+            projects=[
+                ProjectRef(
+                    names[project],
+                    [names[topic] for topic in self._project_topics.get(project, ())],
+                    self._project_descriptions.get(project),
+                )
+                for project in self._projects[aid]
+            ],
+            cta_text=self._cta_texts[aid],
+            cta_link=self._cta_links[aid],
+        )
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        aid = self._article_ids.get(telegram_message_id)
+        return None if aid is None else self._bodies[aid]
+
+    def get_embedding(self, telegram_message_id: str) -> List[float] | None:
+        aid = self._article_ids.get(telegram_message_id)
+        if aid is None:
+            return None
+        offset = aid * self.embedding_dim
+        return self._embeddings[offset : offset + self.embedding_dim].tolist()
+
+    def _published_at(self, aid: int) -> datetime:
+        return _EPOCH + timedelta(seconds=self._published[aid])
+
+    def _day(self, aid: int) -> date:
+        return self._published_at(aid).date()
 
     def find_similar_articles(
         self,
@@ -453,24 +2361,68 @@ class InMemoryKnowledgeGraph:
         telegram_message_id: str,
         limit: int = 5,
         min_score: float = 0.88,
+        channels: Sequence[str] | None = None,
     ) -> List[Dict[str, object]]:
-        results: List[Dict[str, object]] = []
-        for other_id, record in self.articles.items():
-            if other_id == telegram_message_id:
-                continue
-            score = self._cosine_similarity(embedding, record["embedding"])
-            if score >= min_score:
-                article: Article = record["article"]
-                results.append(
-                    {
-                        "telegram_message_id": other_id,
-                        "title": article.title,
-                        "telegram_url": article.telegram_url,
-                        "score": score,
-                    }
+        query = array("f", embedding)
+        query_norm = math.sqrt(sum(value * value for value in query))
+        if not query_norm:
+            return []
+        dim = self.embedding_dim
+        vectors = self._embeddings
+        norms = self._norms
+        exclude = self._article_ids.get(telegram_message_id)
+        if not channels and not self.prefix_dim:
+            # Whole-archive search: newest weeks first, older weeks pruned by
+            # their centroid bounds (see vector_buckets.py).
+            top = self.vector_buckets.search(query, limit, min_score, exclude)
+        else:
+            if channels:
+                candidates: Iterable[int] = union(
+                    self._lookup_posting("channel", channel) or () for channel in channels
+                )
+            else:
+                candidates = range(len(norms))
+            if self.prefix_dim and len(candidates) > limit * self.oversample:
+                candidates = self._prefix_candidates(
+                    query, candidates, exclude, limit * self.oversample
                 )
-        results.sort(key=lambda r: r["score"], reverse=True)
-        return results[:limit]
+            scored: List[Tuple[float, int]] = []
+            for aid in candidates:
+                norm = norms[aid]
+                if aid == exclude or not norm:
+                    continue
+                offset = aid * dim
+                score = sum(map(mul, query, vectors[offset : offset + dim])) / (query_norm * norm)
+                if score >= min_score:
+                    scored.append((score, aid))
+            top = heapq.nlargest(limit, scored)
+        return [
+            {
+                "telegram_message_id": self._message_ids[aid],
+                "title": self._titles[aid],
+                "telegram_url": self._urls[aid],
+                "score": score,
+            }
+            for score, aid in top
+        ]
+
+    def _prefix_candidates(
+        self, query: Sequence[float], candidates: Iterable[int], exclude: int | None, count: int
+    ) -> List[int]:
+        """First stage: the `count` ids whose prefixes score highest against the query's."""
+        size = self.prefix_dim
+        prefix = prefix_vector(query, size)
+        prefixes = self._prefixes
+        norms = self._norms
+        coarse = heapq.nlargest(
+            count,
+            (
+                (sum(map(mul, prefix, prefixes[aid * size : aid * size + size])), aid)
+                for aid in candidates
+                if aid != exclude and norms[aid]
+            ),
+        )
+        return [aid for _, aid in coarse]
 
     @staticmethod
     def _cosine_similarity(vec_a: Sequence[float], vec_b: Sequence[float]) -> float:
@@ -481,90 +2433,265 @@ class InMemoryKnowledgeGraph:
             return 0.0
         return dot / (norm_a * norm_b)
 
-    def create_similarity_links(
-        self, source_id: str, matches: List[Dict[str, object]]
-    ) -> None:
-        timestamp = datetime.utcnow().isoformat()
-        for match in matches:
-            self.similarity_edges.append(
-                {
-                    "source": source_id,
-                    "target": match["telegram_message_id"],
-                    "score": match["score"],
-                    "timestamp": timestamp,
-                }
+    # Posting-list queries ---------------------------------------------------
+    def _lookup_posting(self, facet: str, value: str) -> Sequence[int] | None:
+        names = self._strings
+        if facet == "topic":
+            return self.topic_index.get(names.get(value))
+        if facet == "entity":
+            return self.entity_index.get(self._entity_key(value))
+        if facet == "project":
+            return self.project_index.get(names.get(value))
+        if facet == "channel":
+            return self.channel_index.get(names.get(value))
+        if facet == "domain":
+            return self.domain_index.lookup(value)
+        if facet == "cta_domain":
+            return self.cta_domain_index.lookup(value)
+        if facet == "project_topic":
+            projects = self._topic_projects.get(names.get(value), ())
+            return union(self.project_index.get(project, ()) for project in projects)
+        if facet == "topic_contains":
+            return union(
+                posting for topic, posting in self.topic_index.items() if value in names.values[topic]
             )
+        raise ValueError(f"Unknown posting facet: {facet}")
+
+    def _since(self, days: int | None) -> float | None:
+        if days is None:
+            return None
+        return _epoch_seconds(datetime.utcnow() - timedelta(days=days))
+
+    def select(
+        self,
+        expr: Expr | None = None,
+        days: int | None = None,
+        limit: int | None = None,
+    ) -> List[int]:
+        """Internal article ids matching `expr` in the last `days`, newest first."""
+        return self.engine.top_k(self.engine.select(expr, since=self._since(days)), limit)
+
+    def filter_articles(
+        self,
+        topics: Sequence[str] = (),
+        any_topics: Sequence[str] = (),
+        exclude_topics: Sequence[str] = (),
+        entities: Sequence[str] = (),
+        days: int | None = 30,
+        limit: int = 10,
+    ) -> List[Dict[str, object]]:
+        params = {
+            "topics": topics,
+            "any_topics": any_topics,
+            "exclude_topics": exclude_topics,
+            "entities": entities,
+            "days": days,
+        }
+        return [row for _, row in self.keyed_page("filter_articles", params, limit=limit)]
 
     def weekly_digest(self, days: int = 7) -> List[Dict[str, object]]:
-        cutoff = datetime.utcnow() - timedelta(days=days)
-        entries: List[Dict[str, object]] = []
-        for record in self.articles.values():
-            article: Article = record["article"]
-            if article.published_at >= cutoff:
-                entries.append(
-                    {
-                        "day": article.published_at.date(),
-                        "title": article.title,
-                        "telegram_url": article.telegram_url,
-                        "topics": record["topics"],
-                    }
-                )
-        entries.sort(key=lambda r: (r["day"], r["title"]), reverse=True)
-        return entries
+        return [row for _, row in self.keyed_page("weekly_digest", {"days": days}, limit=None)]
 
     def article_list_by_entity(
         self, entity_name: str, days: int = 14
     ) -> List[Dict[str, object]]:
-        cutoff = datetime.utcnow() - timedelta(days=days)
-        results: List[Dict[str, object]] = []
-        for article_id in self.entity_index.get(entity_name, []):
-            article: Article = self.articles[article_id]["article"]
-            if article.published_at >= cutoff:
-                results.append(
-                    {
-                        "title": article.title,
-                        "telegram_url": article.telegram_url,
-                        "day": article.published_at.date(),
-                    }
-                )
-        results.sort(key=lambda r: r["day"], reverse=True)
-        return results
+        return [
+            {
+                "title": self._titles[aid],
+                "telegram_url": self._urls[aid],
+                "day": self._day(aid),
+            }
+            for aid in self.select(Term("entity", entity_name), days)
+        ]
+
+    def articles_by_domain(
+        self,
+        domain: str,
+        days: int | None = None,
+        limit: int = 50,
+        cta_only: bool = False,
+    ) -> List[Dict[str, object]]:
+        params = {"domain": domain, "days": days, "cta_only": cta_only}
+        return [row for _, row in self.keyed_page("articles_by_domain", params, limit=limit)]
 
     def vlm_projects(self, topic: str = "Vision-Language Models") -> List[Dict[str, object]]:
+        topic_id = self._strings.get(topic)
+        names = self._strings.values
+        projects = self._topic_projects.get(topic_id, set()) if topic_id is not None else set()
         entries: List[Dict[str, object]] = []
-        for project, topics in self.project_topics.items():
-            if topic not in topics:
-                continue
-            for article_id in self.project_articles.get(project, []):
-                article: Article = self.articles[article_id]["article"]
-                entries.append(
-                    {
-                        "project": project,
-                        "title": article.title,
-                        "telegram_url": article.telegram_url,
-                        "day": article.published_at.date(),
-                    }
-                )
-        entries.sort(key=lambda r: r["day"], reverse=True)
+        for aid in self.select(Term("project_topic", topic)):
+            for project in self._project_links[aid]:
+                if project in projects:
+                    entries.append(
+                        {
+                            "project": names[project],
+                            "title": self._titles[aid],
+                            "telegram_url": self._urls[aid],
+                            "day": self._day(aid),
+                        }
+                    )
         return entries
 
     def image_edit_news(self) -> List[Dict[str, object]]:
+        names = self._strings.values
         entries: List[Dict[str, object]] = []
-        for record in self.articles.values():
-            article: Article = record["article"]
-            topics = [topic for topic in record["topics"] if "Image Edit" in topic]
-            if topics:
-                entries.append(
-                    {
-                        "title": article.title,
-                        "telegram_url": article.telegram_url,
-                        "day": article.published_at.date(),
-                        "topics": topics,
-                    }
-                )
-        entries.sort(key=lambda r: r["day"], reverse=True)
+        for aid in self.select(Term("topic_contains", "Image Edit")):
+            entries.append(
+                {
+                    "title": self._titles[aid],
+                    "telegram_url": self._urls[aid],
+                    "day": self._day(aid),
+                    "topics": [
+                        names[topic] for topic in self._topics[aid] if "Image Edit" in names[topic]
+                    ],
+                }
+            )
         return entries
 
+    # Keyset pages ------------------------------------------------------------
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        page = self.keyed_page(name, params, cursor, limit)
+        next_cursor = encode_cursor(page[-1][0]) if page and len(page) == limit else None
+        return [row for _, row in page], next_cursor
+
+    def keyed_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int | None = 500,
+    ) -> List[Tuple[PageKey, Dict[str, object]]]:
+        """`read_page` rows paired with their keyset keys, newest first.
+
+        Keys are comparable across graphs, which is what lets
+        `ShardedKnowledgeGraph` merge per-channel pages. Besides the paged
+        reads this also serves `filter_articles` and `articles_by_domain`
+        (`limit=None` returns all).
+        """
+        params = params or {}
+        names = self._strings.values
+        if name == "filter_articles":
+            expr = _facet_filter(
+                params.get("topics", ()),
+                params.get("any_topics", ()),
+                params.get("exclude_topics", ()),
+                params.get("entities", ()),
+            )
+            candidates = [
+                (aid, "")
+                for aid in self.engine.select(expr, since=self._since(params.get("days", 30)))
+            ]
+        elif name == "articles_by_domain":
+            prefix = domain_prefix(params["domain"])
+            cta_only = bool(params.get("cta_only"))
+            facet = "cta_domain" if cta_only else "domain"
+            candidates = (
+                []
+                if prefix is None
+                else [
+                    (aid, "")
+                    for aid in self.engine.select(
+                        Term(facet, params["domain"]), since=self._since(params.get("days"))
+                    )
+                ]
+            )
+        elif name == "weekly_digest":
+            since = self._since(params.get("days", 7))
+            candidates = [(aid, "") for aid in self.engine.select(since=since)]
+        elif name == "article_list_by_entity":
+            candidates = [
+                (aid, "")
+                for aid in self.engine.select(
+                    Term("entity", params["entity"]), since=self._since(params.get("days", 14))
+                )
+            ]
+        elif name == "vlm_projects":
+            topic = params.get("topic", "Vision-Language Models")
+            topic_id = self._strings.get(topic)
+            projects = self._topic_projects.get(topic_id, set()) if topic_id is not None else set()
+            candidates = [
+                (aid, names[project])
+                for aid in self.engine.select(Term("project_topic", topic))
+                for project in self._project_links[aid]
+                if project in projects
+            ]
+        elif name == "image_edit_news":
+            candidates = [
+                (aid, "") for aid in self.engine.select(Term("topic_contains", "Image Edit"))
+            ]
+        else:
+            raise ValueError(f"Unknown paged read: {name}")
+
+        after = decode_cursor(cursor)
+        message_ids = self._message_ids
+
+        def key(candidate: Tuple[int, str]) -> PageKey:
+            aid, tie = candidate
+            return int(round(self._published[aid] * 1000)), message_ids[aid], tie
+
+        if after is not None:
+            candidates = [candidate for candidate in candidates if key(candidate) < after]
+        if limit is None:
+            page = sorted(candidates, key=key, reverse=True)
+        else:
+            page = heapq.nlargest(limit, candidates, key=key)
+        rows: List[Tuple[PageKey, Dict[str, object]]] = []
+        for aid, tie in page:
+            row: Dict[str, object] = {
+                "title": self._titles[aid],
+                "telegram_url": self._urls[aid],
+                "day": self._day(aid),
+            }
+            if name == "filter_articles":
+                row = {"telegram_message_id": message_ids[aid], **row}
+                row["topics"] = [names[topic] for topic in self._topics[aid]]
+            elif name == "articles_by_domain":
+                matched = [
+                    (url, cta)
+                    for url, host, cta in self._links[aid]
+                    if (cta or not cta_only) and reversed_host(host).startswith(prefix)
+                ]
+                row = {
+                    "title": row["title"],
+                    "telegram_url": row["telegram_url"],
+                    "cta_text": self._cta_texts[aid],
+                    "links": sorted({url for url, _ in matched}),
+                    "cta": any(cta for _, cta in matched),
+                    "day": row["day"],
+                }
+            elif name == "weekly_digest":
+                row["topics"] = [names[topic] for topic in self._topics[aid]]
+            elif name == "vlm_projects":
+                row = {"project": tie, **row}
+            elif name == "image_edit_news":
+                row["topics"] = [
+                    names[topic] for topic in self._topics[aid] if "Image Edit" in names[topic]
+                ]
+            rows.append((key((aid, tie)), row))
+        return rows
+
+
+def _facet_filter(
+    topics: Sequence[str],
+    any_topics: Sequence[str],
+    exclude_topics: Sequence[str],
+    entities: Sequence[str],
+) -> Expr | None:
+    clauses: List[Expr] = [Term("topic", topic) for topic in topics]
+    clauses.extend(Term("entity", entity) for entity in entities)
+    if any_topics:
+        clauses.append(Or(*(Term("topic", topic) for topic in any_topics)))
+    clauses.extend(Not(Term("topic", topic)) for topic in exclude_topics)
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else And(*clauses)
+
 
 def chunk_text(text: str, max_chars: int = 2000) -> Iterable[str]:
     text = text.strip()
@@ -774,48 +2901,166 @@ class ScenarioRunner:
         ]
 
 
-def build_embedding_service(config: EnvConfig):
+def single_flight_from_env() -> SingleFlight | None:
+    """A coalescing group unless `KG_SINGLE_FLIGHT=0` turns request coalescing off."""
+    return None if os.getenv("KG_SINGLE_FLIGHT", "1") == "0" else SingleFlight()
+
+
+def build_embedding_service(
+    config: EnvConfig, startup_cache: StartupCache | None = None
+):
     try:
         service = GeminiEmbeddingService(
-            api_key=config.gemini_api_key, model=config.embedding_model
+            api_key=config.gemini_api_key,
+            model=config.embedding_model,
+            dimensions=config.embedding_dimensions,
+            startup_cache=startup_cache,
+            single_flight=single_flight_from_env(),
         )
-        _ = service.dimensions  # force probe call so we know the model works
-        print(f"Using Gemini embeddings via {service.model}.")
-        return service
+        if not service.dimensions_known:
+            # First run for this model: probe once so we know it works and
+            # remember the dimension for the next invocation.
+            _ = service.dimensions
+            print(f"Using Gemini embeddings via {service.model}.")
+            return service
     except Exception as exc:
         print(
             "[WARN] Gemini embeddings unavailable due to "
             f"{exc}. Falling back to deterministic hash embeddings."
         )
-        return HashEmbeddingService()
+        return hash_embedding_service_from_env()
+    # Dimension from config/cache: no startup probe, so a bad key or an
+    # outage is only discovered by the first embed.
+    print(f"Using Gemini embeddings via {service.model}.")
+    return FallbackEmbeddingService(
+        service, lambda: hash_embedding_service_from_env(service.dimensions)
+    )
+
+
+def hash_embedding_service_from_env(dim: int = 256):
+    """`HashEmbeddingService`, or a process pool for batches when `KG_HASH_WORKERS` > 1."""
+    workers = int(os.getenv("KG_HASH_WORKERS") or 1)
+    if workers <= 1:
+        return HashEmbeddingService(dim)
+    try:
+        from embedding_pool import ParallelHashEmbedder, available_cpus
+    except ModuleNotFoundError:  # pragma: no cover - package import fallback
+        from .embedding_pool import ParallelHashEmbedder, available_cpus
+    if available_cpus() <= 1:
+        return HashEmbeddingService(dim)
+    return ParallelHashEmbedder(dim, workers=workers)
 
 
-def build_graph_backend(config: EnvConfig, embedding_dim: int):
+def _adopt_active_embedding(graph: Any, config: EnvConfig, embedding_dim: int) -> None:
+    """Follow a finished embedding_migration.py cutover instead of the legacy index."""
     try:
-        graph = Neo4jKnowledgeGraph(config, embedding_dim=embedding_dim)
-        print(f"Connected to Neo4j at {config.neo4j_uri}.")
-        return graph
-    except Exception as exc:
+        from embedding_migration import active_version
+    except ModuleNotFoundError:  # pragma: no cover - package import fallback
+        from .embedding_migration import active_version
+
+    version = active_version(graph)
+    if version is None or version.embedding_property == graph.embedding_property:
+        return
+    if (version.model, version.dimensions) != (config.embedding_model, embedding_dim):
         print(
-            "[WARN] Bolt driver unavailable due to "
-            f"{exc}. Attempting Neo4j Query API fallback."
+            f"[WARN] Article embeddings were migrated to {version.model} ({version.dimensions} "
+            f"dims) but this process embeds with {config.embedding_model} ({embedding_dim} dims); "
+            f"staying on {graph.vector_index_name}."
         )
-        try:
-            graph = Neo4jQueryAPIKnowledgeGraph(config, embedding_dim=embedding_dim)
-            print(f"Connected to Neo4j Query API at {config.neo4j_query_url}.")
-            return graph
-        except Exception as http_exc:
-            print(
-                "[WARN] Query API unavailable due to "
-                f"{http_exc}. Using in-memory graph backend for testing."
-            )
-            return InMemoryKnowledgeGraph(embedding_dim)
+        return
+    graph.use_embedding(version.embedding_property, version.index_name, version.dimensions)
+
+
+def _adopt_storage_layout(graph: Any) -> None:
+    """Follow a storage_migration.py cutover to the split layout."""
+    if graph.split_storage:
+        return
+    records = graph.run_cypher(
+        "MATCH (l:StorageLayout {id: $id}) "
+        "RETURN l.layout AS layout, l.compress_bodies AS compress_bodies",
+        {"id": STORAGE_LAYOUT_ID},
+    )
+    if records and records[0].get("layout") == "split":
+        graph.use_split_storage(bool(records[0].get("compress_bodies")))
+
+
+def build_graph_backend(
+    config: EnvConfig, embedding_dim: int, startup_cache: StartupCache | None = None
+):
+    try:
+        from backend_router import BackendRouter
+        from journal import AppendOnlyJournal
+    except ModuleNotFoundError:  # pragma: no cover - package import fallback
+        from .backend_router import BackendRouter
+        from .journal import AppendOnlyJournal
+
+    wal_path = os.getenv("KG_WAL_PATH")
+    # Two-stage vector search over an N-dim prefix index (e.g. 256); unset = full vectors only.
+    prefix_dim = int(os.getenv("KG_PREFIX_DIM") or 0) or None
+    # KG_STORAGE_LAYOUT=split writes vectors and bodies to their own nodes
+    # (storage_migration.py moves existing articles and flips this for you).
+    split_storage = os.getenv("KG_STORAGE_LAYOUT", "inline") == "split"
+    compress_bodies = os.getenv("KG_COMPRESS_BODIES", "0") == "1"
+    # Shared by both transports, so a read in flight on either one is joined.
+    single_flight = single_flight_from_env()
+    transports = {
+        "bolt": lambda: Neo4jKnowledgeGraph(
+            config,
+            embedding_dim=embedding_dim,
+            startup_cache=startup_cache,
+            prefix_dim=prefix_dim,
+            single_flight=single_flight,
+            split_storage=split_storage,
+            compress_bodies=compress_bodies,
+        ),
+        "query_api": lambda: Neo4jQueryAPIKnowledgeGraph(
+            config,
+            embedding_dim=embedding_dim,
+            startup_cache=startup_cache,
+            prefix_dim=prefix_dim,
+            single_flight=single_flight,
+            split_storage=split_storage,
+            compress_bodies=compress_bodies,
+        ),
+    }
+    # KG_GRAPH_TRANSPORT=bolt|query_api registers (and imports the SDK of) that
+    # transport only; the default "auto" keeps both as failover candidates.
+    selected = os.getenv("KG_GRAPH_TRANSPORT", "auto")
+    if selected != "auto" and selected not in transports:
+        raise ValueError(f"KG_GRAPH_TRANSPORT must be auto, bolt or query_api, not {selected!r}")
+    router = BackendRouter(
+        [
+            (name, factory)
+            for name, factory in transports.items()
+            if selected in ("auto", name)
+        ],
+        embedding_dim,
+        fallback=InMemoryKnowledgeGraph(
+            embedding_dim, prefix_dim=prefix_dim, compress_bodies=compress_bodies
+        ),
+        journal=AppendOnlyJournal(wal_path) if wal_path else None,
+        prefix_dim=prefix_dim,
+        split_storage=split_storage,
+        compress_bodies=compress_bodies,
+    )
+    healthy = [status["name"] for status in router.health() if status["state"] == "closed"]
+    if healthy:
+        print(f"Routing graph calls across healthy backends: {', '.join(healthy)}.")
+        _adopt_storage_layout(router)
+        _adopt_active_embedding(router, config, embedding_dim)
+    else:
+        print(
+            "[WARN] No Neo4j transport reachable. Using in-memory graph backend "
+            "and buffering writes until Neo4j recovers."
+        )
+    return router
 
 
 def main() -> None:
     config = EnvConfig()
-    embedding_service = build_embedding_service(config)
-    graph = build_graph_backend(config, embedding_service.dimensions)
+    startup_cache = StartupCache.from_env()
+    embedding_service = build_embedding_service(config, startup_cache)
+    graph = build_graph_backend(config, embedding_service.dimensions, startup_cache)
 
     runner = ScenarioRunner(graph, embedding_service)
     runner.run()
@@ -0,0 +1,702 @@
+"""Local stand-in for the Neo4j Query API, for load testing the HTTP transport.
+
+`Neo4jQueryAPIKnowledgeGraph` and the n8n "Duplicate Query" / "Neo4j Upsert
+Article" nodes all speak `POST /db/{db}/query/v2`, and so far the only server
+to measure them against was production Aura. This module serves the same
+envelope locally:
+
+* request `{"statement", "parameters", "accessMode"}`, response `{"data":
+  {"fields", "values"}}`; failures are `{"errors": [{"code", "message"}]}`
+  with the Neo4j status codes the transport and n8n branch on, and writes
+  sent with `"accessMode": "READ"` are refused like Aura refuses them;
+* explicit transactions (`POST .../tx`, `.../tx/{id}`, `.../tx/{id}/commit`,
+  `DELETE .../tx/{id}`) as used by `run_cypher_batch`; writes in a
+  transaction are buffered and published as one batch on commit;
+* the statements `prototype.py` issues are matched by their exact
+  (whitespace-normalised) text and executed on a `ConcurrentKnowledgeGraph`,
+  so concurrent requests read consistent snapshots. Schema DDL succeeds as a
+  no-op, vector searches and the n8n upsert are recognised by shape, and
+  anything else is rejected as unsupported rather than guessed at.
+
+`--latency-ms`/`--jitter-ms`/`--tail-rate`/`--tail-ms` add server time per
+statement, `--error-rate` injects transient 503s and `--concurrency` caps
+statements in flight (further requests queue, like a saturated Aura
+instance). `GET /stats` reports what was served. Point the prototype at it
+with `NEO4J_QUERY_API_URL=http://127.0.0.1:7475/db/{databaseName}/query/v2`
+and drive it with `benchmarks/load_query_api.py`.
+
+Usage:
+    python query_api_server.py --port 7475 --dim 3072 --seed
+    python query_api_server.py --latency-ms 15 --jitter-ms 10 --error-rate 0.01 \
+        --concurrency 8
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+try:
+    from concurrent_graph import ConcurrentKnowledgeGraph
+    from prototype import (
+        BATCH_WRITE_CYPHER,
+        PAGED_READS,
+        Article,
+        EntityRef,
+        HashEmbeddingService,
+        KnowledgeGraphBase,
+        ProjectRef,
+        ScenarioRunner,
+        _paged_cypher,
+        decode_body,
+        encode_cursor,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .concurrent_graph import ConcurrentKnowledgeGraph
+    from .prototype import (
+        BATCH_WRITE_CYPHER,
+        PAGED_READS,
+        Article,
+        EntityRef,
+        HashEmbeddingService,
+        KnowledgeGraphBase,
+        ProjectRef,
+        ScenarioRunner,
+        _paged_cypher,
+        decode_body,
+        encode_cursor,
+    )
+
+# /db/{db}/query/v2, then optionally /tx (open) or /tx/{id}[/commit].
+QUERY_PATH_RE = re.compile(r"^/db/([^/]+)/query/v2(?:(/tx)|/tx/([^/]+)(/commit)?)?/?$")
+TRANSACTION_TTL_SECONDS = 30.0
+
+Rows = List[Dict[str, Any]]
+
+
+def normalise(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+class QueryAPIError(Exception):
+    def __init__(self, status: int, code: str, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+# Statement templates ---------------------------------------------------------
+class _StatementRecorder(KnowledgeGraphBase):
+    """Captures the Cypher each `KnowledgeGraphBase` method sends, without a database."""
+
+    def __init__(self) -> None:  # noqa: D107 - no schema calls
+        self.embedding_dim = 8
+        self.startup_cache = None
+        self.statements: List[str] = []
+
+    def run_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        self.statements.append(statement)
+        return []
+
+
+def _captured(call: Callable[[KnowledgeGraphBase], Any]) -> str:
+    recorder = _StatementRecorder()
+    call(recorder)
+    return normalise(recorder.statements[-1])
+
+
+_SAMPLE = Article(
+    telegram_message_id="0",
+    title="",
+    body="",
+    telegram_url="",
+    published_at=datetime(2026, 1, 1),
+    source_channel="",
+    topics=["topic"],
+    entities=[EntityRef("entity", "Org")],
+    projects=[ProjectRef("project", [])],
+)
+
+
+def _entity_refs(rows: List[Dict[str, str]]) -> List[EntityRef]:
+    return [EntityRef(row["name"], row["type"]) for row in rows or ()]
+
+
+def _project_refs(rows: List[Dict[str, Any]]) -> List[ProjectRef]:
+    return [
+        ProjectRef(row["name"], list(row.get("topics") or []), row.get("description"))
+        for row in rows or ()
+    ]
+
+
+class _WriteSet:
+    """Turns write statements into `write_batch` operations against a graph snapshot.
+
+    Neo4j MERGEs relationships, so attaching topics adds to an article's
+    existing ones and re-upserting an article keeps them; `pending` holds the
+    articles written earlier in the same transaction so later statements see them.
+    """
+
+    def __init__(self, graph: ConcurrentKnowledgeGraph) -> None:
+        self.graph = graph
+        self.pending: Dict[str, Article] = {}
+        self.operations: List[Tuple[str, Dict[str, Any]]] = []
+        self.merges: List[Dict[str, Any]] = []
+
+    def article(self, telegram_message_id: str) -> Article | None:
+        article = self.pending.get(telegram_message_id)
+        return article if article is not None else self.graph.get_article(telegram_message_id)
+
+    def upsert(self, article: Article, embedding: List[float]) -> None:
+        current = self.article(article.telegram_message_id)
+        if current is not None:
+            article.topics = article.topics or current.topics
+            article.entities = article.entities or current.entities
+            article.projects = article.projects or current.projects
+        self.pending[article.telegram_message_id] = article
+        self.operations.append(("upsert_article", {"article": article, "embedding": embedding}))
+
+    def attach(self, op: str, telegram_message_id: str, values: List[Any]) -> None:
+        article = self.article(str(telegram_message_id))
+        if article is None:  # MATCH found nothing
+            return
+        field = op.split("_", 1)[1]
+        merged = list(getattr(article, field))
+        merged.extend(value for value in values if value not in merged)
+        setattr(article, field, merged)
+        self.pending[article.telegram_message_id] = article
+        self.operations.append((op, {"article": article}))
+
+    def link(self, source_id: str, matches: List[Dict[str, Any]]) -> None:
+        if self.article(source_id) is None:
+            return
+        matches = [m for m in matches if self.article(str(m["telegram_message_id"])) is not None]
+        if matches:
+            self.operations.append(
+                ("create_similarity_links", {"source_id": source_id, "matches": matches})
+            )
+
+    def publish(self) -> None:
+        if self.operations:
+            self.graph.write_batch(self.operations)
+        if self.merges:
+            self.graph.merge_entities(self.merges)
+
+
+def _article_from_row(row: Dict[str, Any]) -> Article:
+    published_at = datetime.fromisoformat(str(row["published_at"]).replace("Z", "+00:00"))
+    return Article(
+        telegram_message_id=str(row["telegram_message_id"]),
+        title=row.get("title") or "",
+        body=decode_body(row.get("body"), row.get("body_encoding")) or "",
+        telegram_url=row.get("telegram_url") or "",
+        published_at=published_at.replace(tzinfo=None),
+        source_channel=row.get("source_channel") or "",
+        cta_text=row.get("cta_text") or "",
+        cta_link=row.get("cta_link") or "",
+    )
+
+
+def _upsert_rows(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+    for row in params["rows"]:
+        writes.upsert(_article_from_row(row), list(row["embedding"]))
+    return []
+
+
+def _n8n_upsert(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+    article = Article(
+        telegram_message_id=str(params["telegram_message_id"]),
+        title=params.get("title") or "",
+        body=params.get("raw_text") or "",
+        telegram_url=params.get("telegram_url") or "",
+        published_at=datetime.utcnow(),
+        source_channel=params.get("channel_username") or "",
+        topics=list(params.get("topics") or []),
+        cta_text=params.get("cta_text") or "",
+        cta_link=params.get("cta_link") or "",
+        entities=[
+            EntityRef(name, kind)
+            for name, kind in zip(
+                params.get("entity_names") or [], params.get("entity_types") or []
+            )
+        ],
+    )
+    writes.upsert(article, list(params["embedding"]))
+    return [{"telegram_message_id": article.telegram_message_id}]
+
+
+def _write_handlers() -> Dict[str, Callable[[_WriteSet, Dict[str, Any]], Rows]]:
+    def single(op: str, key: str, convert: Callable[[Any], List[Any]] = list) -> Callable:
+        def handler(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+            writes.attach(op, params["telegram_message_id"], convert(params[key]))
+            return []
+
+        return handler
+
+    def batched(op: str, key: str, convert: Callable[[Any], List[Any]] = list) -> Callable:
+        def handler(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+            for row in params["rows"]:
+                writes.attach(op, row["telegram_message_id"], convert(row[key]))
+            return []
+
+        return handler
+
+    def links(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+        writes.link(str(params["source_id"]), list(params["matches"]))
+        return []
+
+    def batched_links(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for row in params["rows"]:
+            match = {k: v for k, v in row.items() if k != "source_id"}
+            by_source.setdefault(str(row["source_id"]), []).append(match)
+        for source_id, matches in by_source.items():
+            writes.link(source_id, matches)
+        return []
+
+    def merge(writes: _WriteSet, params: Dict[str, Any]) -> Rows:
+        writes.merges.extend(params["groups"])
+        return []
+
+    return {
+        _captured(lambda g: g.attach_topics(_SAMPLE)): single("attach_topics", "topics"),
+        _captured(lambda g: g.attach_entities(_SAMPLE)): single(
+            "attach_entities", "entities", _entity_refs
+        ),
+        _captured(lambda g: g.attach_projects(_SAMPLE)): single(
+            "attach_projects", "projects", _project_refs
+        ),
+        _captured(lambda g: g.create_similarity_links("0", [{}])): links,
+        normalise(BATCH_WRITE_CYPHER["attach_topics"]): batched("attach_topics", "topics"),
+        normalise(BATCH_WRITE_CYPHER["attach_entities"]): batched(
+            "attach_entities", "entities", _entity_refs
+        ),
+        normalise(BATCH_WRITE_CYPHER["attach_projects"]): batched(
+            "attach_projects", "projects", _project_refs
+        ),
+        normalise(BATCH_WRITE_CYPHER["create_similarity_links"]): batched_links,
+        _captured(lambda g: g.merge_entities([{}])): merge,
+    }
+
+
+def _paged(name: str) -> Callable[[ConcurrentKnowledgeGraph, Dict[str, Any]], Rows]:
+    def handler(graph: ConcurrentKnowledgeGraph, params: Dict[str, Any]) -> Rows:
+        query = {key: value for key, value in params.items() if key not in ("after", "limit")}
+        if "entity_id" in query:
+            query["entity"] = query.pop("entity_id")  # canonical ids map to themselves
+        after = params.get("after")
+        cursor = None if after is None else encode_cursor((after["ms"], after["id"], after["tie"]))
+        return [
+            {**row, "_cursor_ms": key[0], "_cursor_id": key[1], "_cursor_tie": key[2]}
+            for key, row in graph.keyed_page(name, query, cursor, params.get("limit"))
+        ]
+
+    return handler
+
+
+def _article_body(graph: ConcurrentKnowledgeGraph, params: Dict[str, Any]) -> Rows:
+    body = graph.article_body(params["telegram_message_id"])
+    return [] if body is None else [{"body": body, "encoding": "utf-8"}]
+
+
+def _articles_by_domain(graph: ConcurrentKnowledgeGraph, params: Dict[str, Any]) -> Rows:
+    domain = ".".join(reversed(params["prefix"].rstrip(".").split(".")))
+    return graph.articles_by_domain(domain, params["days"], params["limit"], params["cta_only"])
+
+
+def _split(graph: KnowledgeGraphBase) -> KnowledgeGraphBase:
+    graph.use_split_storage()
+    return graph
+
+
+def _read_handlers() -> Dict[str, Callable[[ConcurrentKnowledgeGraph, Dict[str, Any]], Rows]]:
+    handlers: Dict[str, Callable[[ConcurrentKnowledgeGraph, Dict[str, Any]], Rows]] = {
+        _captured(lambda g: g.weekly_digest()): lambda graph, p: graph.weekly_digest(p["days"]),
+        _captured(lambda g: g.article_list_by_entity("entity")): (
+            lambda graph, p: graph.article_list_by_entity(p["entity_id"], p["days"])
+        ),
+        _captured(lambda g: g.articles_by_domain("example.com")): _articles_by_domain,
+        _captured(lambda g: g.list_entities()): lambda graph, p: graph.list_entities(),
+        _captured(lambda g: g.vlm_projects()): lambda graph, p: graph.vlm_projects(p["topic"]),
+        _captured(lambda g: g.image_edit_news()): lambda graph, p: graph.image_edit_news(),
+        _captured(lambda g: g.filter_articles()): lambda graph, p: graph.filter_articles(
+            p["topics"],
+            p["any_topics"],
+            p["exclude_topics"],
+            p["entity_ids"],
+            p["days"],
+            p["limit"],
+        ),
+        # Inline and split storage layouts read the body differently.
+        _captured(lambda g: g.article_body("0")): _article_body,
+        _captured(lambda g: _split(g).article_body("0")): _article_body,
+    }
+    handlers.update((normalise(_paged_cypher(name)), _paged(name)) for name in PAGED_READS)
+    return handlers
+
+
+def _vector_search(graph: ConcurrentKnowledgeGraph, params: Dict[str, Any]) -> Rows:
+    # Covers the flat, channel-scoped and prefix forms plus the n8n Duplicate
+    # Query; the in-memory graph always scores full vectors exactly.
+    return graph.find_similar_articles(
+        params["embedding"],
+        str(params.get("telegram_message_id") or ""),
+        int(params["limit"]),
+        float(params.get("min_score", 0.0)),
+        params.get("channels") or None,
+    )
+
+
+class QueryAPIServer:
+    """Routes Query API requests to statement handlers and tracks transactions."""
+
+    def __init__(
+        self,
+        graph: ConcurrentKnowledgeGraph,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_ms: float = 0.0,
+        error_rate: float = 0.0,
+        concurrency: int = 0,
+        auth: Tuple[str, str] | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.graph = graph
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.auth = auth
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        # Serialises read-modify-write translation so concurrent attaches are not lost.
+        self._write_lock = threading.Lock()
+        self._reads = _read_handlers()
+        self._writes = _write_handlers()
+        self._transactions: Dict[str, Dict[str, Any]] = {}
+        self._tx_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    # Dispatch ----------------------------------------------------------------
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> Tuple[int, Any]:
+        if method == "GET" and path.rstrip("/") == "/stats":
+            with self._stats_lock:
+                return 200, {**self.stats, "open_transactions": len(self._transactions)}
+        match = QUERY_PATH_RE.match(path)
+        if match is None:
+            error = {"code": "Neo.ClientError.Request.Invalid", "message": "not found"}
+            return 404, {"errors": [error]}
+        try:
+            self._authenticate(headers.get("Authorization"))
+            payload = json.loads(body) if body else {}
+            _, open_tx, tx_id, commit = match.groups()
+            if method == "DELETE" and tx_id:
+                self._close_transaction(tx_id)
+                self._count("rollbacks")
+                return 200, {"data": {"fields": [], "values": []}}
+            if method != "POST":
+                raise QueryAPIError(405, "Neo.ClientError.Request.Invalid", f"{method} not allowed")
+            self._inject_failure()
+            if open_tx:
+                return 202, self._begin(payload)
+            if tx_id:
+                return 202, self._in_transaction(tx_id, payload, bool(commit))
+            rows = self._execute(payload, None)
+            return 202, self._envelope(rows)
+        except QueryAPIError as exc:
+            self._count(f"status_{exc.status}")
+            return exc.status, {"errors": [{"code": exc.code, "message": str(exc)}]}
+        except (KeyError, TypeError, ValueError) as exc:
+            self._count("status_400")
+            return 400, {
+                "errors": [
+                    {"code": "Neo.ClientError.Statement.ArgumentError", "message": repr(exc)}
+                ]
+            }
+
+    def _authenticate(self, header: str | None) -> None:
+        if self.auth is None:
+            return
+        expected = "Basic " + base64.b64encode(":".join(self.auth).encode()).decode()
+        if header != expected:
+            raise QueryAPIError(
+                401, "Neo.ClientError.Security.Unauthorized", "The client is unauthorized."
+            )
+
+    def _inject_failure(self) -> None:
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise QueryAPIError(
+                503,
+                "Neo.TransientError.General.DatabaseUnavailable",
+                "Injected failure from the local Query API stand-in.",
+            )
+
+    def _delay(self) -> None:
+        with self._random_lock:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            if self._random.random() < self.tail_rate:
+                delay += self.tail_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # Statements --------------------------------------------------------------
+    def _execute(self, payload: Dict[str, Any], buffered: _WriteSet | None) -> Rows:
+        statement = payload.get("statement")
+        if not statement:
+            return []
+        params = payload.get("parameters") or {}
+        if payload.get("accessMode") == "READ" and self._write_handler(normalise(statement)):
+            raise QueryAPIError(
+                400,
+                "Neo.ClientError.Statement.AccessMode",
+                "Writing in read access mode not allowed.",
+            )
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self._delay()
+            return self._run(normalise(statement), params, buffered)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def _run(self, statement: str, params: Dict[str, Any], buffered: _WriteSet | None) -> Rows:
+        read = self._reads.get(statement)
+        if read is not None:
+            self._count("reads")
+            return read(self.graph, params)
+        if "db.index.vector.queryNodes" in statement or (
+            "vector.similarity.cosine" in statement and "$channels" in statement
+        ):
+            self._count("vector_searches")
+            return _vector_search(self.graph, params)
+        if statement.startswith(("CREATE CONSTRAINT", "CREATE INDEX", "CREATE VECTOR INDEX")) or (
+            statement.startswith("DROP INDEX")
+        ):
+            self._count("schema")
+            return []
+        if statement.startswith("SHOW INDEXES"):
+            self._count("schema")
+            return [
+                {
+                    "options": {
+                        "indexConfig": {
+                            "vector.dimensions": self.graph.embedding_dim,
+                            "vector.similarity_function": "cosine",
+                        }
+                    }
+                }
+            ]
+        if "EmbeddingMigration" in statement or "StorageLayout" in statement:
+            self._count("schema")
+            return []  # no migration or layout change recorded
+
+        handler = self._write_handler(statement)
+        if handler is None:
+            raise QueryAPIError(
+                400,
+                "Neo.ClientError.Statement.SyntaxError",
+                f"Statement not supported by the local stand-in: {statement[:120]}",
+            )
+        self._count("writes")
+        if buffered is not None:
+            return handler(buffered, params)
+        with self._write_lock:
+            writes = _WriteSet(self.graph)
+            rows = handler(writes, params)
+            writes.publish()
+        return rows
+
+    def _write_handler(self, statement: str) -> Callable[[_WriteSet, Dict[str, Any]], Rows] | None:
+        handler = self._writes.get(statement)
+        if handler is not None:
+            return handler
+        # Upserts vary with the embedding version, prefix property and layout.
+        if statement.startswith("UNWIND $rows AS row MERGE (a:Article"):
+            return _upsert_rows
+        if statement.startswith("MERGE (c:Channel"):  # n8n "Neo4j Upsert Article"
+            return _n8n_upsert
+        return None
+
+    @staticmethod
+    def _envelope(rows: Rows) -> Dict[str, Any]:
+        fields = list(rows[0]) if rows else []
+        return {
+            "data": {"fields": fields, "values": [[row.get(f) for f in fields] for row in rows]},
+            "bookmarks": [],
+        }
+
+    # Transactions ------------------------------------------------------------
+    def _begin(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        tx_id = uuid.uuid4().hex[:12]
+        with self._tx_lock:
+            self._expire()
+            self._transactions[tx_id] = {"statements": [], "touched": time.monotonic()}
+        self._count("transactions")
+        return self._in_transaction(tx_id, payload, False)
+
+    def _in_transaction(self, tx_id: str, payload: Dict[str, Any], commit: bool) -> Dict[str, Any]:
+        with self._tx_lock:
+            self._expire()
+            tx = self._transactions.get(tx_id)
+            if tx is None:
+                raise QueryAPIError(
+                    404,
+                    "Neo.ClientError.Transaction.TransactionNotFound",
+                    f"Transaction {tx_id} not found or expired.",
+                )
+            tx["touched"] = time.monotonic()
+        rows: Rows = []
+        statement = payload.get("statement")
+        if statement:
+            # Validate now so a bad statement fails where the client sent it;
+            # writes are replayed against a fresh snapshot at commit.
+            try:
+                rows = self._execute(payload, _WriteSet(self.graph))
+            except Exception:
+                # Like Neo4j, a failed statement rolls the whole transaction back.
+                with self._tx_lock:
+                    self._transactions.pop(tx_id, None)
+                raise
+            tx["statements"].append(payload)
+        body = self._envelope(rows)
+        if commit:
+            self._close_transaction(tx_id)
+            with self._write_lock:
+                writes = _WriteSet(self.graph)
+                for buffered in tx["statements"]:
+                    handler = self._write_handler(normalise(buffered["statement"]))
+                    if handler is not None:
+                        handler(writes, buffered.get("parameters") or {})
+                writes.publish()
+            self._count("commits")
+        else:
+            expires = datetime.utcnow() + timedelta(seconds=TRANSACTION_TTL_SECONDS)
+            body["transaction"] = {"id": tx_id, "expires": expires.isoformat() + "Z"}
+        return body
+
+
+    def _close_transaction(self, tx_id: str) -> None:
+        with self._tx_lock:
+            if self._transactions.pop(tx_id, None) is None:
+                raise QueryAPIError(
+                    404,
+                    "Neo.ClientError.Transaction.TransactionNotFound",
+                    f"Transaction {tx_id} not found or expired.",
+                )
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - TRANSACTION_TTL_SECONDS
+        for tx_id in [t for t, tx in self._transactions.items() if tx["touched"] < cutoff]:
+            del self._transactions[tx_id]
+            self._count("expired_transactions")
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+
+def serve_http(server: QueryAPIServer, host: str, port: int) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            self._dispatch("POST")
+
+        def do_DELETE(self) -> None:  # noqa: N802 - http.server API
+            self._dispatch("DELETE")
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            self._dispatch("GET")
+
+        def _dispatch(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            status, payload = server.handle(method, self.path, self.headers, body)
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return None
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(
+        f"Query API stand-in listening on http://{host}:{port}/db/neo4j/query/v2", file=sys.stderr
+    )
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Neo4j Query API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7475)
+    parser.add_argument("--dim", type=int, default=HashEmbeddingService().dimensions)
+    parser.add_argument("--seed", action="store_true", help="load the synthetic scenario articles")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="server time per statement")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra time")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of slow statements")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="extra time when slow")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument(
+        "--concurrency", type=int, default=0, help="statements in flight (0 = unbounded)"
+    )
+    parser.add_argument("--auth", help="require HTTP basic auth as user:password")
+    parser.add_argument("--random-seed", type=int, default=None)
+    args = parser.parse_args()
+
+    graph = ConcurrentKnowledgeGraph(args.dim)
+    if args.seed:
+        embedding_service = HashEmbeddingService(args.dim)
+        operations = []
+        for article in ScenarioRunner.synthetic_articles():
+            embedding = embedding_service.embed(article.body)
+            operations.append(("upsert_article", {"article": article, "embedding": embedding}))
+            operations.extend(
+                (op, {"article": article})
+                for op in ("attach_topics", "attach_entities", "attach_projects")
+            )
+        graph.write_batch(operations)
+    server = QueryAPIServer(
+        graph,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        error_rate=args.error_rate,
+        concurrency=args.concurrency,
+        auth=tuple(args.auth.split(":", 1)) if args.auth else None,
+        seed=args.random_seed,
+    )
+    try:
+        serve_http(server, args.host, args.port)
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Query-result cache for the knowledge graph read methods.
+
+The digest workflow, the posting agent and the MCP tools call the same handful
+of read queries (`weekly_digest`, `article_list_by_entity`, `vlm_projects`,
+`image_edit_news`) many times within minutes. `CachedKnowledgeGraph` wraps any
+graph backend, memoizes those reads with TTL + LRU bounds, and evicts entries
+through dependency tags whenever a write goes through the wrapper, so an upsert
+touching entity X only drops results that depend on X.
+
+The cache is per process: writes made by other processes (ingest_service, the
+n8n workflow) are only picked up when an entry expires, so readers that share
+the graph with other writers should keep `ttl_seconds` short.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Sequence, Tuple
+
+try:
+    from prototype import Article, canonical_entity_id, is_write_statement
+    from singleflight import copy_rows
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import Article, canonical_entity_id, is_write_statement
+    from .singleflight import copy_rows
+
+DIGEST_TAG = "digest"
+IMAGE_EDIT_TAG = "image_edit"
+IMAGE_EDIT_MARKER = "Image Edit"
+
+
+def entity_tag(name: str) -> str:
+    return f"entity:{canonical_entity_id(name)}"
+
+
+def project_topic_tag(topic: str) -> str:
+    return f"project_topic:{topic}"
+
+
+def article_dependency_tags(article: Article) -> set[str]:
+    """Tags of every cached read whose result may change when `article` is written."""
+    tags = {DIGEST_TAG}
+    tags.update(entity_tag(entity.name) for entity in article.entities)
+    for project in article.projects:
+        tags.update(project_topic_tag(topic) for topic in project.topics)
+    if any(IMAGE_EDIT_MARKER in topic for topic in article.topics):
+        tags.add(IMAGE_EDIT_TAG)
+    return tags
+
+
+def page_tags(name: str, params: Dict[str, Any]) -> set[str]:
+    """Tags of one `read_page` query, matching its one-shot read method."""
+    if name == "weekly_digest":
+        return {DIGEST_TAG}
+    if name == "article_list_by_entity":
+        return {entity_tag(str(params.get("entity") or ""))}
+    if name == "vlm_projects":
+        return {project_topic_tag(str(params.get("topic") or "Vision-Language Models"))}
+    return {IMAGE_EDIT_TAG}
+
+
+def merge_tags(groups: Iterable[Dict[str, Any]]) -> set[str]:
+    """Tags of every cached read an entity merge can change."""
+    tags = set()
+    for group in groups:
+        tags.add(entity_tag(group["name"]))
+        tags.update(entity_tag(name) for name in group.get("duplicates") or ())
+        # Reads by an alias resolve to the merged node from now on.
+        tags.update(entity_tag(name) for name in group.get("aliases") or ())
+    return tags
+
+
+@dataclass
+class _CacheEntry:
+    value: List[Dict[str, object]]
+    expires_at: float
+    tags: FrozenSet[str]
+
+
+class QueryResultCache:
+    """Thread-safe TTL + LRU cache with tag-based invalidation and hit/miss counters."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._tag_index: Dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Tuple[bool, List[Dict[str, object]] | None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry.expires_at <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, copy_rows(entry.value)
+
+    def put(
+        self,
+        key: Hashable,
+        value: Sequence[Dict[str, object]],
+        tags: Iterable[str],
+        generation: int | None = None,
+    ) -> bool:
+        """Store `value`; skipped if a write invalidated anything since `generation`."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            entry = _CacheEntry(
+                value=copy_rows(value),
+                expires_at=self._clock() + self.ttl_seconds,
+                tags=frozenset(tags),
+            )
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            self._generation += 1
+            keys: set[Hashable] = set()
+            for tag in tags:
+                keys.update(self._tag_index.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._tag_index[tag]
+
+
+class CachedKnowledgeGraph:
+    """Caching facade over any graph backend exposing the prototype read/write API.
+
+    Writes must go through this wrapper (or call `invalidate_article`) for the
+    cache to stay fresh; raw `run_cypher` writes conservatively clear it. Other
+    processes' writes are only seen once entries expire (see the module docstring).
+    """
+
+    def __init__(self, graph: Any, cache: QueryResultCache | None = None) -> None:
+        self.graph = graph
+        self.cache = cache or QueryResultCache()
+        # Tags each article was last written with, so edits that drop an entity
+        # or topic still evict the results that listed the old version.
+        self._article_tags: Dict[str, set[str]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    def close(self) -> None:
+        self.graph.close()
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.cache.stats()
+
+    # Reads -----------------------------------------------------------------
+    def weekly_digest(self, days: int = 7) -> List[Dict[str, object]]:
+        return self._cached(
+            ("weekly_digest", days), {DIGEST_TAG}, lambda: self.graph.weekly_digest(days)
+        )
+
+    def article_list_by_entity(
+        self, entity_name: str, days: int = 14
+    ) -> List[Dict[str, object]]:
+        return self._cached(
+            ("article_list_by_entity", canonical_entity_id(entity_name), days),
+            {entity_tag(entity_name)},
+            lambda: self.graph.article_list_by_entity(entity_name, days),
+        )
+
+    def vlm_projects(self, topic: str = "Vision-Language Models") -> List[Dict[str, object]]:
+        return self._cached(
+            ("vlm_projects", topic),
+            {project_topic_tag(topic)},
+            lambda: self.graph.vlm_projects(topic),
+        )
+
+    def image_edit_news(self) -> List[Dict[str, object]]:
+        return self._cached(
+            ("image_edit_news",), {IMAGE_EDIT_TAG}, self.graph.image_edit_news
+        )
+
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        params = dict(params or {})
+
+        def load() -> List[Dict[str, object]]:
+            rows, next_cursor = self.graph.read_page(name, params, cursor, limit)
+            return [{"rows": rows, "next_cursor": next_cursor}]
+
+        [page] = self._cached(
+            ("read_page", name, json.dumps(params, sort_keys=True, default=str), cursor, limit),
+            page_tags(name, params),
+            load,
+        )
+        return page["rows"], page["next_cursor"]  # type: ignore[return-value]
+
+    def find_similar_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        # Dedupe must always see the latest ingest, so vector search is never cached.
+        return self.graph.find_similar_articles(*args, **kwargs)
+
+    def run_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        records = self.graph.run_cypher(statement, parameters)
+        if is_write_statement(statement):
+            self.cache.clear()
+        return records
+
+    # Writes ----------------------------------------------------------------
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        operations = list(operations)
+        self.graph.write_batch(operations)
+        for op, payload in operations:
+            if op == "merge_entities":
+                self.cache.invalidate_tags(merge_tags(payload["groups"]))
+            elif "article" in payload:
+                self.invalidate_article(payload["article"])
+
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        self.graph.upsert_article(article, embedding)
+        self.invalidate_article(article)
+
+    def attach_topics(self, article: Article) -> None:
+        self.graph.attach_topics(article)
+        self.invalidate_article(article)
+
+    def attach_entities(self, article: Article) -> None:
+        self.graph.attach_entities(article)
+        self.invalidate_article(article)
+
+    def attach_projects(self, article: Article) -> None:
+        self.graph.attach_projects(article)
+        self.invalidate_article(article)
+
+    def create_similarity_links(
+        self, source_id: str, matches: List[Dict[str, object]]
+    ) -> None:
+        # SIMILAR_TO edges are not read by any cached query.
+        self.graph.create_similarity_links(source_id, matches)
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        self.graph.merge_entities(groups)
+        self.cache.invalidate_tags(merge_tags(groups))
+
+    def invalidate_article(self, article: Article) -> int:
+        tags = article_dependency_tags(article)
+        previous = self._article_tags.get(article.telegram_message_id, set())
+        self._article_tags[article.telegram_message_id] = tags
+        return self.cache.invalidate_tags(tags | previous)
+
+    def _cached(
+        self,
+        key: Tuple[Hashable, ...],
+        tags: set[str],
+        loader: Callable[[], List[Dict[str, object]]],
+    ) -> List[Dict[str, object]]:
+        hit, value = self.cache.get(key)
+        if hit:
+            return value  # type: ignore[return-value]
+        generation = self.cache.generation
+        records = loader()
+        self.cache.put(key, records, tags, generation=generation)
+        return records
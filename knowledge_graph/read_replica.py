@@ -0,0 +1,576 @@
+"""Warm in-process read replica of the Neo4j graph.
+
+Every agent read (digests, entity lists, dedupe vector search) is a round
+trip to Aura, so the network sets the latency floor. `ReadReplica` wraps a
+Neo4j backend (usually the `BackendRouter` from `build_graph_backend`) and
+keeps an `InMemoryKnowledgeGraph` copy of it:
+
+* `hydrate()` copies every article once, in keyset batches, into a fresh
+  `ConcurrentKnowledgeGraph` that then replaces the live one.
+* A background thread runs `sync_once()` every `sync_interval` seconds. It
+  pulls only the articles whose `updated_at` passed the watermark. Every
+  writer stamps `updated_at`, including attaches, similarity links and
+  entity merges. Each page is published as one batch, so readers never wait.
+* Reads run locally while the last successful sync started less than
+  `max_staleness` seconds ago. Otherwise they go to the source: the replica
+  is still hydrating, or Neo4j cannot be reached to sync.
+* Writes go to the source first and are then mirrored locally, so this
+  process reads its own writes (dedupe sees the post it just ingested).
+  Arbitrary `run_cypher` always goes to the source.
+
+The watermark comes from the server's clock, not ours. Each pass re-reads
+`overlap` seconds before it, to catch transactions that stamped
+`updated_at` before the last pass but committed after it. Re-applying an
+article is idempotent.
+
+With `snapshot_path`, the replica is saved (JSONL, written atomically)
+on `close()` and after `hydrate()`. A restart then loads it and syncs from
+its watermark instead of hydrating again. Deleted articles are not
+replicated, since no writer deletes them; run `hydrate()` to drop them.
+
+    replica = ReadReplica(build_graph_backend(config, dim), snapshot_path="replica.jsonl")
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+try:
+    from concurrent_graph import ConcurrentKnowledgeGraph
+    from prototype import (
+        Article,
+        EntityRef,
+        InMemoryKnowledgeGraph,
+        PagedReadsMixin,
+        ProjectRef,
+        decode_body,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .concurrent_graph import ConcurrentKnowledgeGraph
+    from .prototype import (
+        Article,
+        EntityRef,
+        InMemoryKnowledgeGraph,
+        PagedReadsMixin,
+        ProjectRef,
+        decode_body,
+    )
+
+SNAPSHOT_FORMAT = 1
+_EPOCH = datetime(1970, 1, 1)
+
+SERVER_CLOCK_CYPHER = "RETURN toString(datetime()) AS now"
+
+# One article per row with everything the in-memory graph stores. Articles
+# written by the n8n workflow keep text, channel, topics and entities in
+# their own properties, hence the fallbacks.
+_ARTICLE_ROWS_CYPHER = """
+{match}
+WITH a ORDER BY {order} LIMIT $limit
+OPTIONAL MATCH (a)-[:HAS_CONTENT]->(c:ArticleContent)
+OPTIONAL MATCH (a)-[:HAS_EMBEDDING]->(v:ArticleEmbedding)
+WITH a, c, v,
+     [(a)-[:ABOUT]->(t:Topic) | t.name] AS topics,
+     [(a)-[:MENTIONS]->(e:Entity) | {{name: e.name, type: e.type}}] AS entities
+RETURN a.telegram_message_id AS telegram_message_id,
+       a.title AS title,
+       coalesce(c.body, a.body, a.raw_text) AS body,
+       c.encoding AS body_encoding,
+       a.telegram_url AS telegram_url,
+       coalesce(a.source_channel, a.channel_username) AS source_channel,
+       coalesce(a.published_at, a.ingested_at, a.updated_at).epochMillis AS published_ms,
+       a.cta_text AS cta_text,
+       a.cta_link AS cta_link,
+       coalesce(v.{embedding}, a.{embedding}) AS embedding,
+       CASE WHEN size(topics) > 0 THEN topics ELSE coalesce(a.topics, []) END AS topics,
+       CASE WHEN size(entities) > 0 THEN entities ELSE
+            [i IN range(0, size(coalesce(a.entity_names, [])) - 1) |
+             {{name: a.entity_names[i], type: coalesce(a.entity_types[i], 'other')}}]
+       END AS entities,
+       [(a)-[:FEATURES]->(p:Project) | {{
+           name: p.name,
+           description: p.description,
+           topics: [(p)-[:ABOUT]->(pt:Topic) | pt.name]
+       }}] AS projects,
+       [(a)-[r:SIMILAR_TO]->(s:Article) | {{
+           telegram_message_id: s.telegram_message_id, score: r.score
+       }}] AS similar,
+       toString(a.updated_at) AS updated_at
+ORDER BY {order}
+"""
+
+HYDRATE_MATCH = "MATCH (a:Article) WHERE a.telegram_message_id > $after"
+HYDRATE_ORDER = "a.telegram_message_id"
+# `$overlap` only applies to the first page of a pass; later pages resume
+# from the last (updated_at, telegram_message_id) seen.
+CHANGES_MATCH = """
+WITH datetime($since) - duration({seconds: $overlap}) AS since
+MATCH (a:Article)
+WHERE a.updated_at > since OR (a.updated_at = since AND a.telegram_message_id > $after)
+"""
+CHANGES_ORDER = "a.updated_at, a.telegram_message_id"
+
+
+def article_rows_cypher(embedding_property: str, changes: bool) -> str:
+    return _ARTICLE_ROWS_CYPHER.format(
+        match=CHANGES_MATCH if changes else HYDRATE_MATCH,
+        order=CHANGES_ORDER if changes else HYDRATE_ORDER,
+        embedding=embedding_property,
+    )
+
+
+def _article_from_record(record: Dict[str, Any]) -> Article:
+    published_ms = record.get("published_ms")
+    return Article(
+        telegram_message_id=str(record["telegram_message_id"]),
+        title=record.get("title") or "",
+        body=decode_body(record.get("body"), record.get("body_encoding")) or "",
+        telegram_url=record.get("telegram_url") or "",
+        published_at=_EPOCH + timedelta(milliseconds=published_ms or 0),
+        source_channel=record.get("source_channel") or "",
+        topics=list(record.get("topics") or []),
+        entities=[
+            EntityRef(entity["name"], entity.get("type") or "other")
+            for entity in record.get("entities") or []
+            if entity.get("name")
+        ],
+        projects=[
+            ProjectRef(
+                project["name"], list(project.get("topics") or []), project.get("description")
+            )
+            for project in record.get("projects") or []
+        ],
+        cta_text=record.get("cta_text") or "",
+        cta_link=record.get("cta_link") or "",
+    )
+
+
+class ReadReplica(PagedReadsMixin):
+    """Serves reads from a synced in-memory copy of `source`; writes go to `source`."""
+
+    def __init__(
+        self,
+        source: Any,
+        max_staleness: float = 30.0,
+        sync_interval: float = 5.0,
+        overlap: float = 5.0,
+        batch_size: int = 500,
+        snapshot_path: Path | str | None = None,
+        local_factory: Callable[[], Any] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        start: bool = True,
+    ) -> None:
+        self.source = source
+        self.embedding_dim = source.embedding_dim
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.snapshot_path = Path(snapshot_path) if snapshot_path is not None else None
+        self._local_factory = local_factory or (
+            lambda: InMemoryKnowledgeGraph(
+                source.embedding_dim,
+                prefix_dim=source.prefix_dim,
+                compress_bodies=source.compress_bodies,
+            )
+        )
+        self._clock = clock
+        self.local: ConcurrentKnowledgeGraph | None = None
+        self.watermark: str | None = None  # server time of the last successful pass
+        self.synced_at: float | None = None  # our clock at the start of that pass
+        self._known: set[str] = set()
+        self._edges: set[Tuple[str, str]] = set()
+        self._pending_edges: Dict[Tuple[str, str], float] = {}
+        self._sync_lock = threading.Lock()
+        # Guards the id/edge bookkeeping shared by sync passes and mirrored writes.
+        self._state_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._syncer: threading.Thread | None = None
+        self._failing = False
+        self.local_reads = 0
+        self.source_reads = 0
+        self.synced_articles = 0
+        self.skipped_articles = 0  # no embedding yet; retried on their next update
+        if start:
+            self.start()
+
+    # Lifecycle ---------------------------------------------------------------
+    def start(self) -> None:
+        """Load the snapshot (or hydrate) and start the background sync thread."""
+        if self._syncer is not None:
+            return
+        if not (self.snapshot_path is not None and self.load_snapshot(self.snapshot_path)):
+            try:
+                self.hydrate()
+            except Exception as exc:  # noqa: BLE001 - the sync loop retries
+                print(f"[WARN] Read replica hydration failed ({exc}); reading from Neo4j.")
+        self._stop.clear()
+        self._syncer = threading.Thread(target=self._sync_loop, name="kg-read-replica", daemon=True)
+        self._syncer.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=self.sync_interval + 1)
+            self._syncer = None
+
+    def close(self) -> None:
+        self.stop()
+        if self.snapshot_path is not None and self.local is not None:
+            self.save_snapshot(self.snapshot_path)
+        if self.local is not None:
+            self.local.close()
+        self.source.close()
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                if self.local is None:
+                    self.hydrate()
+                else:
+                    self.sync_once()
+            except Exception as exc:  # noqa: BLE001 - reads fall back to the source
+                if not self._failing:
+                    print(f"[WARN] Read replica sync failed ({exc}); retrying.")
+                self._failing = True
+            else:
+                if self._failing:
+                    print("[INFO] Read replica sync recovered.")
+                self._failing = False
+
+    # Sync --------------------------------------------------------------------
+    def _server_now(self) -> str:
+        return self.source.run_cypher(SERVER_CLOCK_CYPHER)[0]["now"]
+
+    def hydrate(self) -> int:
+        """Copy every article into a fresh local graph and switch reads to it."""
+        with self._sync_lock:
+            started, now = self._clock(), self._server_now()
+            local = ConcurrentKnowledgeGraph(self.embedding_dim, self._local_factory)
+            known: set[str] = set()
+            edges: set[Tuple[str, str]] = set()
+            pending: Dict[Tuple[str, str], float] = {}
+            statement = article_rows_cypher(self.source.embedding_property, changes=False)
+            copied, cursor = 0, ""
+            while True:
+                records = self.source.run_cypher(
+                    statement, {"after": cursor, "limit": self.batch_size}
+                )
+                if not records:
+                    break
+                copied += self._apply(local, records, known, edges, pending)
+                cursor = records[-1]["telegram_message_id"]
+            # Before reads switch over, so no dedupe query pays for it.
+            local.compact_vectors()
+            retired = self.local
+            with self._state_lock:
+                self.local = local
+                self._known, self._edges, self._pending_edges = known, edges, pending
+            self.watermark, self.synced_at = now, started
+            if retired is not None:
+                retired.close()
+        print(f"[INFO] Read replica hydrated with {copied} articles.")
+        if self.snapshot_path is not None:
+            self.save_snapshot(self.snapshot_path)
+        return copied
+
+    def sync_once(self) -> int:
+        """Apply every article updated since the watermark; returns how many."""
+        with self._sync_lock:
+            if self.local is None or self.watermark is None:
+                raise RuntimeError("sync_once() before hydrate()")
+            started, now = self._clock(), self._server_now()
+            statement = article_rows_cypher(self.source.embedding_property, changes=True)
+            params = {"since": self.watermark, "overlap": self.overlap, "after": ""}
+            synced = 0
+            while True:
+                records = self.source.run_cypher(statement, {**params, "limit": self.batch_size})
+                if not records:
+                    break
+                synced += self._apply(
+                    self.local, records, self._known, self._edges, self._pending_edges
+                )
+                if len(records) < self.batch_size:
+                    break
+                last = records[-1]
+                params = {
+                    "since": last["updated_at"],
+                    "overlap": 0,
+                    "after": last["telegram_message_id"],
+                }
+            self.watermark, self.synced_at = now, started
+            return synced
+
+    def _apply(
+        self,
+        local: ConcurrentKnowledgeGraph,
+        records: Sequence[Dict[str, Any]],
+        known: set[str],
+        edges: set[Tuple[str, str]],
+        pending: Dict[Tuple[str, str], float],
+    ) -> int:
+        """Publish one page of source rows to `local` as a single batch."""
+        operations: List[Tuple[str, Dict[str, Any]]] = []
+        applied = 0
+        with self._state_lock:
+            for record in records:
+                embedding = record.get("embedding")
+                if not embedding or len(embedding) != self.embedding_dim:
+                    self.skipped_articles += 1
+                    continue
+                article = _article_from_record(record)
+                operations.append(("upsert_article", {"article": article, "embedding": embedding}))
+                for op in ("attach_topics", "attach_entities", "attach_projects"):
+                    operations.append((op, {"article": article}))
+                known.add(article.telegram_message_id)
+                for match in record.get("similar") or []:
+                    key = (article.telegram_message_id, str(match["telegram_message_id"]))
+                    if key not in edges:
+                        pending[key] = float(match.get("score") or 0.0)
+                applied += 1
+            operations.extend(self._ready_edges(known, edges, pending))
+        if operations:
+            local.write_batch(operations)
+        self.synced_articles += applied
+        return applied
+
+    @staticmethod
+    def _ready_edges(
+        known: set[str], edges: set[Tuple[str, str]], pending: Dict[Tuple[str, str], float]
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """Similarity links whose both ends are local; the rest wait for their target."""
+        ready: Dict[str, List[Dict[str, object]]] = {}
+        for key in [key for key in pending if key[0] in known and key[1] in known]:
+            edges.add(key)
+            ready.setdefault(key[0], []).append(
+                {"telegram_message_id": key[1], "score": pending.pop(key)}
+            )
+        return [
+            ("create_similarity_links", {"source_id": source_id, "matches": matches})
+            for source_id, matches in ready.items()
+        ]
+
+    # Staleness -----------------------------------------------------------------
+    def staleness(self) -> float:
+        """Seconds since the last successful pass started (inf before hydration)."""
+        if self.synced_at is None:
+            return float("inf")
+        return self._clock() - self.synced_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.local is not None and self.staleness() <= self.max_staleness
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "articles": len(self._known),
+            "watermark": self.watermark,
+            "staleness_s": self.staleness(),
+            "fresh": self.fresh,
+            "local_reads": self.local_reads,
+            "source_reads": self.source_reads,
+            "synced_articles": self.synced_articles,
+            "skipped_articles": self.skipped_articles,
+        }
+
+    # Writes ------------------------------------------------------------------
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write to the source, then mirror what the local graph can hold."""
+        operations = list(operations)
+        self.source.write_batch(operations)
+        local = self.local
+        if local is None:
+            return
+        mirrored: List[Tuple[str, Dict[str, Any]]] = []
+        with self._state_lock:
+            for op, payload in operations:
+                if op == "upsert_article":
+                    self._known.add(payload["article"].telegram_message_id)
+                    mirrored.append((op, payload))
+                elif op == "create_similarity_links":
+                    for match in payload["matches"]:
+                        key = (payload["source_id"], str(match["telegram_message_id"]))
+                        if key not in self._edges:
+                            self._pending_edges[key] = float(match["score"])
+                elif payload["article"].telegram_message_id in self._known:
+                    mirrored.append((op, payload))
+            mirrored.extend(self._ready_edges(self._known, self._edges, self._pending_edges))
+        try:
+            local.write_batch(mirrored)
+        except Exception as exc:  # noqa: BLE001 - the next sync repairs the replica
+            print(f"[WARN] Read replica could not mirror a write ({exc}); resyncing.")
+
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        self.write_batch([("upsert_article", {"article": article, "embedding": embedding})])
+
+    def attach_topics(self, article: Article) -> None:
+        self.write_batch([("attach_topics", {"article": article})])
+
+    def attach_entities(self, article: Article) -> None:
+        self.write_batch([("attach_entities", {"article": article})])
+
+    def attach_projects(self, article: Article) -> None:
+        self.write_batch([("attach_projects", {"article": article})])
+
+    def create_similarity_links(self, source_id: str, matches: List[Dict[str, object]]) -> None:
+        self.write_batch(
+            [("create_similarity_links", {"source_id": source_id, "matches": list(matches)})]
+        )
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        groups = list(groups)
+        self.source.merge_entities(groups)
+        if self.local is not None:
+            self.local.merge_entities(groups)
+
+    def run_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        return self.source.run_cypher(statement, parameters)
+
+    # Reads -------------------------------------------------------------------
+    def _read(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        local = self.local
+        if local is not None and self.fresh:
+            self.local_reads += 1
+            return getattr(local, name)(*args, **kwargs)
+        self.source_reads += 1
+        return getattr(self.source, name)(*args, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def get_article(self, telegram_message_id: str) -> Article | None:
+        return self._read("get_article", telegram_message_id)
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        return self._read("article_body", telegram_message_id)
+
+    def get_embedding(self, telegram_message_id: str) -> List[float] | None:
+        return self._read("get_embedding", telegram_message_id)
+
+    def find_similar_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("find_similar_articles", *args, **kwargs)
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        return self._read("list_entities")
+
+    def filter_articles(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("filter_articles", *args, **kwargs)
+
+    def weekly_digest(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("weekly_digest", *args, **kwargs)
+
+    def article_list_by_entity(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("article_list_by_entity", *args, **kwargs)
+
+    def articles_by_domain(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("articles_by_domain", *args, **kwargs)
+
+    def vlm_projects(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        return self._read("vlm_projects", *args, **kwargs)
+
+    def image_edit_news(self) -> List[Dict[str, object]]:
+        return self._read("image_edit_news")
+
+    def read_page(self, *args: Any, **kwargs: Any) -> Tuple[List[Dict[str, object]], str | None]:
+        return self._read("read_page", *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything else (health(), backfill_links(), ...) belongs to the source.
+        return getattr(self.source, name)
+
+    # Snapshot ----------------------------------------------------------------
+    def save_snapshot(self, path: Path | str) -> None:
+        """Write the local graph and watermark as JSONL; replaced atomically."""
+        path = Path(path)
+        with self._sync_lock:
+            local, watermark = self.local, self.watermark
+            if local is None or watermark is None:
+                return
+            with self._state_lock:
+                known = sorted(self._known)
+                edges = sorted(self._edges)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with local.snapshot() as graph, tmp_path.open("w", encoding="utf-8") as handle:
+            header = {
+                "format": SNAPSHOT_FORMAT,
+                "watermark": watermark,
+                "embedding_dim": self.embedding_dim,
+                "embedding_property": self.source.embedding_property,
+            }
+            handle.write(json.dumps(header) + "\n")
+            scores = {
+                (edge["source"], edge["target"]): edge["score"] for edge in graph.similarity_edges
+            }
+            for telegram_message_id in known:
+                article = graph.get_article(telegram_message_id)
+                if article is None:
+                    continue
+                entry = {
+                    "article": article.to_dict(),
+                    "embedding": graph.get_embedding(telegram_message_id),
+                }
+                handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            for source_id, target_id in edges:
+                score = scores.get((source_id, target_id), 0.0)
+                handle.write(json.dumps({"edge": [source_id, target_id, score]}) + "\n")
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: Path | str) -> bool:
+        """Replace the local graph with a saved one; False if missing or incompatible."""
+        path = Path(path)
+        if not path.exists():
+            return False
+        try:
+            with path.open(encoding="utf-8") as handle:
+                header = json.loads(handle.readline())
+                if (
+                    header.get("format") != SNAPSHOT_FORMAT
+                    or header.get("embedding_dim") != self.embedding_dim
+                    or header.get("embedding_property") != self.source.embedding_property
+                ):
+                    print(f"[INFO] Ignoring read replica snapshot {path} from another setup.")
+                    return False
+                local = ConcurrentKnowledgeGraph(self.embedding_dim, self._local_factory)
+                known: set[str] = set()
+                edges: set[Tuple[str, str]] = set()
+                pending: Dict[Tuple[str, str], float] = {}
+                operations: List[Tuple[str, Dict[str, Any]]] = []
+                for line in handle:
+                    entry = json.loads(line)
+                    if "edge" in entry:
+                        source_id, target_id, score = entry["edge"]
+                        pending[(source_id, target_id)] = score
+                        continue
+                    article = Article.from_dict(entry["article"])
+                    known.add(article.telegram_message_id)
+                    operations.append(
+                        ("upsert_article", {"article": article, "embedding": entry["embedding"]})
+                    )
+                    for op in ("attach_topics", "attach_entities", "attach_projects"):
+                        operations.append((op, {"article": article}))
+                operations.extend(self._ready_edges(known, edges, pending))
+                local.write_batch(operations)
+                local.compact_vectors()
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"[WARN] Ignoring unreadable read replica snapshot {path}: {exc}")
+            return False
+        with self._sync_lock, self._state_lock:
+            self.local = local
+            self._known, self._edges, self._pending_edges = known, edges, pending
+            self.watermark = header["watermark"]
+            # Unknown age until the first pass; reads use the source until then.
+            self.synced_at = None
+        try:
+            self.sync_once()
+        except Exception as exc:  # noqa: BLE001 - the sync loop retries
+            print(f"[WARN] Read replica catch-up sync failed ({exc}); reading from Neo4j.")
+        print(f"[INFO] Read replica loaded {len(known)} articles from {path}.")
+        return True
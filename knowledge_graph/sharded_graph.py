@@ -0,0 +1,355 @@
+"""Channel-partitioned in-memory graph.
+
+`ShardedKnowledgeGraph` keeps one `InMemoryKnowledgeGraph` (columns,
+postings, embedding matrix) per `Article.source_channel`, each behind its own
+lock, so a channel's data can be dropped, persisted or rebuilt on its own:
+
+* writes route to the article's shard; `write_batch` applies a mixed batch
+  one channel slice at a time;
+* `find_similar_articles(..., channels=[...])` only scores those shards, and
+  without `channels` visits all of them and merges the per-shard top-k;
+* paged, faceted and domain reads merge the shards' keyset-ordered pages, so
+  results match what a single graph holding every article would return.
+
+It is not faster than the single graph: `InMemoryKnowledgeGraph` already
+scopes dedupe to a channel through its channel postings, and every cross-shard
+read pays one call per shard (see benchmarks/bench_sharded_graph.py). Shards
+are visited in turn; a thread pool only added hand-off cost, since scoring
+holds the GIL. For the same reason cold vector weeks are compacted by one
+background thread that walks the shards, not by a compactor per shard.
+`ingest_service.py --per-channel` therefore uses the single graph.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+try:
+    from prototype import (
+        Article,
+        InMemoryKnowledgeGraph,
+        PagedReadsMixin,
+        PageKey,
+        encode_cursor,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import (
+        Article,
+        InMemoryKnowledgeGraph,
+        PagedReadsMixin,
+        PageKey,
+        encode_cursor,
+    )
+
+
+class _Shard:
+    __slots__ = ("channel", "graph", "lock")
+
+    def __init__(self, channel: str, graph: InMemoryKnowledgeGraph) -> None:
+        self.channel = channel
+        self.graph = graph
+        self.lock = threading.RLock()
+
+
+class ShardedKnowledgeGraph(PagedReadsMixin):
+    """One `InMemoryKnowledgeGraph` per source channel behind the usual graph API."""
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        body_dir: Path | str | None = None,
+        prefix_dim: int | None = None,
+    ) -> None:
+        self.embedding_dim = embedding_dim
+        self.prefix_dim = prefix_dim
+        self.body_dir = Path(body_dir) if body_dir is not None else None
+        self._shards: Dict[str, _Shard] = {}
+        self._homes: Dict[str, str] = {}  # telegram_message_id -> shard channel
+        self._lock = threading.Lock()
+        # SIMILAR_TO edges whose endpoints live in different shards.
+        self._cross_edges: List[Dict[str, object]] = []
+        self._compactor: threading.Thread | None = None
+        self._compaction_due = False
+
+    def close(self) -> None:
+        for shard in list(self._shards.values()):
+            shard.graph.close()
+
+    def __len__(self) -> int:
+        return sum(len(shard.graph) for shard in list(self._shards.values()))
+
+    @property
+    def channels(self) -> List[str]:
+        return sorted(self._shards)
+
+    def shard(self, channel: str) -> InMemoryKnowledgeGraph | None:
+        shard = self._shards.get(channel)
+        return shard.graph if shard is not None else None
+
+    def _shard_for(self, channel: str) -> _Shard:
+        shard = self._shards.get(channel)
+        if shard is not None:
+            return shard
+        with self._lock:
+            shard = self._shards.get(channel)
+            if shard is None:
+                body_path = None
+                if self.body_dir is not None:
+                    self.body_dir.mkdir(parents=True, exist_ok=True)
+                    body_path = self.body_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', channel)}.bodies"
+                graph = InMemoryKnowledgeGraph(self.embedding_dim, body_path, self.prefix_dim)
+                graph.vector_buckets.background_compaction = False
+                shard = _Shard(channel, graph)
+                self._shards[channel] = shard
+            return shard
+
+    def compact_vectors(self) -> int:
+        """Compact cold vector weeks of every shard now, one shard at a time."""
+        self._compaction_due = False
+        return sum(shard.graph.compact_vectors() for shard in list(self._shards.values()))
+
+    def _compact_in_background(self) -> None:
+        with self._lock:
+            if not self._compaction_due:
+                return
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self.compact_vectors, name="kg-shard-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    def _home(self, article: Article) -> _Shard:
+        self._compaction_due = True
+        channel = self._homes.get(article.telegram_message_id)
+        if channel is None:
+            channel = self._homes.setdefault(article.telegram_message_id, article.source_channel)
+        elif channel != article.source_channel:
+            print(
+                f"[WARN] Article {article.telegram_message_id} moved from {channel} to "
+                f"{article.source_channel}; keeping it in the {channel} shard."
+            )
+        return self._shard_for(channel)
+
+    def _selected(self, channels: Sequence[str] | None) -> List[_Shard]:
+        if channels:
+            return [self._shards[channel] for channel in channels if channel in self._shards]
+        return list(self._shards.values())
+
+    def _fan_out(self, shards: Sequence[_Shard], call: Callable[[_Shard], Any]) -> List[Any]:
+        results = []
+        for shard in shards:
+            with shard.lock:
+                results.append(call(shard))
+        return results
+
+    # Writes ----------------------------------------------------------------
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        shard = self._home(article)
+        with shard.lock:
+            shard.graph.upsert_article(article, embedding)
+
+    def attach_topics(self, article: Article) -> None:
+        shard = self._home(article)
+        with shard.lock:
+            shard.graph.attach_topics(article)
+
+    def attach_entities(self, article: Article) -> None:
+        shard = self._home(article)
+        with shard.lock:
+            shard.graph.attach_entities(article)
+
+    def attach_projects(self, article: Article) -> None:
+        shard = self._home(article)
+        with shard.lock:
+            shard.graph.attach_projects(article)
+
+    def create_similarity_links(self, source_id: str, matches: List[Dict[str, object]]) -> None:
+        channel = self._homes[source_id]
+        local = [m for m in matches if self._homes.get(str(m["telegram_message_id"])) == channel]
+        if local:
+            shard = self._shards[channel]
+            with shard.lock:
+                shard.graph.create_similarity_links(source_id, local)
+        timestamp = datetime.utcnow().isoformat()
+        with self._lock:
+            self._cross_edges.extend(
+                {
+                    "source": source_id,
+                    "target": str(match["telegram_message_id"]),
+                    "score": float(match["score"]),
+                    "timestamp": timestamp,
+                }
+                for match in matches
+                if self._homes.get(str(match["telegram_message_id"])) != channel
+            )
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Apply each channel's slice of `operations` in order."""
+        groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for op, payload in operations:
+            if op == "create_similarity_links":
+                channel = self._homes[payload["source_id"]]
+            else:
+                channel = self._home(payload["article"]).channel
+            groups.setdefault(channel, []).append((op, payload))
+
+        for channel, slice_ in groups.items():
+            shard = self._shards[channel]
+            for op, payload in slice_:
+                if op == "create_similarity_links":
+                    self.create_similarity_links(payload["source_id"], payload["matches"])
+                    continue
+                with shard.lock:
+                    if op == "upsert_article":
+                        shard.graph.upsert_article(payload["article"], payload["embedding"])
+                    else:
+                        getattr(shard.graph, op)(payload["article"])
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        self._fan_out(self._selected(None), lambda shard: shard.graph.merge_entities(groups))
+
+    @property
+    def similarity_edges(self) -> List[Dict[str, object]]:
+        edges: List[Dict[str, object]] = []
+        for shard_edges in self._fan_out(
+            self._selected(None), lambda shard: shard.graph.similarity_edges
+        ):
+            edges.extend(shard_edges)
+        with self._lock:
+            edges.extend(dict(edge) for edge in self._cross_edges)
+        return edges
+
+    # Reads -----------------------------------------------------------------
+    def get_article(self, telegram_message_id: str) -> Article | None:
+        channel = self._homes.get(telegram_message_id)
+        if channel is None:
+            return None
+        shard = self._shards[channel]
+        with shard.lock:
+            return shard.graph.get_article(telegram_message_id)
+
+    def article_body(self, telegram_message_id: str) -> str | None:
+        channel = self._homes.get(telegram_message_id)
+        if channel is None:
+            return None
+        shard = self._shards[channel]
+        with shard.lock:
+            return shard.graph.article_body(telegram_message_id)
+
+    def get_embedding(self, telegram_message_id: str) -> List[float] | None:
+        channel = self._homes.get(telegram_message_id)
+        if channel is None:
+            return None
+        shard = self._shards[channel]
+        with shard.lock:
+            return shard.graph.get_embedding(telegram_message_id)
+
+    def find_similar_articles(
+        self,
+        embedding: Sequence[float],
+        telegram_message_id: str,
+        limit: int = 5,
+        min_score: float = 0.88,
+        channels: Sequence[str] | None = None,
+    ) -> List[Dict[str, object]]:
+        """Per-shard top-`limit`, merged; `channels` restricts which shards are scanned."""
+        results = self._fan_out(
+            self._selected(channels),
+            lambda shard: shard.graph.find_similar_articles(
+                embedding, telegram_message_id, limit, min_score
+            ),
+        )
+        self._compact_in_background()
+        return heapq.nlargest(
+            limit, (record for records in results for record in records), key=itemgetter("score")
+        )
+
+    def list_entities(self) -> List[Dict[str, object]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for records in self._fan_out(self._selected(None), lambda shard: shard.graph.list_entities()):
+            for record in records:
+                current = merged.get(record["id"])
+                if current is None:
+                    merged[record["id"]] = {**record, "aliases": list(record["aliases"])}
+                    continue
+                if record["mentions"] > current["mentions"]:
+                    current["name"], current["type"] = record["name"], record["type"]
+                current["mentions"] += record["mentions"]
+                current["aliases"].extend(
+                    alias for alias in record["aliases"] if alias not in current["aliases"]
+                )
+        return sorted(merged.values(), key=lambda record: record["mentions"], reverse=True)
+
+    def _merged(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        cursor: str | None = None,
+        limit: int | None = None,
+        channels: Sequence[str] | None = None,
+    ) -> List[Tuple[PageKey, Dict[str, object]]]:
+        pages = self._fan_out(
+            self._selected(channels),
+            lambda shard: shard.graph.keyed_page(name, params, cursor, limit),
+        )
+        return list(islice(heapq.merge(*pages, key=itemgetter(0), reverse=True), limit))
+
+    def read_page(
+        self,
+        name: str,
+        params: Dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, object]], str | None]:
+        page = self._merged(name, params or {}, cursor, limit)
+        next_cursor = encode_cursor(page[-1][0]) if page and len(page) == limit else None
+        return [row for _, row in page], next_cursor
+
+    def filter_articles(
+        self,
+        topics: Sequence[str] = (),
+        any_topics: Sequence[str] = (),
+        exclude_topics: Sequence[str] = (),
+        entities: Sequence[str] = (),
+        days: int | None = 30,
+        limit: int = 10,
+        channels: Sequence[str] | None = None,
+    ) -> List[Dict[str, object]]:
+        params = {
+            "topics": topics,
+            "any_topics": any_topics,
+            "exclude_topics": exclude_topics,
+            "entities": entities,
+            "days": days,
+        }
+        return [row for _, row in self._merged("filter_articles", params, None, limit, channels)]
+
+    def weekly_digest(self, days: int = 7) -> List[Dict[str, object]]:
+        return [row for _, row in self._merged("weekly_digest", {"days": days})]
+
+    def article_list_by_entity(self, entity_name: str, days: int = 14) -> List[Dict[str, object]]:
+        params = {"entity": entity_name, "days": days}
+        return [row for _, row in self._merged("article_list_by_entity", params)]
+
+    def articles_by_domain(
+        self,
+        domain: str,
+        days: int | None = None,
+        limit: int = 50,
+        cta_only: bool = False,
+    ) -> List[Dict[str, object]]:
+        params = {"domain": domain, "days": days, "cta_only": cta_only}
+        return [row for _, row in self._merged("articles_by_domain", params, None, limit)]
+
+    def vlm_projects(self, topic: str = "Vision-Language Models") -> List[Dict[str, object]]:
+        return [row for _, row in self._merged("vlm_projects", {"topic": topic})]
+
+    def image_edit_news(self) -> List[Dict[str, object]]:
+        return [row for _, row in self._merged("image_edit_news", {})]
@@ -0,0 +1,113 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+A post forwarded to several channels is embedded once per channel, and the
+digest agent's parallel tool calls run the same Cypher side by side, so the
+same upstream request is often in flight several times at once. A
+`SingleFlight` group lets the first caller for a key (the leader) make the
+call while concurrent callers with the same key wait for it and share its
+result or exception. Nothing is cached: once the call returns the key is
+forgotten, so the next caller goes upstream again.
+
+Keys are `embedding_key(model, text)` for `GeminiEmbeddingService.embed` and
+`query_key(statement, parameters)` for read statements in
+`KnowledgeGraphBase.run_cypher`; writes are never coalesced. Waiters receive
+a copy of the leader's result, so a caller mutating its rows cannot affect
+another. `stats()` reports how many calls were coalesced.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+def embedding_key(model: str, text: str) -> tuple:
+    return ("embed", model, _hash(text))
+
+
+def query_key(statement: str, parameters: Dict[str, Any] | None) -> tuple:
+    """(statement fingerprint, parameters hash); whitespace does not change the fingerprint."""
+    fingerprint = _hash(" ".join(statement.split()))
+    params = json.dumps(parameters or {}, sort_keys=True, default=str, separators=(",", ":"))
+    return ("cypher", fingerprint, _hash(params))
+
+
+def copy_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows a caller may mutate freely: nested lists/dicts (e.g. `topics`) are copied too."""
+    return [
+        {
+            key: copy.deepcopy(value) if isinstance(value, (list, dict, set)) else value
+            for key, value in row.items()
+        }
+        for row in rows
+    ]
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe group of in-flight calls keyed by `Hashable` keys."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Any],
+        copy: Callable[[Any], Any] | None = None,
+    ) -> Any:
+        """Run `call` unless an identical one is in flight; then share its outcome."""
+        with self._lock:
+            self.calls += 1
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Call()
+                self.upstream_calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy(flight.result) if copy is not None else flight.result
+        try:
+            flight.result = call()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / self.calls if self.calls else 0.0,
+                "in_flight": len(self._calls),
+            }
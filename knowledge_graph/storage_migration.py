@@ -0,0 +1,259 @@
+"""Move article vectors and bodies off the `(:Article)` node.
+
+Every metadata read (digests, entity lists, paging, dedupe candidates) loads
+the Article node, and with a 3072-float `embedding` and the full post `body`
+inline, most of the bytes paged through the cache are never returned. The
+split layout keeps only metadata on the Article:
+
+    (:Article)-[:HAS_EMBEDDING]->(:ArticleEmbedding {telegram_message_id, embedding})
+    (:Article)-[:HAS_CONTENT]->(:ArticleContent {telegram_message_id, body, encoding})
+
+The vector index moves to `ArticleEmbedding` (`article_embedding_node_idx`),
+so vector search is one extra hop from the hit back to its Article, and the
+body is read only by `article_body()`. With compression, bodies of at least
+`BODY_COMPRESS_MIN_BYTES` are stored zlib+base64 (`encoding` says which).
+
+`SplitStorageMigration` moves an existing graph in three steps:
+
+1. `start()` creates the constraints and the ArticleEmbedding vector index.
+2. `backfill()` copies vectors (inside the database) and bodies (compressed
+   here) onto the new nodes in keyset batches. It only picks articles
+   without a content node, so it can stop and rerun anywhere.
+3. `cutover()` runs a last backfill pass, waits for the new index to be
+   ONLINE and writes the `(:StorageLayout)` marker that `build_graph_backend`
+   follows at startup. Restart ingest processes afterwards, and rerun the
+   backfill for anything they wrote inline in between.
+
+`finalize()` then strips the inline properties (moving any written since)
+and drops the old indexes. n8n workflows still write the inline layout;
+rerunning this script picks those articles up.
+
+    python storage_migration.py --batch-size 500 [--no-compress] [--finalize]
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, List
+
+try:
+    from prototype import (
+        CONTENT_LABEL,
+        EMBEDDING_LABEL,
+        SPLIT_VECTOR_INDEX_NAME,
+        STORAGE_LAYOUT_ID,
+        VECTOR_INDEX_NAME,
+        EnvConfig,
+        GeminiEmbeddingService,
+        StartupCache,
+        build_graph_backend,
+        encode_body,
+        prefix_target,
+        split_storage_schema,
+        vector_index_cypher,
+    )
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .prototype import (
+        CONTENT_LABEL,
+        EMBEDDING_LABEL,
+        SPLIT_VECTOR_INDEX_NAME,
+        STORAGE_LAYOUT_ID,
+        VECTOR_INDEX_NAME,
+        EnvConfig,
+        GeminiEmbeddingService,
+        StartupCache,
+        build_graph_backend,
+        encode_body,
+        prefix_target,
+        split_storage_schema,
+        vector_index_cypher,
+    )
+
+SAVE_LAYOUT_CYPHER = """
+MERGE (l:StorageLayout {id: $id})
+SET l.layout = 'split', l.compress_bodies = $compress_bodies, l.updated_at = datetime()
+"""
+
+
+class SplitStorageMigration:
+    """Resumable batched move from the inline Article layout to the split one."""
+
+    def __init__(self, graph: Any, batch_size: int = 500, compress_bodies: bool = True) -> None:
+        if graph.vector_index_name not in (VECTOR_INDEX_NAME, SPLIT_VECTOR_INDEX_NAME):
+            raise ValueError(
+                f"Vectors live under {graph.vector_index_name}; finish (and finalize) the "
+                "embedding migration before splitting storage."
+            )
+        self.graph = graph
+        self.batch_size = batch_size
+        self.compress_bodies = compress_bodies
+        self.embedding_property = graph.embedding_property
+        self.prefix_property: str | None = None
+        self.moved = 0
+        if graph.prefix_dim:
+            self.prefix_property, _ = prefix_target(
+                self.embedding_property, VECTOR_INDEX_NAME, graph.prefix_dim
+            )
+
+    def start(self) -> None:
+        """Create the split-layout constraints and vector indexes."""
+        for statement in split_storage_schema():
+            self.graph.run_cypher(statement)
+        self.graph.run_cypher(
+            vector_index_cypher(
+                SPLIT_VECTOR_INDEX_NAME,
+                self.embedding_property,
+                self.graph.embedding_dim,
+                EMBEDDING_LABEL,
+            )
+        )
+        if self.prefix_property:
+            _, prefix_index = prefix_target(
+                self.embedding_property, SPLIT_VECTOR_INDEX_NAME, self.graph.prefix_dim
+            )
+            self.graph.run_cypher(
+                vector_index_cypher(
+                    prefix_index, self.prefix_property, self.graph.prefix_dim, EMBEDDING_LABEL
+                )
+            )
+
+    # Backfill --------------------------------------------------------------
+    def _pending_cypher(self, strip: bool) -> str:
+        if strip:
+            condition = f"(a.body IS NOT NULL OR a.{self.embedding_property} IS NOT NULL)"
+        else:
+            condition = f"NOT (a)-[:HAS_CONTENT]->(:{CONTENT_LABEL})"
+        return f"""
+        MATCH (a:Article)
+        WHERE a.telegram_message_id > $after AND {condition}
+        RETURN a.telegram_message_id AS telegram_message_id, a.body AS body
+        ORDER BY a.telegram_message_id
+        LIMIT $limit
+        """
+
+    def _move_cypher(self, strip: bool) -> str:
+        copied = f"v.{self.embedding_property} = a.{self.embedding_property}"
+        removed = f"a.{self.embedding_property}"
+        if self.prefix_property:
+            copied += f", v.{self.prefix_property} = a.{self.prefix_property}"
+            removed += f", a.{self.prefix_property}"
+        # A null row.body means the content node is already current (finalize
+        # pass over an article that only had its vector rewritten inline).
+        return f"""
+        UNWIND $rows AS row
+        MATCH (a:Article {{telegram_message_id: row.telegram_message_id}})
+        MERGE (c:{CONTENT_LABEL} {{telegram_message_id: row.telegram_message_id}})
+        SET c.body = coalesce(row.body, c.body),
+            c.encoding = CASE WHEN row.body IS NULL THEN c.encoding ELSE row.encoding END
+        MERGE (a)-[:HAS_CONTENT]->(c)
+        {"REMOVE a.body" if strip else ""}
+        WITH a, row WHERE a.{self.embedding_property} IS NOT NULL
+        MERGE (v:{EMBEDDING_LABEL} {{telegram_message_id: row.telegram_message_id}})
+        SET {copied}
+        MERGE (a)-[:HAS_EMBEDDING]->(v)
+        {f"REMOVE {removed}" if strip else ""}
+        """
+
+    def _pass(self, strip: bool = False) -> int:
+        """Move every pending article once, in keyset batches; returns how many moved."""
+        moved, cursor = 0, ""
+        while True:
+            records = self.graph.run_cypher(
+                self._pending_cypher(strip), {"after": cursor, "limit": self.batch_size}
+            )
+            if not records:
+                return moved
+            rows: List[Dict[str, Any]] = []
+            for record in records:
+                body, encoding = (None, None)
+                if record.get("body") is not None:
+                    body, encoding = encode_body(record["body"], self.compress_bodies)
+                rows.append(
+                    {
+                        "telegram_message_id": record["telegram_message_id"],
+                        "body": body,
+                        "encoding": encoding,
+                    }
+                )
+            self.graph.run_cypher(self._move_cypher(strip), {"rows": rows})
+            cursor = records[-1]["telegram_message_id"]
+            moved += len(rows)
+            self.moved += len(rows)
+
+    def backfill(self) -> int:
+        return self._pass()
+
+    def index_state(self) -> str | None:
+        records = self.graph.run_cypher(
+            "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state",
+            {"name": SPLIT_VECTOR_INDEX_NAME},
+        )
+        return records[0]["state"] if records else None
+
+    # Cutover ---------------------------------------------------------------
+    def cutover(self) -> bool:
+        """Flip reads and writes to the split layout once every article is moved."""
+        self.backfill()
+        state = self.index_state()
+        if state != "ONLINE":
+            print(f"[INFO] Not cutting over yet: index {SPLIT_VECTOR_INDEX_NAME} is {state}.")
+            return False
+        self.graph.run_cypher(
+            SAVE_LAYOUT_CYPHER, {"id": STORAGE_LAYOUT_ID, "compress_bodies": self.compress_bodies}
+        )
+        self.graph.use_split_storage(self.compress_bodies)
+        print(f"[INFO] Article vectors and bodies now read from {EMBEDDING_LABEL}/{CONTENT_LABEL}.")
+        return True
+
+    def finalize(self) -> int:
+        """After cutover: strip inline bodies/vectors and drop the Article vector indexes."""
+        if not self.graph.split_storage:
+            raise RuntimeError("finalize() before cutover() would remove the live vectors.")
+        stripped = self._pass(strip=True)
+        self.graph.run_cypher(f"DROP INDEX {VECTOR_INDEX_NAME} IF EXISTS")
+        if self.prefix_property:
+            _, prefix_index = prefix_target(
+                self.embedding_property, VECTOR_INDEX_NAME, self.graph.prefix_dim
+            )
+            self.graph.run_cypher(f"DROP INDEX {prefix_index} IF EXISTS")
+        return stripped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move article vectors and bodies to their own nodes"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--no-compress", action="store_true", help="store bodies uncompressed")
+    parser.add_argument(
+        "--finalize", action="store_true", help="after cutover, strip the inline properties"
+    )
+    args = parser.parse_args()
+
+    config = EnvConfig()
+    startup_cache = StartupCache.from_env()
+    service = GeminiEmbeddingService(
+        config.gemini_api_key,
+        config.embedding_model,
+        dimensions=config.embedding_dimensions,
+        startup_cache=startup_cache,
+    )
+    graph = build_graph_backend(config, service.dimensions, startup_cache)
+    try:
+        migration = SplitStorageMigration(
+            graph, batch_size=args.batch_size, compress_bodies=not args.no_compress
+        )
+        migration.start()
+        done = migration.cutover()
+        print(f"Moved {migration.moved} articles to the split layout.")
+        if done and args.finalize:
+            stripped = migration.finalize()
+            print(
+                f"Stripped inline properties from {stripped} articles; "
+                f"dropped {VECTOR_INDEX_NAME}."
+            )
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
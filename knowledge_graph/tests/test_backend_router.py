@@ -0,0 +1,223 @@
+"""BackendRouter failover, journaling and replay ordering against fake transports."""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+from backend_router import BackendRouter, NoHealthyBackendError
+from prototype import GraphQueryError, InMemoryKnowledgeGraph
+
+
+class FakeTransport:
+    """Records every statement it accepts; `down`, `reject` or `invalid` make it raise.
+
+    `reject` is a transport failure for that write; `invalid` is Neo4j
+    refusing the statement (a `Neo.ClientError.*` status).
+    """
+
+    def __init__(self, name: str, log: List[str]) -> None:
+        self.name = name
+        self.log = log
+        self.down = False
+        self.reject: set[str] = set()
+        self.invalid: set[str] = set()
+
+    def run_cypher(self, statement: str, parameters: Dict[str, Any] | None = None):
+        if self.down:
+            raise ConnectionError(f"{self.name} down")
+        tag = (parameters or {}).get("tag")
+        if tag in self.reject:
+            raise ConnectionError(f"{self.name} rejected {tag}")
+        if tag in self.invalid:
+            raise GraphQueryError(
+                f"{self.name} refused {tag}", "Neo.ClientError.Schema.ConstraintValidationFailed"
+            )
+        if statement.startswith("MERGE"):
+            self.log.append(f"{self.name}:{tag}")
+            return []
+        return [{"served_by": self.name}]
+
+    def close(self) -> None:
+        pass
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write(router: BackendRouter, tag: str):
+    return router.run_cypher("MERGE (a:Article {id: $tag})", {"tag": tag})
+
+
+def read(router: BackendRouter, tag: str | None = None):
+    return router.run_cypher("MATCH (a:Article) RETURN a", {"tag": tag})
+
+
+@pytest.fixture
+def cluster():
+    log: List[str] = []
+    clock = FakeClock()
+    transports = {"bolt": FakeTransport("bolt", log), "query_api": FakeTransport("query_api", log)}
+
+    def make(fallback: Any = None, failure_threshold: int = 1) -> BackendRouter:
+        return BackendRouter(
+            [(name, lambda t=transport: t) for name, transport in transports.items()],
+            embedding_dim=8,
+            fallback=fallback,
+            failure_threshold=failure_threshold,
+            reset_timeout=30.0,
+            clock=clock,
+            start_prober=False,
+        )
+
+    return transports, log, clock, make
+
+
+def test_startup_probe_constructs_transports_until_one_answers():
+    built: List[str] = []
+
+    def factory(name: str):
+        def build():
+            built.append(name)
+            return FakeTransport(name, [])
+
+        return build
+
+    router = BackendRouter(
+        [("bolt", factory("bolt")), ("query_api", factory("query_api"))],
+        embedding_dim=8,
+        start_prober=False,
+    )
+    assert built == ["bolt"]
+    router.probe_once()
+    assert built == ["bolt", "query_api"]
+
+
+def test_fails_over_to_next_healthy_transport(cluster):
+    transports, _, _, make = cluster
+    router = make(failure_threshold=3)
+    transports["bolt"].down = True
+    assert read(router) == [{"served_by": "query_api"}]
+    assert router.backends[0].last_error is not None
+    assert not router.degraded
+
+
+def test_journals_writes_while_every_transport_is_down(cluster):
+    transports, log, _, make = cluster
+    router = make()
+    for transport in transports.values():
+        transport.down = True
+    assert write(router, "w1") == []
+    assert router.journal.pending_count() == 1
+    assert router.degraded
+    with pytest.raises(NoHealthyBackendError):
+        read(router)
+    assert log == []
+
+
+def test_replays_journal_in_order_once_a_transport_recovers(cluster):
+    transports, log, clock, make = cluster
+    router = make()
+    for transport in transports.values():
+        transport.down = True
+    write(router, "w1")
+    write(router, "w2")
+    transports["bolt"].down = False
+    clock.now += 31
+    router.probe_once()
+    assert router.journal.pending_count() == 0
+    write(router, "w3")
+    assert log == ["bolt:w1", "bolt:w2", "bolt:w3"]
+
+
+def test_new_write_queues_behind_a_partial_replay(cluster):
+    transports, log, _, make = cluster
+    router = make(failure_threshold=3)
+    transports["query_api"].down = True
+    bolt = transports["bolt"]
+    bolt.down = True
+    for tag in ("w1", "w2"):
+        write(router, tag)
+    bolt.down = False
+    bolt.reject = {"w2"}
+    write(router, "w3")
+    # w2 is still buffered, so w3 must not reach Neo4j ahead of it.
+    assert log == ["bolt:w1"]
+    assert [entry["parameters"]["tag"] for entry in router.journal.pending()] == ["w2", "w3"]
+    bolt.reject = set()
+    write(router, "w4")
+    assert log == ["bolt:w1", "bolt:w2", "bolt:w3", "bolt:w4"]
+    assert router.journal.pending_count() == 0
+
+
+def test_reads_see_buffered_writes_until_replay_finishes(cluster):
+    transports, _, _, make = cluster
+    fallback = InMemoryKnowledgeGraph(8)
+    router = make(fallback=fallback, failure_threshold=3)
+    for transport in transports.values():
+        transport.down = True
+    write(router, "w1")
+    transports["bolt"].down = False
+    transports["bolt"].reject = {"w1"}
+    # Upstream answers but has not received w1 yet: the read goes to the fallback.
+    with pytest.raises(NoHealthyBackendError):
+        read(router)
+    transports["bolt"].reject = set()
+    assert read(router) == [{"served_by": "bolt"}]
+    assert router.journal.pending_count() == 0
+
+
+def test_rejected_write_reaches_the_caller_and_later_traffic_flows(cluster):
+    transports, log, _, make = cluster
+    router = make(fallback=InMemoryKnowledgeGraph(8), failure_threshold=3)
+    for transport in transports.values():
+        transport.invalid = {"bad"}
+    with pytest.raises(GraphQueryError):
+        write(router, "bad")
+    assert router.journal.pending_count() == 0
+    assert all(candidate.breaker.is_closed for candidate in router.backends)
+    write(router, "good")
+    assert log == ["bolt:good"]
+    assert read(router) == [{"served_by": "bolt"}]
+
+
+def test_rejected_reads_do_not_open_breakers(cluster):
+    transports, _, _, make = cluster
+    router = make(failure_threshold=3)
+    for transport in transports.values():
+        transport.invalid = {"bad"}
+    for _ in range(3):
+        with pytest.raises(GraphQueryError):
+            read(router, "bad")
+    assert not router.degraded
+    assert read(router) == [{"served_by": "bolt"}]
+
+
+def test_replay_dead_letters_a_write_neo4j_keeps_rejecting(cluster):
+    transports, log, clock, make = cluster
+    router = make(fallback=InMemoryKnowledgeGraph(8), failure_threshold=3)
+    for transport in transports.values():
+        transport.down = True
+    for tag in ("w1", "bad", "w2"):
+        write(router, tag)
+    for transport in transports.values():
+        transport.down = False
+        transport.invalid = {"bad"}
+    clock.now += 31
+    router.probe_once()
+    # "bad" stays at the head until it has been rejected max_replay_rejections times.
+    assert log == ["bolt:w1"]
+    with pytest.raises(NoHealthyBackendError):
+        read(router)
+    router.probe_once()
+    assert log == ["bolt:w1", "bolt:w2"]
+    assert router.journal.pending_count() == 0
+    assert [entry["parameters"]["tag"] for entry in router.dead_letter.pending()] == ["bad"]
+    write(router, "w3")
+    assert log == ["bolt:w1", "bolt:w2", "bolt:w3"]
+    assert read(router) == [{"served_by": "bolt"}]
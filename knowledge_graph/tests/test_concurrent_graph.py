@@ -0,0 +1,104 @@
+"""ConcurrentKnowledgeGraph publish semantics, driven step by step with events."""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+
+from concurrent_graph import ConcurrentKnowledgeGraph
+from prototype import Article, InMemoryKnowledgeGraph
+
+DIM = 4
+
+
+def article(message_id: str) -> Article:
+    return Article(
+        telegram_message_id=message_id,
+        title=f"post {message_id}",
+        body="body",
+        telegram_url=f"https://t.me/c/{message_id}",
+        published_at=datetime.utcnow(),
+        source_channel="c",
+        topics=["AI"],
+    )
+
+
+def batch(*message_ids: str):
+    operations = []
+    for message_id in message_ids:
+        item = article(message_id)
+        operations.append(("upsert_article", {"article": item, "embedding": [1.0, 0.0, 0.0, 0.0]}))
+        operations.append(("attach_topics", {"article": item}))
+    return operations
+
+
+class Gate:
+    def __init__(self) -> None:
+        self.armed = False
+        self.half_applied = threading.Event()
+        self.resume = threading.Event()
+
+
+class PausingGraph(InMemoryKnowledgeGraph):
+    """Stops after the first operation of the next batch until `gate.resume` is set."""
+
+    def __init__(self, gate: Gate) -> None:
+        super().__init__(DIM)
+        self.gate = gate
+
+    def write_batch(self, operations):
+        for index, operation in enumerate(operations):
+            super().write_batch([operation])
+            if index == 0 and self.gate.armed:
+                self.gate.armed = False
+                self.gate.half_applied.set()
+                assert self.gate.resume.wait(5)
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def test_readers_never_see_a_half_applied_batch():
+    gate = Gate()
+    graph = ConcurrentKnowledgeGraph(DIM, factory=lambda: PausingGraph(gate))
+    gate.armed = True
+    writer = threading.Thread(target=graph.write_batch, args=(batch("1", "2"),))
+    writer.start()
+    assert gate.half_applied.wait(5)
+
+    # Article 1 is already in the standby replica; readers still see version 0.
+    assert graph.version == 0
+    assert len(graph) == 0
+    assert graph.get_article("1") is None
+    assert graph.weekly_digest(7) == []
+
+    with graph.snapshot() as pinned:
+        gate.resume.set()
+        assert wait_until(lambda: graph.version == 1)
+        # New reads get the whole batch at once...
+        assert {row["title"] for row in graph.weekly_digest(7)} == {"post 1", "post 2"}
+        # ...while a reader pinned before the publish keeps its old snapshot,
+        # and the writer waits for it before replaying onto that replica.
+        assert len(pinned) == 0
+        assert writer.is_alive()
+    writer.join(5)
+    assert not writer.is_alive()
+    assert [len(replica) for replica in graph._replicas] == [2, 2]
+    assert graph.publishes == 1
+
+
+def test_writes_are_visible_once_write_batch_returns():
+    graph = ConcurrentKnowledgeGraph(DIM)
+    for message_id in ("1", "2", "3"):
+        graph.write_batch(batch(message_id))
+        assert graph.get_article(message_id) is not None
+        assert graph.find_similar_articles([1.0, 0.0, 0.0, 0.0], "x", limit=5, min_score=0.5)
+    assert graph.version == 3
+    assert len(graph) == 3
+    assert [len(replica) for replica in graph._replicas] == [3, 3]
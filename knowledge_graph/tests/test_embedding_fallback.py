@@ -0,0 +1,56 @@
+"""FallbackEmbeddingService never mixes hash vectors into a Gemini-backed index."""
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+from prototype import FallbackEmbeddingService, HashEmbeddingService
+
+
+class FlakyEmbedder:
+    """Fails the calls whose (1-based) numbers are in `failures`."""
+
+    dimensions = 8
+
+    def __init__(self, failures: set[int]) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    def embed(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.calls in self.failures:
+            raise ConnectionError(f"call {self.calls} failed")
+        return [1.0] * self.dimensions
+
+
+def service(primary: FlakyEmbedder, sleeps: List[float]) -> FallbackEmbeddingService:
+    return FallbackEmbeddingService(
+        primary, lambda: HashEmbeddingService(primary.dimensions), sleep=sleeps.append
+    )
+
+
+def test_transient_error_is_retried_with_backoff():
+    sleeps: List[float] = []
+    embedder = service(FlakyEmbedder({1, 2}), sleeps)
+    assert embedder.embed("post") == [1.0] * 8
+    assert sleeps == [0.5, 1.0]
+    assert embedder._active is embedder.primary
+
+
+def test_falls_back_only_if_primary_never_answered():
+    sleeps: List[float] = []
+    embedder = service(FlakyEmbedder({1, 2, 3}), sleeps)
+    assert embedder.embed("post") == HashEmbeddingService(8).embed("post")
+    assert embedder.embed("again") == HashEmbeddingService(8).embed("again")
+    assert embedder.primary.calls == 3
+
+
+def test_outage_after_first_success_raises_instead_of_switching():
+    sleeps: List[float] = []
+    embedder = service(FlakyEmbedder({2, 3, 4}), sleeps)
+    embedder.embed("first")
+    with pytest.raises(ConnectionError):
+        embedder.embed("second")
+    assert embedder._active is embedder.primary
+    assert embedder.embed("third") == [1.0] * 8
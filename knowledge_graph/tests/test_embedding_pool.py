@@ -0,0 +1,27 @@
+"""ParallelHashEmbedder keeps small batches in-process and matches the serial embedder."""
+from __future__ import annotations
+
+from embedding_pool import ParallelHashEmbedder, available_cpus
+from prototype import HashEmbeddingService
+
+TEXTS = [f"post {index} about model release {index % 3}" for index in range(10)]
+
+
+def test_small_batches_are_embedded_in_process():
+    with ParallelHashEmbedder(16, workers=4, shard_size=8) as embedder:
+        assert embedder.workers == min(4, available_cpus())
+        assert embedder.min_parallel_batch == embedder.workers * 8
+        matrix = embedder.embed_many(TEXTS[:5])
+        assert embedder._pool is None
+    serial = HashEmbeddingService(16)
+    for row, text in zip(matrix, TEXTS):
+        assert max(abs(a - b) for a, b in zip(row, serial.embed(text))) < 1e-6
+
+
+def test_pool_rows_keep_input_order():
+    with ParallelHashEmbedder(16, workers=2, shard_size=3, min_parallel_batch=0) as embedder:
+        matrix = embedder.embed_many(TEXTS)
+    serial = HashEmbeddingService(16)
+    assert len(matrix) == len(TEXTS)
+    for row, text in zip(matrix, TEXTS):
+        assert max(abs(a - b) for a, b in zip(row, serial.embed(text))) < 1e-6
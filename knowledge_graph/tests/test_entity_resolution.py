@@ -0,0 +1,79 @@
+"""EntityResolver fuzzy matching guards, merge confirmation and alias-aware reads."""
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from entity_resolution import EntityResolver
+from prototype import Article, EntityRef, InMemoryKnowledgeGraph, canonical_entity_id
+
+
+@pytest.mark.parametrize(
+    ("known", "query"),
+    [
+        ("WAN 2.2", "WAN 2.5"),
+        ("Llama 3", "Llama 4"),
+        ("Claude 3", "Claude 4"),
+        ("Gemini 2", "Gemini 3"),
+        ("Qwen 3", "Qwen 2"),
+    ],
+)
+def test_versions_are_never_fuzzy_matched(known, query):
+    resolver = EntityResolver()
+    resolver.add(EntityRef(known, "project"))
+    assert resolver.lookup(query) is None
+
+
+def test_typos_still_resolve():
+    resolver = EntityResolver()
+    resolver.add(EntityRef("OpenAI", "company"))
+    resolver.add(EntityRef("Gemini 2.5 Pro", "project"))
+    assert resolver.lookup("OpenAl") == "openai"
+    assert resolver.lookup("Gemnii 2.5 Pro") == "gemini25pro"
+
+
+def test_language_symbols_are_significant():
+    ids = {canonical_entity_id(name) for name in ("C", "C++", "C#")}
+    assert ids == {"c", "c++", "c#"}
+    assert canonical_entity_id("#OpenAI") == "openai"
+
+
+def article(message_id: str, *entities: str) -> Article:
+    return Article(
+        telegram_message_id=message_id,
+        title=f"post {message_id}",
+        body="body",
+        telegram_url=f"https://t.me/c/{message_id}",
+        published_at=datetime.utcnow(),
+        source_channel="c",
+        entities=[EntityRef(name, "company") for name in entities],
+    )
+
+
+@pytest.fixture
+def graph():
+    graph = InMemoryKnowledgeGraph(4)
+    for item in (article("1", "Meta"), article("2", "Facebook")):
+        graph.upsert_article(item, [1.0, 0.0, 0.0, 0.0])
+        graph.attach_entities(item)
+    return graph
+
+
+def test_apply_merges_is_a_dry_run_without_confirm(graph):
+    resolver = EntityResolver.from_graph(graph)
+    resolver.add_alias("Facebook", EntityRef("Meta", "company"))
+    assert resolver.apply_merges(graph) == 1
+    assert len(graph.list_entities()) == 2
+    assert resolver.apply_merges(graph, confirm=True) == 1
+    assert [record["id"] for record in graph.list_entities()] == ["meta"]
+
+
+def test_reads_by_alias_find_the_merged_entity(graph):
+    resolver = EntityResolver.from_graph(graph)
+    resolver.add_alias("Facebook", EntityRef("Meta", "company"))
+    resolver.apply_merges(graph, confirm=True)
+    titles = {row["title"] for row in graph.article_list_by_entity("Facebook")}
+    assert titles == {"post 1", "post 2"}
+    rows, _ = graph.read_page("article_list_by_entity", {"entity": "facebook", "days": 14})
+    assert {row["title"] for row in rows} == titles
@@ -0,0 +1,203 @@
+"""IngestPipeline dedupe ordering, per-item errors, micro-batching and the HTTP handler."""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+
+from ingest_service import (
+    MAX_BODY_BYTES,
+    IngestPipeline,
+    IngestServer,
+    MicroBatcher,
+    normalize_update,
+)
+from prototype import HashEmbeddingService, InMemoryKnowledgeGraph
+
+ORIGINAL = "OpenAI ships a new reasoning model for agents"
+CROSS_POST = "OpenAI ships a new reasoning model for agents!"
+UNRELATED = "Recipe: slow-cooked beans with smoked paprika"
+TEXTS = [ORIGINAL, CROSS_POST, UNRELATED]
+
+
+def update(message_id: int, text: str, channel: str = "ai_news") -> Dict[str, Any]:
+    return {
+        "channel_post": {
+            "message_id": message_id,
+            "date": 1_700_000_000 + message_id,
+            "text": text,
+            "chat": {"username": channel},
+        }
+    }
+
+
+def make_pipeline(graph: Any = None) -> Tuple[IngestPipeline, Any]:
+    embedder = HashEmbeddingService()
+    graph = graph if graph is not None else InMemoryKnowledgeGraph(embedder.dimensions)
+    return IngestPipeline(graph, embedder), graph
+
+
+def duplicate_ids(result: Dict[str, Any]) -> List[str]:
+    return [match["telegram_message_id"] for match in result["duplicates"]]
+
+
+def test_normalize_update_keeps_validated_metadata():
+    raw = update(1, ORIGINAL)
+    raw["metadata"] = {
+        "title": "OpenAI reasoning model",
+        "topics": ["AI Agents"],
+        "ctaText": "Read the announcement",
+        "ctaLink": "https://openai.com/index/agents",
+    }
+    article = normalize_update(raw).article
+    assert article.title == "OpenAI reasoning model"
+    assert article.cta_text == "Read the announcement"
+    assert article.cta_link
+    assert normalize_update(update(2, ORIGINAL)).article.title == ORIGINAL
+
+
+def test_batch_items_only_match_earlier_items():
+    pipeline, _ = make_pipeline()
+    items = [normalize_update(update(i, text)) for i, text in enumerate(TEXTS, 1)]
+    results = pipeline.process_batch(items)
+    assert [r["status"] for r in results] == ["ingested"] * 3
+    assert duplicate_ids(results[0]) == []
+    assert duplicate_ids(results[1]) == ["1"]
+    assert duplicate_ids(results[2]) == []
+
+
+def test_later_batch_matches_stored_corpus():
+    pipeline, graph = make_pipeline()
+    pipeline.process_batch([normalize_update(update(1, ORIGINAL))])
+    [result] = pipeline.process_batch([normalize_update(update(2, CROSS_POST))])
+    assert duplicate_ids(result) == ["1"]
+    assert graph.article_body("2") == CROSS_POST
+
+
+def test_channel_scope_ignores_other_channels_in_the_batch():
+    pipeline, _ = make_pipeline()
+    pipeline.dedupe_scope = "channel"
+    results = pipeline.process_batch(
+        [
+            normalize_update(update(1, ORIGINAL, channel="a")),
+            normalize_update(update(2, CROSS_POST, channel="b")),
+        ]
+    )
+    assert duplicate_ids(results[1]) == []
+
+
+class FlakyGraph(InMemoryKnowledgeGraph):
+    """Rejects any write batch that upserts message id `bad_id`."""
+
+    bad_id = "2"
+
+    def write_batch(self, operations):
+        for name, params in operations:
+            if name == "upsert_article" and params["article"].telegram_message_id == self.bad_id:
+                raise RuntimeError("upsert rejected")
+        super().write_batch(operations)
+
+
+def test_failing_item_does_not_fail_the_batch():
+    pipeline, graph = make_pipeline(FlakyGraph(256))
+    items = [normalize_update(update(i, text)) for i, text in enumerate(TEXTS, 1)]
+    results = pipeline.process_batch(items)
+    assert [r["status"] for r in results] == ["ingested", "error", "ingested"]
+    assert "upsert rejected" in results[1]["error"]
+    assert graph.article_body("1") == ORIGINAL
+    assert graph.article_body("2") is None
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    pipeline, _ = make_pipeline()
+    batcher = MicroBatcher(pipeline, window=0.05, max_batch=8)
+
+    async def run():
+        batcher.start()
+        try:
+            items = [normalize_update(update(i, f"post {i} {UNRELATED}")) for i in range(1, 6)]
+            return await asyncio.gather(*(batcher.submit(item) for item in items))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+    assert [r["telegram_message_id"] for r in results] == ["1", "2", "3", "4", "5"]
+    assert batcher.batches == 1
+    assert batcher.items == 5
+
+
+async def exchange(raw: bytes) -> Tuple[int, Dict[str, Any]]:
+    pipeline, _ = make_pipeline()
+    server = IngestServer(MicroBatcher(pipeline, window=0.01))
+    server.batcher.start()
+    listener = await asyncio.start_server(server._handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    finally:
+        listener.close()
+        await listener.wait_closed()
+        await server.batcher.stop()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def post(body: bytes, headers: str = "") -> bytes:
+    return (
+        f"POST /ingest HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{headers}"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def test_http_ingest_batch():
+    body = json.dumps({"updates": [update(1, ORIGINAL), update(2, CROSS_POST), {"message": {}}]})
+    status, payload = asyncio.run(exchange(post(body.encode())))
+    assert status == 200
+    results = payload["results"]
+    assert [r["status"] for r in results] == ["ingested", "ingested", "skipped"]
+    assert duplicate_ids(results[0]) == []
+    assert duplicate_ids(results[1]) == ["1"]
+
+
+def test_http_batch_reports_malformed_updates_per_item():
+    bad = update(2, CROSS_POST)
+    bad["channel_post"]["date"] = "yesterday"
+    body = json.dumps({"updates": [update(1, ORIGINAL), bad, update(3, UNRELATED)]})
+    status, payload = asyncio.run(exchange(post(body.encode())))
+    assert status == 200
+    results = payload["results"]
+    assert [r["status"] for r in results] == ["ingested", "error", "ingested"]
+    assert "invalid date" in results[1]["error"]
+
+
+def test_http_single_malformed_update_is_400():
+    body = json.dumps({"update_id": 1, "channel_post": {"message_id": 1, "text": ["x"]}})
+    status, payload = asyncio.run(exchange(post(body.encode())))
+    assert status == 400
+    assert "invalid update" in payload["error"]
+
+
+def test_http_rejects_invalid_json():
+    status, payload = asyncio.run(exchange(post(b"{not json")))
+    assert status == 400
+    assert "invalid JSON" in payload["error"]
+
+
+def test_http_malformed_request_line_is_400():
+    status, payload = asyncio.run(exchange(b"GARBAGE\r\n\r\n"))
+    assert status == 400
+    assert "malformed request line" in payload["error"]
+
+
+def test_http_oversized_body_is_413():
+    raw = (
+        "POST /ingest HTTP/1.1\r\nHost: x\r\n"
+        f"Content-Length: {MAX_BODY_BYTES + 1}\r\n\r\n"
+    ).encode("latin-1")
+    status, payload = asyncio.run(exchange(raw))
+    assert status == 413
+    assert str(MAX_BODY_BYTES) in payload["error"]
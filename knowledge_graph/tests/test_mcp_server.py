@@ -0,0 +1,179 @@
+"""MCP tool dispatch, keyset pagination, the read-only Cypher guard and error responses."""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from mcp_server import KnowledgeGraphToolServer
+from prototype import Article, GraphQueryError, InMemoryKnowledgeGraph, is_write_statement
+
+NOW = datetime.utcnow()
+
+
+class PagedOnlyGraph(InMemoryKnowledgeGraph):
+    """Fails the one-shot reads so tools must page through `read_page`."""
+
+    def weekly_digest(self, days: int = 7) -> List[Dict[str, object]]:
+        raise AssertionError("weekly_digest loaded the whole window")
+
+
+class ReadModeGraph(InMemoryKnowledgeGraph):
+    """Runs Cypher like a read-access-mode session: writes are refused upstream."""
+
+    def __init__(self) -> None:
+        super().__init__(4)
+        self.statements: List[str] = []
+        self.pulled = 0
+
+    def iter_read_cypher(
+        self, statement: str, parameters: Dict[str, Any] | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        self.statements.append(statement)
+        if is_write_statement(statement) or "db.create" in statement:
+            raise GraphQueryError(
+                "Writing in read access mode not allowed.", "Neo.ClientError.Statement.AccessMode"
+            )
+        for value in range(10):
+            self.pulled += 1
+            yield {"n": value}
+
+
+def seeded(graph: InMemoryKnowledgeGraph, count: int = 5) -> InMemoryKnowledgeGraph:
+    for index in range(count):
+        article = Article(
+            telegram_message_id=str(index + 1),
+            title=f"Post {index + 1}",
+            body="",
+            telegram_url=f"https://t.me/c/{index + 1}",
+            published_at=NOW - timedelta(minutes=index),
+            source_channel="c",
+            topics=["AI"],
+        )
+        graph.upsert_article(article, [1.0, 0.0, 0.0, float(index)])
+        graph.attach_topics(article)
+    return graph
+
+
+def rpc(server: KnowledgeGraphToolServer, method: str, params: Any = None) -> Dict[str, Any]:
+    return server.handle({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+
+
+def call(server: KnowledgeGraphToolServer, name: str, **arguments: Any) -> Dict[str, Any]:
+    return rpc(server, "tools/call", {"name": name, "arguments": arguments})["result"]
+
+
+def all_pages(server: KnowledgeGraphToolServer, name: str, **arguments: Any) -> List[Any]:
+    rows: List[Any] = []
+    cursor = None
+    while True:
+        result = call(server, name, cursor=cursor, **arguments)
+        assert not result["isError"], result
+        rows.extend(result["structuredContent"]["rows"])
+        cursor = result["structuredContent"]["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def test_tools_list_and_dispatch():
+    server = KnowledgeGraphToolServer(seeded(InMemoryKnowledgeGraph(4)))
+    names = {tool["name"] for tool in rpc(server, "tools/list")["result"]["tools"]}
+    assert {"weekly_digest", "read_neo4j_cypher", "vector_search"} <= names
+    result = call(server, "weekly_digest", days=7)
+    assert not result["isError"]
+    assert [row["title"] for row in json.loads(result["content"][0]["text"])["rows"]] == [
+        f"Post {index}" for index in range(1, 6)
+    ]
+
+
+def test_pages_follow_the_keyset_cursor():
+    graph = seeded(PagedOnlyGraph(4))
+    server = KnowledgeGraphToolServer(graph)
+    expected = [row["title"] for row in InMemoryKnowledgeGraph.weekly_digest(graph, 7)]
+    assert [row["title"] for row in all_pages(server, "weekly_digest", days=7, limit=2)] == expected
+    # A page cut short by the size cap resumes right after its last row.
+    server.max_result_bytes = 1
+    assert [row["title"] for row in all_pages(server, "weekly_digest", days=7, limit=3)] == expected
+
+
+def test_cursor_is_bound_to_its_tool_call():
+    server = KnowledgeGraphToolServer(seeded(InMemoryKnowledgeGraph(4)))
+    cursor = call(server, "weekly_digest", days=7, limit=2)["structuredContent"]["next_cursor"]
+    result = call(server, "weekly_digest", days=3, limit=2, cursor=cursor)
+    assert result["isError"]
+    assert "cursor" in result["content"][0]["text"]
+
+
+def test_read_cypher_runs_in_read_mode_and_pages():
+    graph = ReadModeGraph()
+    server = KnowledgeGraphToolServer(graph)
+    rows = all_pages(server, "read_neo4j_cypher", query="MATCH (n) RETURN n", limit=4)
+    assert rows == [{"n": value} for value in range(10)]
+    graph.pulled = 0
+    first = call(server, "read_neo4j_cypher", query="MATCH (n) RETURN n", limit=4)
+    assert len(first["structuredContent"]["rows"]) == 4
+    assert graph.pulled == 5  # one row past the page to know there is more
+
+
+def test_read_cypher_refuses_writes():
+    graph = ReadModeGraph()
+    server = KnowledgeGraphToolServer(graph)
+    result = call(server, "read_neo4j_cypher", query="CREATE (n:Secret) RETURN n")
+    assert result["isError"]
+    assert graph.statements == []  # rejected before reaching Neo4j
+    # Procedures slip past the statement check; the read-mode session refuses them.
+    result = call(server, "read_neo4j_cypher", query="CALL db.createLabel('Secret')")
+    assert result["isError"]
+    assert "read access mode" in result["content"][0]["text"]
+
+
+def test_read_cypher_needs_a_cypher_backend():
+    server = KnowledgeGraphToolServer(InMemoryKnowledgeGraph(4))
+    result = call(server, "read_neo4j_cypher", query="MATCH (n) RETURN n")
+    assert result["isError"]
+    assert "typed tools" in result["content"][0]["text"]
+
+
+def test_tool_failures_are_tool_results():
+    class BrokenGraph(InMemoryKnowledgeGraph):
+        def read_page(self, *args: Any, **kwargs: Any) -> Any:
+            raise RuntimeError("neo4j unavailable")
+
+    server = KnowledgeGraphToolServer(BrokenGraph(4))
+    result = call(server, "weekly_digest")
+    assert result["isError"]
+    assert "neo4j unavailable" in result["content"][0]["text"]
+    # A missing argument is the tool's error, not an unknown JSON-RPC method.
+    result = call(server, "article_list_by_entity")
+    assert result["isError"]
+    assert "'entity' is required" in result["content"][0]["text"]
+    assert call(server, "weekly_digest", days="soon")["isError"]
+    assert call(server, "no_such_tool")["isError"]
+
+
+def test_json_rpc_errors():
+    server = KnowledgeGraphToolServer(InMemoryKnowledgeGraph(4))
+    assert rpc(server, "resources/list")["error"]["code"] == -32601
+    assert rpc(server, "tools/call", ["weekly_digest"])["error"]["code"] == -32602
+    assert server.handle_raw("{oops")["error"]["code"] == -32700
+    [invalid] = server.handle_raw("[1]")
+    assert invalid["error"]["code"] == -32600
+
+    def explode(name: Any, arguments: Any) -> Dict[str, Any]:
+        raise RuntimeError("boom")
+
+    server.call_tool = explode  # type: ignore[method-assign]
+    response = rpc(server, "tools/call", {"name": "weekly_digest"})
+    assert response["error"]["code"] == -32603
+    assert "boom" in response["error"]["message"]
+
+
+def test_result_cache_can_be_skipped():
+    graph = seeded(InMemoryKnowledgeGraph(4), count=1)
+    cached = KnowledgeGraphToolServer(graph)
+    direct = KnowledgeGraphToolServer(graph, cache_results=False)
+    for server in (cached, direct):
+        assert len(call(server, "weekly_digest")["structuredContent"]["rows"]) == 1
+    seeded(graph, count=2)  # written behind both servers' backs, e.g. by a replica sync
+    assert len(call(cached, "weekly_digest")["structuredContent"]["rows"]) == 1
+    assert len(call(direct, "weekly_digest")["structuredContent"]["rows"]) == 2
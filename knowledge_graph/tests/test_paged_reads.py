@@ -0,0 +1,65 @@
+"""Paged and one-shot reads return the same rows in the same order."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from prototype import Article, InMemoryKnowledgeGraph
+from sharded_graph import ShardedKnowledgeGraph
+
+
+def all_pages(graph, name, params, limit=2):
+    rows, cursor = graph.read_page(name, params, limit=limit)
+    while cursor is not None:
+        page, cursor = graph.read_page(name, params, cursor, limit)
+        rows.extend(page)
+    return rows
+
+
+@pytest.mark.parametrize("graph_class", [InMemoryKnowledgeGraph, ShardedKnowledgeGraph])
+def test_weekly_digest_matches_its_paged_form(graph_class):
+    graph = graph_class(4)
+    now = datetime.utcnow()
+    # Same day, titles in the opposite order of publication, across channels.
+    for index, title in enumerate(["zebra", "mango", "apple", "kiwi", "banana"]):
+        article = Article(
+            telegram_message_id=str(index + 1),
+            title=title,
+            body=title,
+            telegram_url=f"https://t.me/c/{index + 1}",
+            published_at=now - timedelta(minutes=index),
+            source_channel=f"channel{index % 2}",
+            topics=["AI"],
+        )
+        graph.upsert_article(article, [1.0, 0.0, 0.0, 0.0])
+        graph.attach_topics(article)
+    digest = graph.weekly_digest(7)
+    assert [row["title"] for row in digest] == ["zebra", "mango", "apple", "kiwi", "banana"]
+    assert digest == all_pages(graph, "weekly_digest", {"days": 7})
+    graph.close()
+
+
+def test_sharded_articles_by_domain_keeps_single_graph_order():
+    single, sharded = InMemoryKnowledgeGraph(4), ShardedKnowledgeGraph(4)
+    now = datetime.utcnow()
+    for index, title in enumerate(["zebra", "mango", "apple", "kiwi"]):
+        article = Article(
+            telegram_message_id=str(index + 1),
+            title=title,
+            body="Details: https://docs.example.com/post",
+            telegram_url=f"https://t.me/c/{index + 1}",
+            published_at=now - timedelta(minutes=index),
+            source_channel=f"channel{index % 2}",
+            cta_link=f"https://example.com/{index}",
+        )
+        for graph in (single, sharded):
+            graph.upsert_article(article, [1.0, 0.0, 0.0, 0.0])
+    for cta_only in (False, True):
+        expected = single.articles_by_domain("example.com", cta_only=cta_only)
+        assert [row["title"] for row in expected] == ["zebra", "mango", "apple", "kiwi"]
+        assert sharded.articles_by_domain("example.com", cta_only=cta_only) == expected
+    expected = single.articles_by_domain("example.com", limit=2)
+    assert sharded.articles_by_domain("example.com", limit=2) == expected
+    single.close()
+    sharded.close()
@@ -0,0 +1,62 @@
+"""CachedKnowledgeGraph evicts cached reads on every write path through it."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from prototype import Article, EntityRef, InMemoryKnowledgeGraph
+from query_cache import CachedKnowledgeGraph
+
+
+def article(message_id: str, entity: str = "OpenAI") -> Article:
+    return Article(
+        telegram_message_id=message_id,
+        title=f"Post {message_id}",
+        body="",
+        telegram_url=f"https://t.me/c/{message_id}",
+        published_at=datetime.utcnow(),
+        source_channel="c",
+        topics=["AI"],
+        entities=[EntityRef(entity, "company")],
+    )
+
+
+def test_write_batch_invalidates_cached_reads():
+    graph = CachedKnowledgeGraph(InMemoryKnowledgeGraph(4))
+    graph.upsert_article(article("1"), [1.0, 0.0, 0.0, 0.0])
+    graph.attach_entities(article("1"))
+    assert len(graph.weekly_digest(7)) == 1
+    assert len(graph.article_list_by_entity("OpenAI", 14)) == 1
+
+    added = article("2")
+    graph.write_batch(
+        [
+            ("upsert_article", {"article": added, "embedding": [0.0, 1.0, 0.0, 0.0]}),
+            ("attach_entities", {"article": added}),
+        ]
+    )
+    assert len(graph.weekly_digest(7)) == 2
+    assert len(graph.article_list_by_entity("OpenAI", 14)) == 2
+
+
+def test_merge_entities_evicts_alias_reads():
+    graph = CachedKnowledgeGraph(InMemoryKnowledgeGraph(4))
+    for message_id, entity in (("1", "Google"), ("2", "Alphabet")):
+        graph.upsert_article(article(message_id, entity), [1.0, 0.0, 0.0, 0.0])
+        graph.attach_entities(article(message_id, entity))
+    assert len(graph.article_list_by_entity("Google", 14)) == 1
+    graph.merge_entities(
+        [{"id": "google", "name": "Google", "type": "company", "duplicates": ["Alphabet"]}]
+    )
+    assert len(graph.article_list_by_entity("Google", 14)) == 2
+
+
+def test_pages_are_cached_until_a_write_evicts_them():
+    graph = CachedKnowledgeGraph(InMemoryKnowledgeGraph(4))
+    graph.upsert_article(article("1"), [1.0, 0.0, 0.0, 0.0])
+    rows, _ = graph.read_page("article_list_by_entity", {"entity": "OpenAI", "days": 14})
+    assert rows == []
+    graph.read_page("article_list_by_entity", {"entity": "OpenAI", "days": 14})
+    assert graph.cache_stats()["hits"] == 1
+    graph.attach_entities(article("1"))
+    rows, _ = graph.read_page("article_list_by_entity", {"entity": "OpenAI", "days": 14})
+    assert [row["title"] for row in rows] == ["Post 1"]
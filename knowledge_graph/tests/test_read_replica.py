@@ -0,0 +1,226 @@
+"""ReadReplica hydration, incremental sync, read-your-writes, staleness fallback and snapshots."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+import pytest
+
+from prototype import Article, InMemoryKnowledgeGraph
+from read_replica import SERVER_CLOCK_CYPHER, ReadReplica
+
+DIM = 4
+START = datetime(2026, 10, 1, 12)
+EPOCH = datetime(1970, 1, 1)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSource(InMemoryKnowledgeGraph):
+    """In-memory "Neo4j" answering the replica's clock, hydrate and change queries.
+
+    Every write stamps `updated_at` from the fake server clock `now`;
+    `stamp()` backdates one, like a transaction that commits late.
+    """
+
+    embedding_property = "embedding"
+    compress_bodies = False
+
+    def __init__(self) -> None:
+        super().__init__(DIM)
+        self.now = START
+        self.updated: Dict[str, datetime] = {}
+        self.similar: Dict[str, List[Dict[str, object]]] = {}
+        self.queries: List[Dict[str, Any]] = []
+        self.down = False
+
+    def tick(self, seconds: float) -> None:
+        self.now += timedelta(seconds=seconds)
+
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        super().upsert_article(article, embedding)
+        self.updated[article.telegram_message_id] = self.now
+
+    def create_similarity_links(self, source_id: str, matches: List[Dict[str, object]]) -> None:
+        super().create_similarity_links(source_id, matches)
+        self.similar.setdefault(source_id, []).extend(matches)
+        self.updated[source_id] = self.now
+
+    def stamp(self, message_id: str, moment: datetime) -> None:
+        self.updated[message_id] = moment
+
+    def run_cypher(self, statement: str, parameters: Dict[str, Any] | None = None) -> List[Dict]:
+        if self.down:
+            raise ConnectionError("neo4j down")
+        params = parameters or {}
+        if statement == SERVER_CLOCK_CYPHER:
+            return [{"now": self.now.isoformat()}]
+        self.queries.append(params)
+        ids = sorted(self.updated)
+        if "$overlap" in statement:
+            since = datetime.fromisoformat(params["since"]) - timedelta(seconds=params["overlap"])
+            ids = sorted(
+                (
+                    message_id
+                    for message_id in ids
+                    if self.updated[message_id] > since
+                    or (self.updated[message_id] == since and message_id > params["after"])
+                ),
+                key=lambda message_id: (self.updated[message_id], message_id),
+            )
+        else:
+            ids = [message_id for message_id in ids if message_id > params["after"]]
+        return [self._row(message_id) for message_id in ids[: params["limit"]]]
+
+    def _row(self, message_id: str) -> Dict[str, Any]:
+        article = self.get_article(message_id)
+        return {
+            "telegram_message_id": message_id,
+            "title": article.title,
+            "body": article.body,
+            "telegram_url": article.telegram_url,
+            "source_channel": article.source_channel,
+            "published_ms": int((article.published_at - EPOCH).total_seconds() * 1000),
+            "embedding": self.get_embedding(message_id),
+            "topics": article.topics,
+            "entities": [],
+            "projects": [],
+            "similar": self.similar.get(message_id, []),
+            "updated_at": self.updated[message_id].isoformat(),
+        }
+
+
+def article(message_id: str) -> Article:
+    return Article(
+        telegram_message_id=message_id,
+        title=f"Post {message_id}",
+        body=f"Body {message_id}",
+        telegram_url=f"https://t.me/c/{message_id}",
+        published_at=datetime.utcnow() - timedelta(minutes=int(message_id)),
+        source_channel="c",
+        topics=["AI"],
+    )
+
+
+def store(graph: Any, *ids: str) -> None:
+    for message_id in ids:
+        graph.upsert_article(article(message_id), [1.0, 0.0, 0.0, float(message_id)])
+
+
+def replica_of(source: FakeSource, **kwargs: Any) -> Tuple[ReadReplica, FakeClock]:
+    clock = FakeClock()
+    replica = ReadReplica(source, clock=clock, start=False, **kwargs)
+    return replica, clock
+
+
+def test_hydrate_copies_the_source_and_serves_reads_locally():
+    source = FakeSource()
+    store(source, "1", "2", "3")
+    replica, _ = replica_of(source, batch_size=2)
+    assert not replica.fresh
+    assert replica.hydrate() == 3
+    assert [query["after"] for query in source.queries] == ["", "2", "3"]
+    assert replica.fresh and len(replica) == 3
+    assert replica.weekly_digest(7) == source.weekly_digest(7)
+    assert replica.article_body("2") == "Body 2"
+    assert replica.local_reads == 2 and replica.source_reads == 0
+
+
+def test_sync_once_pulls_changes_with_overlap_and_keyset_resume():
+    source = FakeSource()
+    store(source, "1", "2")
+    source.tick(60)
+    replica, _ = replica_of(source, batch_size=2, overlap=5)
+    replica.hydrate()
+    watermark = source.now
+
+    source.tick(10)
+    store(source, "3", "4", "5", "6", "7")  # one updated_at for all: pages resume on the id
+    store(source, "8")
+    source.stamp("8", watermark - timedelta(seconds=2))  # stamped before the pass, committed after
+    source.queries.clear()
+    assert replica.sync_once() == 6
+    assert sorted(replica._known) == [str(index) for index in range(1, 9)]
+    assert [query["after"] for query in source.queries] == ["", "3", "5", "7"]
+    assert source.queries[0]["overlap"] == 5 and source.queries[1]["overlap"] == 0
+    assert replica.watermark == source.now.isoformat()
+
+
+def test_own_writes_are_readable_before_the_next_sync():
+    source = FakeSource()
+    replica, _ = replica_of(source)
+    replica.hydrate()
+    store(replica, "1")
+    assert source.get_article("1") is not None
+    similar = replica.find_similar_articles([1.0, 0.0, 0.0, 1.0], "x", 5, 0.9)
+    assert [row["telegram_message_id"] for row in similar] == ["1"]
+    assert replica.source_reads == 0
+
+
+def test_similarity_edges_wait_for_both_ends():
+    source = FakeSource()
+    store(source, "1", "2")
+    # "1" links to "9", which is only ingested after the replica hydrated.
+    source.similar["1"] = [{"telegram_message_id": "9", "score": 0.9}]
+    replica, _ = replica_of(source)
+    replica.hydrate()
+    assert replica.local.similarity_edges == []
+    assert ("1", "9") in replica._pending_edges
+
+    source.tick(10)
+    store(source, "9")
+    replica.sync_once()
+    edges = replica.local.similarity_edges
+    assert [(edge["source"], edge["target"]) for edge in edges] == [("1", "9")]
+    assert replica._pending_edges == {}
+
+
+def test_stale_replica_reads_from_the_source():
+    source = FakeSource()
+    store(source, "1")
+    replica, clock = replica_of(source, max_staleness=30)
+    replica.hydrate()
+    source.down = True
+    clock.now = 31
+    with pytest.raises(ConnectionError):
+        replica.sync_once()
+    source.down = False
+    store(source, "2")  # written elsewhere; the replica has not seen it
+    assert not replica.fresh
+    assert [row["title"] for row in replica.weekly_digest(7)] == ["Post 1", "Post 2"]
+    assert replica.source_reads == 1 and replica.local_reads == 0
+    replica.sync_once()
+    assert replica.fresh
+    assert [row["title"] for row in replica.weekly_digest(7)] == ["Post 1", "Post 2"]
+    assert replica.local_reads == 1
+
+
+def test_snapshot_round_trip_then_catch_up(tmp_path):
+    source = FakeSource()
+    store(source, "1", "2")
+    source.similar["1"] = [{"telegram_message_id": "2", "score": 0.95}]
+    replica, _ = replica_of(source)
+    replica.hydrate()
+    path = tmp_path / "replica.jsonl"
+    replica.save_snapshot(path)
+
+    source.tick(10)
+    store(source, "3")
+    restarted, _ = replica_of(source)
+    source.queries.clear()
+    assert restarted.load_snapshot(path)
+    # Only the catch-up pass ran: changes since the saved watermark, no hydrate.
+    assert all("since" in query for query in source.queries)
+    assert restarted.watermark == source.now.isoformat()
+    assert sorted(restarted._known) == ["1", "2", "3"]
+    assert restarted.get_article("2").body == "Body 2"
+    assert restarted.get_embedding("1") == replica.get_embedding("1")
+    edges = restarted.local.similarity_edges
+    assert [(edge["source"], edge["target"]) for edge in edges] == [("1", "2")]
+    assert edges[0]["score"] == pytest.approx(0.95)
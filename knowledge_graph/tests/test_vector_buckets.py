@@ -0,0 +1,76 @@
+"""Bucketed dedupe search matches the flat scan without compacting on the request path."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+from prototype import Article, InMemoryKnowledgeGraph
+
+DIM = 16
+NOW = datetime(2026, 10, 1)
+
+
+def article(index: int) -> Article:
+    return Article(
+        telegram_message_id=str(index),
+        title=f"Article {index}",
+        body="",
+        telegram_url=f"https://t.me/c/{index}",
+        published_at=NOW - timedelta(hours=index * 8),
+        source_channel="c",
+    )
+
+
+def build(count=300):
+    rng = random.Random(7)
+    topics = [[rng.gauss(0, 1) for _ in range(DIM)] for _ in range(8)]
+    graph = InMemoryKnowledgeGraph(DIM)
+    graph.vector_buckets.background_compaction = False
+    vectors = [[value + rng.gauss(0, 0.4) for value in rng.choice(topics)] for _ in range(count)]
+    graph.write_batch(
+        [
+            ("upsert_article", {"article": article(index), "embedding": vector})
+            for index, vector in enumerate(vectors)
+        ]
+    )
+    queries = [[value + rng.gauss(0, 0.1) for value in rng.choice(vectors)] for _ in range(10)]
+    return graph, vectors, queries
+
+
+def assert_matches_flat(graph, queries):
+    for query in queries:
+        flat = graph.find_similar_articles(query, "", 5, 0.7, channels=["c"])
+        assert graph.find_similar_articles(query, "", 5, 0.7) == flat
+
+
+def test_search_scans_uncompacted_weeks_flat():
+    graph, _, queries = build()
+    assert_matches_flat(graph, queries)
+    assert graph.vector_buckets.stats()["compacted"] == 0
+    assert graph.vector_buckets.last_mode == "flat"
+    graph.close()
+
+
+def test_compacted_search_and_edits_match_flat_scan():
+    graph, vectors, queries = build()
+    assert graph.compact_vectors() > 0
+    assert_matches_flat(graph, queries)
+    assert graph.vector_buckets.last_mode == "groups"
+    compacted = graph.vector_buckets.stats()["compacted"]
+    # Move old articles onto other topics; their weeks stay compacted.
+    for index in range(250, 300):
+        graph.upsert_article(article(index), vectors[index - 250])
+    assert graph.vector_buckets.stats()["compacted"] == compacted
+    assert_matches_flat(graph, queries + [vectors[0]])
+    graph.close()
+
+
+def test_background_compaction_starts_from_search():
+    graph, _, queries = build()
+    buckets = graph.vector_buckets
+    buckets.background_compaction = True
+    graph.find_similar_articles(queries[0], "", 5, 0.7)
+    buckets.wait_for_compaction(30)
+    assert buckets.stats()["compacted"] > 0
+    assert_matches_flat(graph, queries)
+    graph.close()
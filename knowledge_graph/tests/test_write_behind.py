@@ -0,0 +1,123 @@
+"""WriteBehindKnowledgeGraph group commit, read-your-writes, crash recovery and dead letters."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from journal import AppendOnlyJournal
+from prototype import Article, GraphQueryError, InMemoryKnowledgeGraph
+from write_behind import WriteBehindKnowledgeGraph
+
+DIM = 4
+
+
+class RecordingGraph(InMemoryKnowledgeGraph):
+    """In-memory graph that logs batch sizes; `refuse`/`down` make write_batch raise."""
+
+    def __init__(self) -> None:
+        super().__init__(DIM)
+        self.batches: List[int] = []
+        self.refuse: set[str] = set()
+        self.down = False
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        if self.down:
+            raise ConnectionError("neo4j down")
+        for _, payload in operations:
+            article = payload.get("article")
+            if article is not None and article.telegram_message_id in self.refuse:
+                raise GraphQueryError(
+                    "constraint", "Neo.ClientError.Schema.ConstraintValidationFailed"
+                )
+        self.batches.append(len(operations))
+        super().write_batch(operations)
+
+
+def article(message_id: str) -> Article:
+    return Article(
+        telegram_message_id=message_id,
+        title=f"Post {message_id}",
+        body="",
+        telegram_url=f"https://t.me/c/{message_id}",
+        published_at=datetime.utcnow(),
+        source_channel="c",
+        topics=["AI"],
+    )
+
+
+def buffered(graph: RecordingGraph, journal: AppendOnlyJournal) -> WriteBehindKnowledgeGraph:
+    return WriteBehindKnowledgeGraph(graph, journal, batch_size=3, start_flusher=False)
+
+
+def ingest(writer: WriteBehindKnowledgeGraph, ids: Sequence[str]) -> None:
+    for message_id in ids:
+        writer.upsert_article(article(message_id), [1.0, 0.0, 0.0, float(message_id)])
+        writer.attach_topics(article(message_id))
+
+
+def test_flush_group_commits_in_batches():
+    graph = RecordingGraph()
+    writer = buffered(graph, AppendOnlyJournal(None))
+    ingest(writer, ["1", "2", "3"])
+    assert graph.batches == [] and writer.pending == 6
+    assert writer.flush() == 6
+    assert graph.batches == [3, 3]
+    assert len(graph) == 3 and writer.pending == 0
+
+
+def test_reads_see_buffered_writes():
+    graph = RecordingGraph()
+    writer = buffered(graph, AppendOnlyJournal(None))
+    ingest(writer, ["1"])
+    # Dedupe answers from the overlay without committing...
+    similar = writer.find_similar_articles([1.0, 0.0, 0.0, 1.0], "2", 5, 0.9)
+    assert [row["telegram_message_id"] for row in similar] == ["1"]
+    assert graph.batches == []
+    # ...other reads commit first.
+    assert [row["title"] for row in writer.weekly_digest(7)] == ["Post 1"]
+    assert writer.pending == 0
+
+
+def test_unflushed_writes_are_replayed_after_a_crash(tmp_path):
+    path = tmp_path / "write-behind.jsonl"
+    crashed = buffered(RecordingGraph(), AppendOnlyJournal(path))
+    ingest(crashed, ["1", "2"])
+    crashed.journal.close()  # process dies before the flusher ran
+
+    graph = RecordingGraph()
+    restarted = buffered(graph, AppendOnlyJournal(path))
+    assert restarted.pending == 4
+    assert restarted.find_similar_articles([1.0, 0.0, 0.0, 2.0], "x", 5, 0.99)
+    restarted.flush()
+    assert len(graph) == 2
+    restarted.close()
+    assert AppendOnlyJournal(path).pending_count() == 0
+
+
+def test_refused_operations_are_dead_lettered():
+    graph = RecordingGraph()
+    graph.refuse = {"2"}
+    writer = buffered(graph, AppendOnlyJournal(None))
+    ingest(writer, ["1", "2", "3"])
+    writer.flush()
+    assert writer.pending == 0
+    assert sorted(graph._article_ids) == ["1", "3"]
+    rejected = writer.dead_letter.pending()
+    assert [(entry["op"], entry["article"]["telegram_message_id"]) for entry in rejected] == [
+        ("upsert_article", "2"),
+        ("attach_topics", "2"),
+    ]
+    assert writer.stats()["operations_rejected"] == 2
+
+
+def test_reads_do_not_raise_while_upstream_refuses_writes():
+    graph = RecordingGraph()
+    writer = buffered(graph, AppendOnlyJournal(None))
+    ingest(writer, ["1"])
+    graph.down = True
+    assert writer.weekly_digest(7) == []
+    assert writer.weekly_digest(7) == []
+    assert writer.pending == 2 and writer.last_flush_error is not None
+    graph.down = False
+    writer.flush()
+    assert [row["title"] for row in writer.weekly_digest(7)] == ["Post 1"]
@@ -0,0 +1,190 @@
+"""Embedding-centroid topic classifier for the canonical taxonomy.
+
+Topics come from the Prompt Builder LLM call, and posts it cannot place
+(`topicDecisionRequired`) take a second round trip through the topic-decider
+agent. Every post is embedded before either call, and posts about the same
+topic sit close together in embedding space, so most of them can be labelled
+locally. `CentroidTopicClassifier` keeps, for each of the 11 canonical topics,
+the running sum of the unit embeddings of articles labelled with it, so
+learning from a new labelled article is one vector add. Classifying is one dot
+product per topic against the normalized centroids.
+
+A prediction picks the best-scoring topic plus any within `spread` of it (up
+to `MAX_TOPICS`) that also reach `min_score`. It is confident only when the
+lowest chosen score beats the best unchosen one by `min_margin`. Topics with
+fewer than `min_examples` labelled articles are not scored, and fewer than
+two scored topics is never confident. Unconfident posts keep
+`topicDecisionRequired` and go to the LLM as before. Labels come only from
+LLM/validated metadata, never from the classifier's own predictions, so its
+mistakes do not reinforce themselves.
+
+Centroids survive restarts via `save(path)` / `load(path)` (plain JSON).
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from array import array
+from dataclasses import dataclass, field
+from operator import mul
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    from metadata_validator import CANONICAL_TOPICS, MAX_TOPICS
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .metadata_validator import CANONICAL_TOPICS, MAX_TOPICS
+
+
+@dataclass(frozen=True)
+class TopicPrediction:
+    topics: List[str]
+    scores: Dict[str, float] = field(default_factory=dict)
+    confidence: float = 0.0  # cosine of the best topic
+    margin: float = 0.0  # lowest chosen score minus best unchosen score
+    decision_required: bool = True
+
+
+def _unit(vector: Sequence[float]) -> List[float] | None:
+    norm = math.sqrt(sum(map(mul, vector, vector)))
+    return [value / norm for value in vector] if norm else None
+
+
+class CentroidTopicClassifier:
+    """Incrementally trained nearest-centroid classifier over `CANONICAL_TOPICS`."""
+
+    def __init__(
+        self,
+        min_score: float = 0.6,
+        min_margin: float = 0.04,
+        spread: float = 0.04,
+        min_examples: int = 5,
+        topics: Sequence[str] = CANONICAL_TOPICS,
+    ) -> None:
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.spread = spread
+        self.min_examples = min_examples
+        self.topics = tuple(topics)
+        self.dimensions: int | None = None
+        self._sums: Dict[str, array] = {}
+        self._counts: Dict[str, int] = {}
+        # Normalized centroids of the trained topics, rebuilt after learning.
+        # Plain lists: their floats are already boxed, so dot products run faster.
+        self._centroids: List[Tuple[str, List[float]]] | None = None
+        self._lock = threading.Lock()
+
+    # Training --------------------------------------------------------------
+    def learn(self, topics: Iterable[str], embedding: Sequence[float]) -> None:
+        """Add one labelled article; topics outside the taxonomy are ignored."""
+        labels = [topic for topic in dict.fromkeys(topics) if topic in self.topics]
+        unit = _unit(embedding) if labels else None
+        if unit is None:
+            return
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = len(unit)
+            elif len(unit) != self.dimensions:
+                raise ValueError(
+                    f"Embedding has {len(unit)} dimensions, classifier has {self.dimensions}."
+                )
+            for topic in labels:
+                total = self._sums.get(topic)
+                if total is None:
+                    self._sums[topic] = array("d", unit)
+                else:
+                    for index, value in enumerate(unit):
+                        total[index] += value
+                self._counts[topic] = self._counts.get(topic, 0) + 1
+            self._centroids = None
+
+    def learn_many(self, labelled: Iterable[Tuple[Sequence[str], Sequence[float]]]) -> None:
+        for topics, embedding in labelled:
+            self.learn(topics, embedding)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _trained(self) -> List[Tuple[str, List[float]]]:
+        with self._lock:
+            if self._centroids is None:
+                centroids = []
+                for topic in self.topics:
+                    if self._counts.get(topic, 0) < self.min_examples:
+                        continue
+                    unit = _unit(self._sums[topic])
+                    if unit is not None:
+                        centroids.append((topic, unit))
+                self._centroids = centroids
+            return self._centroids
+
+    # Prediction ------------------------------------------------------------
+    def classify(self, embedding: Sequence[float]) -> TopicPrediction:
+        centroids = self._trained()
+        norm = math.sqrt(sum(map(mul, embedding, embedding)))
+        if not norm or not centroids:
+            return TopicPrediction([])
+        if len(embedding) != self.dimensions:
+            raise ValueError(
+                f"Embedding has {len(embedding)} dimensions, classifier has {self.dimensions}."
+            )
+        ranked = sorted(
+            ((sum(map(mul, embedding, centroid)) / norm, topic) for topic, centroid in centroids),
+            reverse=True,
+        )
+        best = ranked[0][0]
+        chosen = [
+            (score, topic)
+            for score, topic in ranked[:MAX_TOPICS]
+            if score >= self.min_score and score >= best - self.spread
+        ]
+        scores = {topic: round(score, 4) for score, topic in ranked}
+        if not chosen or len(ranked) < 2:
+            return TopicPrediction([], scores, best)
+        runner_up = ranked[len(chosen)][0] if len(chosen) < len(ranked) else -1.0
+        margin = chosen[-1][0] - runner_up
+        return TopicPrediction(
+            [topic for _, topic in chosen],
+            scores,
+            best,
+            margin,
+            decision_required=margin < self.min_margin,
+        )
+
+    # Persistence -----------------------------------------------------------
+    def save(self, path: Path | str) -> None:
+        path = Path(path)
+        with self._lock:
+            state = {
+                "dimensions": self.dimensions,
+                "topics": {
+                    topic: {"count": self._counts[topic], "sum": list(total)}
+                    for topic, total in self._sums.items()
+                },
+            }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path | str, **kwargs) -> "CentroidTopicClassifier":
+        """A classifier with the centroids saved at `path` (empty if the file is missing)."""
+        classifier = cls(**kwargs)
+        path = Path(path)
+        if not path.exists():
+            return classifier
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            print(f"[WARN] Ignoring unreadable topic centroids at {path}: {exc}")
+            return classifier
+        classifier.dimensions = state.get("dimensions")
+        for topic, entry in (state.get("topics") or {}).items():
+            if topic in classifier.topics:
+                classifier._sums[topic] = array("d", entry["sum"])
+                classifier._counts[topic] = int(entry["count"])
+        return classifier
@@ -0,0 +1,403 @@
+"""Time-partitioned vector index for recency-first duplicate detection.
+
+Duplicates land within days of the original, but a flat scan scores the whole
+archive on every `find_similar_articles` call, so dedupe gets slower every
+week. `VectorBuckets` partitions the in-memory graph's embeddings into weekly
+buckets by `published_at` and searches them newest first:
+
+* the newest `hot_buckets` weeks are scanned exactly from the graph's float32
+  matrix, so fresh duplicates fill the top-k and raise the score bar early;
+* older (cold) weeks are compacted off the request path: each vector is
+  filed under the nearest "leader" of a codebook shared by all weeks (a new
+  leader is added when none is within `group_cosine`), and each (week,
+  leader) group keeps its angular radius plus int8 codes with one scale per
+  vector;
+* a query is compared with the codebook once. Leaders whose widest group
+  cannot reach the score bar (query angle to the leader minus the radius) are
+  dropped, so a cold week costs a few dict lookups unless it holds a group
+  near the query, and surviving int8 scores only trigger an exact float
+  rescore when their error bound could reach the bar.
+
+Pruning only drops vectors that provably cannot make the top-k, so results
+match the flat scan exactly. Compaction never runs inside `search`: a cold
+week that is not compacted yet is scanned flat and a background thread
+compacts it (or call `compact()` after hydrating an archive). Writes into a
+compacted week (late or edited articles) are filed into its groups in place.
+When the codebook bound would leave more vectors to estimate than a flat scan
+scores, the query scans the cold weeks flat instead, since an int8 estimate
+costs as much as an exact float score in pure Python.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from array import array
+from bisect import insort
+from operator import mul
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    from posting_lists import posting_add, posting_remove
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .posting_lists import posting_add, posting_remove
+
+SECONDS_PER_WEEK = 7 * 86400
+# Float32 storage and rounding in the bounds; never prune closer than this.
+BOUND_SLACK = 1e-5
+
+
+def _angle(cosine: float) -> float:
+    return math.acos(max(-1.0, min(1.0, cosine)))
+
+
+class _Group:
+    __slots__ = ("radius", "ids", "codes", "scales")
+
+    def __init__(self) -> None:
+        self.radius = 0.0  # largest angle (radians) between a member and its leader
+        self.ids = array("I")
+        self.codes = array("b")  # int8, len(ids) * dim
+        self.scales = array("f")  # per-vector dequantization scale
+
+    def without(self, position: int, dim: int) -> "_Group":
+        group = _Group()
+        group.radius = self.radius  # an upper bound still; recompaction tightens it
+        group.ids = self.ids[:position] + self.ids[position + 1 :]
+        group.codes = self.codes[: position * dim] + self.codes[(position + 1) * dim :]
+        group.scales = self.scales[:position] + self.scales[position + 1 :]
+        return group
+
+
+class _Bucket:
+    __slots__ = ("ids", "groups", "leaders", "version", "removed")
+
+    def __init__(self) -> None:
+        self.ids = array("I")
+        self.groups: Dict[int, _Group] | None = None  # leader -> group, once compacted
+        self.leaders = 0  # codebook size the groups refer into
+        self.version = 0  # bumped by every add/remove, so compaction can detect races
+        self.removed = 0  # members removed since compaction
+
+
+class VectorBuckets:
+    """Weekly buckets over a graph's flat embedding matrix (`vectors`, `norms`)."""
+
+    def __init__(
+        self,
+        vectors: array,
+        norms: array,
+        dim: int,
+        seconds_per_bucket: int = SECONDS_PER_WEEK,
+        hot_buckets: int = 4,
+        group_cosine: float = 0.8,
+        max_leaders: int = 256,
+        background_compaction: bool = True,
+    ) -> None:
+        self.vectors = vectors
+        self.norms = norms
+        self.dim = dim
+        self.seconds_per_bucket = seconds_per_bucket
+        self.hot_buckets = hot_buckets
+        self.group_cosine = group_cosine
+        self.max_leaders = max_leaders
+        self.background_compaction = background_compaction
+        self.buckets: Dict[int, _Bucket] = {}
+        self._keys: List[int] = []
+        # Codebook. Append-only while searches run: `_leaders` grows before
+        # `_leader_radius`, so len(_leader_radius) leaders are always usable.
+        self._leaders: List[List[float]] = []  # unit vectors
+        self._leader_radius: List[float] = []  # widest group radius per leader
+        self._leader_members: List[int] = []  # vectors filed under each leader
+        # Guards buckets' ids/groups and the codebook against a concurrent compactor.
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()  # one compaction pass at a time
+        self._compactor: threading.Thread | None = None
+        # Counters for the last search, for benchmarks and debugging.
+        self.last_scored = 0
+        self.last_pruned = 0
+        self.last_mode = ""
+
+    def _key(self, timestamp: float) -> int:
+        return int(timestamp // self.seconds_per_bucket)
+
+    def add(self, article_id: int, timestamp: float) -> None:
+        key = self._key(timestamp)
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = _Bucket()
+                insort(self._keys, key)
+            posting_add(bucket.ids, article_id)
+            bucket.version += 1
+            if bucket.groups is not None:
+                self._file(bucket, article_id)
+
+    def remove(self, article_id: int, timestamp: float) -> None:
+        with self._lock:
+            bucket = self.buckets.get(self._key(timestamp))
+            if bucket is None:
+                return
+            posting_remove(bucket.ids, article_id)
+            bucket.version += 1
+            if bucket.groups is not None:
+                self._unfile(bucket, article_id)
+
+    def _is_cold(self, key: int) -> bool:
+        return self._keys[-1] - key >= self.hot_buckets
+
+    def _unit(self, article_id: int) -> List[float] | None:
+        norm = self.norms[article_id]
+        if not norm:
+            return None
+        offset = article_id * self.dim
+        return [value / norm for value in self.vectors[offset : offset + self.dim]]
+
+    # Compaction ------------------------------------------------------------
+    def compact(self) -> int:
+        """Compact every cold bucket that needs it; returns how many were built.
+
+        Searches never call this; they scan uncompacted weeks flat and start
+        it on a background thread. Writes are only blocked while a finished
+        bucket is installed, not while it is built.
+        """
+        built = 0
+        with self._compact_lock:
+            for key in list(self._keys):
+                bucket = self.buckets[key]
+                stale = bucket.groups is None or bucket.removed * 2 > len(bucket.ids)
+                if stale and self._is_cold(key) and self._compact_bucket(bucket):
+                    built += 1
+            self._refresh_radius()
+        return built
+
+    def compact_in_background(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self.compact, name="kg-vector-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    def wait_for_compaction(self, timeout: float | None = None) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
+
+    def _compact_bucket(self, bucket: _Bucket) -> bool:
+        with self._lock:
+            ids, version = array("I", bucket.ids), bucket.version
+            leaders = self._leaders[: len(self._leader_radius)]
+        known = len(leaders)
+        groups: Dict[int, _Group] = {}
+        for article_id in ids:
+            unit = self._unit(article_id)
+            if unit is None:
+                continue
+            leader, cosine = self._nearest_leader(unit, leaders)
+            self._append(groups, leader, cosine, article_id, unit)
+        with self._lock:
+            if bucket.version != version:
+                return False  # written meanwhile; the next pass retries
+            # Leaders this build created get their final codebook slots now.
+            remap = {
+                local: self._add_leader(leaders[local]) for local in range(known, len(leaders))
+            }
+            groups = {remap.get(leader, leader): group for leader, group in groups.items()}
+            for leader, group in (bucket.groups or {}).items():
+                self._leader_members[leader] -= len(group.ids)
+            for leader, group in groups.items():
+                self._leader_members[leader] += len(group.ids)
+                self._leader_radius[leader] = max(self._leader_radius[leader], group.radius)
+            bucket.leaders = len(self._leader_radius)
+            bucket.groups, bucket.removed = groups, 0
+        return True
+
+    def _refresh_radius(self) -> None:
+        # Group radii only grow as members are filed in; recompute the
+        # per-leader maximum from the current groups so pruning tightens again.
+        with self._lock:
+            radius = [0.0] * len(self._leader_radius)
+            for bucket in self.buckets.values():
+                for leader, group in (bucket.groups or {}).items():
+                    radius[leader] = max(radius[leader], group.radius)
+            self._leader_radius = radius
+
+    def _file(self, bucket: _Bucket, article_id: int) -> None:
+        """File one vector into a compacted bucket (caller holds `_lock`)."""
+        unit = self._unit(article_id)
+        if unit is None:
+            return
+        leaders = self._leaders[: len(self._leader_radius)]
+        known = len(leaders)
+        leader, cosine = self._nearest_leader(unit, leaders)
+        if leader >= known:
+            leader = self._add_leader(unit)
+        # Copy-on-write: a concurrent search may be iterating the old dict.
+        groups = dict(bucket.groups)
+        self._append(groups, leader, cosine, article_id, unit)
+        self._leader_members[leader] += 1
+        self._leader_radius[leader] = max(self._leader_radius[leader], groups[leader].radius)
+        bucket.leaders = max(bucket.leaders, leader + 1)
+        bucket.groups = groups
+
+    def _unfile(self, bucket: _Bucket, article_id: int) -> None:
+        for leader, group in bucket.groups.items():
+            for position, member in enumerate(group.ids):
+                if member == article_id:
+                    groups = dict(bucket.groups)
+                    groups[leader] = group.without(position, self.dim)
+                    self._leader_members[leader] -= 1
+                    bucket.removed += 1
+                    bucket.groups = groups
+                    return
+
+    def _append(
+        self,
+        groups: Dict[int, _Group],
+        leader: int,
+        cosine: float,
+        article_id: int,
+        unit: List[float],
+    ) -> None:
+        group = groups.get(leader)
+        if group is None:
+            group = groups[leader] = _Group()
+        group.radius = max(group.radius, _angle(cosine))
+        scale = max(map(abs, unit)) / 127 or 1.0
+        # Codes before the id, so a reader that sees the id sees its codes.
+        group.codes.extend(round(value / scale) for value in unit)
+        group.scales.append(scale)
+        group.ids.append(article_id)
+
+    def _add_leader(self, unit: List[float]) -> int:
+        self._leaders.append(unit)
+        self._leader_members.append(0)
+        self._leader_radius.append(0.0)
+        return len(self._leader_radius) - 1
+
+    def _nearest_leader(self, unit: List[float], leaders: List[List[float]]) -> Tuple[int, float]:
+        """Nearest of `leaders`, appending `unit` to the list when none is close enough."""
+        best, best_cosine = -1, -2.0
+        for leader, vector in enumerate(leaders):
+            cosine = sum(map(mul, unit, vector))
+            if cosine > best_cosine:
+                best, best_cosine = leader, cosine
+        if best_cosine < self.group_cosine and len(leaders) < self.max_leaders:
+            # Past `max_leaders` stragglers join their nearest leader and widen it.
+            leaders.append(unit)
+            return len(leaders) - 1, 1.0
+        return best, best_cosine
+
+    # Search ----------------------------------------------------------------
+    def search(
+        self, query: Sequence[float], limit: int, min_score: float, exclude: int | None = None
+    ) -> List[Tuple[float, int]]:
+        """Exact `(cosine, article_id)` top-`limit` with cosine >= `min_score`, best first."""
+        query_norm = math.sqrt(sum(value * value for value in query))
+        keys = list(reversed(self._keys))
+        if not query_norm or limit <= 0 or not keys:
+            return []
+        dim, vectors, norms = self.dim, self.vectors, self.norms
+        top: List[Tuple[float, int]] = []
+        scored = 0
+
+        def scan(ids: Sequence[int]) -> None:
+            nonlocal scored
+            floor = top[0][0] if len(top) == limit else min_score
+            for article_id in ids:
+                norm = norms[article_id]
+                if not norm or article_id == exclude:
+                    continue
+                scored += 1
+                offset = article_id * dim
+                score = sum(map(mul, query, vectors[offset : offset + dim])) / (query_norm * norm)
+                if score < floor:
+                    continue
+                if len(top) < limit:
+                    heapq.heappush(top, (score, article_id))
+                elif (score, article_id) > top[0]:
+                    heapq.heapreplace(top, (score, article_id))
+                else:
+                    continue
+                if len(top) == limit:
+                    floor = top[0][0]
+
+        # Snapshot the codebook once; a compactor may extend it meanwhile.
+        radius = self._leader_radius
+        known = len(radius)
+        newest = keys[0]
+        ready: List[Tuple[_Bucket, Dict[int, _Group]]] = []
+        unready = False
+        for key in keys:
+            bucket = self.buckets[key]
+            groups = bucket.groups
+            if newest - key < self.hot_buckets:
+                scan(bucket.ids)
+            elif groups is None or bucket.leaders > known:
+                unready = unready or groups is None
+                scan(bucket.ids)
+            else:
+                ready.append((bucket, groups))
+        if unready and self.background_compaction:
+            self.compact_in_background()
+
+        archived = sum(len(bucket.ids) for bucket, _ in ready)
+        self.last_mode = "flat"
+        if archived > known:
+            bar = top[0][0] if len(top) == limit else min_score
+            unit = [value / query_norm for value in query]
+            angles = [_angle(sum(map(mul, unit, leader))) for leader in self._leaders[:known]]
+            # Leaders none of whose groups can reach the bar are skipped in every week.
+            passing = [
+                leader
+                for leader, angle in enumerate(angles)
+                if math.cos(max(0.0, angle - radius[leader])) + BOUND_SLACK >= bar
+            ]
+            members = self._leader_members
+            if known + sum(members[leader] for leader in passing) < archived:
+                self.last_mode = "groups"
+                spread = sum(map(abs, unit)) / 2
+                for _, groups in ready:
+                    if len(passing) < len(groups):
+                        candidates = [(leader, groups.get(leader)) for leader in passing]
+                    else:
+                        candidates = list(groups.items())
+                    for leader, group in candidates:
+                        if group is None:
+                            continue
+                        bar = top[0][0] if len(top) == limit else min_score
+                        if math.cos(max(0.0, angles[leader] - group.radius)) + BOUND_SLACK < bar:
+                            continue
+                        codes, scales = group.codes, group.scales
+                        survivors = [
+                            article_id
+                            for index, article_id in enumerate(group.ids)
+                            if (
+                                sum(map(mul, unit, codes[index * dim : index * dim + dim])) + spread
+                            )
+                            * scales[index]
+                            + BOUND_SLACK
+                            >= bar
+                        ]
+                        archived -= len(survivors)
+                        scan(survivors)
+                ready = []
+        for bucket, _ in ready:
+            scan(bucket.ids)
+        if self.last_mode == "flat":
+            archived = 0
+        self.last_scored, self.last_pruned = scored, archived
+        return sorted(top, reverse=True)
+
+    def stats(self) -> Dict[str, int]:
+        compacted = [bucket for bucket in self.buckets.values() if bucket.groups is not None]
+        groups = [group for bucket in compacted for group in bucket.groups.values()]
+        return {
+            "buckets": sum(1 for bucket in self.buckets.values() if bucket.ids),
+            "compacted": len(compacted),
+            "leaders": len(self._leader_radius),
+            "groups": len(groups),
+            "int8_bytes": sum(len(group.codes) for group in groups),
+        }
@@ -0,0 +1,343 @@
+"""Write-behind ingest: journal locally, group-commit to Neo4j in the background.
+
+Every synchronous `run_cypher` write used to sit on the Telegram trigger's
+latency path. `WriteBehindKnowledgeGraph` acknowledges an ingest call as soon
+as the operation is fsynced to an `AppendOnlyJournal`; a flusher thread then
+drains the journal in batches (by size or time window) through the backend's
+`write_batch`, so one Aura round trip commits many articles. Unflushed entries
+left by a crash are replayed on startup.
+
+Duplicate checks keep read-your-writes semantics: `find_similar_articles`
+merges upstream vector hits with an in-process overlay of the articles that
+are still buffered. Other reads flush pending writes first.
+
+A batch Neo4j refuses (see `is_query_error`) is split into single operations
+and the refused ones go to a dead-letter journal, so one bad post cannot hold
+back the rest. While upstream fails for any other reason the entries stay
+buffered, the flusher retries with backoff and reads are served without
+waiting for them.
+
+Opt-in: set `KG_WRITE_BEHIND_PATH` to a journal file (one process per file)
+and `ingest_service.py` / `ingest_similar_articles.py` wrap their graph with
+`write_behind_from_env`.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+try:
+    from journal import AppendOnlyJournal
+    from prototype import Article, InMemoryKnowledgeGraph, PagedReadsMixin, is_query_error
+except ModuleNotFoundError:  # pragma: no cover - package import fallback
+    from .journal import AppendOnlyJournal
+    from .prototype import Article, InMemoryKnowledgeGraph, PagedReadsMixin, is_query_error
+
+
+def _encode(op: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"op": op}
+    if "article" in payload:
+        entry["article"] = payload["article"].to_dict()
+    if "embedding" in payload:
+        entry["embedding"] = list(payload["embedding"])
+    if op == "create_similarity_links":
+        entry["source_id"] = payload["source_id"]
+        entry["matches"] = payload["matches"]
+    return entry
+
+
+def _decode(entry: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    payload: Dict[str, Any] = {}
+    if "article" in entry:
+        payload["article"] = Article.from_dict(entry["article"])
+    if "embedding" in entry:
+        payload["embedding"] = entry["embedding"]
+    if entry["op"] == "create_similarity_links":
+        payload["source_id"] = entry["source_id"]
+        payload["matches"] = entry["matches"]
+    return entry["op"], payload
+
+
+def write_behind_from_env(graph: Any) -> Any:
+    """`graph` behind a write-behind journal when `KG_WRITE_BEHIND_PATH` is set."""
+    path = os.getenv("KG_WRITE_BEHIND_PATH")
+    if not path:
+        return graph
+    print(f"[INFO] Buffering graph writes in {path} (write-behind).")
+    return WriteBehindKnowledgeGraph(graph, AppendOnlyJournal(path))
+
+
+class WriteBehindKnowledgeGraph(PagedReadsMixin):
+    """Journal-backed write buffer in front of a graph backend with `write_batch`."""
+
+    def __init__(
+        self,
+        graph: Any,
+        journal: AppendOnlyJournal,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        start_flusher: bool = True,
+        dead_letter: AppendOnlyJournal | None = None,
+    ) -> None:
+        self.graph = graph
+        self.journal = journal
+        if dead_letter is None:
+            path = journal.path
+            dead_letter = AppendOnlyJournal(
+                path.with_name(path.name + ".rejected") if path is not None else None
+            )
+        self.dead_letter = dead_letter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Articles not yet committed upstream, keyed by id: (article, embedding, seq).
+        self._overlay: Dict[str, Tuple[Article, List[float], int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop = False
+        self.batches_committed = 0
+        self.operations_committed = 0
+        self.operations_rejected = 0
+        self.last_flush_error: Exception | None = None
+        self._recover()
+        self._flusher: threading.Thread | None = None
+        if start_flusher:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="kg-write-behind", daemon=True
+            )
+            self._flusher.start()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    # Writes ----------------------------------------------------------------
+    def upsert_article(self, article: Article, embedding: Sequence[float]) -> None:
+        self._append("upsert_article", {"article": article, "embedding": embedding})
+
+    def attach_topics(self, article: Article) -> None:
+        self._append("attach_topics", {"article": article})
+
+    def attach_entities(self, article: Article) -> None:
+        self._append("attach_entities", {"article": article})
+
+    def attach_projects(self, article: Article) -> None:
+        self._append("attach_projects", {"article": article})
+
+    def create_similarity_links(
+        self, source_id: str, matches: List[Dict[str, object]]
+    ) -> None:
+        if matches:
+            self._append("create_similarity_links", {"source_id": source_id, "matches": matches})
+
+    def write_batch(self, operations: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            seqs = self.journal.append_many(_encode(op, payload) for op, payload in operations)
+            for (op, payload), seq in zip(operations, seqs):
+                self._track(op, payload, seq)
+            if self.journal.pending_count() >= self.batch_size:
+                self._wakeup.notify()
+
+    def merge_entities(self, groups: Sequence[Dict[str, Any]]) -> None:
+        # Merges rewrite MENTIONS edges, so buffered attach_entities must land first.
+        self.flush()
+        self.graph.merge_entities(groups)
+
+    def _append(self, op: str, payload: Dict[str, Any]) -> None:
+        self.write_batch([(op, payload)])
+
+    def _track(self, op: str, payload: Dict[str, Any], seq: int) -> None:
+        article = payload.get("article")
+        if article is None:
+            return
+        if op == "upsert_article":
+            self._overlay[article.telegram_message_id] = (
+                article,
+                list(payload["embedding"]),
+                seq,
+            )
+            return
+        current = self._overlay.get(article.telegram_message_id)
+        if current is not None:
+            self._overlay[article.telegram_message_id] = (article, current[1], seq)
+
+    # Reads -----------------------------------------------------------------
+    def find_similar_articles(
+        self,
+        embedding: Sequence[float],
+        telegram_message_id: str,
+        limit: int = 5,
+        min_score: float = 0.88,
+        channels: Sequence[str] | None = None,
+    ) -> List[Dict[str, object]]:
+        with self._lock:
+            buffered = list(self._overlay.values())
+        matches: Dict[str, Dict[str, object]] = {}
+        for record in self.graph.find_similar_articles(
+            embedding,
+            telegram_message_id=telegram_message_id,
+            limit=limit,
+            min_score=min_score,
+            channels=channels,
+        ):
+            matches[str(record["telegram_message_id"])] = record
+        for article, other, _ in buffered:
+            if article.telegram_message_id == telegram_message_id:
+                continue
+            if channels and article.source_channel not in channels:
+                continue
+            score = InMemoryKnowledgeGraph._cosine_similarity(embedding, other)
+            if score >= min_score:
+                matches[article.telegram_message_id] = {
+                    "telegram_message_id": article.telegram_message_id,
+                    "title": article.title,
+                    "telegram_url": article.telegram_url,
+                    "score": score,
+                }
+        results = sorted(matches.values(), key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    def weekly_digest(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        self._flush_for_read()
+        return self.graph.weekly_digest(*args, **kwargs)
+
+    def article_list_by_entity(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        self._flush_for_read()
+        return self.graph.article_list_by_entity(*args, **kwargs)
+
+    def articles_by_domain(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        self._flush_for_read()
+        return self.graph.articles_by_domain(*args, **kwargs)
+
+    def vlm_projects(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        self._flush_for_read()
+        return self.graph.vlm_projects(*args, **kwargs)
+
+    def image_edit_news(self, *args: Any, **kwargs: Any) -> List[Dict[str, object]]:
+        self._flush_for_read()
+        return self.graph.image_edit_news(*args, **kwargs)
+
+    def read_page(self, *args: Any, **kwargs: Any) -> Tuple[List[Dict[str, object]], str | None]:
+        self._flush_for_read()
+        return self.graph.read_page(*args, **kwargs)
+
+    # Flushing --------------------------------------------------------------
+    @property
+    def pending(self) -> int:
+        return self.journal.pending_count()
+
+    def flush(self) -> int:
+        """Commit every pending entry; returns how many operations were written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                entries = self.journal.pending(limit=self.batch_size)
+                if not entries:
+                    self.last_flush_error = None
+                    return written
+                try:
+                    self.graph.write_batch([_decode(entry) for entry in entries])
+                except Exception as exc:
+                    if not is_query_error(exc):
+                        raise
+                    # Neo4j refused something in the batch: find it one operation at a time.
+                    written += self._write_each(entries)
+                    continue
+                self._committed(entries)
+                self.batches_committed += 1
+                written += len(entries)
+
+    def _write_each(self, entries: List[Dict[str, Any]]) -> int:
+        written = 0
+        for entry in entries:
+            try:
+                self.graph.write_batch([_decode(entry)])
+            except Exception as exc:
+                if not is_query_error(exc):
+                    raise
+                self.dead_letter.append(dict(entry, journal_seq=entry["seq"], error=str(exc)))
+                self.operations_rejected += 1
+                print(
+                    f"[WARN] Neo4j rejected buffered {entry['op']} #{entry['seq']} ({exc}); "
+                    "moved to dead letters."
+                )
+                self._committed([entry], count=False)
+                continue
+            self._committed([entry])
+            self.batches_committed += 1
+            written += 1
+        return written
+
+    def _committed(self, entries: List[Dict[str, Any]], count: bool = True) -> None:
+        last_seq = entries[-1]["seq"]
+        with self._lock:
+            self.journal.mark_flushed(last_seq)
+            for article_id, (_, _, seq) in list(self._overlay.items()):
+                if seq <= last_seq:
+                    del self._overlay[article_id]
+        if count:
+            self.operations_committed += len(entries)
+
+    def _flush_for_read(self) -> None:
+        if self.last_flush_error is not None:
+            return  # upstream is failing; the flusher retries with backoff meanwhile
+        try:
+            self.flush()
+        except Exception as exc:  # noqa: BLE001 - serve the read, keep the writes buffered
+            print(f"[WARN] Write-behind flush failed ({exc}); reading without buffered writes.")
+            self.last_flush_error = exc
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pending": self.pending,
+            "buffered_articles": len(self._overlay),
+            "batches_committed": self.batches_committed,
+            "operations_committed": self.operations_committed,
+            "operations_rejected": self.operations_rejected,
+            "avg_batch_size": (
+                self.operations_committed / self.batches_committed if self.batches_committed else 0.0
+            ),
+            "last_flush_error": None if self.last_flush_error is None else str(self.last_flush_error),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop = True
+            self._wakeup.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        try:
+            self.flush()
+        except Exception as exc:  # noqa: BLE001 - entries stay journaled for next start
+            print(f"[WARN] Final write-behind flush failed ({exc}); replaying on next start.")
+        self.journal.close()
+        self.dead_letter.close()
+        self.graph.close()
+
+    def _flush_loop(self) -> None:
+        backoff = self.flush_interval
+        while True:
+            with self._lock:
+                if not self._stop and self.journal.pending_count() < self.batch_size:
+                    self._wakeup.wait(timeout=backoff)
+                if self._stop:
+                    return
+            try:
+                self.flush()
+            except Exception as exc:  # noqa: BLE001 - keep buffering while upstream is down
+                if self.last_flush_error is None:
+                    print(f"[WARN] Write-behind flush failed ({exc}); retrying.")
+                self.last_flush_error = exc
+                backoff = min(backoff * 2, 30.0)
+                continue
+            self.last_flush_error = None
+            backoff = self.flush_interval
+
+    def _recover(self) -> None:
+        entries = self.journal.pending()
+        for entry in entries:
+            op, payload = _decode(entry)
+            self._track(op, payload, entry["seq"])
+        if entries:
+            print(f"[INFO] Recovered {len(entries)} unflushed graph writes from the journal.")